@@ -3,16 +3,20 @@ Main routine--creates API GUI.
 """
 import argparse
 import logging
+import multiprocessing
 import os
 
-import wx.adv
+import wx
 
-from src.getmyapidata.api_gui import ApiGui
 from src.getmyapidata.common import resource_path
 from src.getmyapidata.my_logging import setup_logging
 from src.getmyapidata.splash import MySplashScreen
+from src.getmyapidata.startup import StartupChecks
 
 if __name__ == "__main__":
+    # HealthPro conversion can use other processes, which must not start the GUI.
+    multiprocessing.freeze_support()
+
     parser: argparse.ArgumentParser = argparse.ArgumentParser(
         description="A GUI-based tool to retrieve All of Us participant data using the InSite API."
     )
@@ -35,15 +39,23 @@ if __name__ == "__main__":
     ]:
         log.setLevel(args.log_level)
 
+    # Look for gcloud & our version while the splash screen shows.
+    startup_checks: StartupChecks = StartupChecks(log)
+    startup_checks.start()
+
     # Display splash screen.
     app: wx.App = wx.App(redirect=False)
     splash = MySplashScreen(resource_path("UCSD_school_of_medicine.png"))
     splash.Show()
     app.Yield()
 
-    # Create the GUI.
+    # Only now load the GUI module.
+    # pylint: disable=import-outside-toplevel
+    from src.getmyapidata.api_gui import ApiGui
+
+    # Create the GUI, which shows what the checks find once they're done.
     log.info("Instantiating ApiGui object.")
-    gui: ApiGui = ApiGui(log)
+    gui: ApiGui = ApiGui(log, startup_checks=startup_checks)
 
     try:
         splash.Destroy()
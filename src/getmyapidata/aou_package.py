@@ -8,10 +8,16 @@ from configparser import ConfigParser, ExtendedInterpolation
 
 from src.getmyapidata.common import \
     ensure_path_possible  # pylint: disable=import-error
+from src.getmyapidata.output_options import (DEFAULT_PARQUET_COMPRESSION,
+                                             ROW_GROUP_SIZE, OutputOptions,
+                                             parse_columns, parse_formats)
 
 # String we insert into config file & GUI entries.
 DUMMY: str = "<YourNameHere>"
 
+# Create a new service account key once the current one's this old.
+DEFAULT_KEY_MAX_AGE_DAYS: int = 90
+
 
 def get_config(log: logging.Logger, config_file: str = None) -> ConfigParser:
     """
@@ -82,8 +88,24 @@ def make_config(config_file: str, log: logging.Logger) -> None:
         "pmi_account": DUMMY + "@pmi-ops.org",
         "project": "all-of-us-ops-data-api-prod",
         "token_file": os.path.join(cwd, "key.json"),
+        "key_max_age_days": str(DEFAULT_KEY_MAX_AGE_DAYS),
+        "delete_old_keys": "no",
     }
     config["Logs"] = {"log_directory": cwd}
+    config["HealthPro"] = {
+        "chunk_size": "0",
+        "combined": "no",
+        "engine": "auto",
+        "workers": "1",
+    }
+    config["Output"] = {
+        "compression": "none",
+        "formats": "",
+        "index": "yes",
+        "parquet_compression": DEFAULT_PARQUET_COMPRESSION,
+        "partition_by": "",
+        "row_group_size": str(ROW_GROUP_SIZE),
+    }
 
     with open(config_file, "w", encoding="utf-8") as configfile:
         log.info(f"Writing config to file {config_file}.")
@@ -121,6 +143,49 @@ class AouPackage:
         self.project: str = self.__config["Logon"]["project"]
         self.token_file: str = self.__config["Logon"]["token_file"]
 
+        # Key lifecycle; older config files won't have these.
+        self.key_max_age_days: int = self.__config.getint(
+            "Logon", "key_max_age_days", fallback=DEFAULT_KEY_MAX_AGE_DAYS
+        )
+        self.delete_old_keys: bool = self.__config.getboolean(
+            "Logon", "delete_old_keys", fallback=False
+        )
+
+        # HealthPro conversion; 0 converts each file in one go.
+        self.chunk_size: int = self.__config.getint(
+            "HealthPro", "chunk_size", fallback=0
+        )
+        # How to read & write CSVs: auto, pandas or pyarrow.
+        self.engine: str = self.__config.get("HealthPro", "engine", fallback="auto")
+        # Files to convert at once; 0 for one per CPU.
+        self.workers: int = self.__config.getint("HealthPro", "workers", fallback=1)
+        # Also write every organization's participants to one file?
+        self.combined: bool = self.__config.getboolean(
+            "HealthPro", "combined", fallback=False
+        )
+
+        # Columnar formats (parquet, feather) to write alongside the CSVs.
+        self.output_formats: tuple = parse_formats(
+            self.__config.get("Output", "formats", fallback="")
+        )
+        self.parquet_compression: str = self.__config.get(
+            "Output", "parquet_compression", fallback=DEFAULT_PARQUET_COMPRESSION
+        )
+        self.row_group_size: int = self.__config.getint(
+            "Output", "row_group_size", fallback=ROW_GROUP_SIZE
+        )
+        # Compress the CSVs as they're written: none, gzip or zstd.
+        self.compression: str = (
+            self.__config.get("Output", "compression", fallback="").strip().lower()
+            or "none"
+        )
+        # Columns to also write the participant lists partitioned by.
+        self.partition_by: tuple = parse_columns(
+            self.__config.get("Output", "partition_by", fallback="")
+        )
+        # Index the CSVs by participant ID, for lookups?
+        self.index: bool = self.__config.getboolean("Output", "index", fallback=True)
+
     def inputs_complete(self) -> bool:
         """
         Checks to see if all inputs are complete.
@@ -164,6 +229,22 @@ class AouPackage:
 
         return input_value and not DUMMY in input_value
 
+    def output_options(self) -> OutputOptions:
+        """
+        What to write besides the CSVs.
+
+        Returns
+        -------
+        OutputOptions
+        """
+        return OutputOptions(
+            self.output_formats,
+            self.parquet_compression,
+            self.row_group_size,
+            self.compression,
+            self.partition_by,
+        )
+
     def restore_aou_service_account(self) -> str:
         """
         Lets external class pull the config file value of AoU service account property.
@@ -246,6 +327,28 @@ class AouPackage:
         self.__config["Logon"]["pmi_account"] = self.pmi_account
         self.__config["Logon"]["project"] = self.project
         self.__config["Logon"]["token_file"] = self.token_file
+        self.__config["Logon"]["key_max_age_days"] = str(self.key_max_age_days)
+        self.__config["Logon"]["delete_old_keys"] = (
+            "yes" if self.delete_old_keys else "no"
+        )
+
+        if not self.__config.has_section("HealthPro"):
+            self.__config.add_section("HealthPro")
+
+        self.__config["HealthPro"]["chunk_size"] = str(self.chunk_size)
+        self.__config["HealthPro"]["combined"] = "yes" if self.combined else "no"
+        self.__config["HealthPro"]["engine"] = self.engine
+        self.__config["HealthPro"]["workers"] = str(self.workers)
+
+        if not self.__config.has_section("Output"):
+            self.__config.add_section("Output")
+
+        self.__config["Output"]["compression"] = self.compression
+        self.__config["Output"]["formats"] = ", ".join(self.output_formats)
+        self.__config["Output"]["index"] = "yes" if self.index else "no"
+        self.__config["Output"]["parquet_compression"] = self.parquet_compression
+        self.__config["Output"]["partition_by"] = ", ".join(self.partition_by)
+        self.__config["Output"]["row_group_size"] = str(self.row_group_size)
 
         with open(get_default_ini_path(), "w", encoding="utf-8") as configfile:
             self.__config.write(configfile)
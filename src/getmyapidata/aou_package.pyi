@@ -2,7 +2,10 @@ import logging
 from configparser import ConfigParser
 from logging import Logger
 
+from src.getmyapidata.output_options import OutputOptions
+
 DUMMY: str = "<YourNameHere>"
+DEFAULT_KEY_MAX_AGE_DAYS: int
 
 def get_config(log: logging.Logger, config_file: str) -> ConfigParser: ...
 def get_default_ini_path() -> str: ...
@@ -16,15 +19,28 @@ class AouPackage:
     def __init__(self, log: logging.Logger, config_file: str = "") -> None:
         self.aou_service_account: str = None
         self.awardee: str = None
+        self.chunk_size: int = None
+        self.combined: bool = None
+        self.compression: str = None
         self.__config: ConfigParser = None
         self.data_directory: str = None
+        self.delete_old_keys: bool = None
         self.endpoint: str = None
+        self.engine: str = None
+        self.index: bool = None
+        self.key_max_age_days: int = None
         self.__log: Logger = None
+        self.output_formats: tuple = None
+        self.parquet_compression: str = None
+        self.partition_by: tuple = None
         self.pmi_account: str = None
         self.project: str = None
+        self.row_group_size: int = None
         self.token_file: str = None
+        self.workers: int = None
     def inputs_complete(self) -> bool: ...
     def __input_ok(self, input_value: str) -> bool: ...
+    def output_options(self) -> OutputOptions: ...
     def restore_aou_service_account(self) -> str: ...
     def restore_awardee(self) -> str: ...
     def restore_endpoint(self) -> str: ...
@@ -4,19 +4,18 @@ Module: Contains class ApiGui, which creates the GUI
 """
 
 import logging
-from collections import namedtuple
+import threading
 from collections.abc import Callable
-from tkinter import filedialog
 from typing import Union
 
 import wx
-import wx.adv
 
 from src.getmyapidata.aou_package import AouPackage
-from src.getmyapidata.common import get_exe_version
-from src.getmyapidata.convert_to_hp_format import HealthProConverter
-from src.getmyapidata.gcloud_tools import GCloudTools, gcloud_tools_installed
-from src.getmyapidata.insite_api import InSiteAPI
+from src.getmyapidata.gcloud_tools import GCloudTools
+from src.getmyapidata.startup import StartupChecks
+
+# Heavier modules (requests, pandas, tkinter, wx.adv) are imported by the methods that
+# need them, so the window appears without waiting for them.
 
 
 # pylint: disable=too-few-public-methods,too-many-instance-attributes
@@ -33,9 +32,17 @@ class ApiGui(wx.Dialog):
     no public methods
     """
 
-    def __init__(self, log: logging.Logger) -> None:
+    def __init__(
+        self, log: logging.Logger, startup_checks: StartupChecks = None
+    ) -> None:
         """
-        Initialise the ApiGui class.
+        Initialise the ApiGui class. Data can't be requested until the start-up checks
+        have found gcloud; they're waited for in the background.
+
+        Parameters
+        ----------
+        log: logging.Logger
+        startup_checks: StartupChecks   Optional; already started, or one is started here
         """
         self.__log: logging.Logger = log
 
@@ -55,9 +62,14 @@ class ApiGui(wx.Dialog):
 
         # Variables we need for data request.
         self.__aou_package: AouPackage = AouPackage(self.__log)
-        self.__gcloud_mgr: GCloudTools
-        self.__api_mgr: InSiteAPI
+        self.__gcloud_mgr = None
+        self.__api_mgr = None
         self.__is_cancelled: bool = False
+        self.__gcloud_installed: bool = False
+
+        if startup_checks is None:
+            startup_checks = StartupChecks(self.__log)
+            startup_checks.start()
 
         sizer: wx.BoxSizer = wx.BoxSizer(wx.VERTICAL)
         self.SetBackgroundColour(wx.Colour(255, 255, 255))
@@ -116,48 +128,37 @@ class ApiGui(wx.Dialog):
             self.__on_restore_endpoint_button_clicked,
         )
 
-        # CHECK THAT GCLOUD TOOLS ARE INSTALLED.
-        if gcloud_tools_installed():
-
-            # PROGRESS BAR
-            self.__gauge = wx.Gauge(self.__my_panel, range=100, size=wx.Size(350, 25))
-            self.__my_grid.Add(
-                self.__gauge,
-                pos=(6, 1),
-                flag=wx.EXPAND | wx.ALL,
-                border=5,
-            )
-
-            # STATUS BOX
-            self.__status_text: wx.StaticText = wx.StaticText(
-                self.__my_panel, id=wx.ID_ANY, label="Ready"
-            )
-            self.__my_grid.Add(
-                self.__status_text,
-                pos=(7, 1),
-                span=(1, 2),
-                flag=wx.EXPAND | wx.ALL,
-                border=5,
-            )
+        # PROGRESS BAR
+        self.__gauge = wx.Gauge(self.__my_panel, range=100, size=wx.Size(350, 25))
+        self.__my_grid.Add(
+            self.__gauge,
+            pos=(6, 1),
+            flag=wx.EXPAND | wx.ALL,
+            border=5,
+        )
 
-            # OK BUTTON
-            self.__ok_button: wx.Button = wx.Button(
-                self.__my_panel,
-                id=wx.ID_ANY,
-                label="Request Data",
-                style=wx.BORDER_SUNKEN,
-            )
-            self.__enable_if_inputs_complete()
-            self.__my_grid.Add(self.__ok_button, pos=(8, 0), flag=wx.ALL, border=5)
-            self.__ok_button.Bind(wx.EVT_BUTTON, self.__on_ok_clicked)
-        else:
-            link_label = "Must first install GCloud tools"
-            link_url = "https://cloud.google.com/sdk/docs/install"
-            hyperlink = wx.adv.HyperlinkCtrl(self.__my_panel, -1, link_label, link_url)
+        # STATUS BOX
+        self.__status_text: wx.StaticText = wx.StaticText(
+            self.__my_panel, id=wx.ID_ANY, label="Checking for GCloud tools..."
+        )
+        self.__my_grid.Add(
+            self.__status_text,
+            pos=(7, 1),
+            span=(1, 2),
+            flag=wx.EXPAND | wx.ALL,
+            border=5,
+        )
 
-            self.__my_grid.Add(
-                hyperlink, pos=(6, 0), span=(1, 2), flag=wx.EXPAND | wx.ALL, border=5
-            )
+        # OK BUTTON: enabled once gcloud's been found.
+        self.__ok_button: wx.Button = wx.Button(
+            self.__my_panel,
+            id=wx.ID_ANY,
+            label="Request Data",
+            style=wx.BORDER_SUNKEN,
+        )
+        self.__enable_if_inputs_complete()
+        self.__my_grid.Add(self.__ok_button, pos=(8, 0), flag=wx.ALL, border=5)
+        self.__ok_button.Bind(wx.EVT_BUTTON, self.__on_ok_clicked)
 
         # CANCEL BUTTON
         self.__cancel_button: wx.Button = wx.Button(
@@ -175,13 +176,15 @@ class ApiGui(wx.Dialog):
             style=wx.FONTSTYLE_ITALIC,
             weight=wx.FONTWEIGHT_NORMAL,
         )
-        version_text: wx.StaticText = wx.StaticText(
+        self.__version_text: wx.StaticText = wx.StaticText(
             self.__my_panel,
             id=wx.ID_ANY,
-            label="Version: " + get_exe_version(self.__log),
+            label="Version: ...",
+        )
+        self.__version_text.SetFont(footnote_font)
+        self.__my_grid.Add(
+            self.__version_text, pos=(8, 2), flag=wx.ALIGN_LEFT, border=5
         )
-        version_text.SetFont(footnote_font)
-        self.__my_grid.Add(version_text, pos=(8, 2), flag=wx.ALIGN_LEFT, border=5)
 
         # Connect grid sizer to panel.
         self.__my_panel.SetSizerAndFit(self.__my_grid)
@@ -197,6 +200,12 @@ class ApiGui(wx.Dialog):
         self.SetSizer(sizer)
         self.Layout()
         self.Fit()
+
+        # The checks can take a while (gcloud is slow to answer), so never on this thread.
+        self.__checks_waiter: threading.Thread = threading.Thread(
+            target=self.__wait_for_checks, args=(startup_checks,), daemon=True
+        )
+        self.__checks_waiter.start()
         self.ShowModal()
 
     # pylint: disable=too-many-arguments,too-many-positional-arguments
@@ -247,6 +256,23 @@ class ApiGui(wx.Dialog):
         self.__text_boxes_and_buttons[text_control] = restore_button
         self.__buttons_and_text_boxes[restore_button] = text_control
 
+    def __add_install_link(self) -> None:
+        """
+        Points the user to where to get the gcloud tools, in place of the progress bar.
+        """
+        # Imported here, not in __init__, where it would make wx a local name.
+        import wx.adv  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+        link_label = "Must first install GCloud tools"
+        link_url = "https://cloud.google.com/sdk/docs/install"
+        hyperlink = wx.adv.HyperlinkCtrl(self.__my_panel, -1, link_label, link_url)
+
+        self.__my_grid.Detach(self.__gauge)
+        self.__gauge.Destroy()
+        self.__my_grid.Add(
+            hyperlink, pos=(6, 0), span=(1, 2), flag=wx.EXPAND | wx.ALL, border=5
+        )
+
     def __add_title(self, label: str) -> None:
         """
         Adds a title at the top of the panel.
@@ -300,6 +326,7 @@ class ApiGui(wx.Dialog):
     def __data_report(self, progress: Union[bool, int, str]) -> None:
         """
         Allow external method to either change status bar, gauge or report completion.
+        Safe to call from any thread.
 
         Parameters
         ----------
@@ -320,7 +347,7 @@ class ApiGui(wx.Dialog):
         -------
         None
         """
-        if self.__aou_package.inputs_complete():
+        if self.__gcloud_installed and self.__aou_package.inputs_complete():
             self.__ok_button.Enable()
         else:
             self.__ok_button.Disable()
@@ -334,7 +361,9 @@ class ApiGui(wx.Dialog):
         None
         """
         self.__set_status_bar("Calling GCloudTools...")
-        self.__gcloud_mgr: GCloudTools = GCloudTools(
+        self.__is_cancelled = False
+        self.__api_mgr = None
+        self.__gcloud_mgr = GCloudTools(
             aou_package=self.__aou_package,
             log=self.__log,
             status_fn=self.__auth_report,
@@ -343,6 +372,9 @@ class ApiGui(wx.Dialog):
         # Kick off thread, which will call our __on_auth_completion() method once thread is done.
         self.__gcloud_mgr.start()
 
+        # A hung or abandoned gcloud command can be cancelled, too.
+        self.__cancel_button.Enable()
+
     def __get_destination_directory(self) -> str:
         """
         Asks user where they want the participant data to be saved.
@@ -351,6 +383,8 @@ class ApiGui(wx.Dialog):
         -------
         directory_path: str
         """
+        from tkinter import filedialog  # pylint: disable=import-outside-toplevel
+
         initial_dir: str
 
         try:
@@ -395,11 +429,25 @@ class ApiGui(wx.Dialog):
         Event handler for when GCloud thread completes.
         """
 
+        # pylint: disable=import-outside-toplevel
+        from src.getmyapidata.insite_api import ApiRequestPackage, InSiteAPI
+        from src.getmyapidata.token_provider import (
+            CachingTokenProvider,
+            GCloudTokenProvider,
+        )
+
+        if self.__is_cancelled:
+            return
+
         self.__set_status_bar("Requesting token...")
         token: str = self.__gcloud_mgr.get_token()
 
-        # Fold token, aou_package into a named tuple.
-        ApiRequestPackage = namedtuple("ApiRequestPackage", ["aou_package", "token"])
+        # Authenticates again if the token gets old or is rejected mid-download.
+        # Reports to the log, not to __auth_report, which would start another download.
+        tokens: CachingTokenProvider = CachingTokenProvider(
+            GCloudTokenProvider(aou_package=self.__aou_package, log=self.__log),
+            token=token,
+        )
 
         # Get data from InSiteAPI.
         self.__set_status_bar("Instantiating InSiteAPI object...")
@@ -407,6 +455,7 @@ class ApiGui(wx.Dialog):
             api_package=ApiRequestPackage(self.__aou_package, token),
             log=self.__log,
             report_fn=self.__data_report,
+            token_provider=tokens,
         )
         self.__set_status_bar("Requesting InSiteAPI data...")
         self.__cancel_button.Enable()
@@ -450,12 +499,41 @@ class ApiGui(wx.Dialog):
         """
         self.__cancel_button.Disable()
         self.__log.info("Cancel button pressed.")
-        self.__api_mgr.stop()
         self.__is_cancelled = True
+
+        if self.__gcloud_mgr:
+            self.__gcloud_mgr.stop()
+
+        if self.__api_mgr:
+            self.__api_mgr.stop()
+
         self.__set_status_bar("Canceled")
         self.__enable_if_inputs_complete()
         event.Skip()
 
+    def __on_checks_done(self, gcloud_installed: bool, version: str) -> None:
+        """
+        Shows what the start-up checks found. Call on the GUI thread.
+
+        Parameters
+        ----------
+        gcloud_installed: bool
+        version: str                None if it couldn't be found
+        """
+        self.__version_text.SetLabel("Version: " + (version or "unknown"))
+        self.__gcloud_installed = bool(gcloud_installed)
+
+        if self.__gcloud_installed:
+            self.__set_status_bar("Ready")
+            self.__enable_if_inputs_complete()
+        else:
+            self.__set_status_bar("GCloud tools not found.")
+            self.__add_install_link()
+            self.__ok_button.Hide()
+
+        self.__my_panel.Layout()
+        self.Fit()
+
     def __on_close(self, event: wx.EVT_CLOSE) -> None:
         """
         Ensure external thread is stopped before GUI closes.
@@ -463,6 +541,9 @@ class ApiGui(wx.Dialog):
         self.__log.info("GUI closing.")
         self.__is_cancelled = True
 
+        if self.__gcloud_mgr:
+            self.__gcloud_mgr.stop()
+
         if self.__api_mgr:
             self.__api_mgr.stop()
 
@@ -473,29 +554,63 @@ class ApiGui(wx.Dialog):
         What to do when external thread completes:
         --create output files
         --convert to HealthPro format
+        --show the participant counts
 
+        Runs on InSiteAPI's thread, so the controls are only touched through wx.CallAfter.
         """
+        # pylint: disable=import-outside-toplevel
+        from src.getmyapidata.change_report import ChangeReport
+        from src.getmyapidata.healthpro_converter import HealthProConverter
+        from src.getmyapidata.participant_index import update_indexes
+        from src.getmyapidata.participant_summary import format_summary
+
         if not self.__is_cancelled:
             data_directory: str = self.__get_destination_directory()
 
             # Create .csv output files.
-            self.__set_status_bar(f"Saving data to {data_directory}...")
+            self.__data_report(f"Saving data to {data_directory}...")
             self.__api_mgr.output_data(
                 data_directory=data_directory,
+                output=self.__aou_package.output_options(),
             )
-            self.__set_status_bar(f"Download complete. Results in {data_directory}.")
-            self.__set_gauge(0)
+            self.__api_mgr.summary.write(data_directory)
+            self.__data_report(f"Download complete. Results in {data_directory}.")
+            self.__data_report(0)
+
+            # Report who's new, changed or gone since the last download.
+            self.__data_report("Comparing with previous download.")
+            change_report: ChangeReport = ChangeReport(
+                log=self.__log,
+                data_directory=data_directory,
+                status_fn=self.__data_report,
+            )
+            change_report.run()
 
             # Convert to HealthPro format.
-            self.__set_status_bar("Converting to HealthPro format.")
+            self.__data_report("Converting to HealthPro format.")
             hp_converter: HealthProConverter = HealthProConverter(
                 log=self.__log,
                 data_directory=data_directory,
                 status_fn=self.__data_report,
+                chunk_size=self.__aou_package.chunk_size,
+                workers=self.__aou_package.workers,
+                engine=self.__aou_package.engine,
+                combined=self.__aou_package.combined,
+                output=self.__aou_package.output_options(),
             )
             hp_converter.convert()
-            self.__set_status_bar(f"Complete. Results in {data_directory}.")
-            self.__cancel_button.Disable()
+
+            if self.__aou_package.index:
+                self.__data_report("Indexing participants.")
+                update_indexes(data_directory, self.__log)
+
+            self.__data_report(f"Complete. Results in {data_directory}.")
+            wx.CallAfter(self.__cancel_button.Disable)
+
+            # What's been downloaded, without anyone having to load the files.
+            wx.CallAfter(
+                self.__show_summary, format_summary(self.__api_mgr.summary.as_dict())
+            )
 
     # pylint: disable=unused-argument
     def __on_ok_clicked(self, event) -> None:
@@ -739,3 +854,43 @@ class ApiGui(wx.Dialog):
         """
         self.__log.debug(f"Received low-level call to set status bar to {status}.")
         self.__status_text.SetLabel(status)
+
+    def __show_summary(self, summary: str) -> None:
+        """
+        Shows the participant counts. Call on the GUI thread.
+
+        Parameters
+        ----------
+        summary: str                As format_summary gives it
+        """
+        # pylint: disable=import-outside-toplevel,redefined-outer-name
+        import wx.lib.dialogs
+
+        dialog = wx.lib.dialogs.ScrolledMessageDialog(
+            self, summary, "Participant summary"
+        )
+        dialog.ShowModal()
+        dialog.Destroy()
+
+    def __wait_for_checks(self, startup_checks: StartupChecks) -> None:
+        """
+        Waits for the start-up checks off the GUI thread, trying any that failed again,
+        & hands the results to __on_checks_done.
+
+        Parameters
+        ----------
+        startup_checks: StartupChecks
+        """
+        startup_checks.join()
+        gcloud_installed: Union[bool, None] = startup_checks.gcloud_installed
+        version: Union[str, None] = startup_checks.version
+
+        if gcloud_installed is None or version is None:
+            retry: StartupChecks = StartupChecks(self.__log)
+            retry.run()
+            gcloud_installed = (
+                retry.gcloud_installed if gcloud_installed is None else gcloud_installed
+            )
+            version = retry.version if version is None else version
+
+        wx.CallAfter(self.__on_checks_done, gcloud_installed, version)
@@ -1,4 +1,5 @@
 import logging
+import threading
 from collections.abc import Callable
 from typing import Union
 
@@ -7,13 +8,16 @@ import wx
 from src.getmyapidata.aou_package import AouPackage
 from src.getmyapidata.gcloud_tools import GCloudTools
 from src.getmyapidata.insite_api import InSiteAPI
+from src.getmyapidata.startup import StartupChecks
 
 class ApiGui(wx.Dialog):
-    def __init__(self, log: logging.Logger) -> None:
+    def __init__(self, log: logging.Logger, startup_checks: StartupChecks = ...) -> None:
         self.__aou_account_text_ctrl: wx.TextCtrl = None
         self.__aou_package: AouPackage = None
         self.__api_mgr: InSiteAPI = None
         self.__awardee_text_ctrl: wx.TextCtrl = None
+        self.__checks_waiter: threading.Thread = None
+        self.__gcloud_installed: bool = False
         self.__gcloud_mgr: GCloudTools = None
         self.__is_cancelled: bool = False
         self.__log: logging.Logger = None
@@ -30,6 +34,7 @@ class ApiGui(wx.Dialog):
         self.__gauge: wx.Gauge = None
         self.__ok_button: wx.Button = None
         self.__status_text: wx.StaticText = None
+        self.__version_text: wx.StaticText = None
     def __add_controls(
         self,
         row: int,
@@ -38,6 +43,7 @@ class ApiGui(wx.Dialog):
         text_changed_fn: Callable,
         restore_fn: Callable,
     ) -> None: ...
+    def __add_install_link(self) -> None: ...
     def __add_title(self, label: str) -> None: ...
     def __auth_report(self, progress: Union[bool, int, str]) -> None: ...
     def __data_report(self, progress: Union[bool, int, str]) -> None: ...
@@ -48,6 +54,7 @@ class ApiGui(wx.Dialog):
     def __on_auth_completion(self) -> None: ...
     def __on_awardee_text_changed(self, event: wx.EVT_TEXT) -> None: ...
     def __on_cancel_clicked(self, event: wx.EVT_BUTTON) -> None: ...
+    def __on_checks_done(self, gcloud_installed: bool, version: str) -> None: ...
     def __on_close(self) -> None: ...
     def __on_data_completion(self) -> None: ...
     def __on_ok_clicked(self, event: wx.EVT_BUTTON) -> None: ...
@@ -65,3 +72,5 @@ class ApiGui(wx.Dialog):
     def __on_endpoint_text_changed(self, event: wx.EVT_TEXT) -> None: ...
     def __set_gauge(self, pct: int) -> None: ...
     def __set_status_bar(self, status: str) -> None: ...
+    def __show_summary(self, summary: str) -> None: ...
+    def __wait_for_checks(self, startup_checks: StartupChecks) -> None: ...
@@ -0,0 +1,352 @@
+"""
+Contains class ChangeReport, which compares the current download against the previous one.
+"""
+import csv
+import hashlib
+import logging
+import os
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Union
+
+from src.getmyapidata.common import atomic_write
+from src.getmyapidata.compressed_files import csv_files, open_text
+from src.getmyapidata.nested_fields import (DEFAULT_RULES, canonical_json,
+                                            parse_nested)
+
+# Where, under the data directory, the snapshot & reports live.
+# (A subdirectory, so the converter's "*.csv" search never picks them up.)
+CHANGES_DIRECTORY: str = "changes"
+SNAPSHOT_FILENAME: str = "participant_snapshot.csv"
+
+# The snapshot's hash column. Snapshots written before nested fields were hashed
+# as canonical JSON call it "hash"; their participants are compared by tracked
+# fields instead, once.
+HASH_COLUMN: str = "content_hash"
+
+# Filled in from other fields (see nested_fields), so they tell us nothing new.
+DERIVED_COLUMNS: frozenset = frozenset(
+    column for rule in DEFAULT_RULES for column in rule.columns
+)
+
+# Columns for which we report field-level deltas.
+TRACKED_FIELDS: list[str] = [
+    "withdrawalStatus",
+    "withdrawalTime",
+    "deactivationStatus",
+    "deactivationTime",
+    "deceasedStatus",
+    "consentForStudyEnrollment",
+    "consentForStudyEnrollmentAuthored",
+    "consentForElectronicHealthRecords",
+    "consentForElectronicHealthRecordsAuthored",
+    "enrollmentStatus",
+    "patientStatus",
+]
+
+REPORT_HEADER: list[str] = [
+    "participantId",
+    "organization",
+    "change",
+    "field",
+    "previous",
+    "current",
+]
+
+# The snapshot's columns (see snapshot_row).
+SNAPSHOT_HEADER: list[str] = [
+    "participantId",
+    "organization",
+    HASH_COLUMN,
+] + TRACKED_FIELDS
+
+
+def compare_to_snapshot(old: Union[dict, None], row: list[str]) -> tuple:
+    """
+    How a participant has changed since the last run.
+
+    Parameters
+    ----------
+    old: dict                   Their row in the previous snapshot, or None if they're new
+    row: list[str]              Their row in this one (see snapshot_row)
+
+    Returns
+    -------
+    (change, report_rows): tuple    change is "new", "changed" or "unchanged";
+                                    report_rows are rows of REPORT_HEADER
+    """
+    participant_id, organization, digest = row[:3]
+
+    if old is None:
+        return "new", [[participant_id, organization, "new", "", "", ""]]
+
+    if old.get(HASH_COLUMN) == digest:
+        return "unchanged", []
+
+    deltas: list[list[str]] = [
+        [participant_id, organization, "changed", field, old.get(field, ""), value]
+        for field, value in zip(TRACKED_FIELDS, row[3:])
+        if normalize_value(old.get(field, "") or "") != normalize_value(value)
+    ]
+
+    if HASH_COLUMN not in old and not deltas:
+        # From an older snapshot, whose hash we can't compare.
+        return "unchanged", []
+
+    if not deltas:
+        # Something outside the tracked fields changed.
+        deltas = [[participant_id, organization, "changed", "", "", ""]]
+
+    return "changed", deltas
+
+
+def hash_record(record: dict) -> str:
+    """
+    Computes a content hash for one participant.
+
+    Empty fields are skipped, so adding a new (empty) column to the download
+    doesn't make every participant look changed. Nor does a change in how nested
+    fields are written, or in the columns derived from them.
+
+    Parameters
+    ----------
+    record: dict
+
+    Returns
+    -------
+    digest: str
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+
+    for key in sorted(record.keys()):
+        value = record[key]
+
+        if key and value and key not in DERIVED_COLUMNS:
+            hasher.update(key.encode("utf-8"))
+            hasher.update(b"\x1f")
+            hasher.update(normalize_value(value).encode("utf-8"))
+            hasher.update(b"\x1e")
+
+    return hasher.hexdigest()
+
+
+def normalize_value(value) -> str:
+    """
+    A value as it's hashed & compared: nested fields as canonical JSON, whether they
+    were written that way or (by older versions) as a Python repr.
+
+    Parameters
+    ----------
+    value: str, or a dict or list straight from the API
+
+    Returns
+    -------
+    normalized: str
+    """
+    if isinstance(value, (dict, list)):
+        return canonical_json(value)
+
+    value = str(value)
+
+    if value[:1] in ("[", "{"):
+        nested = parse_nested(value)
+
+        if isinstance(nested, (dict, list)):
+            return canonical_json(nested)
+
+    return value
+
+
+def read_participants(data_directory: str) -> Iterator[dict]:
+    """
+    Streams participant records out of the InSite-format files in a directory,
+    compressed or not.
+
+    Parameters
+    ----------
+    data_directory: str
+
+    Returns
+    -------
+    Iterator over one dict per participant
+    """
+    pattern: str = os.path.join(data_directory, "*_participant_list")
+
+    for filename in csv_files(pattern):
+        with open_text(filename) as file:
+            yield from csv.DictReader(file)
+
+
+def snapshot_row(record: dict) -> list[str]:
+    """
+    A participant as the snapshot remembers them.
+
+    Parameters
+    ----------
+    record: dict
+
+    Returns
+    -------
+    row: list[str]              participantId, organization, content hash & TRACKED_FIELDS
+    """
+    row: list[str] = [
+        record.get("participantId", ""),
+        record.get("organization", ""),
+        hash_record(record),
+    ]
+    row.extend(record.get(field, "") or "" for field in TRACKED_FIELDS)
+    return row
+
+
+# pylint: disable=too-few-public-methods
+class ChangeReport:
+    """
+    Finds new, removed & changed participants since the last run.
+
+    The previous run is remembered as a compact snapshot (participant id, organization,
+    content hash & tracked fields), so a comparison reads each participant exactly once.
+
+    Methods
+    -------
+    run() -> dict
+    """
+
+    def __init__(
+        self, log: logging.Logger, data_directory: str, status_fn: Callable = None
+    ) -> None:
+        """
+        Instantiate a ChangeReport object.
+
+        Parameters
+        ----------
+        log: logging.Logger
+        data_directory: str         Directory holding the *_participant_list.csv files
+        status_fn: Callable         Optional method from calling object to report status.
+        """
+        self.__log: logging.Logger = log
+        self.__directory: str = data_directory
+        self.__status_fn: Callable = status_fn
+        self.__changes_directory: str = os.path.join(data_directory, CHANGES_DIRECTORY)
+        self.__snapshot_file: str = os.path.join(
+            self.__changes_directory, SNAPSHOT_FILENAME
+        )
+        self.report_file: str = ""
+
+        # Kept after each run, so a long-running caller needn't re-read the snapshot.
+        self.__index: Union[dict, None] = None
+
+    def __load_snapshot(self) -> dict:
+        """
+        Builds the hash index from the previous run's snapshot.
+
+        Returns
+        -------
+        index: dict         participantId -> snapshot row
+        """
+        index: dict = {}
+
+        if not os.path.isfile(self.__snapshot_file):
+            self.__log.info("No previous snapshot at '%s'.", self.__snapshot_file)
+            return index
+
+        with open(self.__snapshot_file, "r", newline="", encoding="utf-8") as file:
+            for row in csv.DictReader(file):
+                index[row["participantId"]] = row
+
+        return index
+
+    def __report_status(self, status: str) -> None:
+        """
+        Wraps the status_fn provided by calling function.
+
+        Parameters
+        ----------
+        status: str
+        """
+        if self.__status_fn is not None:
+            self.__status_fn(status)
+
+        self.__log.info(status)
+
+    def run(self, records: Iterator[dict] = None) -> dict:
+        """
+        Compares the current participants against the snapshot, streaming the differences
+        to a report file, then replaces the snapshot.
+
+        Parameters
+        ----------
+        records: Iterator[dict]     Optional; defaults to reading the directory's files.
+
+        Returns
+        -------
+        counts: dict                Number of new, removed, changed & unchanged participants
+        """
+        if records is None:
+            records = read_participants(self.__directory)
+
+        previous: dict = (
+            self.__load_snapshot() if self.__index is None else self.__index
+        )
+        current: dict = {}
+        is_first_run: bool = not previous
+        counts: dict = {"new": 0, "removed": 0, "changed": 0, "unchanged": 0}
+
+        Path(self.__changes_directory).mkdir(parents=True, exist_ok=True)
+        self.report_file = os.path.join(
+            self.__changes_directory,
+            f"participant_changes_{time.strftime('%Y%m%d_%H%M%S')}.csv",
+        )
+
+        with open(
+            self.report_file, "w", newline="", encoding="utf-8"
+        ) as report, atomic_write(
+            self.__snapshot_file, "w", newline="", encoding="utf-8"
+        ) as snapshot:
+            report_writer: csv.writer = csv.writer(report)
+            report_writer.writerow(REPORT_HEADER)
+            snapshot_writer: csv.writer = csv.writer(snapshot)
+            snapshot_writer.writerow(SNAPSHOT_HEADER)
+
+            for record in records:
+                if not record.get("participantId", ""):
+                    continue
+
+                row: list[str] = snapshot_row(record)
+                snapshot_writer.writerow(row)
+                current[row[0]] = dict(zip(SNAPSHOT_HEADER, row))
+                change, report_rows = compare_to_snapshot(
+                    previous.pop(row[0], None), row
+                )
+                counts[change] += 1
+
+                # Everyone's new the first time, so there's nothing to report.
+                if not is_first_run:
+                    report_writer.writerows(report_rows)
+
+            # Whatever is left in the index wasn't in this download.
+            counts["removed"] = len(previous)
+            report_writer.writerows(
+                [
+                    old.get("participantId", ""),
+                    old.get("organization", ""),
+                    "removed",
+                    "",
+                    "",
+                    "",
+                ]
+                for old in previous.values()
+            )
+        self.__index = current
+
+        if is_first_run:
+            self.__report_status(
+                f"Recorded first snapshot of {counts['new']} participants."
+            )
+        else:
+            self.__report_status(
+                f"Changes: {counts['new']} new, {counts['changed']} changed, "
+                f"{counts['removed']} removed. Report in {self.report_file}."
+            )
+
+        return counts
@@ -0,0 +1,33 @@
+import logging
+from collections.abc import Callable as Callable
+from collections.abc import Iterator
+from typing import Union
+
+CHANGES_DIRECTORY: str
+SNAPSHOT_FILENAME: str
+HASH_COLUMN: str
+DERIVED_COLUMNS: frozenset
+TRACKED_FIELDS: list[str]
+REPORT_HEADER: list[str]
+SNAPSHOT_HEADER: list[str]
+
+def compare_to_snapshot(old: Union[dict, None], row: list[str]) -> tuple: ...
+def hash_record(record: dict) -> str: ...
+def normalize_value(value) -> str: ...
+def read_participants(data_directory: str) -> Iterator[dict]: ...
+def snapshot_row(record: dict) -> list[str]: ...
+
+class ChangeReport:
+    def __init__(
+        self, log: logging.Logger, data_directory: str, status_fn: Callable = ...
+    ) -> None:
+        self.__log: logging.Logger = None
+        self.__directory: str = None
+        self.__status_fn: Callable = None
+        self.__changes_directory: str = None
+        self.__snapshot_file: str = None
+        self.report_file: str = ""
+        self.__index: Union[dict, None] = None
+    def __load_snapshot(self) -> dict: ...
+    def __report_status(self, status: str) -> None: ...
+    def run(self, records: Iterator[dict] = ...) -> dict: ...
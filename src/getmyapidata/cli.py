@@ -0,0 +1,580 @@
+"""
+Headless command-line runner: authenticates, requests, saves & converts participant data
+without the GUI, so it can run on servers & from cron.
+
+Deliberately never imports wx, tkinter or win32api.
+"""
+import argparse
+import copy
+import logging
+import os
+import sys
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+import requests
+
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.change_report import ChangeReport
+from src.getmyapidata.insite_api import (
+    ApiRequestPackage,
+    InSiteAPI,
+    read_last_sync,
+    write_last_sync,
+)
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.my_logging import setup_logging
+from src.getmyapidata.participant_index import lookup, update_indexes
+from src.getmyapidata.participant_summary import format_summary, read_summary
+from src.getmyapidata.token_provider import (CachingTokenProvider,
+                                             GCloudTokenProvider,
+                                             TokenProvider)
+
+# Exit codes.
+EXIT_OK: int = 0
+EXIT_FAILURE: int = 1
+EXIT_BAD_INPUTS: int = 2
+EXIT_INTERRUPTED: int = 130
+
+LOG_LEVELS: list[str] = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Defines the command-line options.
+
+    Returns
+    -------
+    parser: argparse.ArgumentParser
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Retrieve All of Us participant data using the InSite API, without the GUI.",
+        parents=[common_parser()],
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only request participants modified since the last run into this directory",
+    )
+    parser.add_argument(
+        "--refresh-credentials",
+        action="store_true",
+        help="Authenticate again even if the cached access token is still good",
+    )
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="Print the participant counts from the last run, without requesting anything",
+    )
+    parser.add_argument(
+        "--lookup",
+        type=str,
+        metavar="PARTICIPANT_ID",
+        help="Print what the saved files hold for a participant, without requesting anything",
+    )
+    return parser
+
+
+def common_parser() -> argparse.ArgumentParser:
+    """
+    The options the command line & the sync service share, for their parsers' parents.
+
+    Returns
+    -------
+    parser: argparse.ArgumentParser
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument(
+        "--config", type=str, help="Path to config.ini file", default=""
+    )
+    parser.add_argument(
+        "--awardee",
+        type=str,
+        action="append",
+        help="Awardee to request (repeat for several); defaults to the config file's",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        help="Where to save the files; defaults to the config file's data_directory",
+    )
+    parser.add_argument(
+        "--log-level",
+        type=str,
+        choices=LOG_LEVELS,
+        help="INFO, DEBUG, etc.",
+        default="INFO",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="Request several awardees at the same time",
+    )
+    return parser
+
+
+# pylint: disable=too-few-public-methods
+class ConsoleReporter:
+    """
+    Status function that prints progress to the console instead of a GUI.
+    """
+
+    def __init__(self, prefix: str = "") -> None:
+        """
+        Instantiate a ConsoleReporter.
+
+        Parameters
+        ----------
+        prefix: str         Prepended to each line (e.g. the awardee)
+        """
+        self.__prefix: str = f"[{prefix}] " if prefix else ""
+        self.__lock: threading.Lock = threading.Lock()
+
+    def __call__(self, progress: Union[bool, int, str]) -> None:
+        """
+        Same protocol as the GUI's report functions.
+
+        Parameters
+        ----------
+        progress: Union[bool, int, str]
+        """
+        with self.__lock:
+            if isinstance(progress, bool):
+                return
+
+            if isinstance(progress, int):
+                print(f"{self.__prefix}{progress}% complete", flush=True)
+            elif isinstance(progress, str):
+                print(f"{self.__prefix}{progress}", flush=True)
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def authenticate(
+    aou_package: AouPackage,
+    log: logging.Logger,
+    status_fn: Callable,
+    reuse_token: bool = True,
+    stop_event: threading.Event = None,
+    metrics: RunMetrics = None,
+) -> TokenProvider:
+    """
+    Runs the gcloud authentication in this thread, so problems show up before any request,
+    & returns where the requests should get their tokens.
+
+    Parameters
+    ----------
+    aou_package: AouPackage
+    log: logging.Logger
+    status_fn: Callable
+    reuse_token: bool       Use the cached token while it's still good?
+    stop_event: threading.Event Optional; set to kill any gcloud command that's running
+    metrics: RunMetrics     Optional; where to record how long each gcloud command took
+
+    Returns
+    -------
+    tokens: TokenProvider   Authenticates again when the token's old or the API rejects it
+    """
+    tokens: TokenProvider = CachingTokenProvider(
+        GCloudTokenProvider(
+            aou_package=aou_package,
+            log=log,
+            status_fn=status_fn,
+            stop_event=stop_event,
+            metrics=metrics,
+            reuse_token=reuse_token,
+        )
+    )
+    tokens.get_token()
+    return tokens
+
+
+def awardee_packages(
+    aou_package: AouPackage, awardees: list[str], output_dir: str
+) -> list[tuple]:
+    """
+    One package per awardee &, with several awardees, one subdirectory each.
+
+    Parameters
+    ----------
+    aou_package: AouPackage
+    awardees: list[str]
+    output_dir: str
+
+    Returns
+    -------
+    packages: list[tuple]   (awardee, AouPackage, data directory) for each awardee
+    """
+    packages: list[tuple] = []
+
+    for awardee in awardees:
+        package: AouPackage = copy.copy(aou_package)
+        package.awardee = awardee
+        directory: str = (
+            os.path.join(output_dir, awardee) if len(awardees) > 1 else output_dir
+        )
+        packages.append((awardee, package, directory))
+
+    return packages
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class AwardeeSync:
+    """
+    Requests one awardee's data, saves it, reports changes & converts it to HealthPro format.
+
+    Keeps its InSiteAPI object & change-report index between runs,
+    so later incremental runs needn't re-read the previous files.
+
+    Methods
+    -------
+    run(tokens: TokenProvider, metrics: RunMetrics = None) -> dict
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        aou_package: AouPackage,
+        data_directory: str,
+        log: logging.Logger,
+        status_fn: Callable,
+        incremental: bool = False,
+        stop_event: threading.Event = None,
+        session: requests.Session = None,
+    ) -> None:
+        """
+        Instantiate an AwardeeSync object.
+
+        Parameters
+        ----------
+        aou_package: AouPackage
+        data_directory: str
+        log: logging.Logger
+        status_fn: Callable
+        incremental: bool           Only request what changed since the last run?
+        stop_event: threading.Event Optional; set to abandon the request
+        session: requests.Session   Optional; connection pool to reuse
+        """
+        self.__aou_package: AouPackage = aou_package
+        self.__directory: str = data_directory
+        self.__log: logging.Logger = log
+        self.__status_fn: Callable = status_fn
+        self.__incremental: bool = incremental
+        self.__stop_event: threading.Event = stop_event
+        self.__session: requests.Session = session
+        self.__api_mgr: Union[InSiteAPI, None] = None
+
+        # When the last run that saved its data started; the next incremental run's since.
+        self.__last_sync: Union[str, None] = None
+        self.__change_report: ChangeReport = ChangeReport(
+            log=log, data_directory=data_directory, status_fn=status_fn
+        )
+
+    def __prepare(self, tokens: TokenProvider) -> InSiteAPI:
+        """
+        Creates the InSiteAPI object on the first run; refreshes it on later runs.
+
+        Parameters
+        ----------
+        tokens: TokenProvider
+
+        Returns
+        -------
+        api_mgr: InSiteAPI
+        """
+        if self.__api_mgr is not None:
+            # Already holding the previous run's data; just ask for what changed since.
+            self.__api_mgr.set_token_provider(tokens)
+
+            # Not api_mgr.last_sync, which moves on even if the run then fails.
+            if self.__incremental:
+                self.__api_mgr.since = self.__last_sync
+
+            return self.__api_mgr
+
+        since: Union[str, None] = (
+            read_last_sync(self.__directory) if self.__incremental else None
+        )
+
+        if self.__incremental and not since:
+            self.__status_fn("No previous run found; requesting everything.")
+
+        self.__last_sync = since
+
+        self.__api_mgr = InSiteAPI(
+            api_package=ApiRequestPackage(self.__aou_package, tokens.get_token()),
+            log=self.__log,
+            report_fn=self.__status_fn,
+            since=since,
+            stop_event=self.__stop_event,
+            session=self.__session,
+            token_provider=tokens,
+        )
+
+        if since:
+            self.__api_mgr.load_data(self.__directory)
+
+        return self.__api_mgr
+
+    def run(self, tokens: TokenProvider, metrics: RunMetrics = None) -> dict:
+        """
+        One complete request/save/report/convert cycle.
+
+        Parameters
+        ----------
+        tokens: TokenProvider   Asked for a token on every request
+        metrics: RunMetrics     Optional; where to add the bytes written
+
+        Returns
+        -------
+        counts: dict        New, removed, changed & unchanged participants
+        """
+        api_mgr: InSiteAPI = self.__prepare(tokens)
+
+        if api_mgr.since:
+            self.__status_fn(f"Requesting participants modified since {api_mgr.since}.")
+
+        api_mgr.run()
+
+        if self.__stop_event is not None and self.__stop_event.is_set():
+            raise KeyboardInterrupt
+
+        self.__status_fn(f"Saving data to {self.__directory}...")
+        api_mgr.output_data(
+            data_directory=self.__directory,
+            output=self.__aou_package.output_options(),
+            metrics=metrics,
+        )
+        write_last_sync(self.__directory, api_mgr.last_sync)
+        self.__last_sync = api_mgr.last_sync
+        api_mgr.summary.write(self.__directory)
+        self.__status_fn(format_summary(api_mgr.summary.as_dict()))
+
+        counts: dict = self.__change_report.run()
+
+        # Not needed until now; it imports pandas itself only if the files need it.
+        # pylint: disable=import-outside-toplevel
+        from src.getmyapidata.healthpro_converter import HealthProConverter
+
+        self.__status_fn("Converting to HealthPro format.")
+        HealthProConverter(
+            log=self.__log,
+            data_directory=self.__directory,
+            status_fn=self.__status_fn,
+            chunk_size=self.__aou_package.chunk_size,
+            workers=self.__aou_package.workers,
+            engine=self.__aou_package.engine,
+            combined=self.__aou_package.combined,
+            output=self.__aou_package.output_options(),
+            metrics=metrics,
+        ).convert()
+
+        if self.__aou_package.index:
+            update_indexes(self.__directory, self.__log)
+
+        self.__status_fn(f"Complete. Results in {self.__directory}.")
+        return counts
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def sync_awardee(
+    aou_package: AouPackage,
+    tokens: TokenProvider,
+    data_directory: str,
+    log: logging.Logger,
+    status_fn: Callable,
+    incremental: bool = False,
+    stop_event: threading.Event = None,
+    metrics: RunMetrics = None,
+) -> dict:
+    """
+    Runs a one-off AwardeeSync.
+
+    Parameters
+    ----------
+    aou_package: AouPackage
+    tokens: TokenProvider
+    data_directory: str
+    log: logging.Logger
+    status_fn: Callable
+    incremental: bool           Only request what changed since the last run?
+    stop_event: threading.Event Optional; set to abandon the request
+    metrics: RunMetrics         Optional; where to add the bytes written
+
+    Returns
+    -------
+    counts: dict
+    """
+    return AwardeeSync(
+        aou_package=aou_package,
+        data_directory=data_directory,
+        log=log,
+        status_fn=status_fn,
+        incremental=incremental,
+        stop_event=stop_event,
+    ).run(tokens, metrics)
+
+
+def sync_awardees(
+    jobs: list[tuple], parallel: bool, stop_event: threading.Event, metrics: RunMetrics
+) -> None:
+    """
+    Runs sync_awardee for each job, all at the same time if parallel.
+
+    Parameters
+    ----------
+    jobs: list[tuple]           sync_awardee's positional arguments, one tuple per awardee
+    parallel: bool
+    stop_event: threading.Event Set if interrupted, so the other awardees stop too
+    metrics: RunMetrics
+    """
+    if not parallel or len(jobs) < 2:
+        for job in jobs:
+            sync_awardee(*job, stop_event=stop_event, metrics=metrics)
+
+        return
+
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        futures: list = [
+            executor.submit(sync_awardee, *job, stop_event=stop_event, metrics=metrics)
+            for job in jobs
+        ]
+
+        try:
+            for future in futures:
+                future.result()
+        except KeyboardInterrupt:
+            # Don't wait for the other awardees to finish.
+            stop_event.set()
+            raise
+
+
+def print_participant(data_directory: str, participant_id: str) -> int:
+    """
+    Prints a participant's rows from every file in the data directory.
+
+    Parameters
+    ----------
+    data_directory: str
+    participant_id: str
+
+    Returns
+    -------
+    exit code: int
+    """
+    rows: list[tuple] = lookup(data_directory, participant_id)
+
+    if not rows:
+        print(f"{participant_id} isn't in {data_directory}.")
+        return EXIT_FAILURE
+
+    for filename, row in rows:
+        print(f"{os.path.basename(filename)}:")
+
+        for column, value in row.items():
+            if value:
+                print(f"  {column}: {value}")
+
+    return EXIT_OK
+
+
+def print_summary(data_directory: str) -> int:
+    """
+    Prints the participant counts saved by the last run.
+
+    Parameters
+    ----------
+    data_directory: str
+
+    Returns
+    -------
+    exit code: int
+    """
+    summary: Union[dict, None] = read_summary(data_directory)
+
+    if summary is None:
+        print(f"No summary in {data_directory}; request the data first.")
+        return EXIT_FAILURE
+
+    print(format_summary(summary))
+    return EXIT_OK
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    Command-line entry point.
+
+    Parameters
+    ----------
+    argv: list[str]         Optional; defaults to sys.argv
+
+    Returns
+    -------
+    exit code: int
+    """
+    args = build_parser().parse_args(argv)
+    log: logging.Logger = setup_logging(
+        log_filename=os.path.join(os.getcwd(), "getmyapidata.log")
+    )
+    log.setLevel(args.log_level)
+
+    aou_package: AouPackage = AouPackage(log, config_file=args.config)
+
+    if args.lookup:
+        return print_participant(
+            args.output_dir or aou_package.data_directory, args.lookup
+        )
+
+    if args.summary:
+        return print_summary(args.output_dir or aou_package.data_directory)
+
+    if not aou_package.inputs_complete():
+        print("Config file is incomplete: fill in the account & project details.")
+        return EXIT_BAD_INPUTS
+
+    output_dir: str = args.output_dir or aou_package.data_directory
+    awardees: list[str] = args.awardee or [aou_package.awardee]
+    stop_event: threading.Event = threading.Event()
+    metrics: RunMetrics = RunMetrics()
+    metrics.set("awardees", awardees)
+
+    try:
+        with metrics.timer("auth"):
+            tokens: TokenProvider = authenticate(
+                aou_package,
+                log,
+                ConsoleReporter(),
+                reuse_token=not args.refresh_credentials,
+                stop_event=stop_event,
+                metrics=metrics,
+            )
+
+        jobs: list[tuple] = [
+            (
+                package,
+                tokens,
+                directory,
+                log,
+                ConsoleReporter(awardee if len(awardees) > 1 else ""),
+                args.incremental,
+            )
+            for awardee, package, directory in awardee_packages(
+                aou_package, awardees, output_dir
+            )
+        ]
+        sync_awardees(jobs, args.parallel, stop_event, metrics)
+    except KeyboardInterrupt:
+        stop_event.set()
+        log.info("Interrupted.")
+        return EXIT_INTERRUPTED
+    except RuntimeError as e:
+        log.error("Failed: %s", e)
+        return EXIT_FAILURE
+
+    metrics.publish(output_dir, log)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import argparse
+import logging
+import threading
+from collections.abc import Callable as Callable
+from typing import Union
+
+import requests
+
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.change_report import ChangeReport
+from src.getmyapidata.insite_api import InSiteAPI
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.token_provider import TokenProvider
+
+EXIT_OK: int
+EXIT_FAILURE: int
+EXIT_BAD_INPUTS: int
+EXIT_INTERRUPTED: int
+LOG_LEVELS: list[str]
+
+def build_parser() -> argparse.ArgumentParser: ...
+def common_parser() -> argparse.ArgumentParser: ...
+
+class ConsoleReporter:
+    def __init__(self, prefix: str = ...) -> None:
+        self.__prefix: str = None
+        self.__lock: threading.Lock = None
+    def __call__(self, progress: Union[bool, int, str]) -> None: ...
+
+def authenticate(
+    aou_package: AouPackage,
+    log: logging.Logger,
+    status_fn: Callable,
+    reuse_token: bool = ...,
+    stop_event: threading.Event = ...,
+    metrics: RunMetrics = ...,
+) -> TokenProvider: ...
+def awardee_packages(
+    aou_package: AouPackage, awardees: list[str], output_dir: str
+) -> list[tuple]: ...
+
+class AwardeeSync:
+    def __init__(
+        self,
+        aou_package: AouPackage,
+        data_directory: str,
+        log: logging.Logger,
+        status_fn: Callable,
+        incremental: bool = ...,
+        stop_event: threading.Event = ...,
+        session: requests.Session = ...,
+    ) -> None:
+        self.__aou_package: AouPackage = None
+        self.__directory: str = None
+        self.__log: logging.Logger = None
+        self.__status_fn: Callable = None
+        self.__incremental: bool = False
+        self.__stop_event: threading.Event = None
+        self.__session: requests.Session = None
+        self.__api_mgr: Union[InSiteAPI, None] = None
+        self.__last_sync: Union[str, None] = None
+        self.__change_report: ChangeReport = None
+    def __prepare(self, tokens: TokenProvider) -> InSiteAPI: ...
+    def run(self, tokens: TokenProvider, metrics: Union[RunMetrics, None] = None) -> dict: ...
+
+def sync_awardee(
+    aou_package: AouPackage,
+    tokens: TokenProvider,
+    data_directory: str,
+    log: logging.Logger,
+    status_fn: Callable,
+    incremental: bool = ...,
+    stop_event: threading.Event = ...,
+    metrics: Union[RunMetrics, None] = ...,
+) -> dict: ...
+def sync_awardees(
+    jobs: list[tuple], parallel: bool, stop_event: threading.Event, metrics: RunMetrics
+) -> None: ...
+def print_participant(data_directory: str, participant_id: str) -> int: ...
+def print_summary(data_directory: str) -> int: ...
+def main(argv: list[str] = ...) -> int: ...
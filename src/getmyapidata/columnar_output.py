@@ -0,0 +1,445 @@
+"""
+Contains class ColumnarWriter, which writes participant data as Parquet or Feather
+alongside the CSVs, so it can be loaded without parsing any text.
+
+Columns are typed by name (see column_type): dates become timestamps or dates,
+columns of codes are dictionary-encoded & everything else is a string,
+whether it's the InSite data or the HealthPro conversion.
+
+Imports pyarrow, so import this only when columnar output's wanted.
+"""
+import logging
+import math
+from contextlib import ExitStack
+from typing import Union
+
+import pyarrow
+import pyarrow.compute as pc
+import pyarrow.ipc
+import pyarrow.parquet
+
+from src.getmyapidata.common import atomic_write
+from src.getmyapidata.healthpro_mapping import DATE_FORMAT, DATE_FORMATS
+from src.getmyapidata.output_options import (COLUMNAR_FORMATS, OutputOptions,
+                                             columnar_filename)
+
+# Columns holding dates without times: InSite's & HealthPro's.
+DATE_ONLY_COLUMNS: frozenset = frozenset({"Date of Birth", "dateOfBirth"})
+
+# Formats dates of birth come in.
+DATE_ONLY_FORMATS: tuple = ("%Y-%m-%d", "%m/%d/%Y")
+
+# Columns of codes & names with few distinct values, besides those ending in
+# DICTIONARY_SUFFIXES. Stored as a dictionary plus an index per row.
+DICTIONARY_COLUMNS: frozenset = frozenset(
+    {
+        "Consent Cohort",
+        "Deceased",
+        "EHR Data Transfer",
+        "Enrollment Site",
+        "Paired Organization",
+        "Paired Site",
+        "Participant Origination",
+        "Retention Eligible",
+        "Sex",
+        "State",
+        "Withdrawal Reason",
+        "organization",
+        "state",
+    }
+)
+
+DICTIONARY_SUFFIXES: tuple = ("Method", "Site", "Status")
+
+# Columns holding dates & times, besides those with "Date" in their names.
+TIMESTAMP_SUFFIXES: tuple = ("Authored", "Receipt", "Time")
+
+# Parquet has no timestamps in seconds, so both formats use milliseconds.
+TIMESTAMP_TYPE: pyarrow.DataType = pyarrow.timestamp("ms")
+
+
+def column_type(name: str) -> pyarrow.DataType:
+    """
+    The Arrow type for an InSite or HealthPro column, going by its name.
+
+    Parameters
+    ----------
+    name: str
+
+    Returns
+    -------
+    data_type: pyarrow.DataType
+    """
+    if name in DATE_ONLY_COLUMNS:
+        return pyarrow.date32()
+
+    if name.endswith(TIMESTAMP_SUFFIXES) or "Date" in name:
+        return TIMESTAMP_TYPE
+
+    if (
+        name in DICTIONARY_COLUMNS
+        or name.endswith(DICTIONARY_SUFFIXES)
+        or name.startswith("consentFor")
+    ):
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+    return pyarrow.string()
+
+
+def open_writers(
+    stack: ExitStack,
+    csv_filename: str,
+    columns: list[str],
+    options: Union[OutputOptions, None],
+    log: logging.Logger,
+) -> list:
+    """
+    A ColumnarWriter for each format asked for, closed with the stack.
+
+    Parameters
+    ----------
+    stack: ExitStack
+    csv_filename: str           The CSV they go alongside
+    columns: list[str]
+    options: OutputOptions      Optional
+    log: logging.Logger
+
+    Returns
+    -------
+    writers: list[ColumnarWriter]
+    """
+    writers: list = []
+
+    for fmt in options.formats if options is not None else ():
+        filename: str = columnar_filename(csv_filename, fmt)
+        log.info("Writing to %s", filename)
+        writers.append(
+            stack.enter_context(ColumnarWriter(filename, fmt, columns, options))
+        )
+
+    return writers
+
+
+def parse_dates(array: pyarrow.Array, formats: tuple) -> pyarrow.Array:
+    """
+    Parses strings as timestamps, trying each format in turn on what's left.
+
+    Parameters
+    ----------
+    array: pyarrow.Array        Strings, with nulls for missing values
+    formats: tuple
+
+    Returns
+    -------
+    parsed: pyarrow.Array       TIMESTAMP_TYPE; null where no format fits
+    """
+    parsed: Union[pyarrow.Array, None] = None
+
+    for date_format in formats:
+        attempt: pyarrow.Array = pc.strptime(
+            array, format=date_format, unit=TIMESTAMP_TYPE.unit, error_is_null=True
+        )
+        parsed = attempt if parsed is None else pc.coalesce(parsed, attempt)
+
+        if parsed.null_count == array.null_count:
+            break
+
+    return parsed
+
+
+def to_arrow(values, data_type: pyarrow.DataType) -> pyarrow.Array:
+    """
+    Converts a column's values, as written to the CSV, to an Arrow type.
+    Empty strings become nulls; values that aren't dates we understand
+    are left empty in date columns.
+
+    Parameters
+    ----------
+    values: list, tuple or pandas.Series
+    data_type: pyarrow.DataType As column_type gives
+
+    Returns
+    -------
+    array: pyarrow.Array
+    """
+    try:
+        array: pyarrow.Array = pyarrow.array(values, from_pandas=True)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        # Mixed types, as the API's JSON sometimes gives.
+        array = None
+
+    if array is not None and pyarrow.types.is_dictionary(array.type):
+        array = array.dictionary_decode()
+
+    if array is None or not (
+        pyarrow.types.is_string(array.type) or pyarrow.types.is_null(array.type)
+    ):
+        # Numbers & booleans as the csv module writes them; NaN's missing.
+        array = pyarrow.array(
+            [
+                (
+                    None
+                    if value is None or (isinstance(value, float) and math.isnan(value))
+                    else str(value)
+                )
+                for value in values
+            ],
+            type=pyarrow.string(),
+            from_pandas=True,
+        )
+
+    array = array.cast(pyarrow.string())
+    array = pc.if_else(pc.equal(array, ""), None, array)
+
+    if pyarrow.types.is_date32(data_type):
+        return parse_dates(array, DATE_ONLY_FORMATS).cast(data_type)
+
+    if pyarrow.types.is_timestamp(data_type):
+        return parse_dates(array, (DATE_FORMAT,) + DATE_FORMATS)
+
+    if pyarrow.types.is_dictionary(data_type):
+        return pc.dictionary_encode(array).cast(data_type)
+
+    return array
+
+
+# pylint: disable=too-many-instance-attributes
+class ColumnarWriter:
+    """
+    Writes one Parquet or Feather file, a row group at a time.
+    A context manager: the file appears when it's closed, as with common.atomic_write.
+
+    Attributes
+    ----------
+    filename: str
+    schema: pyarrow.Schema
+
+    Methods
+    -------
+    close() -> None
+    write_frame(df: pandas.DataFrame) -> None
+    write_row(row: list) -> None
+    """
+
+    def __init__(
+        self, filename: str, fmt: str, columns: list[str], options: OutputOptions
+    ) -> None:
+        """
+        Instantiate a ColumnarWriter object.
+
+        Parameters
+        ----------
+        filename: str
+        fmt: str                    One of COLUMNAR_FORMATS
+        columns: list[str]          In order; each typed by column_type
+        options: OutputOptions      For the compression & row group size
+        """
+        if fmt not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format '{fmt}'.")
+
+        self.filename: str = filename
+        self.schema: pyarrow.Schema = pyarrow.schema(
+            [pyarrow.field(column, column_type(column)) for column in columns]
+        )
+        self.__format: str = fmt
+        self.__options: OutputOptions = options
+        self.__stack: ExitStack = ExitStack()
+        self.__writer = None
+
+        # Converted to Arrow a row group at a time.
+        self.__rows: list[list] = []
+        self.__tables: list[pyarrow.Table] = []
+        self.__buffered: int = 0
+
+        # Feather: each dictionary column's values so far (see __extend_dictionaries).
+        self.__dictionaries: dict = {}
+
+    def __enter__(self) -> "ColumnarWriter":
+        file = self.__stack.enter_context(atomic_write(self.filename, "wb"))
+
+        try:
+            if self.__format == "parquet":
+                compression: str = self.__options.parquet_compression
+                self.__writer = pyarrow.parquet.ParquetWriter(
+                    file,
+                    self.schema,
+                    compression=None if compression == "none" else compression,
+                )
+            else:
+                # Uncompressed, so it can be memory-mapped.
+                self.__writer = pyarrow.ipc.new_file(
+                    file,
+                    self.schema,
+                    options=pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True),
+                )
+        except BaseException:
+            self.__stack.close()
+            raise
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None:
+            self.close()
+        else:
+            self.__writer.close()
+
+        return self.__stack.__exit__(exc_type, exc_value, traceback)
+
+    def __add_table(self, table: pyarrow.Table) -> None:
+        """
+        Buffers a table, writing whole row groups as they fill up.
+
+        Parameters
+        ----------
+        table: pyarrow.Table
+        """
+        self.__tables.append(table)
+        self.__buffered += table.num_rows
+        size: int = self.__options.row_group_size
+
+        if self.__buffered < size:
+            return
+
+        combined: pyarrow.Table = pyarrow.concat_tables(self.__tables)
+        whole: int = combined.num_rows - combined.num_rows % size
+        self.__write_table(combined.slice(0, whole))
+        self.__tables = [combined.slice(whole)]
+        self.__buffered = combined.num_rows - whole
+
+    def close(self) -> None:
+        """
+        Writes whatever's buffered & finishes the file.
+        """
+        self.__flush_rows()
+
+        if self.__buffered:
+            self.__write_table(pyarrow.concat_tables(self.__tables))
+
+        self.__tables = []
+        self.__buffered = 0
+        self.__writer.close()
+
+    def __extend_dictionaries(self, table: pyarrow.Table) -> pyarrow.Table:
+        """
+        Re-encodes dictionary columns against each column's values so far.
+        A Feather file can't replace a dictionary part way through, only add to it.
+
+        Parameters
+        ----------
+        table: pyarrow.Table
+
+        Returns
+        -------
+        table: pyarrow.Table
+        """
+        for i, field in enumerate(self.schema):
+            if not pyarrow.types.is_dictionary(field.type):
+                continue
+
+            values: pyarrow.Array = (
+                table.column(i).cast(pyarrow.string()).combine_chunks()
+            )
+            dictionary: pyarrow.Array = self.__dictionaries.get(
+                i, pyarrow.array([], type=pyarrow.string())
+            )
+            distinct: pyarrow.Array = pc.unique(values.drop_null())
+            dictionary = pyarrow.concat_arrays(
+                [
+                    dictionary,
+                    pc.filter(
+                        distinct, pc.invert(pc.is_in(distinct, value_set=dictionary))
+                    ),
+                ]
+            )
+            self.__dictionaries[i] = dictionary
+            table = table.set_column(
+                i,
+                field,
+                pyarrow.DictionaryArray.from_arrays(
+                    pc.index_in(values, value_set=dictionary).cast(pyarrow.int32()),
+                    dictionary,
+                ),
+            )
+
+        return table
+
+    def __flush_rows(self) -> None:
+        """
+        Converts the rows given to write_row to a table.
+        """
+        if not self.__rows:
+            return
+
+        columns: list = list(zip(*self.__rows))
+        rows: int = len(self.__rows)
+        self.__rows = []
+        self.__add_table(
+            pyarrow.Table.from_arrays(
+                [
+                    to_arrow(
+                        columns[i] if i < len(columns) else [None] * rows, field.type
+                    )
+                    for i, field in enumerate(self.schema)
+                ],
+                schema=self.schema,
+            )
+        )
+
+    def write_frame(self, df) -> None:
+        """
+        Adds a DataFrame's rows; columns it hasn't got are left empty.
+
+        Parameters
+        ----------
+        df: pandas.DataFrame
+        """
+        self.__flush_rows()
+        self.__add_table(
+            pyarrow.Table.from_arrays(
+                [
+                    to_arrow(
+                        df[field.name]
+                        if field.name in df.columns
+                        else [None] * len(df),
+                        field.type,
+                    )
+                    for field in self.schema
+                ],
+                schema=self.schema,
+            )
+        )
+
+    def write_row(self, row: list) -> None:
+        """
+        Adds one row, with a value (or None) per column, as it would be written to the CSV.
+
+        Parameters
+        ----------
+        row: list
+        """
+        self.__rows.append(row)
+
+        if len(self.__rows) >= self.__options.row_group_size:
+            self.__flush_rows()
+
+    def __write_table(self, table: pyarrow.Table) -> None:
+        """
+        Writes a table in row groups (record batches, for Feather).
+
+        Parameters
+        ----------
+        table: pyarrow.Table
+        """
+        if self.__format == "parquet":
+            self.__writer.write_table(
+                table, row_group_size=self.__options.row_group_size
+            )
+        else:
+            # A RecordBatchFileWriter here, not the ParquetWriter pylint takes it for.
+            # max_chunksize has been its keyword since before IpcWriteOptions existed.
+            # pylint: disable=unexpected-keyword-arg
+            self.__writer.write_table(
+                self.__extend_dictionaries(table),
+                max_chunksize=self.__options.row_group_size,
+            )
@@ -0,0 +1,49 @@
+import logging
+from contextlib import ExitStack
+from typing import Union
+
+import pyarrow
+
+from src.getmyapidata.output_options import OutputOptions
+
+DATE_ONLY_COLUMNS: frozenset
+DATE_ONLY_FORMATS: tuple
+DICTIONARY_COLUMNS: frozenset
+DICTIONARY_SUFFIXES: tuple
+TIMESTAMP_SUFFIXES: tuple
+TIMESTAMP_TYPE: pyarrow.DataType
+
+def column_type(name: str) -> pyarrow.DataType: ...
+def open_writers(
+    stack: ExitStack,
+    csv_filename: str,
+    columns: list[str],
+    options: Union[OutputOptions, None],
+    log: logging.Logger,
+) -> list: ...
+def parse_dates(array: pyarrow.Array, formats: tuple) -> pyarrow.Array: ...
+def to_arrow(values, data_type: pyarrow.DataType) -> pyarrow.Array: ...
+
+class ColumnarWriter:
+    filename: str
+    schema: pyarrow.Schema
+    def __init__(
+        self, filename: str, fmt: str, columns: list[str], options: OutputOptions
+    ) -> None:
+        self.__format: str = None
+        self.__options: OutputOptions = None
+        self.__stack: ExitStack = None
+        self.__writer = None
+        self.__rows: list[list] = None
+        self.__tables: list[pyarrow.Table] = None
+        self.__buffered: int = None
+        self.__dictionaries: dict = None
+    def __enter__(self) -> ColumnarWriter: ...
+    def __exit__(self, exc_type, exc_value, traceback) -> bool: ...
+    def __add_table(self, table: pyarrow.Table) -> None: ...
+    def close(self) -> None: ...
+    def __extend_dictionaries(self, table: pyarrow.Table) -> pyarrow.Table: ...
+    def __flush_rows(self) -> None: ...
+    def write_frame(self, df) -> None: ...
+    def write_row(self, row: list) -> None: ...
+    def __write_table(self, table: pyarrow.Table) -> None: ...
@@ -0,0 +1,168 @@
+"""
+Contains class CombinedOutput, which gathers the HealthPro rows of every organization
+as they're converted & writes them out as one file, sorted & deduplicated by PMI ID.
+
+The converters hand over each row as the CSV line they've just written,
+so making the combined file costs a sort, not another pass over the data.
+"""
+import csv
+import io
+import logging
+import os
+from typing import Union
+
+from src.getmyapidata.compressed_files import open_output, open_text
+
+# Lines written at a time.
+WRITE_BATCH_SIZE: int = 10000
+
+
+def csv_line(writer: csv.writer, buffer: io.StringIO, row: list) -> str:
+    """
+    One row as csv.writer(lineterminator=os.linesep) would write it, without the line ending.
+
+    Parameters
+    ----------
+    writer: csv.writer          Writing to buffer, with lineterminator=os.linesep
+    buffer: io.StringIO
+    row: list
+
+    Returns
+    -------
+    line: str
+    """
+    buffer.seek(0)
+    buffer.truncate()
+    writer.writerow(row)
+    return buffer.getvalue()[: -len(os.linesep)]
+
+
+class CombinedOutput:
+    """
+    Every organization's HealthPro rows in one file.
+
+    Where a participant turns up in more than one participant list,
+    the row from the most recently modified list is kept.
+    Rows without a PMI ID can't be told apart, so they're all kept, at the top.
+
+    Attributes
+    ----------
+    filename: str
+
+    Methods
+    -------
+    add(rows: list[tuple], rank: float) -> None
+    add_converted_file(filename: str, rank: float) -> None
+    write(sizes: dict = None) -> int
+    """
+
+    def __init__(
+        self, filename: str, columns: list[str], key: str, log: logging.Logger
+    ) -> None:
+        """
+        Instantiate a CombinedOutput object.
+
+        Parameters
+        ----------
+        filename: str               Where to write the combined file
+        columns: list[str]          Its header
+        key: str                    Column to sort & deduplicate by
+        log: logging.Logger
+        """
+        self.filename: str = filename
+        self.__columns: list[str] = columns
+        self.__key_position: int = columns.index(key)
+        self.__log: logging.Logger = log
+
+        # PMI ID -> (rank, line)
+        self.__rows: dict = {}
+        self.__unkeyed: list[str] = []
+        self.__duplicates: int = 0
+
+    def add(self, rows: list[tuple], rank: float) -> None:
+        """
+        Takes rows just written to one organization's file.
+
+        Parameters
+        ----------
+        rows: list[tuple]           (PMI ID, CSV line without its line ending)
+        rank: float                 Where a participant's in several files, highest wins;
+                                    the source file's modification time
+        """
+        for key, line in rows:
+            if not key:
+                self.__unkeyed.append(line)
+                continue
+
+            previous: Union[tuple, None] = self.__rows.get(key)
+
+            if previous is not None:
+                self.__duplicates += 1
+
+                if previous[0] >= rank:
+                    continue
+
+            self.__rows[key] = (rank, line)
+
+    def add_converted_file(self, filename: str, rank: float) -> None:
+        """
+        Takes the rows of a file converted earlier, for organizations that haven't changed.
+
+        Parameters
+        ----------
+        filename: str               A HealthPro-format file, compressed or not
+        rank: float                 As for add()
+        """
+        buffer: io.StringIO = io.StringIO()
+        writer: csv.writer = csv.writer(buffer, lineterminator=os.linesep)
+        rows: list[tuple] = []
+
+        with open_text(filename) as file:
+            reader = csv.reader(file)
+
+            if next(reader, None) != self.__columns:
+                raise RuntimeError(f"'{filename}' doesn't have the HealthPro columns.")
+
+            for row in reader:
+                if row:
+                    rows.append(
+                        (row[self.__key_position], csv_line(writer, buffer, row))
+                    )
+
+        self.add(rows, rank)
+
+    def write(self, sizes: dict = None) -> int:
+        """
+        Writes the combined file, compressed if its name says so.
+
+        Parameters
+        ----------
+        sizes: dict                 Optional; as for compressed_files.open_output
+
+        Returns
+        -------
+        participants: int           Rows written
+        """
+        keys: list[str] = sorted(self.__rows)
+
+        with open_output(self.filename, sizes) as file:
+            csv.writer(file, lineterminator=os.linesep).writerow(self.__columns)
+            lines: list[str] = list(self.__unkeyed)
+
+            for key in keys:
+                lines.append(self.__rows[key][1])
+
+                if len(lines) >= WRITE_BATCH_SIZE:
+                    file.write(os.linesep.join(lines) + os.linesep)
+                    lines = []
+
+            if lines:
+                file.write(os.linesep.join(lines) + os.linesep)
+
+        self.__log.info(
+            "Wrote %d participants to '%s' (%d duplicates dropped).",
+            len(keys) + len(self.__unkeyed),
+            self.filename,
+            self.__duplicates,
+        )
+        return len(keys) + len(self.__unkeyed)
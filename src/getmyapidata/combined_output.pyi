@@ -0,0 +1,22 @@
+import csv
+import io
+import logging
+
+WRITE_BATCH_SIZE: int
+
+def csv_line(writer: csv.writer, buffer: io.StringIO, row: list) -> str: ...
+
+class CombinedOutput:
+    filename: str
+    def __init__(
+        self, filename: str, columns: list[str], key: str, log: logging.Logger
+    ) -> None:
+        self.__columns: list[str] = None
+        self.__key_position: int = None
+        self.__log: logging.Logger = None
+        self.__rows: dict = None
+        self.__unkeyed: list[str] = None
+        self.__duplicates: int = None
+    def add(self, rows: list[tuple], rank: float) -> None: ...
+    def add_converted_file(self, filename: str, rank: float) -> None: ...
+    def write(self, sizes: dict = None) -> int: ...
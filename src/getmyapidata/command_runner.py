@@ -0,0 +1,229 @@
+"""
+Contains class CommandRunner, which runs external commands (gcloud) with timeouts,
+cancellation & timing, without a shell.
+"""
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union
+
+from src.getmyapidata.metrics import RunMetrics
+
+# Seconds we allow a command when the caller doesn't say.
+DEFAULT_TIMEOUT_SECONDS: float = 120.0
+
+# How often we check whether we've been told to stop.
+POLL_SECONDS: float = 0.1
+
+# What came of one command.
+# lines is the combined stdout & stderr, split into lines.
+# returncode is None if the command timed out or was cancelled.
+CommandResult = namedtuple(
+    "CommandResult",
+    ["argv", "returncode", "lines", "duration", "timed_out", "cancelled"],
+)
+
+
+def command_name(argv: list[str]) -> str:
+    """
+    Short name for a command, for logs & metrics: the program & its first two sub-commands.
+
+    Parameters
+    ----------
+    argv: list[str]
+
+    Returns
+    -------
+    name: str           e.g. "gcloud_auth_list"
+    """
+    program: str = os.path.splitext(argv[0].replace("\\", "/").split("/")[-1])[0]
+    words: list[str] = [word for word in argv[1:] if not word.startswith("-")][:2]
+    return "_".join([program] + words)
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    """
+    Kills a command & anything it started.
+
+    gcloud is a wrapper script, so killing just the process we started would leave
+    the Python process behind it running, holding our end of the pipe open.
+
+    Parameters
+    ----------
+    process: subprocess.Popen   Started in its own process group (see CommandRunner.run)
+    """
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            # Already gone.
+            pass
+
+
+class CommandRunner:
+    """
+    Runs commands given as argument lists, so nothing passes through a shell.
+
+    Each command has a timeout & is killed if the stop event's set.
+    Durations are logged &, given a RunMetrics object, added up per command there.
+
+    Methods
+    -------
+    run(argv: list[str], timeout: float = None) -> CommandResult
+    run_concurrently(commands: dict, timeout: float = None) -> dict
+    """
+
+    def __init__(
+        self,
+        log: logging.Logger,
+        stop_event: threading.Event = None,
+        metrics: RunMetrics = None,
+        default_timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ) -> None:
+        """
+        Instantiate a CommandRunner object.
+
+        Parameters
+        ----------
+        log: logging.Logger
+        stop_event: threading.Event Optional; set to kill whatever's running
+        metrics: RunMetrics         Optional; where to record command durations
+        default_timeout: float      Seconds allowed when run() isn't told otherwise
+        """
+        self.__log: logging.Logger = log
+        self.__stop_event: threading.Event = (
+            stop_event if stop_event is not None else threading.Event()
+        )
+        self.__metrics: Union[RunMetrics, None] = metrics
+        self.__default_timeout: float = default_timeout
+
+    def __record(self, result: CommandResult) -> None:
+        """
+        Logs the outcome & adds the duration to the metrics.
+
+        Parameters
+        ----------
+        result: CommandResult
+        """
+        name: str = command_name(result.argv)
+
+        if result.timed_out:
+            self.__log.error("%s timed out after %.1f s.", name, result.duration)
+        elif result.cancelled:
+            self.__log.info("%s cancelled after %.1f s.", name, result.duration)
+        else:
+            self.__log.debug(
+                "%s exited with %d after %.2f s.",
+                name,
+                result.returncode,
+                result.duration,
+            )
+
+        if self.__metrics is not None:
+            self.__metrics.increment(f"{name}_s", round(result.duration, 3))
+            self.__metrics.increment(f"{name}_count")
+
+    def run(self, argv: list[str], timeout: float = None) -> CommandResult:
+        """
+        Runs one command, waiting for it to finish, time out or be cancelled.
+
+        Parameters
+        ----------
+        argv: list[str]         Program & arguments
+        timeout: float          Optional; seconds before we kill it
+
+        Returns
+        -------
+        result: CommandResult
+        """
+        timeout = self.__default_timeout if timeout is None else timeout
+
+        # Without a shell, Windows won't find gcloud.cmd from plain "gcloud".
+        program: Union[str, None] = shutil.which(argv[0])
+
+        if program is None:
+            return CommandResult(
+                argv, None, [f"{argv[0]}: command not found"], 0.0, False, False
+            )
+
+        start: float = time.perf_counter()
+        deadline: float = time.monotonic() + timeout
+        timed_out: bool = False
+        cancelled: bool = False
+
+        # Its own process group, so we can kill everything it starts.
+        # pylint: disable=consider-using-with
+        process: subprocess.Popen = subprocess.Popen(
+            [program] + list(argv[1:]),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            start_new_session=os.name != "nt",
+        )
+
+        try:
+            while True:
+                try:
+                    output: str = process.communicate(timeout=POLL_SECONDS)[0]
+                    break
+                except subprocess.TimeoutExpired:
+                    timed_out = time.monotonic() >= deadline
+                    cancelled = self.__stop_event.is_set()
+
+                    if timed_out or cancelled:
+                        kill_process_tree(process)
+                        output = process.communicate()[0]
+                        break
+        except BaseException:
+            # E.g. KeyboardInterrupt: don't leave gcloud running.
+            kill_process_tree(process)
+            raise
+
+        result: CommandResult = CommandResult(
+            argv=list(argv),
+            returncode=None if timed_out or cancelled else process.returncode,
+            lines=(output or "").strip().split("\n"),
+            duration=time.perf_counter() - start,
+            timed_out=timed_out,
+            cancelled=cancelled,
+        )
+        self.__record(result)
+        return result
+
+    def run_concurrently(self, commands: dict, timeout: float = None) -> dict:
+        """
+        Runs independent commands at the same time.
+
+        Parameters
+        ----------
+        commands: dict          Name -> argv
+        timeout: float          Optional; seconds allowed each command
+
+        Returns
+        -------
+        results: dict           Name -> CommandResult
+        """
+        if not commands:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            futures: dict = {
+                name: executor.submit(self.run, argv, timeout)
+                for name, argv in commands.items()
+            }
+
+        return {name: future.result() for name, future in futures.items()}
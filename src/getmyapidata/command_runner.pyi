@@ -0,0 +1,34 @@
+import logging
+import subprocess
+import threading
+from collections import namedtuple
+from typing import Union
+
+from src.getmyapidata.metrics import RunMetrics
+
+DEFAULT_TIMEOUT_SECONDS: float
+POLL_SECONDS: float
+
+CommandResult = namedtuple(
+    "CommandResult",
+    ["argv", "returncode", "lines", "duration", "timed_out", "cancelled"],
+)
+
+def command_name(argv: list[str]) -> str: ...
+def kill_process_tree(process: subprocess.Popen) -> None: ...
+
+class CommandRunner:
+    def __init__(
+        self,
+        log: logging.Logger,
+        stop_event: threading.Event = ...,
+        metrics: RunMetrics = ...,
+        default_timeout: float = ...,
+    ) -> None:
+        self.__log: logging.Logger = None
+        self.__stop_event: threading.Event = None
+        self.__metrics: Union[RunMetrics, None] = None
+        self.__default_timeout: float = None
+    def __record(self, result: CommandResult) -> None: ...
+    def run(self, argv: list[str], timeout: float = ...) -> CommandResult: ...
+    def run_concurrently(self, commands: dict, timeout: float = ...) -> dict: ...
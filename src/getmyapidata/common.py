@@ -5,10 +5,40 @@ import logging
 import os
 import re
 import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import IO
 
-import pywintypes
-import win32api
+
+@contextmanager
+def atomic_write(filename: str, mode: str = "w", **kwargs) -> Iterator[IO]:
+    """
+    Opens a temporary file next to the target & swaps it into place only once
+    writing has succeeded, so readers never see a half-written file.
+
+    Parameters
+    ----------
+    filename: str           File we want to (re)write
+    mode: str               "w" or "wb"
+    kwargs                  Passed along to open()
+
+    Returns
+    -------
+    Iterator[IO]            The open temporary file
+    """
+    temp_filename: str = f"{filename}.{os.getpid()}.tmp"
+
+    try:
+        # Text-mode callers pass the encoding in kwargs; binary mode can't take one.
+        # pylint: disable=unspecified-encoding
+        with open(temp_filename, mode, **kwargs) as file:
+            yield file
+
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
 
 
 def ensure_path_possible(filename: str, log: logging.Logger) -> bool:
@@ -98,6 +128,13 @@ def get_exe_version(log: logging.Logger) -> str:
     exe_path: str = get_exe_path()
     log.debug("Found exe path: {exe_path}.")
 
+    try:
+        # Windows-only; imported here so headless runs elsewhere never load it.
+        import pywintypes  # pylint: disable=import-outside-toplevel
+        import win32api  # pylint: disable=import-outside-toplevel
+    except ImportError:  # pragma: no cover
+        return parse_version_file()
+
     try:  # pragma: no cover
         # Get the full path to the executable.
         log.debug(f"Getting abspath from {exe_path}.")
@@ -1,7 +1,12 @@
 import argparse
 import logging
 from collections.abc import Callable as Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO
 
+@contextmanager
+def atomic_write(filename: str, mode: str = ..., **kwargs) -> Iterator[IO]: ...
 def ensure_path_possible(filename: str, log: logging.Logger) -> bool: ...
 def get_base_path() -> str: ...
 def get_exe_path(log: logging.Logger) -> str: ...
@@ -0,0 +1,391 @@
+"""
+Reads & writes CSVs compressed with gzip or zstd, going by their names
+(".csv.gz", ".csv.zst"), so the rest of the code needn't care which it has.
+
+Compression happens as the file's written, on a thread of its own (see BackgroundWriter),
+so it overlaps with formatting the rows; zstd uses several threads if the zstandard
+package is installed. zstd falls back on pyarrow's codec if it isn't.
+"""
+import glob
+import gzip
+import importlib.util
+import io
+import os
+import queue
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO, TextIO, Union
+
+from src.getmyapidata.common import atomic_write
+
+# Compression -> file extension, added after ".csv".
+COMPRESSIONS: dict = {"gzip": ".gz", "zstd": ".zst"}
+
+# gzip's own default; 9 (Python's) is several times slower for a few percent.
+GZIP_LEVEL: int = 6
+
+# Bytes handed to the compressing thread at a time, & how many can wait for it.
+BLOCK_SIZE: int = 1024 * 1024
+QUEUED_BLOCKS: int = 4
+
+ZSTD_LEVEL: int = 3
+
+
+class BackgroundWriter(io.RawIOBase):
+    """
+    Binary stream that collects what's written into blocks & has another thread
+    write them to a (compressing) stream, so compression runs alongside whatever's
+    producing the data. zlib & zstd let go of the GIL while they work.
+
+    Attributes
+    ----------
+    bytes_written: int          Bytes given to write(), before compression
+
+    Methods
+    -------
+    abandon() -> None
+    close() -> None
+    write(data: bytes) -> int
+    """
+
+    def __init__(self, target: IO[bytes]) -> None:
+        """
+        Instantiate a BackgroundWriter object.
+
+        Parameters
+        ----------
+        target: IO[bytes]           Closed along with this
+        """
+        super().__init__()
+        self.bytes_written: int = 0
+        self.__target: IO[bytes] = target
+        self.__pending: list[bytes] = []
+        self.__pending_size: int = 0
+        self.__queue: queue.Queue = queue.Queue(maxsize=QUEUED_BLOCKS)
+        self.__error: Union[BaseException, None] = None
+        self.__thread: threading.Thread = threading.Thread(
+            target=self.__drain, name="compressor", daemon=True
+        )
+        self.__thread.start()
+
+    def abandon(self) -> None:
+        """
+        Stops the thread without finishing the stream, e.g. after an error.
+        """
+        self.__pending = []
+        self.__error = self.__error or RuntimeError("Abandoned.")
+
+        if self.__thread.is_alive():
+            self.__queue.put(None)
+            self.__thread.join()
+
+        super().close()
+
+    def close(self) -> None:
+        """
+        Writes what's left & closes the target.
+        """
+        if self.closed:
+            return
+
+        self.__send()
+        self.__queue.put(None)
+        self.__thread.join()
+        super().close()
+
+        if self.__error is not None:
+            raise RuntimeError(f"Couldn't write compressed data: {self.__error}")
+
+        self.__target.close()
+
+    def __drain(self) -> None:
+        """
+        The thread: writes blocks until it's given None.
+        """
+        while True:
+            block: Union[bytes, None] = self.__queue.get()
+
+            if block is None:
+                return
+
+            if self.__error is None:
+                try:
+                    self.__target.write(block)
+                except BaseException as e:  # pylint: disable=broad-exception-caught
+                    self.__error = e
+
+    def __send(self) -> None:
+        """
+        Queues what's pending as one block.
+        """
+        if self.__error is not None:
+            raise RuntimeError(f"Couldn't write compressed data: {self.__error}")
+
+        if self.__pending:
+            self.__queue.put(b"".join(self.__pending))
+            self.__pending = []
+            self.__pending_size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        """
+        Takes data to be written.
+
+        Parameters
+        ----------
+        data: bytes
+
+        Returns
+        -------
+        size: int                   All of it, always
+        """
+        size: int = len(data)
+        self.__pending.append(bytes(data))
+        self.__pending_size += size
+        self.bytes_written += size
+
+        if self.__pending_size >= BLOCK_SIZE:
+            self.__send()
+
+        return size
+
+
+def check_compression(compression: str) -> None:
+    """
+    Raises an error if we can't write files compressed this way.
+
+    Parameters
+    ----------
+    compression: str            "none" or one of COMPRESSIONS
+    """
+    if compression != "none" and compression not in COMPRESSIONS:
+        raise ValueError(
+            f"Unknown compression '{compression}'; use none, {', '.join(COMPRESSIONS)}."
+        )
+
+    if (
+        compression == "zstd"
+        and importlib.util.find_spec("zstandard") is None
+        and importlib.util.find_spec("pyarrow") is None
+    ):
+        raise RuntimeError(
+            "zstd compression needs zstandard or pyarrow: pip install zstandard"
+        )
+
+
+def compressed_filename(filename: str, compression: str) -> str:
+    """
+    A file's name when it's compressed this way.
+
+    Parameters
+    ----------
+    filename: str               Uncompressed, e.g. "A_participant_list.csv"
+    compression: str            "none" or one of COMPRESSIONS
+
+    Returns
+    -------
+    filename: str               e.g. "A_participant_list.csv.gz"
+    """
+    return filename + COMPRESSIONS.get(compression, "")
+
+
+def compressing_stream(target: IO[bytes], compression: str) -> IO[bytes]:
+    """
+    A stream that compresses what's written to it into target.
+
+    Parameters
+    ----------
+    target: IO[bytes]
+    compression: str            One of COMPRESSIONS
+
+    Returns
+    -------
+    stream: IO[bytes]           Closing it finishes the compressed data
+    """
+    if compression == "gzip":
+        # No file name or time in the header, so the same data always compresses the same.
+        return gzip.GzipFile(
+            filename="", mode="wb", fileobj=target, compresslevel=GZIP_LEVEL, mtime=0
+        )
+
+    # pylint: disable=import-outside-toplevel
+    if importlib.util.find_spec("zstandard") is not None:
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1).stream_writer(
+            target, closefd=False
+        )
+
+    import pyarrow
+
+    return pyarrow.CompressedOutputStream(target, "zstd")
+
+
+def compression_of(filename: str) -> str:
+    """
+    How a file's compressed, going by its name.
+
+    Parameters
+    ----------
+    filename: str
+
+    Returns
+    -------
+    compression: str            "none" or one of COMPRESSIONS
+    """
+    for compression, extension in COMPRESSIONS.items():
+        if filename.endswith(extension):
+            return compression
+
+    return "none"
+
+
+def csv_files(pattern: str) -> list[str]:
+    """
+    Like glob.glob(pattern + ".csv"), but finding compressed CSVs as well.
+
+    Parameters
+    ----------
+    pattern: str                e.g. "/data/*_participant_list"
+
+    Returns
+    -------
+    filenames: list[str]        Sorted
+    """
+    return sorted(
+        filename
+        for extension in [""] + list(COMPRESSIONS.values())
+        for filename in glob.glob(pattern + ".csv" + extension)
+    )
+
+
+def open_binary(filename: str) -> IO[bytes]:
+    """
+    Opens a file to read, decompressing it if its name says it's compressed.
+
+    Parameters
+    ----------
+    filename: str
+
+    Returns
+    -------
+    file: IO[bytes]
+    """
+    compression: str = compression_of(filename)
+
+    if compression == "gzip":
+        return gzip.open(filename, "rb")
+
+    if compression == "zstd":
+        # pylint: disable=import-outside-toplevel
+        if importlib.util.find_spec("zstandard") is not None:
+            import zstandard
+
+            return zstandard.open(filename, "rb")
+
+        import pyarrow
+
+        return pyarrow.input_stream(filename, compression="zstd")
+
+    return open(filename, "rb")
+
+
+@contextmanager
+def open_output(filename: str, sizes: dict = None) -> Iterator[TextIO]:
+    """
+    Opens a CSV to write, compressed if its name says so, with common.atomic_write.
+    Once it's written, the same file in any other compression is removed
+    (see remove_other_compressions).
+
+    Parameters
+    ----------
+    filename: str
+    sizes: dict                 Optional; "csv_bytes" & "bytes_written" are added to
+
+    Returns
+    -------
+    Iterator[TextIO]            Opened with newline="", in UTF-8
+    """
+    compression: str = compression_of(filename)
+
+    if compression == "none":
+        with atomic_write(filename, "w", newline="", encoding="utf-8") as file:
+            yield file
+
+        csv_bytes: int = os.path.getsize(filename)
+    else:
+        with atomic_write(filename, "wb") as raw:
+            background: BackgroundWriter = BackgroundWriter(
+                compressing_stream(raw, compression)
+            )
+            text: TextIO = io.TextIOWrapper(background, encoding="utf-8", newline="")
+
+            try:
+                yield text
+                text.close()
+            except BaseException:
+                background.abandon()
+                raise
+
+        csv_bytes = background.bytes_written
+
+    if sizes is not None:
+        sizes["csv_bytes"] = sizes.get("csv_bytes", 0) + csv_bytes
+        sizes["bytes_written"] = sizes.get("bytes_written", 0) + os.path.getsize(
+            filename
+        )
+
+    remove_other_compressions(filename)
+
+
+def open_text(filename: str, encoding: str = "utf-8") -> TextIO:
+    """
+    Opens a CSV to read as text, decompressing it if its name says it's compressed.
+
+    Parameters
+    ----------
+    filename: str
+    encoding: str
+
+    Returns
+    -------
+    file: TextIO                Opened with newline="", for the csv module
+    """
+    if compression_of(filename) == "none":
+        return open(filename, "r", newline="", encoding=encoding)
+
+    return io.TextIOWrapper(open_binary(filename), encoding=encoding, newline="")
+
+
+def remove_other_compressions(filename: str) -> None:
+    """
+    Removes the same file in any other compression (or none), as out of date.
+
+    Parameters
+    ----------
+    filename: str               The file just written
+    """
+    for other in [""] + list(COMPRESSIONS.values()):
+        variant: str = uncompressed_filename(filename) + other
+
+        if variant != filename and os.path.isfile(variant):
+            os.remove(variant)
+
+
+def uncompressed_filename(filename: str) -> str:
+    """
+    A file's name without any compression extension.
+
+    Parameters
+    ----------
+    filename: str               e.g. "A_participant_list.csv.gz"
+
+    Returns
+    -------
+    filename: str               e.g. "A_participant_list.csv"
+    """
+    extension: str = COMPRESSIONS.get(compression_of(filename), "")
+    return filename[: -len(extension)] if extension else filename
@@ -0,0 +1,40 @@
+import io
+import queue
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import IO, TextIO, Union
+
+BLOCK_SIZE: int
+COMPRESSIONS: dict
+GZIP_LEVEL: int
+QUEUED_BLOCKS: int
+ZSTD_LEVEL: int
+
+class BackgroundWriter(io.RawIOBase):
+    bytes_written: int
+    def __init__(self, target: IO[bytes]) -> None:
+        self.__target: IO[bytes] = None
+        self.__pending: list[bytes] = None
+        self.__pending_size: int = None
+        self.__queue: queue.Queue = None
+        self.__error: Union[BaseException, None] = None
+        self.__thread: threading.Thread = None
+    def abandon(self) -> None: ...
+    def close(self) -> None: ...
+    def __drain(self) -> None: ...
+    def __send(self) -> None: ...
+    def writable(self) -> bool: ...
+    def write(self, data: bytes) -> int: ...
+
+def check_compression(compression: str) -> None: ...
+def compressed_filename(filename: str, compression: str) -> str: ...
+def compressing_stream(target: IO[bytes], compression: str) -> IO[bytes]: ...
+def compression_of(filename: str) -> str: ...
+def csv_files(pattern: str) -> list[str]: ...
+def open_binary(filename: str) -> IO[bytes]: ...
+@contextmanager
+def open_output(filename: str, sizes: dict = None) -> Iterator[TextIO]: ...
+def open_text(filename: str, encoding: str = "utf-8") -> TextIO: ...
+def remove_other_compressions(filename: str) -> None: ...
+def uncompressed_filename(filename: str) -> str: ...
@@ -0,0 +1,241 @@
+"""
+Contains class ConversionManifest, which remembers what the HealthPro converter last did,
+so unchanged participant lists needn't be converted again.
+"""
+import hashlib
+import json
+import logging
+import os
+from typing import Union
+
+from src.getmyapidata.common import atomic_write
+
+# Kept next to the converted files.
+MANIFEST_FILENAME: str = "conversion_manifest.json"
+
+# Read files in pieces this big when hashing them.
+HASH_BLOCK_SIZE: int = 1024 * 1024
+
+
+def file_digest(filename: str) -> str:
+    """
+    Content hash of a file.
+
+    Parameters
+    ----------
+    filename: str
+
+    Returns
+    -------
+    digest: str
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+            hasher.update(block)
+
+    return hasher.hexdigest()
+
+
+def file_state(filename: str) -> Union[dict, None]:
+    """
+    Cheap identity of a file: size & modification time.
+
+    Parameters
+    ----------
+    filename: str
+
+    Returns
+    -------
+    state: dict or None if there's no such file
+    """
+    try:
+        stats: os.stat_result = os.stat(filename)
+    except OSError:
+        return None
+
+    return {"mtime": stats.st_mtime, "size": stats.st_size}
+
+
+class ConversionManifest:
+    """
+    Records each source file's size, modification time & content hash,
+    the file it was converted to & the converter version that did it.
+
+    A source is unchanged if its size & time match. If only the time differs
+    (the download rewrote it), the hash decides.
+
+    Attributes
+    ----------
+    manifest_file: str
+
+    Methods
+    -------
+    combined_is_current(target_filename: str, source_filenames: list[str]) -> bool
+    is_current(source_filename: str, target_filename: str) -> bool
+    record(source_filename: str, target_filename: str) -> None
+    record_combined(target_filename: str, source_filenames: list[str]) -> None
+    save(source_filenames: list[str]) -> None
+    """
+
+    def __init__(self, data_directory: str, version: str, log: logging.Logger) -> None:
+        """
+        Instantiate a ConversionManifest object & read the previous manifest, if any.
+
+        Parameters
+        ----------
+        data_directory: str         Where the converted files & manifest live
+        version: str                Converter version; a different one invalidates everything
+        log: logging.Logger
+        """
+        self.__version: str = version
+        self.__log: logging.Logger = log
+        self.manifest_file: str = os.path.join(data_directory, MANIFEST_FILENAME)
+        self.__entries: dict = {}
+
+        # The file made from all the sources together, if any.
+        self.__combined: dict = {}
+
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as file:
+                manifest: dict = json.load(file)
+        except (OSError, ValueError):
+            return
+
+        if not isinstance(manifest, dict):
+            return
+
+        if manifest.get("converter_version") != version:
+            self.__log.info(
+                "Converter version changed from %s to %s: converting everything.",
+                manifest.get("converter_version"),
+                version,
+            )
+            return
+
+        self.__entries = manifest.get("files", {})
+        self.__combined = manifest.get("combined", {})
+
+    def combined_is_current(
+        self, target_filename: str, source_filenames: list[str]
+    ) -> bool:
+        """
+        Was target_filename made from these sources, as they were last converted?
+        Call after is_current() has found every source unchanged.
+
+        Parameters
+        ----------
+        target_filename: str
+        source_filenames: list[str]
+
+        Returns
+        -------
+        bool
+        """
+        return (
+            self.__combined.get("target") == os.path.basename(target_filename)
+            and self.__combined.get("target_state") == file_state(target_filename)
+            and self.__combined.get("sources")
+            == sorted(os.path.basename(filename) for filename in source_filenames)
+        )
+
+    def is_current(self, source_filename: str, target_filename: str) -> bool:
+        """
+        Is target_filename still what we made from source_filename as it is now?
+
+        Parameters
+        ----------
+        source_filename: str
+        target_filename: str
+
+        Returns
+        -------
+        bool
+        """
+        entry: Union[dict, None] = self.__entries.get(os.path.basename(source_filename))
+
+        if entry is None or entry.get("target") != os.path.basename(target_filename):
+            return False
+
+        # Someone's deleted or edited the output.
+        if file_state(target_filename) != entry.get("target_state"):
+            return False
+
+        state: Union[dict, None] = file_state(source_filename)
+
+        if state is None or state["size"] != entry.get("size"):
+            return False
+
+        if state["mtime"] == entry.get("mtime"):
+            return True
+
+        if file_digest(source_filename) != entry.get("hash"):
+            return False
+
+        # Same content, rewritten: remember the new time so we needn't hash it again.
+        entry["mtime"] = state["mtime"]
+        return True
+
+    def record(self, source_filename: str, target_filename: str) -> None:
+        """
+        Remembers that source_filename has just been converted to target_filename.
+
+        Parameters
+        ----------
+        source_filename: str
+        target_filename: str
+        """
+        state: dict = file_state(source_filename)
+        self.__entries[os.path.basename(source_filename)] = {
+            "hash": file_digest(source_filename),
+            "mtime": state["mtime"],
+            "size": state["size"],
+            "target": os.path.basename(target_filename),
+            "target_state": file_state(target_filename),
+        }
+
+    def record_combined(
+        self, target_filename: str, source_filenames: list[str]
+    ) -> None:
+        """
+        Remembers that target_filename has just been made from all these sources.
+
+        Parameters
+        ----------
+        target_filename: str
+        source_filenames: list[str]
+        """
+        self.__combined = {
+            "sources": sorted(
+                os.path.basename(filename) for filename in source_filenames
+            ),
+            "target": os.path.basename(target_filename),
+            "target_state": file_state(target_filename),
+        }
+
+    def save(self, source_filenames: list[str]) -> None:
+        """
+        Writes the manifest, forgetting sources that are no longer there.
+
+        Parameters
+        ----------
+        source_filenames: list[str]     Every source in the directory, converted or not
+        """
+        names: set = {os.path.basename(filename) for filename in source_filenames}
+        manifest: dict = {
+            "combined": self.__combined,
+            "converter_version": self.__version,
+            "files": {
+                name: entry for name, entry in self.__entries.items() if name in names
+            },
+        }
+
+        try:
+            with atomic_write(self.manifest_file, "w", encoding="utf-8") as file:
+                json.dump(manifest, file, indent=2, sort_keys=True)
+        except OSError as e:
+            # Not fatal: we'll just convert everything next time.
+            self.__log.warning(
+                "Unable to write conversion manifest '%s': %s", self.manifest_file, e
+            )
@@ -0,0 +1,25 @@
+import logging
+from typing import Union
+
+MANIFEST_FILENAME: str
+HASH_BLOCK_SIZE: int
+
+def file_digest(filename: str) -> str: ...
+def file_state(filename: str) -> Union[dict, None]: ...
+
+class ConversionManifest:
+    manifest_file: str
+    def __init__(self, data_directory: str, version: str, log: logging.Logger) -> None:
+        self.__version: str = None
+        self.__log: logging.Logger = None
+        self.__entries: dict = None
+        self.__combined: dict = None
+    def combined_is_current(
+        self, target_filename: str, source_filenames: list[str]
+    ) -> bool: ...
+    def is_current(self, source_filename: str, target_filename: str) -> bool: ...
+    def record(self, source_filename: str, target_filename: str) -> None: ...
+    def record_combined(
+        self, target_filename: str, source_filenames: list[str]
+    ) -> None: ...
+    def save(self, source_filenames: list[str]) -> None: ...
@@ -0,0 +1,303 @@
+"""
+Compiles declarative column mappings (see healthpro_mapping) into plans for DataFrames.
+
+A mapping says, for each target column, which source column it comes from,
+what to do to the values & what to put where there's no value.
+compile_plan() turns a list of mappings into a ConversionPlan that:
+    - reads only the source columns some target needs,
+    - works out each distinct (source, transform) pair once, however many targets use it,
+    - applies transforms to each column's distinct values (a categorical's categories),
+      not every row, & keeps categoricals categorical,
+    - builds the output DataFrame once, with no intermediate columns,
+    - & keeps a note of how long each step took.
+"""
+import logging
+import time
+from collections import namedtuple
+from typing import Union
+
+import numpy as np
+import pandas
+
+from src.getmyapidata.healthpro_mapping import ColumnMapping
+
+# Works out one (source, transform, default) combination & feeds one or more targets.
+PlanStep = namedtuple("PlanStep", ["name", "source", "transform", "default", "targets"])
+
+
+def distinct_values(values: pandas.Series) -> tuple:
+    """
+    Codes for a column's values & the distinct values they stand for.
+    A categorical column already has them.
+
+    Parameters
+    ----------
+    values: pandas.Series
+
+    Returns
+    -------
+    codes: np.ndarray               -1 for missing values
+    uniques: pandas.Index or array
+    """
+    if isinstance(values.dtype, pandas.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+
+    return pandas.factorize(values)
+
+
+def is_blank(values: np.ndarray) -> np.ndarray:
+    """
+    Which values are missing or empty strings?
+
+    Parameters
+    ----------
+    values: np.ndarray
+
+    Returns
+    -------
+    mask: np.ndarray
+    """
+    return pandas.isna(values) | (values == "")
+
+
+class ConversionPlan:
+    """
+    A compiled list of ColumnMappings.
+
+    Attributes
+    ----------
+    source_columns: list[str]       The only input columns the plan reads
+    target_columns: list[str]       Output columns, in order
+
+    Methods
+    -------
+    report(timings: dict) -> str
+    run(df: pandas.DataFrame, log: logging.Logger, timings: dict = None) -> pandas.DataFrame
+    """
+
+    def __init__(self, steps: list, target_columns: list[str]) -> None:
+        """
+        Instantiate a ConversionPlan object; use compile_plan() rather than calling this.
+
+        Parameters
+        ----------
+        steps: list                 PlanSteps
+        target_columns: list[str]
+        """
+        self.__steps: list = steps
+        self.target_columns: list[str] = target_columns
+        self.source_columns: list[str] = sorted(
+            {step.source for step in steps if step.source is not None}
+        )
+
+    @staticmethod
+    def report(timings: dict) -> str:
+        """
+        Formats the time each step took, slowest first.
+
+        Parameters
+        ----------
+        timings: dict               As filled in by run()
+
+        Returns
+        -------
+        report: str
+        """
+        return "\n".join(
+            f"{seconds:8.3f} s  {name}"
+            for name, seconds in sorted(
+                timings.items(), key=lambda item: item[1], reverse=True
+            )
+        )
+
+    def run(
+        self, df: pandas.DataFrame, log: logging.Logger, timings: dict = None
+    ) -> pandas.DataFrame:
+        """
+        Applies the plan to one DataFrame (or chunk).
+
+        Parameters
+        ----------
+        df: pandas.DataFrame        Source data
+        log: logging.Logger
+        timings: dict               Optional; step name -> seconds, added to
+
+        Returns
+        -------
+        converted: pandas.DataFrame
+        """
+        context: dict = {}
+        factorized: dict = {}
+        columns: dict = {}
+
+        for step in self.__steps:
+            start: float = time.perf_counter()
+            values: pandas.Series = self.__run_step(step, df, log, context, factorized)
+
+            for target in step.targets:
+                columns[target] = values
+
+            self.__time(timings, step.name, start)
+
+        # Everything's already a Series of the right type, so there's nothing to infer or copy.
+        start = time.perf_counter()
+        empty: pandas.Series = pandas.Series(
+            np.full(len(df), np.nan, dtype=object), index=df.index, copy=False
+        )
+        converted: pandas.DataFrame = pandas.DataFrame(
+            {column: columns.get(column, empty) for column in self.target_columns},
+            copy=False,
+        )
+        self.__time(timings, "building the DataFrame", start)
+        return converted
+
+    @staticmethod
+    def __lookup(
+        step: PlanStep, uniques: Union[pandas.Index, np.ndarray], context: dict
+    ) -> np.ndarray:
+        """
+        Converts a column's distinct values, once each.
+
+        Parameters
+        ----------
+        step: PlanStep
+        uniques: pandas.Index or array  The source column's distinct values (see distinct_values)
+        context: dict               Shared by the transforms in this run
+
+        Returns
+        -------
+        lookup: np.ndarray          Each distinct value converted, then the value for
+                                    missing values, whose code is -1
+        """
+        lookup: np.ndarray = np.full(len(uniques) + 1, None, dtype=object)
+
+        if step.transform is None:
+            lookup[:-1] = np.asarray(uniques, dtype=object)
+        elif step.transform.vectorized is not None:
+            lookup[:-1] = np.asarray(
+                step.transform.vectorized(pandas.Series(uniques), context), dtype=object
+            )
+        else:
+            lookup[:-1] = [step.transform.function(value) for value in uniques]
+
+        if step.default is not None:
+            lookup[is_blank(lookup)] = step.default
+
+        return lookup
+
+    @staticmethod
+    def __run_step(
+        step: PlanStep,
+        df: pandas.DataFrame,
+        log: logging.Logger,
+        context: dict,
+        factorized: dict,
+    ) -> pandas.Series:
+        """
+        Works out one step's values.
+
+        Parameters
+        ----------
+        step: PlanStep
+        df: pandas.DataFrame
+        log: logging.Logger
+        context: dict               Shared by the transforms in this run
+        factorized: dict            Source column -> (codes, distinct values), shared by steps
+
+        Returns
+        -------
+        values: pandas.Series
+        """
+        if step.source is not None and step.source not in df.columns:
+            log.warning("No '%s' column; using '%s'.", step.source, step.default or "")
+
+        if step.source is None or step.source not in df.columns:
+            return pandas.Series(
+                np.full(len(df), step.default, dtype=object), index=df.index, copy=False
+            )
+
+        if step.transform is None and step.default is None:
+            return df[step.source]
+
+        if step.source not in factorized:
+            factorized[step.source] = distinct_values(df[step.source])
+
+        codes, uniques = factorized[step.source]
+        lookup: np.ndarray = ConversionPlan.__lookup(step, uniques, context)
+
+        if isinstance(df[step.source].dtype, pandas.CategoricalDtype):
+            # Stay categorical: the converted categories (merging any that converted
+            # to the same value) & the codes for them.
+            lookup_codes, categories = pandas.factorize(lookup)
+            return pandas.Series(
+                pandas.Categorical.from_codes(lookup_codes[codes], categories),
+                index=df.index,
+                copy=False,
+            )
+
+        return pandas.Series(lookup[codes], index=df.index, dtype=object, copy=False)
+
+    @staticmethod
+    def __time(timings: Union[dict, None], name: str, start: float) -> None:
+        """
+        Adds the time since start to a step's total.
+
+        Parameters
+        ----------
+        timings: dict or None
+        name: str
+        start: float                From time.perf_counter()
+        """
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def compile_plan(
+    mappings: list[ColumnMapping], target_columns: list[str]
+) -> ConversionPlan:
+    """
+    Turns ColumnMappings into a ConversionPlan.
+
+    Parameters
+    ----------
+    mappings: list[ColumnMapping]
+    target_columns: list[str]       Output columns, in order; those with no mapping are empty
+
+    Returns
+    -------
+    plan: ConversionPlan
+    """
+    steps: dict = {}
+
+    for mapping in mappings:
+        if mapping.source is None and mapping.default is None:
+            # Nothing to compute: the column's left empty.
+            continue
+
+        transform_name: str = mapping.transform.name if mapping.transform else "copy"
+        key: tuple = (mapping.source, transform_name, mapping.default)
+
+        if key in steps:
+            steps[key].targets.append(mapping.target)
+        else:
+            name: str = (
+                f"{mapping.source} ({transform_name})"
+                if mapping.source
+                else f"constant {mapping.default!r}"
+            )
+            steps[key] = PlanStep(
+                name,
+                mapping.source,
+                mapping.transform,
+                mapping.default,
+                [mapping.target],
+            )
+
+    unknown: list[str] = [
+        mapping.target for mapping in mappings if mapping.target not in target_columns
+    ]
+
+    if unknown:
+        raise ValueError(f"Mapped columns missing from the target columns: {unknown}")
+
+    return ConversionPlan(list(steps.values()), list(target_columns))
@@ -0,0 +1,42 @@
+import logging
+from collections import namedtuple
+from typing import Union
+
+import numpy as np
+import pandas
+
+from src.getmyapidata.healthpro_mapping import ColumnMapping
+
+PlanStep = namedtuple("PlanStep", ["name", "source", "transform", "default", "targets"])
+
+def distinct_values(values: pandas.Series) -> tuple: ...
+def is_blank(values: np.ndarray) -> np.ndarray: ...
+
+class ConversionPlan:
+    source_columns: list[str]
+    target_columns: list[str]
+    def __init__(self, steps: list, target_columns: list[str]) -> None:
+        self.__steps: list = None
+    @staticmethod
+    def report(timings: dict) -> str: ...
+    def run(
+        self, df: pandas.DataFrame, log: logging.Logger, timings: dict = None
+    ) -> pandas.DataFrame: ...
+    @staticmethod
+    def __lookup(
+        step: PlanStep, uniques: Union[pandas.Index, np.ndarray], context: dict
+    ) -> np.ndarray: ...
+    @staticmethod
+    def __run_step(
+        step: PlanStep,
+        df: pandas.DataFrame,
+        log: logging.Logger,
+        context: dict,
+        factorized: dict,
+    ) -> pandas.Series: ...
+    @staticmethod
+    def __time(timings: Union[dict, None], name: str, start: float) -> None: ...
+
+def compile_plan(
+    mappings: list[ColumnMapping], target_columns: list[str]
+) -> ConversionPlan: ...
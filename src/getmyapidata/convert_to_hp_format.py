@@ -1,356 +1,518 @@
 """
-Contains class HealthProConverter, which converts participant list into Health Pro format.
+Converts one participant list at a time into Health Pro format with pandas
+(reading & writing with pyarrow, if it's installed). HealthProConverter decides
+which files to convert & with which engine.
 """
-import glob
-import json
+import csv
+import io
 import logging
 import os
 import pathlib
-from collections.abc import Callable
+import re
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import ExitStack
+from typing import TextIO
 
 import numpy as np
 import pandas
 
+from src.getmyapidata.combined_output import csv_line
+from src.getmyapidata.compressed_files import (compression_of, open_binary,
+                                               open_output, open_text)
+from src.getmyapidata.conversion_plan import ConversionPlan, compile_plan
+from src.getmyapidata.healthpro_converter import converter_for, resolve_engine
+from src.getmyapidata.healthpro_mapping import (DATE_FORMAT, HEALTHPRO_COLUMNS,
+                                                HEALTHPRO_MAPPING, KEY_COLUMN,
+                                                normalize_date_value)
 from src.getmyapidata.my_logging import setup_logging
+from src.getmyapidata.output_options import OutputOptions
+from src.getmyapidata.stream_converter import unique_column_names
+
+# Columns with a handful of distinct values, read as categoricals:
+# their values are converted once per category, not once per row.
+CATEGORY_COLUMNS: tuple = (
+    "clinicPhysicalMeasurementsStatus",
+    "consentForElectronicHealthRecords",
+    "consentForStudyEnrollment",
+    "deactivationStatus",
+    "deceasedStatus",
+    "organization",
+    "state",
+    "withdrawalStatus",
+)
+
+
+def arrow_lines(df: pandas.DataFrame) -> list[str]:
+    """
+    A DataFrame of strings as CSV lines (without line endings), byte for byte as
+    DataFrame.to_csv(index=False, header=False) would write them, but joining
+    (& if need be, quoting) the fields with Arrow compute functions instead of row by row.
 
+    (Arrow's own CSV writer quotes every string, which would change the output.)
 
-# UTILITY CLASS
-# Forces all data typing to strings
-class StringConverter(dict):
-    """
-    Required for read_csv method.
+    Parameters
+    ----------
+    df: pandas.DataFrame        Strings & missing values only
+
+    Returns
+    -------
+    lines: list[str]
     """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow
+    import pyarrow.compute as pc
+
+    if df.empty:
+        return []
+
+    fields: list = [
+        pc.fill_null(pc.cast(column, pyarrow.string()), "")
+        for column in pyarrow.Table.from_pandas(df, preserve_index=False).columns
+    ]
+    lines = pc.binary_join_element_wise(*fields, ",")
+
+    # The csv module quotes fields with a delimiter, quote or line-ending character in them.
+    # Usually there are none, which we can check on whole lines at once.
+    needs_quotes = pc.or_(
+        pc.greater(pc.count_substring(lines, ","), len(fields) - 1),
+        pc.match_substring_regex(lines, "[" + re.escape('"' + os.linesep) + "]"),
+    )
 
-    def __contains__(self, item):
-        return True
+    if pc.any(needs_quotes).as_py():
+        special: str = "[" + re.escape(',"' + os.linesep) + "]"
 
-    def __getitem__(self, item):
-        return str
+        for i, values in enumerate(fields):
+            quote = pc.match_substring_regex(values, special)
 
-    def get(self, default=None):  # pylint: disable=unused-argument
-        return str  # pragma: no cover
+            if pc.any(quote).as_py():
+                quoted = pc.binary_join_element_wise(
+                    '"', pc.replace_substring(values, '"', '""'), '"', ""
+                )
+                fields[i] = pc.if_else(quote, quoted, values)
+
+        lines = pc.binary_join_element_wise(*fields, ",")
 
+    return lines.to_pylist()
 
-def convert_date(raw_date: pandas.Series) -> pandas.Series:
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+def convert_file(
+    source_filename: str,
+    target_filename: str,
+    log: logging.Logger,
+    chunk_size: int = 0,
+    status_fn: Callable = None,
+    engine: str = "auto",
+    collect: Callable = None,
+    output: OutputOptions = None,
+    sizes: dict = None,
+) -> int:
     """
-    Convert date format.
+    Reads a CSV, applies field conversions, and writes it out as new file.
+    Either file can be compressed; their names say how (see compressed_files).
+
+    A plain function, so HealthProConverter can run it in other processes.
 
     Parameters
     ----------
-    raw_date: pandas.Series         One column
+    source_filename: str
+    target_filename: str
+    log: logging.Logger
+    chunk_size: int             Rows to convert at a time; 0 for the whole file.
+    status_fn: Callable         Optional; method to report status.
+    engine: str                 How to read the CSV; see healthpro_converter.ENGINES.
+    collect: Callable           Optional; given lists of (PMI ID, CSV line) as they're written,
+                                for a CombinedOutput.
+    output: OutputOptions       Optional; columnar formats to write too.
+    sizes: dict                 Optional; the CSV's bytes & the bytes written are added to,
+                                as for compressed_files.open_output.
 
     Returns
     -------
-    date_converted: pandas.Series
+    participants: int           How many participants were converted
     """
-    date_temp: pandas.Series = pandas.to_datetime(raw_date, errors="coerce")
-    date_converted: pandas.Series = date_temp.dt.strftime("%Y-%m-%dT%H:%M:%S")
-    return date_converted
+    engine = resolve_engine(engine, log)
+
+    if engine == "stream":
+        return converter_for(engine)(
+            source_filename,
+            target_filename,
+            log,
+            chunk_size,
+            status_fn,
+            engine,
+            collect,
+            output,
+            sizes,
+        )
+
+    log.info(
+        "Converting '%s' to '%s' (%s engine).", source_filename, target_filename, engine
+    )
+    participants: int = 0
+    timings: dict = {}
+
+    # Write the modified data to a new CSV file, overwriting if necessary.
+    if status_fn is not None:
+        status_fn(f"Writing file {target_filename}.")
+
+    with ExitStack() as stack:
+        writers: list = []
+
+        if output is not None and output.formats:
+            # pylint: disable=import-outside-toplevel
+            from src.getmyapidata.columnar_output import open_writers
+
+            writers = open_writers(
+                stack, target_filename, HEALTHPRO_COLUMNS, output, log
+            )
+
+        file: TextIO = stack.enter_context(open_output(target_filename, sizes))
+        header: bool = True
+
+        for participant_match in read_participant_list(
+            source_filename, chunk_size, engine, HEALTHPRO_PLAN.source_columns
+        ):
+            hp: pandas.DataFrame = to_healthpro(participant_match, log, timings)
+            write_csv_chunk(hp, file, engine, header, collect)
+
+            for writer in writers:
+                writer.write_frame(hp)
+
+            participants += len(participant_match)
+            header = False
+
+        # No participants at all: still write the header.
+        if header:
+            pandas.DataFrame(columns=HEALTHPRO_COLUMNS).to_csv(file, index=False)
+
+    log.debug("Conversion plan timings:\n%s", ConversionPlan.report(timings))
+    return participants
 
 
-def convert_patient_status(df: pandas.DataFrame) -> pandas.DataFrame:
+def csv_lines(df: pandas.DataFrame, engine: str = "pandas") -> list[str]:
     """
-    Converts patient status columns.
+    A DataFrame as CSV lines (without line endings), as DataFrame.to_csv(index=False)
+    would write them.
 
     Parameters
     ----------
     df: pandas.DataFrame
+    engine: str                 "pyarrow" to join the fields with Arrow
 
     Returns
     -------
-    df: pandas.DataFrame
+    lines: list[str]
     """
-    # Add new columns derived from patientStatus JSON strings.
-    temp_ser: pandas.Series = df["patientStatus"].apply(lambda s: s.replace("'", '"'))
-    df["patientStatusParsed"] = temp_ser.apply(json.loads)
-    df["patientStatusWord"] = df["patientStatusParsed"].apply(
-        lambda x: x[0]["status"] if x else None
-    )
-    df["patientStatusOrganization"] = df["patientStatusParsed"].apply(
-        lambda x: x[0]["organization"] if x else None
-    )
+    if engine == "pyarrow":
+        return arrow_lines(df)
 
-    # Empty columns for now.
-    df["patientStatusYes"] = None
-    df["patientStatusNo"] = None
-    df["patientStatusNoAccess"] = None
-    df["patientStatusUnknown"] = None
+    text: str = df.to_csv(index=False, header=False, lineterminator=os.linesep)
+    lines: list[str] = text.split(os.linesep)[:-1]
 
-    # Insert the patientStatusOrganization where patientStatusWord is YES/NO/NO ACCESS/UNKNOWN.
-    mask: bool = df["patientStatusWord"].values == "YES"
-    df.loc[mask, "patientStatusYes"] = df.loc[mask, "patientStatusOrganization"]
-    mask = df["patientStatusWord"].values == "NO"
-    df.loc[mask, "patientStatusNo"] = df.loc[mask, "patientStatusOrganization"]
-    mask = df["patientStatusWord"].values == "NO ACCESS"
-    df.loc[mask, "patientStatusNoAccess"] = df.loc[mask, "patientStatusOrganization"]
-    mask = df["patientStatusWord"].values == "UNKNOWN"
-    df.loc[mask, "patientStatusUnknown"] = df.loc[mask, "patientStatusOrganization"]
+    if len(lines) == len(df):
+        return lines
 
-    return df
+    # Some field has a line ending in it, so the lines can't just be split apart.
+    buffer: io.StringIO = io.StringIO()
+    writer: csv.writer = csv.writer(buffer, lineterminator=os.linesep)
+    return [
+        csv_line(writer, buffer, ["" if pandas.isna(value) else value for value in row])
+        for row in df.itertuples(index=False, name=None)
+    ]
 
 
-# pylint: disable=too-few-public-methods
-class HealthProConverter:
+def normalize_date_column(raw_date: pandas.Series, cache: dict) -> pandas.Series:
     """
-    Allows us to convert new InSite API format to the HealthPro format we're used to.
+    Converts dates to DATE_FORMAT, each distinct value only once;
+    values already in DATE_FORMAT just need checking, not reformatting.
+    Values in other formats get normalize_date_value, one at a time, which reads
+    ISO 8601 dates as pandas does, but no more of pandas' guesses.
+
+    Parameters
+    ----------
+    raw_date: pandas.Series         One column
+    cache: dict                     Raw value -> converted value; shared between columns
+
+    Returns
+    -------
+    date_converted: pandas.Series
     """
+    codes, uniques = pandas.factorize(raw_date)
+    new_values: list[str] = [value for value in uniques if value not in cache]
 
-    def __init__(
-        self, log: logging.Logger, data_directory: str, status_fn: Callable = None
-    ) -> None:
-        """Instantiate a HealthProConverter object
-
-        Parameters
-        ----------
-        log: logging.Logger         log object
-        data_directory: str         Where to store the data file
-        status_fn: Callable         Method from calling object to report status.
-        """
-        self.__log: logging.Logger = log
-        self.__directory: str = data_directory
-        self.__status_fn: Callable = status_fn
-
-    def convert(self) -> None:
-        """Convert all .csv files in given directory that aren't already marked as "transformed"."""
-        directory_plus_ext: str = os.path.join(self.__directory, "*.csv")
-
-        for filename_and_ext in glob.glob(directory_plus_ext):
-            if (
-                os.path.isfile(filename_and_ext)
-                and "transformed" not in filename_and_ext
-            ):
-                just_the_filename, ext = os.path.splitext(filename_and_ext)
-                output_file: str = os.path.join(
-                    self.__directory, just_the_filename + "_transformed" + ext
-                )
+    if new_values:
+        values: pandas.Series = pandas.Series(new_values, dtype=object)
+        converted: pandas.Series = pandas.Series(
+            np.nan, index=values.index, dtype=object
+        )
+
+        # Fast path: the API's own timestamps. A valid one is already in the right format.
+        parsed: pandas.Series = pandas.to_datetime(
+            values, format=DATE_FORMAT, errors="coerce"
+        )
+        conforming: pandas.Series = parsed.notna() & (values.str.len() == 19)
+        converted[conforming] = values[conforming]
+        unpadded: pandas.Series = parsed.notna() & ~conforming
+        converted[unpadded] = parsed[unpadded].dt.strftime(DATE_FORMAT)
+
+        # Anything else is looked at one value at a time, as the stream converter does,
+        # so one odd date can't change how pandas reads the others.
+        others: pandas.Series = parsed.isna() & (values != "")
+
+        if others.any():
+            converted[others] = [
+                np.nan if date is None else date
+                for date in map(normalize_date_value, values[others])
+            ]
+
+        cache.update(zip(new_values, converted))
+
+    # codes are -1 for missing values, which picks the NaN on the end.
+    lookup: np.ndarray = np.array(
+        [cache[value] for value in uniques] + [np.nan], dtype=object
+    )
+    return pandas.Series(lookup[codes], index=raw_date.index)
 
-                input_file: str = os.path.join(self.__directory, filename_and_ext)
-                self.__convert_file(input_file, output_file)
 
-    def __convert_file(self, source_filename: str, target_filename: str) -> None:
-        """Reads a CSV, applies field conversions, and writes it out as new file."""
-        if self.__status_fn is not None:
-            self.__status_fn(f"Converting '{source_filename}' to '{target_filename}'.")
+def read_header(source_filename: str) -> list[str]:
+    """
+    A CSV's column names, as read_participant_list would give them.
 
-        self.__log.info("Converting '%s' to '%s'.", source_filename, target_filename)
+    Parameters
+    ----------
+    source_filename: str
 
-        # Read CSV, forcing all data as string.
-        participant_match: pandas.DataFrame = pandas.read_csv(
-            source_filename,
-            converters=StringConverter(),
-            delimiter=",",
-        )
-        #
-        #   SPECIAL HANDLING OF PATIENT STATUS
-        #
-        participant_match = convert_patient_status(participant_match)
-        #
-        #   CONVERT COLUMNS
-        #
-        # Consent status.
-        consent_map: dict = {
-            "yes": "1",
-            "no": "0",
-        }
-        participant_match["consentForElectronicHealthRecords"] = participant_match[
-            "consentForElectronicHealthRecords"
-        ].map(consent_map)
-        participant_match["consentForStudyEnrollment"] = participant_match[
-            "consentForStudyEnrollment"
-        ].map(consent_map)
-        #
-        #   FORMAT DATE COLUMNS
-        #
-        participant_match[
-            "clinicPhysicalMeasurementsFinalizedTimeFormatted"
-        ] = convert_date(participant_match["clinicPhysicalMeasurementsFinalizedTime"])
-        participant_match[
-            "consentForElectronicHealthRecordsAuthoredFormatted"
-        ] = convert_date(participant_match["consentForElectronicHealthRecordsAuthored"])
-        participant_match["consentForStudyEnrollmentAuthoredFormatted"] = convert_date(
-            participant_match["consentForStudyEnrollmentAuthored"]
-        )
-        participant_match["deactivationTimeFormatted"] = convert_date(
-            participant_match["deactivationTime"]
-        )
-        participant_match["deceasedAuthoredFormatted"] = convert_date(
-            participant_match["deceasedAuthored"]
-        )
-        participant_match["latestEhrReceiptTimeFormatted"] = convert_date(
-            participant_match["latestEhrReceiptTime"]
+    Returns
+    -------
+    names: list[str]
+    """
+    with open_text(source_filename, encoding="utf-8-sig") as file:
+        return unique_column_names(next(csv.reader(file), []))
+
+
+def read_participant_list(
+    source_filename: str,
+    chunk_size: int = 0,
+    engine: str = "pandas",
+    columns: list[str] = None,
+) -> Iterator[pandas.DataFrame]:
+    """
+    Reads an InSite-format CSV, compressed or not, with every field as a string
+    (empty fields as ""), CATEGORY_COLUMNS as categoricals of strings.
+
+    Parameters
+    ----------
+    source_filename: str
+    chunk_size: int             Rows at a time (roughly, with pyarrow); 0 for the whole file.
+    engine: str                 "pandas" or "pyarrow"
+    columns: list[str]          Optional; read only these (if they're there), not every column
+
+    Returns
+    -------
+    Iterator over DataFrames; with a chunk size, only one is in memory at a time.
+    """
+    if engine == "pyarrow":
+        yield from read_with_arrow(source_filename, chunk_size, columns)
+        return
+
+    wanted: set = set(columns or [])
+
+    with ExitStack() as stack:
+        # pandas can only read zstd with zstandard installed; open_binary manages without.
+        source = (
+            source_filename
+            if compression_of(source_filename) == "none"
+            else stack.enter_context(open_binary(source_filename))
         )
-        participant_match["withdrawalTimeFormatted"] = convert_date(
-            participant_match["withdrawalTime"]
+        reader = pandas.read_csv(
+            source,
+            dtype=defaultdict(
+                lambda: str, {column: "category" for column in CATEGORY_COLUMNS}
+            ),
+            na_filter=False,
+            delimiter=",",
+            chunksize=chunk_size or None,
+            usecols=(lambda name: name in wanted) if columns else None,
         )
 
-        # Deactivation status.
-        deactivation_map: dict = {
-            "deactivated": "NO_CONTACT",
-            "not_deactivated": "NOT_SUSPENDED",
-            "unset": "UNSET",
-        }
-        participant_match["deactivationStatus"] = participant_match[
-            "deactivationStatus"
-        ].map(deactivation_map)
-
-        # Deceased status.
-        deceased_map: dict = {
-            "deceased": "APPROVED",
-            "unset": "UNSET",
-        }
-        participant_match["deceasedStatus"] = participant_match["deceasedStatus"].map(
-            deceased_map
-        )
+        if chunk_size:
+            yield from reader
+        else:
+            yield reader
+
+
+def read_with_arrow(
+    source_filename: str, chunk_size: int = 0, columns: list[str] = None
+) -> Iterator[pandas.DataFrame]:
+    """
+    Reads a CSV with Arrow's multi-threaded parser into Arrow-backed string columns.
 
-        # Physical measurements.
-        participant_match["clinicPhysicalMeasurementsStatus"] = participant_match[
-            "clinicPhysicalMeasurementsStatus"
-        ].str.upper()
-
-        # State
-        participant_match.replace("", {"state": np.nan}, inplace=True)
-        participant_match.fillna({"state": "UNSET"}, inplace=True)
-
-        # Withdrawn status.
-        withdrawal_map: dict = {
-            "not_withdrawn": "0",
-            "withdrawn": "1",
-        }
-        participant_match["withdrawalStatus"] = participant_match[
-            "withdrawalStatus"
-        ].map(withdrawal_map)
-
-        # Add dummy columns.
-        participant_match["withdrawalReason"] = "UNSET"
-
-        # Create a new DataFrame and assign columns with new names.
-        hp = pandas.DataFrame(
-            {
-                "Last Name": participant_match["lastName"],
-                "First Name": participant_match["firstName"],
-                "Middle Initial": participant_match["middleName"],
-                "Date of Birth": participant_match["dateOfBirth"],
-                "PMI ID": participant_match["participantId"],
-                "Withdrawal Status": participant_match["withdrawalStatus"],
-                "Withdrawal Date": participant_match["withdrawalTimeFormatted"],
-                "Withdrawal Reason": participant_match["withdrawalReason"],
-                "Deactivation Status": participant_match["deactivationStatus"],
-                "Deactivation Date": participant_match["deactivationTimeFormatted"],
-                "Deceased": participant_match["deceasedStatus"],
-                "Date of Death": participant_match["deceasedAuthoredFormatted"],
-                "Street Address": participant_match["streetAddress"],
-                "Street Address2": participant_match["streetAddress2"],
-                "City": participant_match["city"],
-                "State": participant_match["state"],
-                "Zip": participant_match["zipCode"],
-                "Login Phone": participant_match["phoneNumber"],
-                "Phone": participant_match["phoneNumber"],
-                "Email": participant_match["email"],
-                "Paired Organization": participant_match["organization"],
-                "Physical Measurements Status": participant_match[
-                    "clinicPhysicalMeasurementsStatus"
-                ],
-                "Physical Measurements Completion Date": participant_match[
-                    "clinicPhysicalMeasurementsFinalizedTimeFormatted"
-                ],
-                "Paired Site": participant_match[
-                    "clinicPhysicalMeasurementsFinalizedSite"
-                ],
-                "EHR Consent Status": participant_match[
-                    "consentForElectronicHealthRecords"
-                ],
-                "EHR Consent Date": participant_match[
-                    "consentForElectronicHealthRecordsAuthoredFormatted"
-                ],
-                "Most Recent EHR Receipt": participant_match[
-                    "latestEhrReceiptTimeFormatted"
-                ],
-                "Patient Status: Yes": participant_match["patientStatusYes"],
-                "Patient Status: No": participant_match["patientStatusNo"],
-                "Patient Status: No Access": participant_match["patientStatusNoAccess"],
-                "Patient Status: Unknown": participant_match["patientStatusUnknown"],
-                "Primary Consent Status": participant_match[
-                    "consentForStudyEnrollment"
-                ],
-                "Date of First Primary Consent": participant_match[
-                    "consentForStudyEnrollmentAuthoredFormatted"
-                ],
-                "Primary Consent Date": participant_match[
-                    "consentForStudyEnrollmentAuthoredFormatted"
-                ],
-            },
-            columns=[
-                "Last Name",
-                "First Name",
-                "Middle Initial",
-                "Date of Birth",
-                "PMI ID",
-                "Participant Status",
-                "Core Participant Date",
-                "Withdrawal Status",
-                "Withdrawal Date",
-                "Withdrawal Reason",
-                "Deactivation Status",
-                "Deactivation Date",
-                "Deceased",
-                "Date of Death",
-                "Date of Death Approval",
-                "Participant Origination",
-                "Consent Cohort",
-                "Date of First Primary Consent",
-                "Primary Consent Status",
-                "Primary Consent Date",
-                "Program Update",
-                "Date of Program Update",
-                "EHR Consent Status",
-                "EHR Consent Date",
-                "gRoR Consent Status",
-                "gRoR Consent Date",
-                "Language of Primary Consent",
-                "CABoR Consent Status",
-                "CABoR Consent Date",
-                "Retention Eligible",
-                "Date of Retention Eligibility",
-                "Retention Status",
-                "EHR Data Transfer",
-                "Most Recent EHR Receipt",
-                "Patient Status: Yes",
-                "Patient Status: No",
-                "Patient Status: No Access",
-                "Patient Status: Unknown",
-                "Street Address",
-                "Street Address2",
-                "City",
-                "State",
-                "Zip",
-                "Email",
-                "Login Phone",
-                "Phone",
-                "Required PPI Surveys Complete",
-                "Completed Surveys",
-                "Paired Site",
-                "Paired Organization",
-                "Physical Measurements Status",
-                "Physical Measurements Completion Date",
-                "Samples to Isolate DNA",
-                "Baseline Samples",
-                "Sex",
-                "Gender Identity",
-                "Race/Ethnicity",
-                "Education",
-                "Core Participant Minus PM Date",
-                "Enrollment Site",
-            ],
+    Parameters
+    ----------
+    source_filename: str
+    chunk_size: int             Rows at a time, rounded up to whole blocks; 0 for the whole file.
+    columns: list[str]          Optional; read only these (if they're there), not every column
+
+    Returns
+    -------
+    Iterator over DataFrames
+    """
+    # pylint: disable=import-outside-toplevel
+    import pyarrow
+    import pyarrow.csv
+
+    # Same column names as pandas would give them, & all strings.
+    column_names: list[str] = read_header(source_filename)
+    read_options = pyarrow.csv.ReadOptions(column_names=column_names, skip_rows=1)
+    parse_options = pyarrow.csv.ParseOptions(newlines_in_values=True)
+    convert_options = pyarrow.csv.ConvertOptions(
+        column_types={
+            name: (
+                pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+                if name in CATEGORY_COLUMNS
+                else pyarrow.string()
+            )
+            for name in column_names
+        },
+        include_columns=(
+            [name for name in column_names if name in columns] if columns else None
+        ),
+        strings_can_be_null=False,
+        quoted_strings_can_be_null=False,
+    )
+    string_dtype = pandas.StringDtype("pyarrow")
+
+    def to_pandas(table) -> pandas.DataFrame:
+        return table.to_pandas(types_mapper={pyarrow.string(): string_dtype}.get)
+
+    if not chunk_size:
+        yield to_pandas(
+            pyarrow.csv.read_csv(
+                source_filename,
+                read_options=read_options,
+                parse_options=parse_options,
+                convert_options=convert_options,
+            )
         )
+        return
+
+    batches: list = []
+    rows: int = 0
+    start: int = 0
+
+    with pyarrow.csv.open_csv(
+        source_filename,
+        read_options=read_options,
+        parse_options=parse_options,
+        convert_options=convert_options,
+    ) as reader:
+        for batch in reader:
+            batches.append(batch)
+            rows += batch.num_rows
+
+            if rows >= chunk_size:
+                df: pandas.DataFrame = to_pandas(
+                    pyarrow.Table.from_batches(batches, schema=reader.schema)
+                )
+                # Number the rows through the file, like pandas' chunks.
+                df.index = pandas.RangeIndex(start, start + rows)
+                yield df
+                start += rows
+                batches, rows = [], 0
 
-        # Write the modified DataFrame back to a new CSV file, overwriting if necessary.
-        if self.__status_fn is not None:
-            self.__status_fn(f"Writing file {target_filename}.")
+        if batches or start == 0:
+            df = to_pandas(pyarrow.Table.from_batches(batches, schema=reader.schema))
+            df.index = pandas.RangeIndex(start, start + rows)
+            yield df
 
-        hp.to_csv(target_filename, index=False, header=True, mode="w")
+
+def to_healthpro(
+    participant_match: pandas.DataFrame, log: logging.Logger, timings: dict = None
+) -> pandas.DataFrame:
+    """
+    Applies the field conversions: runs HEALTHPRO_PLAN.
+
+    Parameters
+    ----------
+    participant_match: pandas.DataFrame     InSite data, all strings
+    log: logging.Logger
+    timings: dict                           Optional; plan step -> seconds, added to
+
+    Returns
+    -------
+    hp: pandas.DataFrame                    HealthPro data
+    """
+    return HEALTHPRO_PLAN.run(participant_match, log, timings)
+
+
+def write_with_arrow(df: pandas.DataFrame, file: TextIO, header: bool = True) -> None:
+    """
+    Writes a DataFrame of strings as CSV, byte for byte as DataFrame.to_csv(index=False) would,
+    a chunk at a time (see arrow_lines).
+
+    Parameters
+    ----------
+    df: pandas.DataFrame        Strings & missing values only
+    file: TextIO                Opened with newline=""
+    header: bool                Write the column names first?
+    """
+    if header:
+        csv.writer(file, lineterminator=os.linesep).writerow(df.columns)
+
+    lines: list[str] = arrow_lines(df)
+
+    if lines:
+        file.write(os.linesep.join(lines) + os.linesep)
+
+
+def write_csv_chunk(
+    hp: pandas.DataFrame, file: TextIO, engine: str, header: bool, collect: Callable
+) -> None:
+    """
+    Writes some converted rows to the CSV, handing them to collect as well if it's given.
+
+    Parameters
+    ----------
+    hp: pandas.DataFrame        HealthPro data
+    file: TextIO                Opened with newline=""
+    engine: str                 "pyarrow" to join the fields with Arrow
+    header: bool                Write the column names first?
+    collect: Callable           Optional; given a list of (PMI ID, CSV line)
+    """
+    if collect is None:
+        if engine == "pyarrow":
+            write_with_arrow(hp, file, header=header)
+        else:
+            hp.to_csv(file, index=False, header=header)
+
+        return
+
+    if header:
+        csv.writer(file, lineterminator=os.linesep).writerow(hp.columns)
+
+    lines: list[str] = csv_lines(hp, engine)
+
+    if lines:
+        file.write(os.linesep.join(lines) + os.linesep)
+
+    collect(
+        [
+            (key if isinstance(key, str) else "", line)
+            for key, line in zip(hp[KEY_COLUMN], lines)
+        ]
+    )
+
+
+# Compiled once, when the module's imported.
+HEALTHPRO_PLAN: ConversionPlan = compile_plan(HEALTHPRO_MAPPING, HEALTHPRO_COLUMNS)
 
 
 if __name__ == "__main__":
+    # pylint: disable=cyclic-import
+    from src.getmyapidata.healthpro_converter import HealthProConverter
+
     my_log: logging.Logger = setup_logging(
         log_filename=os.path.join(os.getcwd(), "convert_to_hp_format.log")
     )
@@ -1,23 +1,49 @@
 import logging
-from collections.abc import Callable
-from typing import Any, Optional, Union
+from collections.abc import Callable, Iterator
+from typing import TextIO, Union
 
 import pandas
 
-class StringConverter(dict):
-    def __contains__(self, item: Any): ...
-    def __getitem__(self, item: Any): ...
-    def get(self, default: Optional[Any] = ...): ...
+from src.getmyapidata.conversion_plan import ConversionPlan
+from src.getmyapidata.healthpro_converter import converter_for, resolve_engine
+from src.getmyapidata.healthpro_mapping import (DATE_FORMAT, HEALTHPRO_COLUMNS,
+                                                HEALTHPRO_MAPPING, KEY_COLUMN)
+from src.getmyapidata.output_options import OutputOptions
+from src.getmyapidata.stream_converter import unique_column_names
 
-def convert_date(raw_date: pandas.Series) -> pandas.Series: ...
-def convert_patient_status(df: pandas.DataFrame) -> pandas.DataFrame: ...
+CATEGORY_COLUMNS: tuple
+HEALTHPRO_PLAN: ConversionPlan
 
-class HealthProConverter:
-    def __init__(
-        self, log: logging.Logger, data_directory: str, status_fn: Union[Callable, None]
-    ) -> None:
-        self.__log: logging.Logger = None
-        self.__directory: str = None
-        self.__status_fn: Callable = None
-    def convert(self) -> None: ...
-    def __convert_file(self, source_filename: str, target_filename: str) -> None: ...
+def arrow_lines(df: pandas.DataFrame) -> list[str]: ...
+def convert_file(
+    source_filename: str,
+    target_filename: str,
+    log: logging.Logger,
+    chunk_size: int = 0,
+    status_fn: Union[Callable, None] = None,
+    engine: str = "auto",
+    collect: Union[Callable, None] = None,
+    output: Union[OutputOptions, None] = None,
+    sizes: Union[dict, None] = None,
+) -> int: ...
+def csv_lines(df: pandas.DataFrame, engine: str = "pandas") -> list[str]: ...
+def normalize_date_column(raw_date: pandas.Series, cache: dict) -> pandas.Series: ...
+def read_header(source_filename: str) -> list[str]: ...
+def read_participant_list(
+    source_filename: str,
+    chunk_size: int = 0,
+    engine: str = "pandas",
+    columns: list[str] = None,
+) -> Iterator[pandas.DataFrame]: ...
+def read_with_arrow(
+    source_filename: str, chunk_size: int = 0, columns: list[str] = None
+) -> Iterator[pandas.DataFrame]: ...
+def to_healthpro(
+    participant_match: pandas.DataFrame, log: logging.Logger, timings: dict = None
+) -> pandas.DataFrame: ...
+def write_csv_chunk(
+    hp: pandas.DataFrame, file: TextIO, engine: str, header: bool, collect: Callable
+) -> None: ...
+def write_with_arrow(
+    df: pandas.DataFrame, file: TextIO, header: bool = True
+) -> None: ...
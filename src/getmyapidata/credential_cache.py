@@ -0,0 +1,172 @@
+"""
+Contains class CredentialCache, which remembers the last access token so we needn't re-authenticate.
+"""
+import json
+import logging
+import os
+import time
+from typing import Union
+
+from src.getmyapidata.common import atomic_write
+
+# Kept next to the key file.
+CACHE_FILENAME: str = "token_cache.json"
+
+# Stop using a token a few minutes before it expires.
+EXPIRY_MARGIN_SECONDS: int = 300
+
+
+def key_file_fingerprint(key_file: str) -> Union[dict, None]:
+    """
+    Cheap identity of the key file, so we notice if it's been replaced.
+
+    Parameters
+    ----------
+    key_file: str
+
+    Returns
+    -------
+    fingerprint: dict or None if there's no key file
+    """
+    try:
+        stats: os.stat_result = os.stat(key_file)
+    except OSError:
+        return None
+
+    return {"mtime": stats.st_mtime, "size": stats.st_size}
+
+
+class CredentialCache:
+    """
+    Remembers an access token, when it expires & which key file & account it came from.
+
+    Attributes
+    ----------
+    cache_file: str
+
+    Methods
+    -------
+    clear() -> None
+    get() -> Union[str, None]
+    put(token: str, expires_at: Union[float, None]) -> None
+    """
+
+    def __init__(
+        self,
+        key_file: str,
+        account: str,
+        log: logging.Logger,
+        margin: int = EXPIRY_MARGIN_SECONDS,
+    ) -> None:
+        """
+        Instantiate a CredentialCache object.
+
+        Parameters
+        ----------
+        key_file: str           Service account key file the token depends on
+        account: str            Service account the token belongs to
+        log: logging.Logger
+        margin: int             Treat tokens as expired this many seconds early
+        """
+        self.__key_file: str = key_file
+        self.__account: str = account
+        self.__log: logging.Logger = log
+        self.__margin: int = margin
+        self.cache_file: str = os.path.join(
+            os.path.dirname(os.path.abspath(key_file)), CACHE_FILENAME
+        )
+
+    def clear(self) -> None:
+        """
+        Forgets the cached token, e.g. after the API rejects it.
+        """
+        if os.path.exists(self.cache_file):
+            os.remove(self.cache_file)
+
+    def get(self) -> Union[str, None]:
+        """
+        Returns the cached token if it's still good.
+
+        Returns
+        -------
+        token: str or None if there's no usable token
+        """
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as file:
+                cached: dict = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        reason: str = self.__rejection(cached)
+
+        if reason:
+            self.__log.info("Not using cached token: %s.", reason)
+            return None
+
+        return cached["token"]
+
+    def put(self, token: str, expires_at: Union[float, None]) -> None:
+        """
+        Remembers a freshly-issued token.
+
+        Parameters
+        ----------
+        token: str
+        expires_at: float       When the token expires, in seconds since the epoch.
+                                gcloud hands out its own cached tokens, so this needn't
+                                be an hour away; None if we don't know, & then we don't cache.
+        """
+        if expires_at is None:
+            self.__log.info("Not caching token: its expiry is unknown.")
+            self.clear()
+            return
+
+        cached: dict = {
+            "account": self.__account,
+            "expires_at": expires_at,
+            "key_file": os.path.abspath(self.__key_file),
+            "key_fingerprint": key_file_fingerprint(self.__key_file),
+            "token": token,
+        }
+
+        try:
+            # It's a bearer token: keep it to ourselves from the moment the file exists.
+            with atomic_write(
+                self.cache_file,
+                "w",
+                encoding="utf-8",
+                opener=lambda path, flags: os.open(path, flags, 0o600),
+            ) as file:
+                json.dump(cached, file)
+        except OSError as e:
+            # Not fatal: we'll just authenticate again next time.
+            self.__log.warning("Unable to cache token in '%s': %s", self.cache_file, e)
+
+    def __rejection(self, cached: dict) -> str:
+        """
+        Why a cached token can't be used, if it can't.
+
+        Parameters
+        ----------
+        cached: dict                The cache file's contents
+
+        Returns
+        -------
+        reason: str                 "" if the token's still good
+        """
+        if not isinstance(cached, dict) or not cached.get("token"):
+            return "no token"
+
+        if cached.get("account") != self.__account:
+            return "different service account"
+
+        if cached.get("key_file") != os.path.abspath(self.__key_file):
+            return "different key file"
+
+        if cached.get("key_fingerprint") != key_file_fingerprint(self.__key_file):
+            return "key file changed or missing"
+
+        if float(cached.get("expires_at", 0)) - self.__margin <= time.time():
+            return "token expired"
+
+        return ""
@@ -0,0 +1,25 @@
+import logging
+from typing import Union
+
+CACHE_FILENAME: str
+EXPIRY_MARGIN_SECONDS: int
+
+def key_file_fingerprint(key_file: str) -> Union[dict, None]: ...
+
+class CredentialCache:
+    cache_file: str
+    def __init__(
+        self,
+        key_file: str,
+        account: str,
+        log: logging.Logger,
+        margin: int = ...,
+    ) -> None:
+        self.__key_file: str = None
+        self.__account: str = None
+        self.__log: logging.Logger = None
+        self.__margin: int = None
+    def clear(self) -> None: ...
+    def get(self) -> Union[str, None]: ...
+    def put(self, token: str, expires_at: Union[float, None]) -> None: ...
+    def __rejection(self, cached: dict) -> str: ...
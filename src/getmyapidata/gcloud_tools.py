@@ -1,14 +1,30 @@
 """
 Contains class GCLoudTools & associated static methods for GCloud authentication.
 """
+import calendar
+import json
 import logging
-import subprocess
+import os
 import threading
 import time
 from collections.abc import Callable
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Union
 
 from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.command_runner import CommandResult, CommandRunner
+from src.getmyapidata.credential_cache import CredentialCache
+from src.getmyapidata.metrics import RunMetrics
+
+# The interactive login waits for the user's browser, so give it longer than other commands.
+LOGIN_TIMEOUT_SECONDS: float = 300.0
+
+# Long enough for gcloud's first-run setup.
+VERSION_TIMEOUT_SECONDS: float = 60.0
+
+# Where to ask how long a token has left, when gcloud doesn't say.
+TOKEN_INFO_URL: str = "https://oauth2.googleapis.com/tokeninfo"
 
 
 def gcloud_tools_installed() -> bool:
@@ -19,65 +35,150 @@ def gcloud_tools_installed() -> bool:
     -------
     installed: bool         Is gcloud toolkit installed?
     """
-    installed: bool = False
+    result: CommandResult = CommandRunner(
+        log=logging.getLogger(__name__), default_timeout=VERSION_TIMEOUT_SECONDS
+    ).run(["gcloud", "version"])
+    installed: bool = result.returncode == 0
 
-    try:
-        # Execute the command and display output directly to console
-        subprocess.run("gcloud version", shell=True, check=True)
-        installed: bool = True
-    except subprocess.CalledProcessError:
+    if not installed:
         print("Gcloud command-line tools are not installed.")
 
     return installed
 
 
-def getoutput(cmd: str) -> list[str]:
+def look_up_token_expiry(token: str) -> Union[float, None]:
     """
-    Execute a shell command and return the output as a list of strings.
+    Asks Google when an access token expires.
 
     Parameters
     ----------
-    cmd: str
+    token: str
 
     Returns
     -------
-    output: str
+    expires_at: float or None if we couldn't find out; seconds since the epoch
     """
+    # Only needed when gcloud doesn't say, so only imported then.
+    import requests  # pylint: disable=import-outside-toplevel
 
     try:
-        # Execute the command, capture the output
-        output = subprocess.check_output(
-            cmd, shell=True, stderr=subprocess.STDOUT, text=True
+        resp: requests.Response = requests.get(
+            TOKEN_INFO_URL, params={"access_token": token}, timeout=10
         )
-        # Split the output into lines and return as a list
-        return output.strip().split("\n")
-    except subprocess.CalledProcessError as e:
-        # Return error output if command execution fails
-        return e.output.strip().split("\n")
+
+        if resp.status_code != 200:
+            return None
+
+        return time.time() + int(resp.json()["expires_in"])
+    except (requests.exceptions.RequestException, KeyError, TypeError, ValueError):
+        return None
 
 
-def system(cmd: str) -> None:
+def parse_access_token(lines: list[str]) -> tuple:
     """
-    Execute a shell command, displaying the output directly to the console.
+    Reads the output of 'gcloud auth print-access-token --format=json'.
+    gcloud prints its own cached token, which may be close to expiring, so we need its expiry.
 
     Parameters
     ----------
-    cmd: str
+    lines: list[str]
 
     Returns
     -------
-    None
+    (token, expires_at): tuple  token is "" if there isn't one; expires_at (seconds since
+                                the epoch) is None if gcloud didn't say
     """
+    try:
+        output = json.loads("\n".join(lines))
+    except ValueError:
+        # Older versions of gcloud print just the token (or an error).
+        return (lines[0].strip() if lines else ""), None
+
+    if not isinstance(output, dict):
+        return "", None
+
+    token: str = str(output.get("token") or output.get("access_token") or "")
+    return token, parse_expiry(output)
+
+
+def parse_expiry(output: dict) -> Union[float, None]:
+    """
+    When the token in gcloud's JSON output expires.
+
+    Parameters
+    ----------
+    output: dict
+
+    Returns
+    -------
+    expires_at: float or None if gcloud didn't say; seconds since the epoch
+    """
+    expiry = output.get("token_expiry") or output.get("expiry")
+
+    if output.get("expires_in") is not None:
+        try:
+            return time.time() + float(output["expires_in"])
+        except (TypeError, ValueError):
+            return None
+
+    if not isinstance(expiry, str):
+        return None
 
     try:
-        # Execute the command and display output directly to console.
-        subprocess.run(cmd, shell=True, check=True)
-    except subprocess.CalledProcessError as e:
-        # Print error message if command execution fails
-        print(f"Command failed with return code {e.returncode}")
+        moment: datetime = datetime.fromisoformat(expiry.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
 
+    # gcloud gives UTC.
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
 
-# pylint: disable=too-few-public-methods)
+    return moment.timestamp()
+
+
+def wait_until(
+    probe: Callable[[], bool],
+    timeout: float = 60.0,
+    initial_interval: float = 0.25,
+    max_interval: float = 4.0,
+    stop_event: threading.Event = None,
+) -> bool:
+    """
+    Polls until the probe succeeds, doubling the pause between attempts.
+
+    Parameters
+    ----------
+    probe: Callable         Returns True once whatever we're waiting for is ready
+    timeout: float          Give up after this many seconds
+    initial_interval: float First pause, in seconds
+    max_interval: float     Longest pause, in seconds
+    stop_event: threading.Event Optional; stop waiting when it's set
+
+    Returns
+    -------
+    ready: bool             False if we gave up or were stopped
+    """
+    deadline: float = time.monotonic() + timeout
+    interval: float = initial_interval
+
+    while True:
+        if probe():
+            return True
+
+        remaining: float = deadline - time.monotonic()
+
+        if remaining <= 0:
+            return False
+
+        if stop_event is None:
+            time.sleep(min(interval, remaining))
+        elif stop_event.wait(min(interval, remaining)):
+            return False
+
+        interval = min(interval * 2, max_interval)
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
 class GCloudTools(threading.Thread):
     """
     Takes care of gcloud authentication, tokens, etc.
@@ -89,13 +190,19 @@ class GCloudTools(threading.Thread):
     Methods
     -------
     get_token() -> str
+    stop() -> None
     """
 
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
     def __init__(
         self,
         aou_package: AouPackage,
         log: logging.Logger,
         status_fn: Callable = None,
+        readiness_timeout: float = 60.0,
+        reuse_token: bool = True,
+        stop_event: threading.Event = None,
+        metrics: RunMetrics = None,
     ):
         """
         Create instance of GCloudTools class.
@@ -105,6 +212,10 @@ class GCloudTools(threading.Thread):
         aou_package : AouPackage
         log: logging.Logger object
         status_fn : callable        Optional external fn to report status
+        readiness_timeout: float    How long to wait for new credentials to start working
+        reuse_token: bool           Skip authentication while the cached token's still good?
+        stop_event: threading.Event Optional; set to abandon authentication
+        metrics: RunMetrics         Optional; where to record how long each gcloud command took
 
         Return
         ------
@@ -115,11 +226,40 @@ class GCloudTools(threading.Thread):
         self.__aou_package: AouPackage = aou_package
         self.__log: logging.Logger = log
         self.__status_fn: Callable = status_fn
+        self.__readiness_timeout: float = readiness_timeout
+        self.__reuse_token: bool = reuse_token
+        self.__cache: CredentialCache = CredentialCache(
+            key_file=aou_package.token_file,
+            account=aou_package.aou_service_account,
+            log=log,
+        )
+        self.__token: str = ""
+        self.__stop_event: threading.Event = (
+            stop_event if stop_event is not None else threading.Event()
+        )
+        self.__runner: CommandRunner = CommandRunner(
+            log=log, stop_event=self.__stop_event, metrics=metrics
+        )
 
         # Ensure the path to the token file exists.
         file_path: Path = Path(self.__aou_package.token_file)
         file_path.parent.mkdir(parents=True, exist_ok=True)
 
+    def __account_active(self) -> bool:
+        """
+        Readiness probe: is the service account the active gcloud account yet?
+
+        Returns
+        -------
+        bool
+        """
+        accounts: list[str] = self.__gcloud(
+            "auth", "list", "--filter=status:ACTIVE", "--format=value(account)"
+        )
+        return self.__aou_package.aou_service_account in [
+            account.strip() for account in accounts
+        ]
+
     def __activate(self) -> None:
         """
         Activates the service account.
@@ -133,9 +273,20 @@ class GCloudTools(threading.Thread):
         else:
             self.__log.info("Activating the service account...")
 
-        system(
-            f"gcloud -q auth activate-service-account --key-file={self.__aou_package.token_file}"
+        results_list: list[str] = self.__gcloud(
+            "auth",
+            "activate-service-account",
+            f"--key-file={self.__aou_package.token_file}",
         )
+        self.__log.info(" ".join(results_list))
+
+    def __activate_and_wait(self) -> None:
+        """
+        Activates the service account & waits until we can get a token with it.
+        """
+        self.__activate()
+        self.__wait_for("service account activation", self.__account_active)
+        self.__wait_for("access token", self.__token_ready)
 
     def __auth(self) -> None:
         """
@@ -151,11 +302,14 @@ class GCloudTools(threading.Thread):
         else:
             self.__log.info("Authorizing via GCloud...")
 
-        cmd: str = (
-            f"gcloud -q auth application-default login "
-            f"--impersonate-service-account {self.__aou_package.aou_service_account}"
+        results_list: list[str] = self.__gcloud(
+            "auth",
+            "application-default",
+            "login",
+            "--impersonate-service-account",
+            self.__aou_package.aou_service_account,
+            timeout=LOGIN_TIMEOUT_SECONDS,
         )
-        results_list: list[str] = getoutput(cmd)
 
         if not results_list or len(results_list) < 6:
             if self.__status_fn is not None:
@@ -172,6 +326,68 @@ class GCloudTools(threading.Thread):
             self.__log.exception("Unable to login: %s", results[0])
             raise RuntimeError(f"Unable to login: {results[0]}")
 
+    def __authenticate(self) -> None:
+        """
+        Activates the service account, first logging in & creating a new key file
+        unless the existing one's young enough to reuse.
+        """
+        age: Union[float, None] = self.__key_age_days()
+        max_age: int = self.__aou_package.key_max_age_days
+
+        if age is not None and age < max_age:
+            self.__report_status(f"Reusing key file created {age:.0f} days ago.")
+
+            try:
+                self.__activate_and_wait()
+                return
+            except RuntimeError:
+                # Perhaps the key's been deleted or disabled.
+                self.__report_status(
+                    "Existing key file didn't work; creating a new one."
+                )
+        elif age is None:
+            self.__report_status("No usable key file; creating one.")
+        else:
+            self.__report_status(
+                f"Key file is {age:.0f} days old (limit {max_age}); rotating it."
+            )
+
+        # Move on as soon as each step's results are usable.
+        self.__auth()
+        self.__create_key_file()
+        self.__wait_for("key file", self.__key_file_ready)
+
+        if self.__aou_package.delete_old_keys:
+            self.__delete_old_keys()
+
+        self.__activate_and_wait()
+
+    def __checked_lines(self, result: CommandResult) -> list[str]:
+        """
+        A gcloud command's output, unless it was cancelled or timed out.
+
+        Parameters
+        ----------
+        result: CommandResult
+
+        Returns
+        -------
+        results_list: list[str] Output, one line per element
+        """
+        if result.cancelled:
+            raise RuntimeError("Cancelled.")
+
+        if result.timed_out:
+            # argv is "gcloud -q ...".
+            message: str = (
+                f"gcloud {' '.join(result.argv[2:4])} timed out after "
+                f"{result.duration:.0f} s."
+            )
+            self.__report_error(message)
+            raise RuntimeError(message)
+
+        return result.lines
+
     def __create_key_file(self) -> None:
         """
         Uses GCloud to create key file.
@@ -186,14 +402,14 @@ class GCloudTools(threading.Thread):
         else:
             self.__log.info("Creating key file...")
 
-        command: str = (
-            f"gcloud -q iam service-accounts keys create "
-            f"--account {self.__aou_package.pmi_account} "
-            f"--project {self.__aou_package.project} "
-            f"--iam-account {self.__aou_package.aou_service_account} "
-            f"{self.__aou_package.token_file}"
+        results_list: list[str] = self.__gcloud(
+            "iam",
+            "service-accounts",
+            "keys",
+            "create",
+            *self.__key_scope(),
+            self.__aou_package.token_file,
         )
-        results_list: list[str] = getoutput(command)
         results: str = results_list[0]
 
         if not results.startswith("created key"):
@@ -203,6 +419,160 @@ class GCloudTools(threading.Thread):
             self.__log.exception("Unable to create key file: %s", results)
             raise RuntimeError(f"Unable to create key file: {results}")
 
+    def __delete_old_keys(self) -> None:
+        """
+        Deletes the service account's user-managed keys that are older than the
+        maximum key age, other than the one we're using.
+        """
+        current_key: str = (self.__read_key_file() or {}).get("private_key_id", "")
+        listing: list[str] = self.__gcloud(
+            "iam",
+            "service-accounts",
+            "keys",
+            "list",
+            *self.__key_scope(),
+            "--managed-by=user",
+            "--format=value(name.basename(),validAfterTime)",
+        )
+        cutoff: float = time.time() - self.__aou_package.key_max_age_days * 86400
+        old_keys: list[str] = []
+
+        for line in listing:
+            fields: list[str] = line.split()
+
+            if len(fields) != 2 or fields[0] == current_key:
+                continue
+
+            try:
+                created: float = calendar.timegm(
+                    time.strptime(fields[1][:19], "%Y-%m-%dT%H:%M:%S")
+                )
+            except ValueError:
+                continue
+
+            if created < cutoff:
+                self.__report_status(f"Deleting old key {fields[0]}.")
+                old_keys.append(fields[0])
+
+        # Each deletion stands alone, so they needn't wait for one another.
+        results: dict = self.__runner.run_concurrently(
+            {
+                key_id: [
+                    "gcloud",
+                    "-q",
+                    "iam",
+                    "service-accounts",
+                    "keys",
+                    "delete",
+                    key_id,
+                    *self.__key_scope(),
+                ]
+                for key_id in old_keys
+            }
+        )
+
+        for result in results.values():
+            self.__checked_lines(result)
+
+    def __gcloud(self, *args: str, timeout: float = None) -> list[str]:
+        """
+        Runs a gcloud command without prompting.
+
+        Parameters
+        ----------
+        args: str               Everything after "gcloud -q"
+        timeout: float          Optional; defaults to the runner's
+
+        Returns
+        -------
+        results_list: list[str] Output, one line per element
+        """
+        return self.__checked_lines(self.__runner.run(["gcloud", "-q", *args], timeout))
+
+    def __key_age_days(self) -> Union[float, None]:
+        """
+        How old is the existing key file?
+
+        Returns
+        -------
+        age: float or None if there's no usable key file for this service account
+        """
+        key: Union[dict, None] = self.__read_key_file()
+
+        if (
+            key is None
+            or key.get("client_email") != self.__aou_package.aou_service_account
+        ):
+            return None
+
+        return (time.time() - os.path.getmtime(self.__aou_package.token_file)) / 86400
+
+    def __keep_token(self, token: str, expires_at: Union[float, None]) -> None:
+        """
+        Remembers a token & caches it on disk until it expires.
+
+        Parameters
+        ----------
+        token: str
+        expires_at: float           Seconds since the epoch, or None if gcloud didn't say
+        """
+        if expires_at is None:
+            expires_at = look_up_token_expiry(token)
+
+        self.__cache.put(token, expires_at)
+        self.__token = token
+
+    def __key_file_ready(self) -> bool:
+        """
+        Readiness probe: has the key file been written completely?
+
+        Returns
+        -------
+        bool
+        """
+        return self.__read_key_file() is not None
+
+    def __key_scope(self) -> list[str]:
+        """
+        Arguments telling gcloud whose keys we mean.
+
+        Returns
+        -------
+        arguments: list[str]
+        """
+        return [
+            "--account",
+            self.__aou_package.pmi_account,
+            "--project",
+            self.__aou_package.project,
+            "--iam-account",
+            self.__aou_package.aou_service_account,
+        ]
+
+    def __read_key_file(self) -> Union[dict, None]:
+        """
+        Reads the key file, if it's complete.
+
+        Returns
+        -------
+        key: dict or None if the key file is missing or incomplete
+        """
+        try:
+            with open(self.__aou_package.token_file, "r", encoding="utf-8") as file:
+                key: dict = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if (
+            isinstance(key, dict)
+            and key.get("type") == "service_account"
+            and key.get("private_key")
+            and key.get("client_email")
+        ):
+            return key
+
+        return None
+
     def get_token(self) -> str:
         """
         Retrieves just the token from the token file.
@@ -211,23 +581,27 @@ class GCloudTools(threading.Thread):
         -------
         token: str
         """
+        if self.__token:
+            return self.__token
+
         if self.__status_fn is not None:
             self.__status_fn("Reading key file...")
         else:
             self.__log.info("Reading key file...")
 
-        token: list[str] = getoutput("gcloud -q auth print-access-token")
-
-        if token:
-            token_payload: str = token[0]
+        token_payload, expires_at = parse_access_token(
+            self.__gcloud("auth", "print-access-token", "--format=json")
+        )
 
-            if not token_payload.startswith("ya"):
-                self.__report_error(f"Authentication Token Error: {token_payload}")
-                raise RuntimeError(f"Authentication Token Error: {token_payload}")
-        else:
+        if not token_payload:
             self.__report_error("Unable to retrieve token from the key file")
             raise RuntimeError("Unable to retrieve token from the key file")
 
+        if not token_payload.startswith("ya"):
+            self.__report_error(f"Authentication Token Error: {token_payload}")
+            raise RuntimeError(f"Authentication Token Error: {token_payload}")
+
+        self.__keep_token(token_payload, expires_at)
         return token_payload
 
     def __report_error(self, status: str) -> None:
@@ -242,21 +616,90 @@ class GCloudTools(threading.Thread):
 
         self.__log.exception(status)
 
+    def __report_status(self, status: str) -> None:
+        """
+        Wraps the status_fn provided by calling function.
+
+        Parameters
+        ----------
+        status: str
+        """
+        if self.__status_fn is not None:
+            self.__status_fn(status)
+
+        self.__log.info(status)
+
     def run(self) -> None:
         """
-        Handles authentication, activate and key generation in a separate thread.
+        Handles authentication, activate and key generation in a separate thread,
+        unless the cached token is still good.
         """
+        cached_token: Union[str, None] = (
+            self.__cache.get() if self.__reuse_token else None
+        )
 
-        # Authenticate, prepare key file & activate account.
-        self.__auth()
-        time.sleep(5)
-        self.__create_key_file()
-        time.sleep(10)
-        self.__activate()
+        if cached_token:
+            self.__token = cached_token
+            self.__report_status("Reusing cached credentials.")
+        else:
+            try:
+                self.__authenticate()
+            except RuntimeError:
+                if self.__stop_event.is_set():
+                    self.__log.info("Authentication cancelled.")
+                    return
 
-        # Maybe we need to pause after account activation?
-        time.sleep(5)
+                raise
 
         # Let calling function know we're done.
         if self.__status_fn is not None:
             self.__status_fn(True)
+
+    def stop(self) -> None:
+        """
+        Lets calling function tell us to stop, killing any gcloud command that's running.
+        """
+        self.__log.info("Stopping authentication.")
+        self.__stop_event.set()
+
+    def __token_ready(self) -> bool:
+        """
+        Readiness probe: can we get an access token yet?
+
+        Returns
+        -------
+        bool
+        """
+        token, expires_at = parse_access_token(
+            self.__gcloud("auth", "print-access-token", "--format=json")
+        )
+
+        if not token.startswith("ya"):
+            return False
+
+        # Kept, so get_token needn't ask gcloud for it again.
+        self.__keep_token(token, expires_at)
+        return True
+
+    def __wait_for(self, what: str, probe: Callable[[], bool]) -> None:
+        """
+        Polls a readiness probe, giving up after the readiness timeout.
+
+        Parameters
+        ----------
+        what: str               For status & error messages
+        probe: Callable
+        """
+        self.__log.info("Waiting for %s...", what)
+        start: float = time.monotonic()
+
+        if not wait_until(
+            probe, timeout=self.__readiness_timeout, stop_event=self.__stop_event
+        ):
+            if self.__stop_event.is_set():
+                raise RuntimeError("Cancelled.")
+
+            self.__report_error(f"Timed out waiting for {what}.")
+            raise RuntimeError(f"Timed out waiting for {what}.")
+
+        self.__log.info("%s ready after %.1f s.", what, time.monotonic() - start)
@@ -1,12 +1,28 @@
 import logging
 import threading
 from collections.abc import Callable as Callable
+from typing import Union
 
 from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.command_runner import CommandResult, CommandRunner
+from src.getmyapidata.credential_cache import CredentialCache
+from src.getmyapidata.metrics import RunMetrics
+
+LOGIN_TIMEOUT_SECONDS: float
+VERSION_TIMEOUT_SECONDS: float
+TOKEN_INFO_URL: str
 
 def gcloud_tools_installed() -> bool: ...
-def getoutput(command: str) -> list[str]: ...
-def system(command: str) -> None: ...
+def look_up_token_expiry(token: str) -> Union[float, None]: ...
+def parse_access_token(lines: list[str]) -> tuple: ...
+def parse_expiry(output: dict) -> Union[float, None]: ...
+def wait_until(
+    probe: Callable[[], bool],
+    timeout: float = ...,
+    initial_interval: float = ...,
+    max_interval: float = ...,
+    stop_event: threading.Event = ...,
+) -> bool: ...
 
 class GCloudTools(threading.Thread):
     def __init__(
@@ -14,13 +30,38 @@ class GCloudTools(threading.Thread):
         aou_package: AouPackage,
         log: logging.Logger,
         status_fn: Callable = ...,
+        readiness_timeout: float = ...,
+        reuse_token: bool = ...,
+        stop_event: threading.Event = ...,
+        metrics: RunMetrics = ...,
     ) -> None:
         self.__log: logging.Logger = None
         self.__aou_package: AouPackage = None
         self.__status_fn: Callable = None
+        self.__readiness_timeout: float = None
+        self.__reuse_token: bool = None
+        self.__cache: CredentialCache = None
+        self.__token: str = None
+        self.__stop_event: threading.Event = None
+        self.__runner: CommandRunner = None
+    def __account_active(self) -> bool: ...
     def __activate(self) -> None: ...
+    def __activate_and_wait(self) -> None: ...
     def __auth(self) -> None: ...
+    def __authenticate(self) -> None: ...
+    def __checked_lines(self, result: CommandResult) -> list[str]: ...
     def __create_key_file(self) -> None: ...
+    def __delete_old_keys(self) -> None: ...
+    def __gcloud(self, *args: str, timeout: float = ...) -> list[str]: ...
+    def __key_age_days(self) -> Union[float, None]: ...
+    def __keep_token(self, token: str, expires_at: Union[float, None]) -> None: ...
+    def __key_file_ready(self) -> bool: ...
+    def __key_scope(self) -> list[str]: ...
+    def __read_key_file(self) -> Union[dict, None]: ...
     def get_token(self) -> str: ...
     def __report_error(self, status: str) -> None: ...
+    def __report_status(self, status: str) -> None: ...
     def run(self) -> None: ...
+    def stop(self) -> None: ...
+    def __token_ready(self) -> bool: ...
+    def __wait_for(self, what: str, probe: Callable[[], bool]) -> None: ...
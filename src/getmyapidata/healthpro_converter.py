@@ -0,0 +1,458 @@
+"""
+Contains class HealthProConverter, which converts participant lists into Health Pro format.
+
+Choosing what to convert & with which engine needs neither pandas nor numpy,
+so the streaming engine works (& starts quickly) without them.
+"""
+import importlib.util
+import logging
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Union
+
+from src.getmyapidata.combined_output import CombinedOutput
+from src.getmyapidata.compressed_files import (compressed_filename, csv_files,
+                                               uncompressed_filename)
+from src.getmyapidata.conversion_manifest import ConversionManifest
+from src.getmyapidata.healthpro_mapping import HEALTHPRO_COLUMNS, KEY_COLUMN
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.output_options import (OutputOptions, check_options,
+                                             columnar_filename)
+
+# Bump whenever the output changes, so files converted by older versions are redone.
+CONVERTER_VERSION: str = "4"
+
+# How convert_file can read CSVs.
+# "auto" is pyarrow if it's installed, else pandas, but stream for small files
+# & when pandas isn't installed.
+ENGINES: tuple = ("auto", "pandas", "pyarrow", "stream")
+
+# With the "auto" engine, files this small are streamed:
+# it's quicker than importing pandas (about 30,000 participants break even).
+STREAM_MAX_BYTES: int = 4 * 1024 * 1024
+
+# Marks the converted files.
+TRANSFORMED_SUFFIX: str = "_transformed"
+
+# Every organization's participants, when asked for. Not "*_participant_list_transformed.csv",
+# so anything gathering up the organizations' files doesn't count everyone twice.
+COMBINED_FILENAME: str = "all_participants" + TRANSFORMED_SUFFIX + ".csv"
+
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def convert_in_worker(
+    engine: str,
+    source_filename: str,
+    target_filename: str,
+    log: logging.Logger,
+    chunk_size: int = 0,
+    output: OutputOptions = None,
+    keep_rows: bool = False,
+) -> tuple:
+    """
+    Converts one file in another process, which can't hand the rows over as they go
+    or add to the caller's counts, so returns them instead.
+
+    Parameters
+    ----------
+    engine: str                 "pandas", "pyarrow" or "stream"
+    source_filename: str
+    target_filename: str
+    log: logging.Logger
+    chunk_size: int
+    output: OutputOptions       Optional; columnar formats to write too
+    keep_rows: bool             Keep the rows for a CombinedOutput?
+
+    Returns
+    -------
+    (participants, rows, sizes): tuple  rows as CombinedOutput.add() takes them (or None),
+                                        sizes as compressed_files.open_output gives them
+    """
+    rows: list[tuple] = []
+    sizes: dict = {}
+    participants: int = converter_for(engine)(
+        source_filename,
+        target_filename,
+        log,
+        chunk_size,
+        None,
+        engine,
+        rows.extend if keep_rows else None,
+        output,
+        sizes,
+    )
+    return participants, rows if keep_rows else None, sizes
+
+
+def converter_for(engine: str) -> Callable:
+    """
+    The convert_file function for an engine.
+
+    Parameters
+    ----------
+    engine: str                 "pandas", "pyarrow" or "stream"
+
+    Returns
+    -------
+    convert_file: Callable
+    """
+    # Only import pandas if we're going to use it.
+    # pylint: disable=import-outside-toplevel
+    if engine == "stream":
+        from src.getmyapidata.stream_converter import convert_file
+    else:
+        # It resolves its engine here, so imports this module in turn.
+        # pylint: disable=cyclic-import
+        from src.getmyapidata.convert_to_hp_format import convert_file
+
+    return convert_file
+
+
+# pylint: disable=too-many-branches
+def resolve_engine(engine: str, log: logging.Logger, size: int = None) -> str:
+    """
+    Which engine to read CSVs with: pyarrow if it's wanted & installed,
+    stream for small files or if pandas isn't installed, pandas otherwise.
+
+    Parameters
+    ----------
+    engine: str                 One of ENGINES
+    log: logging.Logger
+    size: int                   Optional; the file's size in bytes
+
+    Returns
+    -------
+    engine: str                 "pandas", "pyarrow" or "stream"
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'; use one of {', '.join(ENGINES)}.")
+
+    if engine == "stream":
+        return engine
+
+    if importlib.util.find_spec("pandas") is None:
+        if engine != "auto":
+            log.warning("pandas unavailable; using the stream engine.")
+
+        return "stream"
+
+    if engine == "auto" and size is not None and size <= STREAM_MAX_BYTES:
+        return "stream"
+
+    if engine == "pandas":
+        return engine
+
+    try:
+        import pyarrow.csv  # pylint: disable=import-outside-toplevel,unused-import
+    except ImportError as e:
+        if engine == "pyarrow":
+            log.warning("pyarrow unavailable (%s); using pandas.", e)
+
+        return "pandas"
+
+    return "pyarrow"
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class HealthProConverter:
+    """
+    Allows us to convert new InSite API format to the HealthPro format we're used to.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        log: logging.Logger,
+        data_directory: str,
+        status_fn: Callable = None,
+        chunk_size: int = 0,
+        workers: int = 1,
+        engine: str = "auto",
+        combined: bool = False,
+        output: OutputOptions = None,
+        metrics: RunMetrics = None,
+    ) -> None:
+        """Instantiate a HealthProConverter object
+
+        Parameters
+        ----------
+        log: logging.Logger         log object
+        data_directory: str         Where to store the data file
+        status_fn: Callable         Method from calling object to report status.
+        chunk_size: int             Rows to convert at a time; 0 for whole files.
+        workers: int                Files to convert at once; 0 for one per CPU.
+        engine: str                 How to read the CSVs; see ENGINES.
+        combined: bool              Also write every participant to COMBINED_FILENAME?
+        output: OutputOptions       Optional; compression & columnar formats for the output.
+        metrics: RunMetrics         Optional; where to add the bytes written
+        """
+        self.__log: logging.Logger = log
+        self.__directory: str = data_directory
+        self.__status_fn: Callable = status_fn
+        self.__chunk_size: int = chunk_size
+        self.__workers: int = workers or os.cpu_count() or 1
+        self.__manifest: Union[ConversionManifest, None] = None
+        self.__engine: str = resolve_engine(engine, log)
+        self.__auto: bool = engine == "auto"
+        self.__combined: bool = combined
+        self.__combined_output: Union[CombinedOutput, None] = None
+        self.__output: OutputOptions = output or OutputOptions()
+        check_options(self.__output)
+        self.__metrics: Union[RunMetrics, None] = metrics
+        self.__sizes: dict = {}
+
+    def convert(self, force: bool = False) -> None:
+        """
+        Convert all .csv files in given directory that aren't already marked as "transformed",
+        skipping those that haven't changed since they were last converted.
+        If asked, put all the converted rows in one file as well.
+
+        Parameters
+        ----------
+        force: bool                 Convert everything, changed or not?
+        """
+        self.__sizes = {}
+        self.__manifest = ConversionManifest(
+            self.__directory, CONVERTER_VERSION, self.__log
+        )
+        sources, jobs, unchanged = self.__find_jobs(force)
+        self.__combined_output = self.__start_combined(sources, jobs, unchanged)
+
+        try:
+            if self.__workers > 1 and len(jobs) > 1:
+                self.__convert_in_parallel(jobs)
+            else:
+                for input_file, output_file in jobs:
+                    self.__convert_file(input_file, output_file)
+
+            if self.__combined_output is not None:
+                participants: int = self.__combined_output.write(self.__sizes)
+                self.__manifest.record_combined(
+                    self.__combined_output.filename, sources
+                )
+                self.__report_status(
+                    f"Wrote {participants} participants to '{self.__combined_output.filename}'."
+                )
+        finally:
+            # Whatever got converted needn't be next time.
+            self.__manifest.save(sources)
+
+            if self.__metrics is not None:
+                for name, size in self.__sizes.items():
+                    self.__metrics.increment(f"converted_{name}", size)
+
+    def __convert_file(self, source_filename: str, target_filename: str) -> None:
+        """Converts one file in this process."""
+        self.__report_status(f"Converting '{source_filename}' to '{target_filename}'.")
+        engine: str = self.__engine_for(source_filename)
+        collect: Union[Callable, None] = None
+
+        if self.__combined_output is not None:
+            rank: float = os.path.getmtime(source_filename)
+
+            def collect(rows: list[tuple]) -> None:
+                self.__combined_output.add(rows, rank)
+
+        converter_for(engine)(
+            source_filename,
+            target_filename,
+            log=self.__log,
+            chunk_size=self.__chunk_size,
+            status_fn=self.__status_fn,
+            engine=engine,
+            collect=collect,
+            output=self.__output,
+            sizes=self.__sizes,
+        )
+        self.__manifest.record(source_filename, target_filename)
+
+    def __convert_in_parallel(self, jobs: list[tuple]) -> None:
+        """
+        Converts files on a pool of processes, as conversion is CPU-bound.
+
+        Parameters
+        ----------
+        jobs: list[tuple]           (source, target) file names, largest first
+        """
+        workers: int = min(self.__workers, len(jobs))
+        self.__report_status(f"Converting {len(jobs)} files on {workers} processes.")
+        start: float = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures: dict = {}
+
+            for source_filename, target_filename in jobs:
+                future = executor.submit(
+                    convert_in_worker,
+                    self.__engine_for(source_filename),
+                    source_filename,
+                    target_filename,
+                    self.__log,
+                    self.__chunk_size,
+                    self.__output,
+                    self.__combined_output is not None,
+                )
+                futures[future] = (source_filename, target_filename)
+
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    participants, rows, sizes = future.result()
+
+                    if self.__combined_output is not None:
+                        self.__combined_output.add(
+                            rows, os.path.getmtime(futures[future][0])
+                        )
+
+                    for name, size in sizes.items():
+                        self.__sizes[name] = self.__sizes.get(name, 0) + size
+
+                    self.__manifest.record(*futures[future])
+                    self.__report_status(
+                        f"Converted '{futures[future][0]}' ({participants} participants)."
+                    )
+                    self.__report_status(int(done * 100 / len(jobs)))
+            except BaseException:
+                # Don't start converting the rest.
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        self.__log.info(
+            "Converted %d files on %d processes in %.1f s.",
+            len(jobs),
+            workers,
+            time.perf_counter() - start,
+        )
+
+    def __engine_for(self, source_filename: str) -> str:
+        """
+        With the "auto" engine, small files are streamed.
+
+        Parameters
+        ----------
+        source_filename: str
+
+        Returns
+        -------
+        engine: str
+        """
+        if self.__auto and self.__engine != "stream":
+            return resolve_engine("auto", self.__log, os.path.getsize(source_filename))
+
+        return self.__engine
+
+    def __find_jobs(self, force: bool) -> tuple:
+        """
+        Every participant list, & which of them to convert: those that have changed
+        since they were last converted.
+
+        Parameters
+        ----------
+        force: bool                 Convert everything, changed or not?
+
+        Returns
+        -------
+        (sources, jobs, unchanged): tuple   Every participant list, then the (source, target)
+                                            file names to convert, largest first, & not to
+        """
+        sources: list[str] = []
+        jobs: list[tuple] = []
+        unchanged: list[tuple] = []
+
+        for filename_and_ext in csv_files(os.path.join(self.__directory, "*")):
+            just_the_filename, ext = os.path.splitext(
+                uncompressed_filename(filename_and_ext)
+            )
+
+            # Only the file name counts: the directory may have "transformed" in it.
+            if os.path.isfile(filename_and_ext) and not just_the_filename.endswith(
+                TRANSFORMED_SUFFIX
+            ):
+                output_file: str = compressed_filename(
+                    just_the_filename + TRANSFORMED_SUFFIX + ext,
+                    self.__output.compression,
+                )
+                sources.append(filename_and_ext)
+
+                if not force and self.__is_current(filename_and_ext, output_file):
+                    self.__log.info("'%s' unchanged; not converting.", filename_and_ext)
+                    unchanged.append((filename_and_ext, output_file))
+                else:
+                    jobs.append((filename_and_ext, output_file))
+
+        if len(jobs) < len(sources):
+            self.__report_status(
+                f"{len(sources) - len(jobs)} of {len(sources)} files unchanged "
+                "since last converted."
+            )
+
+        # Largest first, so no process is left converting a big file on its own at the end.
+        jobs.sort(key=lambda job: os.path.getsize(job[0]), reverse=True)
+        return sources, jobs, unchanged
+
+    def __is_current(self, source_filename: str, target_filename: str) -> bool:
+        """
+        Was the file converted since it last changed, with every columnar file wanted?
+
+        Parameters
+        ----------
+        source_filename: str
+        target_filename: str
+
+        Returns
+        -------
+        bool
+        """
+        return self.__manifest.is_current(source_filename, target_filename) and all(
+            os.path.isfile(columnar_filename(target_filename, fmt))
+            for fmt in self.__output.formats
+        )
+
+    def __report_status(self, progress: Union[int, str]) -> None:
+        """
+        Passes progress on to the calling object, if it's interested.
+
+        Parameters
+        ----------
+        progress: Union[int, str]       Percent complete or a message
+        """
+        if self.__status_fn is not None:
+            self.__status_fn(progress)
+
+    def __start_combined(
+        self, sources: list[str], jobs: list[tuple], unchanged: list[tuple]
+    ) -> Union[CombinedOutput, None]:
+        """
+        A CombinedOutput, holding the rows of the files that needn't be converted again,
+        if the combined file's wanted & out of date.
+
+        Parameters
+        ----------
+        sources: list[str]          Every participant list
+        jobs: list[tuple]           (source, target) file names to convert
+        unchanged: list[tuple]      (source, target) file names converted earlier
+
+        Returns
+        -------
+        combined_output: CombinedOutput or None
+        """
+        combined_file: str = compressed_filename(
+            os.path.join(self.__directory, COMBINED_FILENAME), self.__output.compression
+        )
+
+        if not self.__combined or (
+            not jobs and self.__manifest.combined_is_current(combined_file, sources)
+        ):
+            return None
+
+        combined_output: CombinedOutput = CombinedOutput(
+            combined_file, HEALTHPRO_COLUMNS, KEY_COLUMN, self.__log
+        )
+
+        for source_filename, target_filename in unchanged:
+            combined_output.add_converted_file(
+                target_filename, os.path.getmtime(source_filename)
+            )
+
+        return combined_output
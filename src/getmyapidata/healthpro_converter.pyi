@@ -0,0 +1,63 @@
+import logging
+from collections.abc import Callable
+from typing import Union
+
+from src.getmyapidata.combined_output import CombinedOutput
+from src.getmyapidata.conversion_manifest import ConversionManifest
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.output_options import OutputOptions
+
+COMBINED_FILENAME: str
+CONVERTER_VERSION: str
+ENGINES: tuple
+STREAM_MAX_BYTES: int
+TRANSFORMED_SUFFIX: str
+
+def convert_in_worker(
+    engine: str,
+    source_filename: str,
+    target_filename: str,
+    log: logging.Logger,
+    chunk_size: int = 0,
+    output: Union[OutputOptions, None] = None,
+    keep_rows: bool = False,
+) -> tuple: ...
+def converter_for(engine: str) -> Callable: ...
+def resolve_engine(engine: str, log: logging.Logger, size: int = None) -> str: ...
+
+class HealthProConverter:
+    def __init__(
+        self,
+        log: logging.Logger,
+        data_directory: str,
+        status_fn: Union[Callable, None],
+        chunk_size: int = 0,
+        workers: int = 1,
+        engine: str = "auto",
+        combined: bool = False,
+        output: Union[OutputOptions, None] = None,
+        metrics: Union[RunMetrics, None] = None,
+    ) -> None:
+        self.__log: logging.Logger = None
+        self.__directory: str = None
+        self.__status_fn: Callable = None
+        self.__chunk_size: int = None
+        self.__workers: int = None
+        self.__manifest: Union[ConversionManifest, None] = None
+        self.__engine: str = None
+        self.__auto: bool = None
+        self.__combined: bool = None
+        self.__combined_output: Union[CombinedOutput, None] = None
+        self.__output: OutputOptions = None
+        self.__metrics: Union[RunMetrics, None] = None
+        self.__sizes: dict = None
+    def convert(self, force: bool = False) -> None: ...
+    def __convert_file(self, source_filename: str, target_filename: str) -> None: ...
+    def __convert_in_parallel(self, jobs: list[tuple]) -> None: ...
+    def __engine_for(self, source_filename: str) -> str: ...
+    def __find_jobs(self, force: bool) -> tuple: ...
+    def __is_current(self, source_filename: str, target_filename: str) -> bool: ...
+    def __report_status(self, progress: Union[int, str]) -> None: ...
+    def __start_combined(
+        self, sources: list[str], jobs: list[tuple], unchanged: list[tuple]
+    ) -> Union[CombinedOutput, None]: ...
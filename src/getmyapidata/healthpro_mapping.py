@@ -0,0 +1,329 @@
+"""
+The InSite -> HealthPro column mapping & the pieces it's made of.
+
+Needs nothing but the standard library, so both the pandas converter
+(through ConversionPlan) & the streaming one (through RowConverter) can use it
+& give the same results.
+"""
+import datetime
+from collections import namedtuple
+from typing import Union
+
+# One target column.
+# source is None for columns we have no data for, which are all default.
+# transform is None to copy the values as they are.
+# default replaces missing & empty values; None leaves them empty.
+ColumnMapping = namedtuple(
+    "ColumnMapping", ["target", "source", "transform", "default"]
+)
+
+# What to do to a column's values.
+# function converts one value (never missing, but maybe "") & returns a string or None.
+# vectorized is optional: it's given a column's distinct values (a pandas.Series)
+# & a dict it can use to share work with other transforms in the same run,
+# & returns the same as function would for each, in the same order.
+# Transforms with the same name must do the same thing.
+Transform = namedtuple("Transform", ["name", "function", "vectorized"])
+
+# How HealthPro wants dates, which is also how the API sends them.
+DATE_FORMAT: str = "%Y-%m-%dT%H:%M:%S"
+
+# pandas can't represent dates outside these, so makes them empty; so do we.
+DATE_RANGE: tuple = (
+    datetime.datetime(1677, 9, 21, 0, 12, 44),
+    datetime.datetime(2262, 4, 11, 23, 47, 16),
+)
+
+# Other date formats we understand; anything else comes out empty.
+# (pandas will guess at more, so it's best to stick to ISO 8601.)
+DATE_FORMATS: tuple = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%m/%d/%Y")
+
+# Identifies participants in HealthPro files.
+KEY_COLUMN: str = "PMI ID"
+
+# HealthPro's columns, in its order. We leave some of them empty.
+HEALTHPRO_COLUMNS: list[str] = [
+    "Last Name",
+    "First Name",
+    "Middle Initial",
+    "Date of Birth",
+    "PMI ID",
+    "Participant Status",
+    "Core Participant Date",
+    "Withdrawal Status",
+    "Withdrawal Date",
+    "Withdrawal Reason",
+    "Deactivation Status",
+    "Deactivation Date",
+    "Deceased",
+    "Date of Death",
+    "Date of Death Approval",
+    "Participant Origination",
+    "Consent Cohort",
+    "Date of First Primary Consent",
+    "Primary Consent Status",
+    "Primary Consent Date",
+    "Program Update",
+    "Date of Program Update",
+    "EHR Consent Status",
+    "EHR Consent Date",
+    "gRoR Consent Status",
+    "gRoR Consent Date",
+    "Language of Primary Consent",
+    "CABoR Consent Status",
+    "CABoR Consent Date",
+    "Retention Eligible",
+    "Date of Retention Eligibility",
+    "Retention Status",
+    "EHR Data Transfer",
+    "Most Recent EHR Receipt",
+    "Patient Status: Yes",
+    "Patient Status: No",
+    "Patient Status: No Access",
+    "Patient Status: Unknown",
+    "Street Address",
+    "Street Address2",
+    "City",
+    "State",
+    "Zip",
+    "Email",
+    "Login Phone",
+    "Phone",
+    "Required PPI Surveys Complete",
+    "Completed Surveys",
+    "Paired Site",
+    "Paired Organization",
+    "Physical Measurements Status",
+    "Physical Measurements Completion Date",
+    "Samples to Isolate DNA",
+    "Baseline Samples",
+    "Sex",
+    "Gender Identity",
+    "Race/Ethnicity",
+    "Education",
+    "Core Participant Minus PM Date",
+    "Enrollment Site",
+]
+
+
+def date_transform() -> Transform:
+    """
+    Transform that normalizes dates (see normalize_date_value).
+    With pandas, whole columns are done at once (see normalize_date_column),
+    sharing converted values between all the date columns in a run.
+
+    Returns
+    -------
+    transform: Transform
+    """
+    return Transform("date", normalize_date_value, normalize_distinct_dates)
+
+
+def map_values(name: str, mapping: dict) -> Transform:
+    """
+    Transform that looks values up in a dict; values not in it become missing.
+
+    Parameters
+    ----------
+    name: str
+    mapping: dict
+
+    Returns
+    -------
+    transform: Transform
+    """
+    return Transform(name, mapping.get, None)
+
+
+def normalize_date_value(raw_date: str) -> Union[str, None]:
+    """
+    One date in DATE_FORMAT, as normalize_date_column would give it.
+
+    Parameters
+    ----------
+    raw_date: str
+
+    Returns
+    -------
+    date_converted: str or None if it isn't a date we understand
+    """
+    if not raw_date:
+        return None
+
+    try:
+        parsed: datetime.datetime = datetime.datetime.strptime(raw_date, DATE_FORMAT)
+    except ValueError:
+        parsed = None
+
+    if parsed is not None and len(raw_date) == 19:
+        # The API's own timestamps: already in the right format.
+        return raw_date if DATE_RANGE[0] <= parsed <= DATE_RANGE[1] else None
+
+    if parsed is None:
+        parsed = parse_date(raw_date)
+
+    if parsed is None or not (
+        DATE_RANGE[0] <= parsed.replace(tzinfo=None) <= DATE_RANGE[1]
+    ):
+        return None
+
+    return parsed.strftime(DATE_FORMAT)
+
+
+def normalize_distinct_dates(values, context: dict):
+    """
+    Vectorized date_transform, for ConversionPlan.
+
+    Parameters
+    ----------
+    values: pandas.Series       Distinct dates
+    context: dict               Shared by the transforms in a run
+
+    Returns
+    -------
+    dates_converted: pandas.Series
+    """
+    # Only ever called with pandas loaded, so this costs nothing.
+    # pylint: disable=import-outside-toplevel,cyclic-import
+    from src.getmyapidata.convert_to_hp_format import normalize_date_column
+
+    return normalize_date_column(values, context.setdefault("dates", {}))
+
+
+def parse_date(raw_date: str) -> Union[datetime.datetime, None]:
+    """
+    Reads a date that isn't in DATE_FORMAT: ISO 8601 or one of DATE_FORMATS.
+
+    Parameters
+    ----------
+    raw_date: str
+
+    Returns
+    -------
+    parsed: datetime.datetime or None if it isn't a date we understand
+    """
+    try:
+        return datetime.datetime.fromisoformat(raw_date.strip())
+    except ValueError:
+        pass
+
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(raw_date.strip(), date_format)
+        except ValueError:
+            pass
+
+    return None
+
+
+def upper_case() -> Transform:
+    """
+    Transform that upper-cases values.
+
+    Returns
+    -------
+    transform: Transform
+    """
+    return Transform("upper", str.upper, None)
+
+
+# Where each HealthPro column's data comes from; columns not listed are left empty.
+HEALTHPRO_MAPPING: list[ColumnMapping] = [
+    ColumnMapping("Last Name", "lastName", None, None),
+    ColumnMapping("First Name", "firstName", None, None),
+    ColumnMapping("Middle Initial", "middleName", None, None),
+    ColumnMapping("Date of Birth", "dateOfBirth", None, None),
+    ColumnMapping("PMI ID", "participantId", None, None),
+    ColumnMapping(
+        "Withdrawal Status",
+        "withdrawalStatus",
+        map_values("withdrawal", {"not_withdrawn": "0", "withdrawn": "1"}),
+        None,
+    ),
+    ColumnMapping("Withdrawal Date", "withdrawalTime", date_transform(), None),
+    ColumnMapping("Withdrawal Reason", None, None, "UNSET"),
+    ColumnMapping(
+        "Deactivation Status",
+        "deactivationStatus",
+        map_values(
+            "deactivation",
+            {
+                "deactivated": "NO_CONTACT",
+                "not_deactivated": "NOT_SUSPENDED",
+                "unset": "UNSET",
+            },
+        ),
+        None,
+    ),
+    ColumnMapping("Deactivation Date", "deactivationTime", date_transform(), None),
+    ColumnMapping(
+        "Deceased",
+        "deceasedStatus",
+        map_values("deceased", {"deceased": "APPROVED", "unset": "UNSET"}),
+        None,
+    ),
+    ColumnMapping("Date of Death", "deceasedAuthored", date_transform(), None),
+    ColumnMapping(
+        "Date of First Primary Consent",
+        "consentForStudyEnrollmentAuthored",
+        date_transform(),
+        None,
+    ),
+    ColumnMapping(
+        "Primary Consent Status",
+        "consentForStudyEnrollment",
+        map_values("consent", {"yes": "1", "no": "0"}),
+        None,
+    ),
+    ColumnMapping(
+        "Primary Consent Date",
+        "consentForStudyEnrollmentAuthored",
+        date_transform(),
+        None,
+    ),
+    ColumnMapping(
+        "EHR Consent Status",
+        "consentForElectronicHealthRecords",
+        map_values("consent", {"yes": "1", "no": "0"}),
+        None,
+    ),
+    ColumnMapping(
+        "EHR Consent Date",
+        "consentForElectronicHealthRecordsAuthored",
+        date_transform(),
+        None,
+    ),
+    ColumnMapping(
+        "Most Recent EHR Receipt", "latestEhrReceiptTime", date_transform(), None
+    ),
+    # InSiteAPI puts the first patientStatus entry's organization in these when it
+    # flattens the field, so nothing here has to parse it.
+    ColumnMapping("Patient Status: Yes", "patientStatusFirstYes", None, None),
+    ColumnMapping("Patient Status: No", "patientStatusFirstNo", None, None),
+    ColumnMapping(
+        "Patient Status: No Access", "patientStatusFirstNoAccess", None, None
+    ),
+    ColumnMapping("Patient Status: Unknown", "patientStatusFirstUnknown", None, None),
+    ColumnMapping("Street Address", "streetAddress", None, None),
+    ColumnMapping("Street Address2", "streetAddress2", None, None),
+    ColumnMapping("City", "city", None, None),
+    ColumnMapping("State", "state", None, "UNSET"),
+    ColumnMapping("Zip", "zipCode", None, None),
+    ColumnMapping("Email", "email", None, None),
+    ColumnMapping("Login Phone", "phoneNumber", None, None),
+    ColumnMapping("Phone", "phoneNumber", None, None),
+    ColumnMapping("Paired Site", "clinicPhysicalMeasurementsFinalizedSite", None, None),
+    ColumnMapping("Paired Organization", "organization", None, None),
+    ColumnMapping(
+        "Physical Measurements Status",
+        "clinicPhysicalMeasurementsStatus",
+        upper_case(),
+        None,
+    ),
+    ColumnMapping(
+        "Physical Measurements Completion Date",
+        "clinicPhysicalMeasurementsFinalizedTime",
+        date_transform(),
+        None,
+    ),
+]
@@ -0,0 +1,20 @@
+import datetime
+from collections import namedtuple
+from typing import Union
+
+ColumnMapping = namedtuple("ColumnMapping", ["target", "source", "transform", "default"])
+Transform = namedtuple("Transform", ["name", "function", "vectorized"])
+
+DATE_FORMAT: str
+DATE_FORMATS: tuple
+DATE_RANGE: tuple
+HEALTHPRO_COLUMNS: list[str]
+HEALTHPRO_MAPPING: list[ColumnMapping]
+KEY_COLUMN: str
+
+def date_transform() -> Transform: ...
+def map_values(name: str, mapping: dict) -> Transform: ...
+def normalize_date_value(raw_date: str) -> Union[str, None]: ...
+def normalize_distinct_dates(values, context: dict): ...
+def parse_date(raw_date: str) -> Union[datetime.datetime, None]: ...
+def upper_case() -> Transform: ...
@@ -2,19 +2,45 @@
 Contains InSiteAPI class.
 """
 import csv
+import json
 import logging
 import os
 import threading
 import time
 from collections import namedtuple
 from collections.abc import Callable
+from contextlib import ExitStack
 from pathlib import Path
 from typing import Union
 
 import requests
 
 from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.common import atomic_write
+from src.getmyapidata.compressed_files import (
+    compressed_filename,
+    csv_files,
+    open_output,
+    open_text,
+)
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.nested_fields import FlatteningRule, ResourceFlattener
+from src.getmyapidata.output_options import (
+    COLUMNAR_FORMATS,
+    OutputOptions,
+    check_options,
+    columnar_filename,
+)
+from src.getmyapidata.participant_summary import ParticipantSummary
+from src.getmyapidata.partitioned_output import PartitionedOutput
 from src.getmyapidata.progress import Progress
+from src.getmyapidata.token_provider import StaticTokenProvider, TokenProvider
+
+# Fold token, aou_package into a named tuple.
+ApiRequestPackage = namedtuple("ApiRequestPackage", ["aou_package", "token"])
+
+# Remembers when the data in a directory was last pulled, for incremental requests.
+SYNC_STATE_FILENAME: str = "sync_state.json"
 
 
 def join_headers(h1: list, h2: list) -> list:
@@ -43,6 +69,42 @@ def join_headers(h1: list, h2: list) -> list:
     return list(combined)
 
 
+def read_last_sync(data_directory: str) -> Union[str, None]:
+    """
+    Reads the time of the last successful pull into a directory.
+
+    Parameters
+    ----------
+    data_directory: str
+
+    Returns
+    -------
+    last_sync: str or None if the directory has never been synced
+    """
+    state_file: str = os.path.join(data_directory, SYNC_STATE_FILENAME)
+
+    try:
+        with open(state_file, "r", encoding="utf-8") as file:
+            return json.load(file).get("last_sync")
+    except (OSError, ValueError):
+        return None
+
+
+def write_last_sync(data_directory: str, last_sync: str) -> None:
+    """
+    Records the time of a successful pull into a directory.
+
+    Parameters
+    ----------
+    data_directory: str
+    last_sync: str          UTC time the pull started, as %Y-%m-%dT%H:%M:%S
+    """
+    state_file: str = os.path.join(data_directory, SYNC_STATE_FILENAME)
+
+    with atomic_write(state_file, "w", encoding="utf-8") as file:
+        json.dump({"last_sync": last_sync}, file)
+
+
 def make_header(dict1: dict) -> list:
     """
     Turns a dictionary keys into a header list.
@@ -63,6 +125,7 @@ def make_header(dict1: dict) -> list:
     return ret
 
 
+# pylint: disable=too-many-instance-attributes
 class InSiteAPI(threading.Thread):
     """
     An interface with the AwardeeInSite API
@@ -74,15 +137,27 @@ class InSiteAPI(threading.Thread):
     self.__official_header
     self.__report_fn
     self.__stop_event
+    self.__token_provider
 
     Methods
     ---------
+    load_data()
     output_data()
     run()
+    set_token_provider()
     """
 
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
     def __init__(
-        self, api_package: namedtuple, log: logging.Logger, report_fn: Callable = None
+        self,
+        api_package: namedtuple,
+        log: logging.Logger,
+        report_fn: Callable = None,
+        since: str = None,
+        stop_event: threading.Event = None,
+        session: requests.Session = None,
+        token_provider: TokenProvider = None,
+        flattening_rules: list[FlatteningRule] = None,
     ):
         """Instantiate an InSiteAPI object.
 
@@ -91,17 +166,52 @@ class InSiteAPI(threading.Thread):
         api_package: namedtuple     Contains the token file name, awardee & endpoint info
         log: logging.Logger
         report_fn: Callable         Optional Tell something to calling function
+        since: str                  Optional Only request records modified after this time
+        stop_event: threading.Event Optional Shared event that stops the request
+        session: requests.Session   Optional Reuse this connection pool across requests
+        token_provider: TokenProvider   Optional Where to get tokens; defaults to api_package's
+        flattening_rules: list[FlatteningRule]  Optional How to flatten nested fields;
+                                                defaults to nested_fields.DEFAULT_RULES
         """
         # Set up ability of calling function to stop data request.
         threading.Thread.__init__(self)
-        self.__stop_event: threading.Event = threading.Event()
+        self.__stop_event: threading.Event = (
+            stop_event if stop_event is not None else threading.Event()
+        )
 
         # Everything we'll need to make request.
         self.__api_package: namedtuple = api_package
 
-        # Property used to record results.
+        # Asked for the token on every request, so it can be refreshed mid-download.
+        self.__token_provider: TokenProvider = (
+            token_provider
+            if token_provider is not None
+            else StaticTokenProvider(api_package.token)
+        )
+
+        # Either a Session (keeps connections open between calls) or the requests module.
+        self.__http = session if session is not None else requests
+
+        # Nested fields become JSON & plain columns as they arrive, not Python reprs.
+        self.__flattener: ResourceFlattener = ResourceFlattener(flattening_rules)
+
+        # Property used to record results: organization -> {participant key: resource}.
         self.__data: dict = {}
 
+        # Which organization each participant is filed under.
+        self.__index: dict = {}
+        self.__num_unkeyed: int = 0
+
+        # Organizations all of whose participants have moved elsewhere.
+        self.__emptied: set = set()
+
+        # Counts of the participants in self.__data, kept up to date as they arrive.
+        self.summary: ParticipantSummary = ParticipantSummary()
+
+        # For incremental requests.
+        self.since: Union[str, None] = since
+        self.last_sync: str = ""
+
         # Logger
         self.__log: logging.Logger = log
 
@@ -158,9 +268,43 @@ class InSiteAPI(threading.Thread):
                 organization = resource["organization"]
 
             if organization not in self.__data:
-                self.__data[organization] = []
+                self.__data[organization] = {}
+
+            key: str = resource.get("participantId")
+
+            if not key:
+                self.__num_unkeyed += 1
+                key = f"#{self.__num_unkeyed}"
+
+            self.__forget_participant(key, organization)
+            self.__data[organization][key] = resource
+            self.__index[key] = organization
+            self.summary.add(resource)
+
+    def __forget_participant(self, key: str, organization: str) -> None:
+        """
+        A newer version of a participant we already have replaces it,
+        even if they've moved to another organization: forgets the old one.
+
+        Parameters
+        ----------
+        key: str                    Participant ID
+        organization: str           The newer version's organization
+        """
+        previous_organization: str = self.__index.get(key)
+
+        if not previous_organization:
+            return
 
-            self.__data[organization].append(resource)
+        self.summary.remove(self.__data[previous_organization][key])
+
+        if previous_organization != organization:
+            del self.__data[previous_organization][key]
+
+            # Otherwise its file would be rewritten with just a header.
+            if not self.__data[previous_organization]:
+                del self.__data[previous_organization]
+                self.__emptied.add(previous_organization)
 
     def __handle_timeouts(
         self,
@@ -193,7 +337,7 @@ class InSiteAPI(threading.Thread):
                 time.sleep(30)
 
                 try:
-                    resp = requests.get(next_url, headers=headers, timeout=60)
+                    resp = self.__http.get(next_url, headers=headers, timeout=60)
                 except requests.exceptions.RequestException:
                     self.__log.error("API request failed.")
                     raise RuntimeError("API request failed. Exiting.")
@@ -236,40 +380,130 @@ class InSiteAPI(threading.Thread):
 
         return ps_data
 
-    def output_data(self, data_directory: str) -> None:
+    def __headers(self) -> dict:
+        """
+        Request headers, with the provider's current token.
+
+        Returns
+        -------
+        headers: dict
+        """
+        return {
+            "content-type": "application/json",
+            "Authorization": f"Bearer {self.__token_provider.get_token()}",
+        }
+
+    def load_data(self, data_directory: str) -> None:
+        """
+        Seeds the results with the files from a previous pull,
+        so an incremental request only needs to fetch what has changed since.
+
+        Parameters
+        ----------
+        data_directory: str
+        """
+        pattern: str = os.path.join(data_directory, "*_participant_list")
+
+        for csv_filepath in csv_files(pattern):
+            self.__log.info("Loading previous data from %s", csv_filepath)
+
+            with open_text(csv_filepath) as file:
+                reader: csv.DictReader = csv.DictReader(file)
+                self.__official_header = join_headers(
+                    self.__official_header, reader.fieldnames
+                )
+
+                # Files written before a field was flattened need its columns.
+                self.__official_header = join_headers(
+                    self.__official_header,
+                    self.__flattener.columns_for(reader.fieldnames or []),
+                )
+
+                for resource in reader:
+                    self.__extract_organization_data(
+                        self.__flattener.flatten_row(resource)
+                    )
+
+    def output_data(
+        self,
+        data_directory: str,
+        output: OutputOptions = None,
+        metrics: RunMetrics = None,
+    ) -> None:
         """
-        Produces .csv files from extracted data.
+        Produces .csv files from extracted data, compressed if asked for,
+        & Parquet or Feather files alongside them if asked for.
+        The rows are also written partitioned if output.partition_by says so.
 
         Parameters
         ----------
         data_directory: str                             Where do you want the files to be created?
+        output: OutputOptions                           Optional; compression & columnar formats
+        metrics: RunMetrics                             Optional; where to add the bytes written
 
         Returns
         -------
         None
         """
-
+        output = output or OutputOptions()
+        check_options(output)
         self.__official_header.sort()
 
         # Ensure the path to the data directory exists.
         data_directory_path: Path = Path(data_directory)
         data_directory_path.mkdir(parents=True, exist_ok=True)
+        sizes: dict = {}
+
+        with ExitStack() as partitions_stack:
+            partitioned: Union[PartitionedOutput, None] = None
+
+            if output.partition_by:
+                partitioned = partitions_stack.enter_context(
+                    PartitionedOutput(
+                        data_directory,
+                        self.__official_header,
+                        output,
+                        self.__log,
+                        sizes,
+                    )
+                )
 
-        for key, value in self.__data.items():
-            csv_filepath = os.path.join(data_directory, key + "_participant_list.csv")
+            for key, value in self.__data.items():
+                self.__write_organization(
+                    key, value, data_directory, output, sizes, partitioned
+                )
 
-            if self.__report_fn is not None:
-                self.__report_fn(f"Writing to {csv_filepath}")
-            else:
-                self.__log.info("Writing to %s", csv_filepath)
+                # Partitions by organization are done with; don't keep their files open.
+                if partitioned is not None and "organization" in output.partition_by:
+                    partitioned.close_partitions()
 
-            with open(csv_filepath, "w", newline="", encoding="utf-8") as file:
-                writer: csv.writer = csv.writer(file)
-                writer.writerow(self.__official_header)
+        # Their participants are in other organizations' files now.
+        for organization in sorted(self.__emptied - set(self.__data)):
+            self.__remove_organization(organization, data_directory)
 
-                for d in value:
-                    line: list = self.__build_line(d)
-                    writer.writerow(line)
+        if metrics is not None:
+            for name, size in sizes.items():
+                metrics.increment(f"output_{name}", size)
+
+    def __remove_organization(self, organization: str, data_directory: str) -> None:
+        """
+        Removes the files of an organization that no longer has any participants.
+
+        Parameters
+        ----------
+        organization: str
+        data_directory: str
+        """
+        csv_pattern: str = os.path.join(
+            data_directory, organization + "_participant_list"
+        )
+
+        for filename in csv_files(csv_pattern) + [
+            columnar_filename(csv_pattern + ".csv", fmt) for fmt in COLUMNAR_FORMATS
+        ]:
+            if os.path.isfile(filename):
+                self.__log.info("Removing %s: no participants left.", filename)
+                os.remove(filename)
 
     def __report_completion(self) -> None:
         """
@@ -317,10 +551,15 @@ class InSiteAPI(threading.Thread):
         self.__log.debug(f"Requesting {next_url}")
 
         try:
-            resp: requests.Response = requests.get(
+            resp: requests.Response = self.__http.get(
                 next_url, headers=headers, timeout=30
             )
 
+            if resp.status_code == 401 and self.__token_provider.invalidate():
+                self.__log.info("Token rejected; trying again with a fresh one.")
+                headers = self.__headers()
+                resp = self.__http.get(next_url, headers=headers, timeout=30)
+
             if resp.status_code == 200:
                 self.__log.debug(f"status code: {resp.status_code}")
                 ps_data = resp.json()
@@ -357,27 +596,32 @@ class InSiteAPI(threading.Thread):
         # Constants
         num_rows_per_page: int = 1000
 
-        headers: dict = {
-            "content-type": "application/json",
-            "Authorization": f"Bearer {self.__api_package.token}",
-        }
-
         aou_package: AouPackage = self.__api_package.aou_package
         next_url: Union[str, None] = (
             f"{aou_package.endpoint}?_sort=lastModified&_includeTotal=TRUE"
             f"&_count={num_rows_per_page}&awardee={aou_package.awardee}"
         )
 
+        if self.since:
+            # Keep what load_data() gave us & just ask for what has changed.
+            next_url += f"&_lastModified=gt{self.since}"
+        else:
+            self.__data = {}
+            self.__index = {}
+            self.__emptied = set()
+            self.summary.clear()
+
         self.__log.debug("next_url: %s", next_url)
 
-        self.__data = {}
+        # Note the time BEFORE asking, so the next incremental request won't miss anything.
+        self.last_sync = time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime())
 
         while next_url and not self.__stop_event.is_set():
-            ps_data: dict = self.__request_response(next_url, headers)
+            ps_data: dict = self.__request_response(next_url, self.__headers())
             self.__report_progress(len(ps_data["entry"]))
 
             for entry in ps_data["entry"]:
-                resource = entry["resource"]
+                resource = self.__flattener.flatten(entry["resource"])
                 h = make_header(resource)
                 self.__official_header = join_headers(self.__official_header, h)
                 self.__extract_organization_data(resource)
@@ -387,6 +631,16 @@ class InSiteAPI(threading.Thread):
         # Let calling function know we're done.
         self.__report_completion()
 
+    def set_token_provider(self, token_provider: TokenProvider) -> None:
+        """
+        Lets calling function change where tokens come from before requesting again.
+
+        Parameters
+        ----------
+        token_provider: TokenProvider
+        """
+        self.__token_provider = token_provider
+
     def stop(self) -> None:
         """
         Lets calling function tell us to stop.
@@ -437,3 +691,66 @@ class InSiteAPI(threading.Thread):
             self.__log.error("Key error")
 
         return next_url
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __write_organization(
+        self,
+        organization: str,
+        participants: dict,
+        data_directory: str,
+        output: OutputOptions,
+        sizes: dict,
+        partitioned: Union[PartitionedOutput, None],
+    ) -> None:
+        """
+        Writes one organization's participant list, & its rows to their partitions.
+
+        Parameters
+        ----------
+        organization: str
+        participants: dict                              participant key -> resource
+        data_directory: str
+        output: OutputOptions
+        sizes: dict                                     As for compressed_files.open_output
+        partitioned: PartitionedOutput                  Optional
+        """
+        csv_filepath = compressed_filename(
+            os.path.join(data_directory, organization + "_participant_list.csv"),
+            output.compression,
+        )
+
+        if self.__report_fn is not None:
+            self.__report_fn(f"Writing to {csv_filepath}")
+        else:
+            self.__log.info("Writing to %s", csv_filepath)
+
+        with ExitStack() as stack:
+            # Everywhere each row goes.
+            write_fns: list[Callable] = []
+
+            if output.formats:
+                # Only import pyarrow when it's needed.
+                # pylint: disable=import-outside-toplevel
+                from src.getmyapidata.columnar_output import open_writers
+
+                write_fns.extend(
+                    columnar_writer.write_row
+                    for columnar_writer in open_writers(
+                        stack, csv_filepath, self.__official_header, output, self.__log
+                    )
+                )
+
+            writer: csv.writer = csv.writer(
+                stack.enter_context(open_output(csv_filepath, sizes))
+            )
+            writer.writerow(self.__official_header)
+            write_fns.append(writer.writerow)
+
+            if partitioned is not None:
+                write_fns.append(partitioned.write_row)
+
+            for d in participants.values():
+                line: list = self.__build_line(d)
+
+                for write_fn in write_fns:
+                    write_fn(line)
@@ -6,20 +6,47 @@ from typing import Union
 
 import requests
 
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.nested_fields import FlatteningRule, ResourceFlattener
+from src.getmyapidata.output_options import OutputOptions
+from src.getmyapidata.participant_summary import ParticipantSummary
+from src.getmyapidata.partitioned_output import PartitionedOutput
 from src.getmyapidata.progress import Progress
+from src.getmyapidata.token_provider import TokenProvider
 
 # Fold resp, num_attempts into a named tuple.
 ResponsePackage = namedtuple("ResponsePackage", ["resp", "num_attempts"])
+ApiRequestPackage = namedtuple("ApiRequestPackage", ["aou_package", "token"])
+SYNC_STATE_FILENAME: str
 
 def join_headers(h1: list, h2: list) -> list: ...
+def read_last_sync(data_directory: str) -> Union[str, None]: ...
+def write_last_sync(data_directory: str, last_sync: str) -> None: ...
 def make_header(dict1: dict) -> list: ...
 
 class InSiteAPI(threading.Thread):
     def __init__(
-        self, api_package: namedtuple, log: logging.Logger, report_fn: Callable
+        self,
+        api_package: namedtuple,
+        log: logging.Logger,
+        report_fn: Callable = ...,
+        since: str = ...,
+        stop_event: threading.Event = ...,
+        session: requests.Session = ...,
+        token_provider: TokenProvider = ...,
+        flattening_rules: list[FlatteningRule] = ...,
     ) -> None:
         self.__api_package: namedtuple = api_package
+        self.__token_provider: TokenProvider = None
+        self.__http = None
+        self.__flattener: ResourceFlattener = None
         self.__data: dict = {}
+        self.__index: dict = {}
+        self.__emptied: set = set()
+        self.__num_unkeyed: int = 0
+        self.summary: ParticipantSummary = None
+        self.since: Union[str, None] = None
+        self.last_sync: str = ""
         self.__log: logging.Logger = log
         self.__official_header: list = []
         self.__report_fn: Callable = report_fn
@@ -27,17 +54,36 @@ class InSiteAPI(threading.Thread):
         self.__progress: Progress = None
     def __build_line(self, d: dict) -> list: ...
     def __extract_organization_data(self, resource: dict) -> None: ...
+    def __forget_participant(self, key: str, organization: str) -> None: ...
     def __handle_timeouts(
         self,
         resp: requests.Response,
         next_url: Union[str, None],
         headers: dict,
     ) -> dict: ...
-    def output_data(self, data_directory: str) -> None: ...
+    def __headers(self) -> dict: ...
+    def load_data(self, data_directory: str) -> None: ...
+    def output_data(
+        self,
+        data_directory: str,
+        output: OutputOptions = None,
+        metrics: RunMetrics = None,
+    ) -> None: ...
+    def __remove_organization(self, organization: str, data_directory: str) -> None: ...
     def __report_completion(self) -> None: ...
     def __report_progress(self, num_new_records: int) -> None: ...
     def __request_response(self, next_url: Union[str, None], headers: dict) -> dict: ...
     def run(self) -> None: ...
+    def set_token_provider(self, token_provider: TokenProvider) -> None: ...
     def stop(self) -> None: ...
     def __test_for_bundle(self, ps_data: dict) -> None: ...
     def __update_url(self, ps_data: dict) -> str: ...
+    def __write_organization(
+        self,
+        organization: str,
+        participants: dict,
+        data_directory: str,
+        output: OutputOptions,
+        sizes: dict,
+        partitioned: Union[PartitionedOutput, None],
+    ) -> None: ...
@@ -0,0 +1,126 @@
+"""
+Contains RunMetrics class, which collects counts & timings for one run and publishes them.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+# Counters ending in this: bytes actually written. Where "<prefix>_csv_bytes" was
+# counted too, as_dict adds "<prefix>_compression_ratio".
+BYTES_WRITTEN_SUFFIX: str = "_bytes_written"
+
+# Where, under the data directory, each run's metrics are appended (one JSON object per line).
+METRICS_FILENAME: str = "sync_metrics.jsonl"
+
+
+class RunMetrics:
+    """
+    Thread-safe collection of the numbers describing one run.
+
+    Methods
+    -------
+    as_dict() -> dict
+    increment(name: str, amount: int = 1) -> None
+    publish(data_directory: str, log: logging.Logger) -> None
+    set(name: str, value) -> None
+    timer(name: str) -> Iterator[None]
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the RunMetrics class.
+        """
+        self.__lock: threading.Lock = threading.Lock()
+        self.__started: float = time.time()
+        self.__values: dict = {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self.__started))
+        }
+
+    def as_dict(self) -> dict:
+        """
+        Snapshot of everything recorded so far, with compression ratios worked out.
+
+        Returns
+        -------
+        values: dict
+        """
+        with self.__lock:
+            values: dict = dict(self.__values)
+
+        for name in list(values):
+            prefix: str = name[: -len(BYTES_WRITTEN_SUFFIX)]
+
+            if (
+                name.endswith(BYTES_WRITTEN_SUFFIX)
+                and values[name]
+                and f"{prefix}_csv_bytes" in values
+            ):
+                values[f"{prefix}_compression_ratio"] = round(
+                    values[f"{prefix}_csv_bytes"] / values[name], 2
+                )
+
+        values["duration_s"] = round(time.time() - self.__started, 3)
+        return values
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+        Adds to a counter.
+
+        Parameters
+        ----------
+        name: str
+        amount: int
+        """
+        with self.__lock:
+            self.__values[name] = self.__values.get(name, 0) + amount
+
+    def publish(self, data_directory: str, log: logging.Logger) -> None:
+        """
+        Logs the metrics & appends them to the directory's metrics file.
+
+        Parameters
+        ----------
+        data_directory: str
+        log: logging.Logger
+        """
+        values: dict = self.as_dict()
+        log.info("Run metrics: %s", values)
+        Path(data_directory).mkdir(parents=True, exist_ok=True)
+
+        with open(
+            os.path.join(data_directory, METRICS_FILENAME), "a", encoding="utf-8"
+        ) as file:
+            file.write(json.dumps(values, sort_keys=True) + "\n")
+
+    def set(self, name: str, value) -> None:
+        """
+        Records a value, replacing any previous one.
+
+        Parameters
+        ----------
+        name: str
+        value                   Anything JSON can represent
+        """
+        with self.__lock:
+            self.__values[name] = value
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """
+        Records how long the enclosed block took, in seconds, under "<name>_s".
+
+        Parameters
+        ----------
+        name: str
+        """
+        start: float = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            self.set(f"{name}_s", round(time.perf_counter() - start, 3))
@@ -0,0 +1,19 @@
+import logging
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+BYTES_WRITTEN_SUFFIX: str
+METRICS_FILENAME: str
+
+class RunMetrics:
+    def __init__(self) -> None:
+        self.__lock: threading.Lock = None
+        self.__started: float = None
+        self.__values: dict = {}
+    def as_dict(self) -> dict: ...
+    def increment(self, name: str, amount: int = ...) -> None: ...
+    def publish(self, data_directory: str, log: logging.Logger) -> None: ...
+    def set(self, name: str, value) -> None: ...
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]: ...
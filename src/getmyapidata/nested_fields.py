@@ -0,0 +1,252 @@
+"""
+Flattens the nested fields (lists & dicts) of InSite API resources as they arrive,
+so the participant lists hold nothing anyone has to parse back.
+
+Each nested field is written as canonical JSON. A FlatteningRule can also spread
+a field into plain columns of its own, e.g. patientStatus into one column of
+organizations per status, listing every entry's, & another per status with
+the first entry's alone (which is what HealthPro's columns have).
+"""
+import ast
+import json
+from collections import namedtuple
+from typing import Union
+
+# How to flatten one nested field.
+# field is the resource's key; columns are the flat columns the rule fills in.
+# flatten takes the field's value (a list or dict) & returns {column: str or None}
+# for every one of columns.
+FlatteningRule = namedtuple("FlatteningRule", ["field", "columns", "flatten"])
+
+# Column filled with the organizations for each patient status.
+PATIENT_STATUS_COLUMNS: dict = {
+    "YES": "patientStatusYes",
+    "NO": "patientStatusNo",
+    "NO ACCESS": "patientStatusNoAccess",
+    "UNKNOWN": "patientStatusUnknown",
+}
+
+# Column filled with the first entry's organization, under its status.
+FIRST_PATIENT_STATUS_COLUMNS: dict = {
+    "YES": "patientStatusFirstYes",
+    "NO": "patientStatusFirstNo",
+    "NO ACCESS": "patientStatusFirstNoAccess",
+    "UNKNOWN": "patientStatusFirstUnknown",
+}
+
+# Between the values when several entries go in one column.
+SEPARATOR: str = ";"
+
+
+def canonical_json(value: Union[dict, list]) -> str:
+    """
+    The same value always gives the same string, whatever order its keys came in.
+
+    Parameters
+    ----------
+    value: dict or list
+
+    Returns
+    -------
+    encoded: str
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def group_rule(
+    field: str, key: str, value: str, columns: dict, first_columns: dict = None
+) -> FlatteningRule:
+    """
+    Rule for a list of dicts: each entry's value goes in the column for its key.
+    Keys are matched upper-cased, with underscores as spaces ("no_access" is "NO ACCESS");
+    entries with other keys are left out of the columns (but not the JSON).
+    With first_columns, the first entry's value also goes in the one for its key.
+
+    Parameters
+    ----------
+    field: str                  e.g. "patientStatus"
+    key: str                    Entry key that says which column, e.g. "status"
+    value: str                  Entry key that says what goes in it, e.g. "organization"
+    columns: dict               Key -> column
+    first_columns: dict         Optional Key -> column for the first entry alone
+
+    Returns
+    -------
+    rule: FlatteningRule
+    """
+
+    first_columns = first_columns or {}
+
+    def flatten(entries: Union[dict, list]) -> dict:
+        entries = entries if isinstance(entries, list) else [entries]
+        grouped: dict = {column: [] for column in columns.values()}
+        first: dict = dict.fromkeys(first_columns.values())
+
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict) or entry.get(value) in (None, ""):
+                continue
+
+            word: str = str(entry.get(key, "")).replace("_", " ").upper()
+            column: Union[str, None] = columns.get(word)
+
+            if column is not None and str(entry[value]) not in grouped[column]:
+                grouped[column].append(str(entry[value]))
+
+            if i == 0 and word in first_columns:
+                first[first_columns[word]] = str(entry[value])
+
+        flat: dict = {
+            column: SEPARATOR.join(values) or None for column, values in grouped.items()
+        }
+        flat.update(first)
+        return flat
+
+    return FlatteningRule(
+        field, list(columns.values()) + list(first_columns.values()), flatten
+    )
+
+
+def parse_nested(raw_value: str) -> Union[dict, list, None]:
+    """
+    Reads a nested field back from a participant list: canonical JSON or,
+    in files written before fields were flattened, the Python repr.
+
+    Parameters
+    ----------
+    raw_value: str
+
+    Returns
+    -------
+    value: dict, list or None if it's empty or isn't either
+    """
+    if not raw_value:
+        return None
+
+    try:
+        return json.loads(raw_value)
+    except ValueError:
+        pass
+
+    try:
+        return ast.literal_eval(raw_value)
+    except (ValueError, SyntaxError):
+        return None
+
+
+class ResourceFlattener:
+    """
+    Flattens resources in place, following FlatteningRules.
+
+    Methods
+    -------
+    columns_for(fields: list[str]) -> list[str]
+    flatten(resource: dict) -> dict
+    flatten_row(row: dict) -> dict
+    """
+
+    def __init__(self, rules: list[FlatteningRule] = None) -> None:
+        """
+        Instantiate a ResourceFlattener object.
+
+        Parameters
+        ----------
+        rules: list[FlatteningRule]     Optional; defaults to DEFAULT_RULES
+        """
+        rules = DEFAULT_RULES if rules is None else rules
+        self.__rules: dict = {rule.field: rule for rule in rules}
+
+    def __apply(self, resource: dict, field: str, value: Union[dict, list]) -> None:
+        """
+        Flattens one field.
+
+        Parameters
+        ----------
+        resource: dict
+        field: str
+        value: dict or list
+        """
+        rule: Union[FlatteningRule, None] = self.__rules.get(field)
+
+        if rule is not None:
+            resource.update(rule.flatten(value))
+
+        resource[field] = canonical_json(value)
+
+    def columns_for(self, fields: list[str]) -> list[str]:
+        """
+        The columns the rules fill in for resources with these fields.
+
+        Parameters
+        ----------
+        fields: list[str]
+
+        Returns
+        -------
+        columns: list[str]
+        """
+        return [
+            column
+            for field in fields
+            if field in self.__rules
+            for column in self.__rules[field].columns
+        ]
+
+    def flatten(self, resource: dict) -> dict:
+        """
+        Flattens a resource straight from the API.
+
+        Parameters
+        ----------
+        resource: dict
+
+        Returns
+        -------
+        resource: dict          The same one
+        """
+        nested: list = [
+            (field, value)
+            for field, value in resource.items()
+            if isinstance(value, (dict, list))
+        ]
+
+        for field, value in nested:
+            self.__apply(resource, field, value)
+
+        return resource
+
+    def flatten_row(self, row: dict) -> dict:
+        """
+        Fills in the rules' columns for a row read back from a participant list
+        written before they existed; rows that have them are left alone.
+
+        Parameters
+        ----------
+        row: dict               As csv.DictReader gives it
+
+        Returns
+        -------
+        row: dict               The same one
+        """
+        for field, rule in self.__rules.items():
+            if not row.get(field) or all(column in row for column in rule.columns):
+                continue
+
+            value: Union[dict, list, None] = parse_nested(row[field])
+
+            if isinstance(value, (dict, list)):
+                self.__apply(row, field, value)
+
+        return row
+
+
+# patientStatus is a list of {"organization": ..., "status": ...}.
+PATIENT_STATUS_RULE: FlatteningRule = group_rule(
+    "patientStatus",
+    "status",
+    "organization",
+    PATIENT_STATUS_COLUMNS,
+    FIRST_PATIENT_STATUS_COLUMNS,
+)
+
+# What InSiteAPI flattens unless told otherwise.
+DEFAULT_RULES: list[FlatteningRule] = [PATIENT_STATUS_RULE]
@@ -0,0 +1,24 @@
+from collections import namedtuple
+from typing import Union
+
+FlatteningRule = namedtuple("FlatteningRule", ["field", "columns", "flatten"])
+
+DEFAULT_RULES: list[FlatteningRule]
+FIRST_PATIENT_STATUS_COLUMNS: dict
+PATIENT_STATUS_COLUMNS: dict
+PATIENT_STATUS_RULE: FlatteningRule
+SEPARATOR: str
+
+def canonical_json(value: Union[dict, list]) -> str: ...
+def group_rule(
+    field: str, key: str, value: str, columns: dict, first_columns: dict = None
+) -> FlatteningRule: ...
+def parse_nested(raw_value: str) -> Union[dict, list, None]: ...
+
+class ResourceFlattener:
+    def __init__(self, rules: list[FlatteningRule] = None) -> None:
+        self.__rules: dict = None
+    def __apply(self, resource: dict, field: str, value: Union[dict, list]) -> None: ...
+    def columns_for(self, fields: list[str]) -> list[str]: ...
+    def flatten(self, resource: dict) -> dict: ...
+    def flatten_row(self, row: dict) -> dict: ...
@@ -0,0 +1,135 @@
+"""
+What to write besides the CSVs, & how.
+
+Needs nothing but the standard library, so it can be read from the config file
+& checked before anything imports pyarrow.
+"""
+import importlib.util
+import os
+from collections import namedtuple
+
+from src.getmyapidata.compressed_files import (check_compression,
+                                               uncompressed_filename)
+
+# Columnar formats we can write alongside the CSVs -> their file extensions.
+# Feather is the Arrow IPC file format, which can be memory-mapped.
+COLUMNAR_FORMATS: dict = {"feather": ".feather", "parquet": ".parquet"}
+
+# Parquet compression codecs pyarrow understands.
+PARQUET_COMPRESSIONS: tuple = ("brotli", "gzip", "lz4", "none", "snappy", "zstd")
+
+DEFAULT_PARQUET_COMPRESSION: str = "zstd"
+
+# Rows per Parquet row group & Feather record batch.
+ROW_GROUP_SIZE: int = 100000
+
+# formats: columnar formats to write as well as the CSV, e.g. ("parquet",)
+# parquet_compression: one of PARQUET_COMPRESSIONS
+# row_group_size: rows per Parquet row group (& Feather record batch)
+# compression: how to compress the CSVs: "none" or one of compressed_files.COMPRESSIONS
+# partition_by: columns to also write the participant lists partitioned by, e.g.
+#   ("organization", "withdrawalStatus"); see partitioned_output
+OutputOptions = namedtuple(
+    "OutputOptions",
+    ["formats", "parquet_compression", "row_group_size", "compression", "partition_by"],
+    defaults=((), DEFAULT_PARQUET_COMPRESSION, ROW_GROUP_SIZE, "none", ()),
+)
+
+
+def check_options(options: OutputOptions) -> None:
+    """
+    Raises an error if the options can't be used here.
+
+    Parameters
+    ----------
+    options: OutputOptions
+    """
+    unknown: list[str] = [fmt for fmt in options.formats if fmt not in COLUMNAR_FORMATS]
+
+    if unknown:
+        raise ValueError(
+            f"Unknown output formats {unknown}; use {', '.join(COLUMNAR_FORMATS)}."
+        )
+
+    if options.parquet_compression not in PARQUET_COMPRESSIONS:
+        raise ValueError(
+            f"Unknown Parquet compression '{options.parquet_compression}'; "
+            f"use one of {', '.join(PARQUET_COMPRESSIONS)}."
+        )
+
+    if options.row_group_size < 1:
+        raise ValueError("Row groups need at least one row.")
+
+    check_compression(options.compression)
+
+    if len(set(options.partition_by)) != len(options.partition_by):
+        raise ValueError("Can't partition by the same column twice.")
+
+    if options.formats and importlib.util.find_spec("pyarrow") is None:
+        raise RuntimeError(
+            f"Writing {', '.join(options.formats)} files needs pyarrow: pip install pyarrow"
+        )
+
+
+def columnar_filename(csv_filename: str, fmt: str) -> str:
+    """
+    Where to write a CSV's data in a columnar format: next to it, with the format's extension.
+
+    Parameters
+    ----------
+    csv_filename: str           Compressed or not
+    fmt: str                    One of COLUMNAR_FORMATS
+
+    Returns
+    -------
+    filename: str
+    """
+    return (
+        os.path.splitext(uncompressed_filename(csv_filename))[0] + COLUMNAR_FORMATS[fmt]
+    )
+
+
+def parse_columns(text: str) -> tuple:
+    """
+    Reads a list of column names from the config file, e.g. "organization, withdrawalStatus".
+
+    Parameters
+    ----------
+    text: str
+
+    Returns
+    -------
+    columns: tuple              In order, without duplicates; case matters
+    """
+    columns: list[str] = []
+
+    for column in text.replace(";", ",").split(","):
+        column = column.strip()
+
+        if column and column not in columns:
+            columns.append(column)
+
+    return tuple(columns)
+
+
+def parse_formats(text: str) -> tuple:
+    """
+    Reads a list of formats from the config file, e.g. "parquet, feather".
+
+    Parameters
+    ----------
+    text: str
+
+    Returns
+    -------
+    formats: tuple              Lower case, without duplicates or "csv" (always written)
+    """
+    formats: list[str] = []
+
+    for fmt in text.replace(";", ",").split(","):
+        fmt = fmt.strip().lower()
+
+        if fmt and fmt != "csv" and fmt not in formats:
+            formats.append(fmt)
+
+    return tuple(formats)
@@ -0,0 +1,16 @@
+from collections import namedtuple
+
+COLUMNAR_FORMATS: dict
+DEFAULT_PARQUET_COMPRESSION: str
+PARQUET_COMPRESSIONS: tuple
+ROW_GROUP_SIZE: int
+
+OutputOptions = namedtuple(
+    "OutputOptions",
+    ["formats", "parquet_compression", "row_group_size", "compression", "partition_by"],
+)
+
+def check_options(options: OutputOptions) -> None: ...
+def columnar_filename(csv_filename: str, fmt: str) -> str: ...
+def parse_columns(text: str) -> tuple: ...
+def parse_formats(text: str) -> tuple: ...
@@ -0,0 +1,379 @@
+"""
+Contains class ParticipantIndex, which finds a participant's row in a CSV without reading it.
+
+Each uncompressed CSV the app writes gets an index file next to it ("<name>.csv.idx"):
+a header, then one fixed-width record per row, sorted by participant ID,
+holding the row's byte offset & length. The index is memory-mapped
+& binary-searched, so a lookup reads a few pages of it & one row of the CSV.
+
+Indexes remember the size & modification time of the CSV they were built from,
+so update_indexes only rebuilds those whose CSVs have changed.
+Compressed CSVs can't be read from the middle, so they aren't indexed;
+lookup reads through them instead.
+"""
+import bisect
+import csv
+import io
+import logging
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+from typing import Union
+
+from src.getmyapidata.common import atomic_write
+from src.getmyapidata.compressed_files import (compression_of, csv_files,
+                                               open_text)
+from src.getmyapidata.healthpro_mapping import KEY_COLUMN
+
+# Columns holding the participant ID: InSite's & HealthPro's.
+KEY_COLUMNS: tuple = ("participantId", KEY_COLUMN)
+
+INDEX_EXTENSION: str = ".idx"
+
+# Magic, CSV size, CSV modification time (ns), records, key width.
+HEADER: struct.Struct = struct.Struct("<8sQqII")
+INDEX_MAGIC: bytes = b"GMADIDX1"
+
+# After each key: the row's offset & length in the CSV.
+RECORD: struct.Struct = struct.Struct("<QI")
+
+
+class ParticipantIndex:
+    """
+    A memory-mapped index of one CSV. A context manager.
+
+    Attributes
+    ----------
+    csv_size: int
+    csv_mtime_ns: int
+
+    Methods
+    -------
+    close() -> None
+    find(participant_id: str) -> list[tuple]
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Instantiate a ParticipantIndex object.
+
+        Parameters
+        ----------
+        filename: str               The index file
+        """
+        with open(filename, "rb") as file:
+            self.__map: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (
+                magic,
+                self.csv_size,
+                self.csv_mtime_ns,
+                self.__count,
+                self.__width,
+            ) = HEADER.unpack_from(self.__map)
+        except struct.error as e:
+            self.__map.close()
+            raise RuntimeError(f"'{filename}' isn't a participant index.") from e
+
+        if magic != INDEX_MAGIC:
+            self.__map.close()
+            raise RuntimeError(f"'{filename}' isn't a participant index.")
+
+        self.__record_size: int = self.__width + RECORD.size
+
+    def __enter__(self) -> "ParticipantIndex":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.close()
+        return False
+
+    def __getitem__(self, position: int) -> bytes:
+        """
+        The key of the record at a position, as bisect needs.
+
+        Parameters
+        ----------
+        position: int
+
+        Returns
+        -------
+        key: bytes                  Padded with NULs to the key width
+        """
+        start: int = HEADER.size + position * self.__record_size
+        return self.__map[start : start + self.__width]
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def close(self) -> None:
+        """
+        Lets go of the mapping.
+        """
+        self.__map.close()
+
+    def find(self, participant_id: str) -> list[tuple]:
+        """
+        Where a participant's rows are.
+
+        Parameters
+        ----------
+        participant_id: str
+
+        Returns
+        -------
+        rows: list[tuple]           (offset, length) in the CSV; none if they aren't in it
+        """
+        key: bytes = participant_id.encode("utf-8")
+
+        if len(key) > self.__width:
+            return []
+
+        key = key.ljust(self.__width, b"\0")
+        rows: list[tuple] = []
+        position: int = bisect.bisect_left(self, key)
+
+        while position < self.__count and self[position] == key:
+            rows.append(
+                RECORD.unpack_from(
+                    self.__map,
+                    HEADER.size + position * self.__record_size + self.__width,
+                )
+            )
+            position += 1
+
+        return rows
+
+
+def build_index(csv_filename: str) -> int:
+    """
+    Indexes an uncompressed CSV by its participant ID column.
+
+    Parameters
+    ----------
+    csv_filename: str
+
+    Returns
+    -------
+    rows: int                   Rows indexed
+    """
+    status: os.stat_result = os.stat(csv_filename)
+    records: list[tuple] = []
+
+    with open(csv_filename, "rb") as file:
+        rows: Iterator[tuple] = rows_with_offsets(file)
+        header: list[str] = next(rows, (None, None, []))[2]
+        key_position: Union[int, None] = next(
+            (header.index(column) for column in KEY_COLUMNS if column in header), None
+        )
+
+        if key_position is None:
+            raise RuntimeError(f"'{csv_filename}' has no participant ID column.")
+
+        for offset, length, row in rows:
+            if len(row) > key_position and row[key_position]:
+                records.append((row[key_position].encode("utf-8"), offset, length))
+
+    records.sort()
+    width: int = max((len(key) for key, _, _ in records), default=0)
+
+    with atomic_write(index_filename(csv_filename), "wb") as file:
+        file.write(
+            HEADER.pack(
+                INDEX_MAGIC, status.st_size, status.st_mtime_ns, len(records), width
+            )
+        )
+        file.write(
+            b"".join(
+                key.ljust(width, b"\0") + RECORD.pack(offset, length)
+                for key, offset, length in records
+            )
+        )
+
+    return len(records)
+
+
+def index_filename(csv_filename: str) -> str:
+    """
+    Where a CSV's index goes: next to it.
+
+    Parameters
+    ----------
+    csv_filename: str
+
+    Returns
+    -------
+    filename: str
+    """
+    return csv_filename + INDEX_EXTENSION
+
+
+def is_current(csv_filename: str) -> bool:
+    """
+    Was the CSV's index built from the CSV as it is now?
+
+    Parameters
+    ----------
+    csv_filename: str
+
+    Returns
+    -------
+    current: bool
+    """
+    try:
+        status: os.stat_result = os.stat(csv_filename)
+
+        with ParticipantIndex(index_filename(csv_filename)) as index:
+            return (index.csv_size, index.csv_mtime_ns) == (
+                status.st_size,
+                status.st_mtime_ns,
+            )
+    except (OSError, RuntimeError, ValueError):
+        # Missing, unreadable or empty.
+        return False
+
+
+def lookup(data_directory: str, participant_id: str) -> list[tuple]:
+    """
+    A participant's rows in every CSV in a directory.
+    Indexes that are missing or out of date are built first.
+
+    Parameters
+    ----------
+    data_directory: str
+    participant_id: str
+
+    Returns
+    -------
+    rows: list[tuple]           (CSV file name, {column: value})
+    """
+    found: list[tuple] = []
+
+    for csv_filename in csv_files(os.path.join(data_directory, "*")):
+        if compression_of(csv_filename) != "none":
+            found.extend(
+                (csv_filename, row) for row in scan(csv_filename, participant_id)
+            )
+            continue
+
+        if not is_current(csv_filename):
+            try:
+                build_index(csv_filename)
+            except RuntimeError:
+                # Not participant data.
+                continue
+
+        with ParticipantIndex(index_filename(csv_filename)) as index:
+            places: list[tuple] = index.find(participant_id)
+
+        if not places:
+            continue
+
+        with open(csv_filename, "rb") as file:
+            header: list[str] = next(rows_with_offsets(file))[2]
+
+            for offset, length in places:
+                file.seek(offset)
+                text: str = file.read(length).decode("utf-8")
+                row: list[str] = next(csv.reader(io.StringIO(text, newline="")))
+                found.append((csv_filename, dict(zip(header, row))))
+
+    return found
+
+
+def rows_with_offsets(file) -> Iterator[tuple]:
+    """
+    Reads a CSV, giving where each row starts & how long it is in bytes.
+    Rows can span lines, where a value has a line break in it.
+
+    Parameters
+    ----------
+    file: IO[bytes]             Opened in binary, at the start
+
+    Returns
+    -------
+    Iterator[tuple]             (offset, length, row)
+    """
+    # Where the lines the reader's taken so far end.
+    end: list[int] = [0]
+
+    def lines() -> Iterator[str]:
+        for number, line in enumerate(file):
+            end[0] += len(line)
+            yield line.decode("utf-8-sig" if number == 0 else "utf-8")
+
+    start: int = 0
+
+    # The reader takes every line of a row & none of the next before giving it.
+    for row in csv.reader(lines()):
+        yield start, end[0] - start, row
+        start = end[0]
+
+
+def scan(csv_filename: str, participant_id: str) -> Iterator[dict]:
+    """
+    A participant's rows in a CSV, reading all of it.
+
+    Parameters
+    ----------
+    csv_filename: str           Compressed or not
+    participant_id: str
+
+    Returns
+    -------
+    Iterator[dict]              {column: value}
+    """
+    with open_text(csv_filename) as file:
+        reader: csv.DictReader = csv.DictReader(file)
+        columns: list[str] = [
+            column for column in KEY_COLUMNS if column in (reader.fieldnames or [])
+        ]
+
+        if not columns:
+            return
+
+        for row in reader:
+            if row[columns[0]] == participant_id:
+                yield row
+
+
+def update_indexes(data_directory: str, log: logging.Logger) -> int:
+    """
+    Builds indexes for the CSVs in a directory that haven't got a current one,
+    & removes those whose CSVs have gone.
+
+    Parameters
+    ----------
+    data_directory: str
+    log: logging.Logger
+
+    Returns
+    -------
+    built: int                  Indexes built
+    """
+    built: int = 0
+
+    for csv_filename in csv_files(os.path.join(data_directory, "*")):
+        if compression_of(csv_filename) != "none" or is_current(csv_filename):
+            continue
+
+        try:
+            rows: int = build_index(csv_filename)
+        except RuntimeError as e:
+            log.info("Not indexing '%s': %s", csv_filename, e)
+            continue
+
+        log.info("Indexed %d participants in '%s'.", rows, csv_filename)
+        built += 1
+
+    for filename in os.listdir(data_directory):
+        path: str = os.path.join(data_directory, filename)
+
+        if filename.endswith(".csv" + INDEX_EXTENSION) and not os.path.isfile(
+            path[: -len(INDEX_EXTENSION)]
+        ):
+            os.remove(path)
+
+    return built
@@ -0,0 +1,33 @@
+import logging
+import mmap
+import struct
+from collections.abc import Iterator
+
+HEADER: struct.Struct
+INDEX_EXTENSION: str
+INDEX_MAGIC: bytes
+KEY_COLUMNS: tuple
+RECORD: struct.Struct
+
+class ParticipantIndex:
+    csv_size: int
+    csv_mtime_ns: int
+    def __init__(self, filename: str) -> None:
+        self.__map: mmap.mmap = None
+        self.__count: int = None
+        self.__width: int = None
+        self.__record_size: int = None
+    def __enter__(self) -> ParticipantIndex: ...
+    def __exit__(self, exc_type, exc_value, traceback) -> bool: ...
+    def __getitem__(self, position: int) -> bytes: ...
+    def __len__(self) -> int: ...
+    def close(self) -> None: ...
+    def find(self, participant_id: str) -> list[tuple]: ...
+
+def build_index(csv_filename: str) -> int: ...
+def index_filename(csv_filename: str) -> str: ...
+def is_current(csv_filename: str) -> bool: ...
+def lookup(data_directory: str, participant_id: str) -> list[tuple]: ...
+def rows_with_offsets(file) -> Iterator[tuple]: ...
+def scan(csv_filename: str, participant_id: str) -> Iterator[dict]: ...
+def update_indexes(data_directory: str, log: logging.Logger) -> int: ...
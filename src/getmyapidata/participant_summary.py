@@ -0,0 +1,349 @@
+"""
+Contains class ParticipantSummary, which counts participants by organization, consent,
+withdrawal, deactivation, patient status & how recently EHR data last arrived.
+
+The counts are kept up to date as InSiteAPI takes each participant (& takes back
+the old version of one that's changed), so they cost nothing extra to report:
+the summary's written with the participant lists, to the "summary" subdirectory.
+"""
+import csv
+import datetime
+import json
+import os
+from collections import Counter
+from typing import Union
+
+from src.getmyapidata.common import atomic_write
+from src.getmyapidata.nested_fields import PATIENT_STATUS_COLUMNS
+
+# A subdirectory, so the converter's search for CSVs never picks the summary up.
+SUMMARY_DIRECTORY: str = "summary"
+SUMMARY_FILENAME: str = "participant_summary"
+
+# What to count, by resource field.
+SUMMARY_FIELDS: tuple = (
+    "consentForStudyEnrollment",
+    "consentForElectronicHealthRecords",
+    "withdrawalStatus",
+    "deactivationStatus",
+)
+
+# Counted under this when a participant hasn't got a value.
+BLANK: str = "(blank)"
+
+# When EHR data last arrived.
+EHR_FIELD: str = "latestEhrReceiptTime"
+EHR_RECENCY: str = "ehrReceipt"
+NEVER: str = "never"
+
+# Upper bounds (in days) of the EHR recency bands; older than the last is its own band.
+RECENCY_DAYS: tuple = (30, 90, 365)
+
+# The organization column of the CSV for every organization together.
+ALL_ORGANIZATIONS: str = "ALL"
+
+
+def format_summary(summary: dict) -> str:
+    """
+    The overall counts as text, for the console or a dialog.
+
+    Parameters
+    ----------
+    summary: dict               As ParticipantSummary.as_dict gives it
+
+    Returns
+    -------
+    text: str
+    """
+    lines: list[str] = [
+        f"Participants: {summary['participants']} (as of {summary['as_of']})",
+        "",
+    ]
+    sections: list[tuple] = [("organization", summary["organizations"])] + list(
+        summary["counts"].items()
+    )
+
+    for title, values in sections:
+        lines.append(f"By {title}:")
+        width: int = max((len(value) for value in values), default=0)
+        lines.extend(
+            f"  {value:<{width}}  {participants:>8}"
+            for value, participants in sorted(
+                values.items(), key=lambda item: (-item[1], item[0])
+            )
+        )
+        lines.append("")
+
+    return "\n".join(lines).rstrip("\n")
+
+
+def read_summary(data_directory: str) -> Union[dict, None]:
+    """
+    The summary last written to a data directory.
+
+    Parameters
+    ----------
+    data_directory: str
+
+    Returns
+    -------
+    summary: dict or None if there isn't one
+    """
+    try:
+        with open(
+            os.path.join(data_directory, SUMMARY_DIRECTORY, SUMMARY_FILENAME + ".json"),
+            "r",
+            encoding="utf-8",
+        ) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def recency_band(days: int) -> str:
+    """
+    Which EHR recency band a number of days falls in.
+
+    Parameters
+    ----------
+    days: int                   Since EHR data last arrived
+
+    Returns
+    -------
+    band: str                   e.g. "31-90 days"
+    """
+    lower: int = 0
+
+    for upper in RECENCY_DAYS:
+        if days <= upper:
+            return f"{lower}-{upper} days"
+
+        lower = upper + 1
+
+    return f"over {RECENCY_DAYS[-1]} days"
+
+
+def value_of(resource: dict, field: str) -> str:
+    """
+    A field's value as it's counted.
+
+    Parameters
+    ----------
+    resource: dict
+    field: str
+
+    Returns
+    -------
+    value: str                  BLANK if it hasn't got one
+    """
+    value = resource.get(field)
+    return BLANK if value is None or value == "" else str(value)
+
+
+class ParticipantSummary:
+    """
+    Participant counts, kept up to date one participant at a time.
+
+    Attributes
+    ----------
+    participants: int
+
+    Methods
+    -------
+    add(resource: dict) -> None
+    as_dict(today: datetime.date = None) -> dict
+    clear() -> None
+    remove(resource: dict) -> None
+    write(data_directory: str, today: datetime.date = None) -> str
+    """
+
+    def __init__(self) -> None:
+        """
+        Instantiate a ParticipantSummary object.
+        """
+        self.participants: int = 0
+
+        # organization -> participants
+        self.__organizations: Counter = Counter()
+
+        # (organization, field, value) -> participants
+        self.__counts: Counter = Counter()
+
+        # (organization, date EHR data last arrived or "") -> participants.
+        # Kept as dates, not bands, so the bands are right whenever they're reported.
+        self.__ehr_dates: Counter = Counter()
+
+    def add(self, resource: dict) -> None:
+        """
+        Counts a participant.
+
+        Parameters
+        ----------
+        resource: dict              After flattening, with its organization filled in
+        """
+        self.__count(resource, 1)
+
+    def as_dict(self, today: datetime.date = None) -> dict:
+        """
+        The counts, overall & by organization.
+
+        Parameters
+        ----------
+        today: datetime.date        Optional; what the EHR recency is measured from
+
+        Returns
+        -------
+        summary: dict               {"as_of", "participants", "organizations",
+                                     "counts": {field: {value: participants}},
+                                     "by_organization":
+                                         {organization: {field: {value: participants}}}}
+        """
+        today = today or datetime.date.today()
+        by_organization: dict = {
+            organization: {} for organization in sorted(self.__organizations)
+        }
+        counts: dict = {}
+
+        for (organization, field, value), participants in sorted(self.__counts.items()):
+            if participants:
+                for target in [counts, by_organization[organization]]:
+                    values: dict = target.setdefault(field, {})
+                    values[value] = values.get(value, 0) + participants
+
+        for (organization, date), participants in self.__ehr_dates.items():
+            if participants:
+                band: str = self.__band(date, today)
+
+                for target in [counts, by_organization[organization]]:
+                    values = target.setdefault(EHR_RECENCY, {})
+                    values[band] = values.get(band, 0) + participants
+
+        return {
+            "as_of": today.isoformat(),
+            "by_organization": {
+                organization: fields
+                for organization, fields in by_organization.items()
+                if self.__organizations[organization]
+            },
+            "counts": counts,
+            "organizations": {
+                organization: participants
+                for organization, participants in sorted(self.__organizations.items())
+                if participants
+            },
+            "participants": self.participants,
+        }
+
+    @staticmethod
+    def __band(date: str, today: datetime.date) -> str:
+        """
+        EHR recency band for the date EHR data last arrived.
+
+        Parameters
+        ----------
+        date: str                   "YYYY-MM-DD", or "" if it never has
+        today: datetime.date
+
+        Returns
+        -------
+        band: str
+        """
+        try:
+            received: datetime.date = datetime.date.fromisoformat(date)
+        except ValueError:
+            return NEVER
+
+        return recency_band(max((today - received).days, 0))
+
+    def clear(self) -> None:
+        """
+        Forgets every participant.
+        """
+        self.participants = 0
+        self.__organizations.clear()
+        self.__counts.clear()
+        self.__ehr_dates.clear()
+
+    def __count(self, resource: dict, change: int) -> None:
+        """
+        Adds a participant to the counts, or takes them away.
+
+        Parameters
+        ----------
+        resource: dict
+        change: int                 1 or -1
+        """
+        organization: str = str(resource.get("organization") or BLANK)
+        self.participants += change
+        self.__organizations[organization] += change
+
+        for field in SUMMARY_FIELDS:
+            self.__counts[(organization, field, value_of(resource, field))] += change
+
+        statuses: list[str] = [
+            status
+            for status, column in PATIENT_STATUS_COLUMNS.items()
+            if resource.get(column)
+        ]
+
+        for status in statuses or [BLANK]:
+            self.__counts[(organization, "patientStatus", status)] += change
+
+        self.__ehr_dates[
+            (organization, str(resource.get(EHR_FIELD) or "")[:10])
+        ] += change
+
+    def remove(self, resource: dict) -> None:
+        """
+        Takes a participant back out of the counts, e.g. when a newer version arrives.
+
+        Parameters
+        ----------
+        resource: dict              As it was given to add()
+        """
+        self.__count(resource, -1)
+
+    def write(self, data_directory: str, today: datetime.date = None) -> str:
+        """
+        Writes the summary as JSON & as CSV (organization, field, value, participants).
+
+        Parameters
+        ----------
+        data_directory: str
+        today: datetime.date        Optional; what the EHR recency is measured from
+
+        Returns
+        -------
+        filename: str               Of the JSON; the CSV's next to it
+        """
+        summary: dict = self.as_dict(today)
+        directory: str = os.path.join(data_directory, SUMMARY_DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        json_filename: str = os.path.join(directory, SUMMARY_FILENAME + ".json")
+
+        with atomic_write(json_filename, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2, sort_keys=True)
+
+        with atomic_write(
+            os.path.join(directory, SUMMARY_FILENAME + ".csv"),
+            "w",
+            newline="",
+            encoding="utf-8",
+        ) as file:
+            writer = csv.writer(file)
+            writer.writerow(["organization", "field", "value", "participants"])
+            writer.writerow(
+                [ALL_ORGANIZATIONS, "participants", "", summary["participants"]]
+            )
+
+            for organization, participants in summary["organizations"].items():
+                writer.writerow([organization, "participants", "", participants])
+
+            for organization, fields in [(ALL_ORGANIZATIONS, summary["counts"])] + list(
+                summary["by_organization"].items()
+            ):
+                for field, values in fields.items():
+                    for value, participants in values.items():
+                        writer.writerow([organization, field, value, participants])
+
+        return json_filename
@@ -0,0 +1,33 @@
+import datetime
+from collections import Counter
+from typing import Union
+
+ALL_ORGANIZATIONS: str
+BLANK: str
+EHR_FIELD: str
+EHR_RECENCY: str
+NEVER: str
+RECENCY_DAYS: tuple
+SUMMARY_DIRECTORY: str
+SUMMARY_FIELDS: tuple
+SUMMARY_FILENAME: str
+
+def format_summary(summary: dict) -> str: ...
+def read_summary(data_directory: str) -> Union[dict, None]: ...
+def recency_band(days: int) -> str: ...
+def value_of(resource: dict, field: str) -> str: ...
+
+class ParticipantSummary:
+    participants: int
+    def __init__(self) -> None:
+        self.__organizations: Counter = None
+        self.__counts: Counter = None
+        self.__ehr_dates: Counter = None
+    def add(self, resource: dict) -> None: ...
+    def as_dict(self, today: datetime.date = None) -> dict: ...
+    @staticmethod
+    def __band(date: str, today: datetime.date) -> str: ...
+    def clear(self) -> None: ...
+    def __count(self, resource: dict, change: int) -> None: ...
+    def remove(self, resource: dict) -> None: ...
+    def write(self, data_directory: str, today: datetime.date = None) -> str: ...
@@ -0,0 +1,258 @@
+"""
+Contains class PartitionedOutput, which writes the participant lists a second time,
+split Hive-style by the values of some columns:
+
+    partitioned/organization=X/withdrawalStatus=Y/part-0000.csv
+
+so a reader (e.g. pyarrow.dataset with partitioning="hive") can skip the partitions it
+doesn't want. As Hive does, the partition columns are left out of the files themselves.
+Rows are written to their partitions as the flat files are written, not afterwards.
+
+A manifest (partitioned/_manifest.json) lists every partition, its files & rows.
+"""
+import csv
+import json
+import logging
+import os
+import urllib.parse
+from contextlib import ExitStack
+from typing import Union
+
+from src.getmyapidata.common import atomic_write
+from src.getmyapidata.compressed_files import compressed_filename, open_output
+from src.getmyapidata.output_options import OutputOptions, columnar_filename
+
+# Under the data directory; a subdirectory, so the converter never picks up the parts.
+PARTITION_DIRECTORY: str = "partitioned"
+
+MANIFEST_FILENAME: str = "_manifest.json"
+
+# Hive's name for the partition holding rows without a value.
+DEFAULT_PARTITION: str = "__HIVE_DEFAULT_PARTITION__"
+
+# Each partition's one file (per format) from a run.
+PART_FILENAME: str = "part-0000.csv"
+
+
+def partition_path(columns: tuple, values: tuple) -> str:
+    """
+    A partition's directory, relative to the partition root.
+
+    Parameters
+    ----------
+    columns: tuple
+    values: tuple               One per column; empty or None for DEFAULT_PARTITION
+
+    Returns
+    -------
+    path: str                   e.g. "organization=X/withdrawalStatus=Y"
+    """
+    return "/".join(
+        f"{column}="
+        + (urllib.parse.quote(str(value), safe="") if value else DEFAULT_PARTITION)
+        for column, value in zip(columns, values)
+    )
+
+
+# pylint: disable=too-many-instance-attributes
+class PartitionedOutput:
+    """
+    Takes the rows of the participant lists & writes each to its partition.
+    A context manager: the manifest's written & out-of-date parts removed when it's closed.
+
+    Attributes
+    ----------
+    root: str
+
+    Methods
+    -------
+    close() -> None
+    close_partitions() -> None
+    write_row(row: list) -> None
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        data_directory: str,
+        header: list[str],
+        options: OutputOptions,
+        log: logging.Logger,
+        sizes: dict = None,
+    ) -> None:
+        """
+        Instantiate a PartitionedOutput object.
+
+        Parameters
+        ----------
+        data_directory: str
+        header: list[str]           Columns of the rows to be written
+        options: OutputOptions      partition_by, compression & columnar formats
+        log: logging.Logger
+        sizes: dict                 Optional; as for compressed_files.open_output
+        """
+        self.root: str = os.path.join(data_directory, PARTITION_DIRECTORY)
+        self.__options: OutputOptions = options
+        self.__log: logging.Logger = log
+        self.__sizes: Union[dict, None] = sizes
+        self.__columns: tuple = options.partition_by
+        self.__positions: list = [
+            header.index(column) if column in header else None
+            for column in self.__columns
+        ]
+        self.__kept: list[int] = [
+            i for i, column in enumerate(header) if column not in self.__columns
+        ]
+        self.__header: list[str] = [header[i] for i in self.__kept]
+
+        # Partition path -> (ExitStack, csv.writer, columnar writers) while it's open.
+        self.__open: dict = {}
+
+        # Partition path -> {"files", "rows", "values"}
+        self.__partitions: dict = {}
+
+    def __enter__(self) -> "PartitionedOutput":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        if exc_type is None:
+            self.close()
+        else:
+            # Leave the last complete set of partitions as it was.
+            for stack, _, _ in self.__open.values():
+                stack.__exit__(exc_type, exc_value, traceback)
+
+            self.__open = {}
+
+        return False
+
+    def close(self) -> None:
+        """
+        Finishes the open partitions, writes the manifest & removes parts
+        left from earlier runs in partitions that are now empty.
+        """
+        self.close_partitions()
+        manifest: dict = {
+            "columns": self.__header,
+            "partition_by": list(self.__columns),
+            "partitions": [
+                {"path": path, **self.__partitions[path]}
+                for path in sorted(self.__partitions)
+            ],
+        }
+
+        with atomic_write(
+            os.path.join(self.root, MANIFEST_FILENAME), "w", encoding="utf-8"
+        ) as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+
+        self.__remove_stale()
+
+    def close_partitions(self) -> None:
+        """
+        Finishes the partitions written so far. Call between organizations
+        when partitioning by organization, so only one organization's files are open.
+        A partition written to again after this is overwritten.
+        """
+        for stack, _, _ in self.__open.values():
+            stack.close()
+
+        self.__open = {}
+
+    def __open_partition(self, path: str, values: tuple) -> tuple:
+        """
+        Opens a partition's CSV & columnar files.
+
+        Parameters
+        ----------
+        path: str
+        values: tuple
+
+        Returns
+        -------
+        (stack, writer, columnar writers): tuple
+        """
+        csv_filename: str = compressed_filename(
+            os.path.join(self.root, *path.split("/"), PART_FILENAME),
+            self.__options.compression,
+        )
+        os.makedirs(os.path.dirname(csv_filename), exist_ok=True)
+        stack: ExitStack = ExitStack()
+
+        try:
+            columnar_writers: list = []
+
+            if self.__options.formats:
+                # Only import pyarrow when it's needed.
+                # pylint: disable=import-outside-toplevel
+                from src.getmyapidata.columnar_output import open_writers
+
+                columnar_writers = open_writers(
+                    stack, csv_filename, self.__header, self.__options, self.__log
+                )
+
+            file = stack.enter_context(open_output(csv_filename, self.__sizes))
+            writer: csv.writer = csv.writer(file)
+            writer.writerow(self.__header)
+        except BaseException:
+            stack.close()
+            raise
+
+        self.__partitions[path] = {
+            "files": [os.path.basename(csv_filename)]
+            + [
+                os.path.basename(columnar_filename(csv_filename, fmt))
+                for fmt in self.__options.formats
+            ],
+            "rows": 0,
+            "values": {
+                column: value or None for column, value in zip(self.__columns, values)
+            },
+        }
+        return stack, writer, columnar_writers
+
+    def __remove_stale(self) -> None:
+        """
+        Removes files the manifest doesn't list & the directories left empty.
+        """
+        for directory, _, filenames in os.walk(self.root, topdown=False):
+            path: str = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            current: list[str] = self.__partitions.get(path, {}).get("files", [])
+
+            for filename in filenames:
+                if filename not in current and filename != MANIFEST_FILENAME:
+                    self.__log.info(
+                        "Removing old partition file '%s'.",
+                        os.path.join(directory, filename),
+                    )
+                    os.remove(os.path.join(directory, filename))
+
+            if directory != self.root and not os.listdir(directory):
+                os.rmdir(directory)
+
+    def write_row(self, row: list) -> None:
+        """
+        Writes a row to its partition.
+
+        Parameters
+        ----------
+        row: list                   A value per header column
+        """
+        values: tuple = tuple(
+            row[position] if position is not None and position < len(row) else None
+            for position in self.__positions
+        )
+        path: str = partition_path(self.__columns, values)
+        partition: Union[tuple, None] = self.__open.get(path)
+
+        if partition is None:
+            partition = self.__open_partition(path, values)
+            self.__open[path] = partition
+
+        kept: list = [row[i] if i < len(row) else None for i in self.__kept]
+        partition[1].writerow(kept)
+
+        for columnar_writer in partition[2]:
+            columnar_writer.write_row(kept)
+
+        self.__partitions[path]["rows"] += 1
@@ -0,0 +1,38 @@
+import logging
+from typing import Union
+
+from src.getmyapidata.output_options import OutputOptions
+
+DEFAULT_PARTITION: str
+MANIFEST_FILENAME: str
+PARTITION_DIRECTORY: str
+PART_FILENAME: str
+
+def partition_path(columns: tuple, values: tuple) -> str: ...
+
+class PartitionedOutput:
+    root: str
+    def __init__(
+        self,
+        data_directory: str,
+        header: list[str],
+        options: OutputOptions,
+        log: logging.Logger,
+        sizes: dict = None,
+    ) -> None:
+        self.__options: OutputOptions = None
+        self.__log: logging.Logger = None
+        self.__sizes: Union[dict, None] = None
+        self.__columns: tuple = None
+        self.__positions: list = None
+        self.__kept: list[int] = None
+        self.__header: list[str] = None
+        self.__open: dict = None
+        self.__partitions: dict = None
+    def __enter__(self) -> PartitionedOutput: ...
+    def __exit__(self, exc_type, exc_value, traceback) -> bool: ...
+    def close(self) -> None: ...
+    def close_partitions(self) -> None: ...
+    def __open_partition(self, path: str, values: tuple) -> tuple: ...
+    def __remove_stale(self) -> None: ...
+    def write_row(self, row: list) -> None: ...
@@ -0,0 +1,55 @@
+"""
+Contains class StartupChecks, which runs the slow start-up lookups in the background
+while the splash screen is showing.
+"""
+import logging
+import threading
+from typing import Union
+
+from src.getmyapidata.common import get_exe_version
+from src.getmyapidata.gcloud_tools import gcloud_tools_installed
+
+
+class StartupChecks(threading.Thread):
+    """
+    Checks that gcloud is installed & finds the app's version, without blocking the GUI.
+
+    Attributes
+    ----------
+    gcloud_installed: bool      None until known, or if the check failed
+    version: str                None until known, or if the lookup failed
+    """
+
+    def __init__(self, log: logging.Logger) -> None:
+        """
+        Instantiate a StartupChecks object.
+
+        Parameters
+        ----------
+        log: logging.Logger
+        """
+        threading.Thread.__init__(self, daemon=True)
+        self.__log: logging.Logger = log
+        self.gcloud_installed: Union[bool, None] = None
+        self.version: Union[str, None] = None
+
+    def run(self) -> None:
+        """
+        Performs the checks. One that fails is left as None, for ApiGui to try itself.
+        """
+        # pylint: disable=broad-exception-caught
+        try:
+            self.gcloud_installed = gcloud_tools_installed()
+        except Exception:
+            self.__log.exception("Unable to check whether gcloud is installed.")
+
+        try:
+            self.version = get_exe_version(self.__log)
+        except Exception:
+            self.__log.exception("Unable to look up the version.")
+
+        self.__log.debug(
+            "Startup checks: gcloud installed %s, version %s.",
+            self.gcloud_installed,
+            self.version,
+        )
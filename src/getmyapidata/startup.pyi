@@ -0,0 +1,10 @@
+import logging
+import threading
+from typing import Union
+
+class StartupChecks(threading.Thread):
+    def __init__(self, log: logging.Logger) -> None:
+        self.__log: logging.Logger = None
+        self.gcloud_installed: Union[bool, None] = None
+        self.version: Union[str, None] = None
+    def run(self) -> None: ...
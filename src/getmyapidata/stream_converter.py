@@ -0,0 +1,308 @@
+"""
+A HealthPro converter that needs only the standard library.
+
+It reads the participant list a row at a time with the csv module & writes each row
+as soon as it's converted, so it starts quickly & uses the same (little) memory
+whatever the size of the file. The output's the same as the pandas converter's
+(tests/test_stream_converter.py checks), but it's slower per row, so HealthProConverter
+only uses it for small files & where pandas isn't installed.
+"""
+import csv
+import io
+import logging
+import os
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import ExitStack
+from typing import TextIO
+
+from src.getmyapidata.combined_output import csv_line
+from src.getmyapidata.compressed_files import open_output, open_text
+from src.getmyapidata.healthpro_mapping import (HEALTHPRO_COLUMNS,
+                                                HEALTHPRO_MAPPING, KEY_COLUMN)
+from src.getmyapidata.output_options import OutputOptions
+
+# Converted values each transform remembers before starting again; keeps memory constant.
+MEMO_SIZE: int = 10000
+
+
+# pylint: disable=too-few-public-methods
+class RowConverter:
+    """
+    Applies ColumnMappings to one CSV row at a time, as ConversionPlan does to DataFrames.
+
+    Methods
+    -------
+    __call__(row: list[str]) -> list
+    """
+
+    def __init__(
+        self,
+        mappings: list,
+        target_columns: list[str],
+        source_columns: list[str],
+        log: logging.Logger,
+    ) -> None:
+        """
+        Instantiate a RowConverter object.
+
+        Parameters
+        ----------
+        mappings: list                  ColumnMappings
+        target_columns: list[str]       Output columns, in order; those with no mapping are empty
+        source_columns: list[str]       The input file's columns
+        log: logging.Logger
+        """
+        positions: dict = {name: i for i, name in enumerate(source_columns)}
+        step_numbers: dict = {}
+        target_steps: dict = {}
+
+        # Each step is one (source, transform, default) combination, done once per row
+        # however many targets use it: (source position, function, default, memo).
+        self.__steps: list[tuple] = []
+
+        for mapping in mappings:
+            if mapping.target not in target_columns:
+                raise ValueError(
+                    f"Mapped column '{mapping.target}' missing from the target columns."
+                )
+
+            if mapping.source is None and mapping.default is None:
+                continue
+
+            transform_name: str = (
+                mapping.transform.name if mapping.transform else "copy"
+            )
+            key: tuple = (mapping.source, transform_name, mapping.default)
+
+            if key not in step_numbers:
+                position: int = positions.get(mapping.source)
+
+                if mapping.source is not None and position is None:
+                    log.warning(
+                        "No '%s' column; using '%s'.",
+                        mapping.source,
+                        mapping.default or "",
+                    )
+
+                step_numbers[key] = len(self.__steps)
+                self.__steps.append(
+                    (
+                        position,
+                        mapping.transform.function if mapping.transform else None,
+                        mapping.default,
+                        {},
+                    )
+                )
+
+            target_steps[mapping.target] = step_numbers[key]
+
+        # The step each output column comes from; None to leave it empty.
+        self.__outputs: list = [target_steps.get(column) for column in target_columns]
+
+    def __call__(self, row: list[str]) -> list:
+        """
+        Converts one row.
+
+        Parameters
+        ----------
+        row: list[str]          As the csv module reads it
+
+        Returns
+        -------
+        converted: list         One value (or None) per target column
+        """
+        values: list = []
+
+        for position, function, default, memo in self.__steps:
+            value: str = (
+                row[position] if position is not None and position < len(row) else ""
+            )
+
+            if function is not None:
+                if value in memo:
+                    value = memo[value]
+                else:
+                    if len(memo) >= MEMO_SIZE:
+                        memo.clear()
+
+                    converted: str = function(value)
+                    memo[value] = converted
+                    value = converted
+
+            if default is not None and not value:
+                value = default
+
+            values.append(value)
+
+        return [None if step is None else values[step] for step in self.__outputs]
+
+
+# pylint: disable=unused-argument,too-many-arguments,too-many-positional-arguments
+# pylint: disable=too-many-locals
+def convert_file(
+    source_filename: str,
+    target_filename: str,
+    log: logging.Logger,
+    chunk_size: int = 0,
+    status_fn: Callable = None,
+    engine: str = "stream",
+    collect: Callable = None,
+    output: OutputOptions = None,
+    sizes: dict = None,
+) -> int:
+    """
+    Reads a CSV, applies field conversions, and writes it out as new file, a row at a time.
+    Either file can be compressed; their names say how (see compressed_files).
+
+    Takes the same arguments as convert_to_hp_format.convert_file, so HealthProConverter
+    can run either.
+
+    Parameters
+    ----------
+    source_filename: str
+    target_filename: str
+    log: logging.Logger
+    chunk_size: int             Ignored: this always goes a row at a time.
+    status_fn: Callable         Optional; method to report status.
+    engine: str                 Ignored.
+    collect: Callable           Optional; given lists of (PMI ID, CSV line) as they're written,
+                                for a CombinedOutput.
+    output: OutputOptions       Optional; columnar formats to write too.
+    sizes: dict                 Optional; the CSV's bytes & the bytes written are added to,
+                                as for compressed_files.open_output.
+
+    Returns
+    -------
+    participants: int           How many participants were converted
+    """
+    log.info(
+        "Converting '%s' to '%s' (stream engine).", source_filename, target_filename
+    )
+    participants: int = 0
+
+    if status_fn is not None:
+        status_fn(f"Writing file {target_filename}.")
+
+    # utf-8-sig & skipping blank lines, as pandas.read_csv does.
+    with open_text(source_filename, encoding="utf-8-sig") as source:
+        reader = csv.reader(source)
+        header: list[str] = unique_column_names(next(reader, []))
+        convert_row: RowConverter = RowConverter(
+            HEALTHPRO_MAPPING,
+            HEALTHPRO_COLUMNS,
+            header,
+            log,
+        )
+
+        rows: Iterable[list] = (convert_row(row) for row in reader if row)
+
+        with ExitStack() as stack:
+            if output is not None and output.formats:
+                # Only import pyarrow when it's needed.
+                # pylint: disable=import-outside-toplevel
+                from src.getmyapidata.columnar_output import open_writers
+
+                rows = write_columnar(
+                    rows,
+                    open_writers(
+                        stack, target_filename, HEALTHPRO_COLUMNS, output, log
+                    ),
+                )
+
+            target: TextIO = stack.enter_context(open_output(target_filename, sizes))
+            writer = csv.writer(target, lineterminator=os.linesep)
+            writer.writerow(HEALTHPRO_COLUMNS)
+
+            if collect is None:
+                for converted in rows:
+                    writer.writerow(converted)
+                    participants += 1
+            else:
+                participants = write_and_collect(rows, target, collect)
+
+    return participants
+
+
+def unique_column_names(header: list[str]) -> list[str]:
+    """
+    Column names as pandas.read_csv gives them: blanks named "Unnamed: <n>",
+    duplicates suffixed ".1", ".2", etc.
+
+    Parameters
+    ----------
+    header: list[str]
+
+    Returns
+    -------
+    names: list[str]
+    """
+    names: list[str] = []
+    seen: dict = {}
+
+    for i, name in enumerate(header):
+        name = name or f"Unnamed: {i}"
+
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+
+        seen.setdefault(name, 0)
+        names.append(name)
+
+    return names
+
+
+def write_and_collect(rows: Iterable[list], target: TextIO, collect: Callable) -> int:
+    """
+    Writes converted rows, handing each line to collect as well.
+
+    Parameters
+    ----------
+    rows: Iterable[list]        As RowConverter gives them
+    target: TextIO              Opened with newline=""
+    collect: Callable           Given lists of (PMI ID, CSV line)
+
+    Returns
+    -------
+    participants: int
+    """
+    buffer: io.StringIO = io.StringIO()
+    line_writer = csv.writer(buffer, lineterminator=os.linesep)
+    key_position: int = HEALTHPRO_COLUMNS.index(KEY_COLUMN)
+    lines: list[tuple] = []
+    participants: int = 0
+
+    for converted in rows:
+        line: str = csv_line(line_writer, buffer, converted)
+        target.write(line + os.linesep)
+        lines.append((converted[key_position] or "", line))
+        participants += 1
+
+        if len(lines) >= MEMO_SIZE:
+            collect(lines)
+            lines = []
+
+    if lines:
+        collect(lines)
+
+    return participants
+
+
+def write_columnar(rows: Iterable[list], writers: list) -> Iterator[list]:
+    """
+    Passes rows on, giving each to the columnar writers on the way.
+
+    Parameters
+    ----------
+    rows: Iterable[list]
+    writers: list               ColumnarWriters
+
+    Returns
+    -------
+    rows: Iterator[list]        The same rows
+    """
+    for row in rows:
+        for writer in writers:
+            writer.write_row(row)
+
+        yield row
@@ -0,0 +1,36 @@
+import logging
+from collections.abc import Callable, Iterable, Iterator
+from typing import TextIO, Union
+
+from src.getmyapidata.output_options import OutputOptions
+
+MEMO_SIZE: int
+
+class RowConverter:
+    def __init__(
+        self,
+        mappings: list,
+        target_columns: list[str],
+        source_columns: list[str],
+        log: logging.Logger,
+    ) -> None:
+        self.__steps: list[tuple] = None
+        self.__outputs: list = None
+    def __call__(self, row: list[str]) -> list: ...
+
+def convert_file(
+    source_filename: str,
+    target_filename: str,
+    log: logging.Logger,
+    chunk_size: int = 0,
+    status_fn: Union[Callable, None] = None,
+    engine: str = "stream",
+    collect: Union[Callable, None] = None,
+    output: Union[OutputOptions, None] = None,
+    sizes: Union[dict, None] = None,
+) -> int: ...
+def unique_column_names(header: list[str]) -> list[str]: ...
+def write_and_collect(
+    rows: Iterable[list], target: TextIO, collect: Callable
+) -> int: ...
+def write_columnar(rows: Iterable[list], writers: list) -> Iterator[list]: ...
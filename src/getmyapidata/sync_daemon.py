@@ -0,0 +1,540 @@
+"""
+Long-running service that keeps the configured awardees' data up to date,
+re-syncing incrementally on an interval or cron-like schedule.
+
+Between runs it keeps the token provider, the HTTP connection pool and each awardee's
+participant data & change-report index in memory, so each refresh only pays for what changed.
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Union
+
+import requests
+
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.cli import (EXIT_BAD_INPUTS, EXIT_OK, AwardeeSync,
+                                  ConsoleReporter, authenticate,
+                                  awardee_packages, common_parser)
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.my_logging import setup_logging
+from src.getmyapidata.token_provider import TokenProvider
+
+# Another process (or a stuck one) holds the lock if this file exists.
+LOCK_FILENAME: str = "sync.lock"
+STALE_LOCK_SECONDS: int = 12 * 60 * 60
+
+
+def parse_cron_field(field: str, lowest: int, highest: int) -> set[int]:
+    """
+    Expands one cron field (e.g. "*/15", "1-5", "0,30") into the values it allows.
+
+    Parameters
+    ----------
+    field: str
+    lowest: int
+    highest: int
+
+    Returns
+    -------
+    values: set[int]
+    """
+    values: set[int] = set()
+
+    for part in field.split(","):
+        step: int = 1
+
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+
+        if part == "*":
+            start, end = lowest, highest
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = highest if step > 1 else start
+
+        if start < lowest or end > highest or step < 1:
+            raise ValueError(f"Cron field '{field}' out of range {lowest}-{highest}.")
+
+        values.update(range(start, end + 1, step))
+
+    return values
+
+
+# pylint: disable=too-few-public-methods
+class CronSchedule:
+    """
+    Five-field cron expression: minute hour day-of-month month day-of-week.
+    """
+
+    def __init__(self, expression: str) -> None:
+        """
+        Instantiate a CronSchedule.
+
+        Parameters
+        ----------
+        expression: str         e.g. "0 6 * * 1-5" (06:00 on weekdays)
+        """
+        fields: list[str] = expression.split()
+
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression '{expression}' needs five fields.")
+
+        self.__minutes: set[int] = parse_cron_field(fields[0], 0, 59)
+        self.__hours: set[int] = parse_cron_field(fields[1], 0, 23)
+        self.__days: set[int] = parse_cron_field(fields[2], 1, 31)
+        self.__months: set[int] = parse_cron_field(fields[3], 1, 12)
+
+        # Cron counts Sunday as 0 (or 7); Python's weekday() counts Monday as 0.
+        self.__weekdays: set[int] = {
+            (day - 1) % 7 for day in parse_cron_field(fields[4], 0, 7)
+        }
+        self.__any_day: bool = fields[2] == "*"
+        self.__any_weekday: bool = fields[4] == "*"
+
+    def __day_matches(self, moment: datetime) -> bool:
+        """
+        Applies cron's rule that a restricted day-of-month OR day-of-week is enough.
+
+        Parameters
+        ----------
+        moment: datetime
+
+        Returns
+        -------
+        bool
+        """
+        day_ok: bool = moment.day in self.__days
+        weekday_ok: bool = moment.weekday() in self.__weekdays
+
+        if self.__any_day or self.__any_weekday:
+            return day_ok and weekday_ok
+
+        return day_ok or weekday_ok
+
+    def next_time(self, after: float) -> float:
+        """
+        First scheduled moment strictly after the given time.
+
+        Parameters
+        ----------
+        after: float            Seconds since the epoch
+
+        Returns
+        -------
+        float                   Seconds since the epoch
+        """
+        moment: datetime = datetime.fromtimestamp(after).replace(
+            second=0, microsecond=0
+        ) + timedelta(minutes=1)
+        limit: datetime = moment + timedelta(days=366 * 5)
+
+        while moment < limit:
+            if moment.month not in self.__months:
+                moment = (moment.replace(day=1) + timedelta(days=32)).replace(
+                    day=1, hour=0, minute=0
+                )
+            elif not self.__day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.__hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.__minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+
+        raise ValueError("Cron expression never matches.")
+
+
+# pylint: disable=too-few-public-methods
+class IntervalSchedule:
+    """
+    Runs every so many seconds.
+    """
+
+    def __init__(self, seconds: float) -> None:
+        """
+        Instantiate an IntervalSchedule.
+
+        Parameters
+        ----------
+        seconds: float
+        """
+        if seconds <= 0:
+            raise ValueError("Interval must be positive.")
+
+        self.__seconds: float = seconds
+
+    def next_time(self, after: float) -> float:
+        """
+        First scheduled moment strictly after the given time.
+
+        Parameters
+        ----------
+        after: float            Seconds since the epoch
+
+        Returns
+        -------
+        float                   Seconds since the epoch
+        """
+        return after + self.__seconds
+
+
+class RunLock:
+    """
+    Lock file that keeps two processes from syncing the same directory at once.
+    """
+
+    def __init__(self, data_directory: str, log: logging.Logger) -> None:
+        """
+        Instantiate a RunLock.
+
+        Parameters
+        ----------
+        data_directory: str
+        log: logging.Logger
+        """
+        self.__lock_file: str = os.path.join(data_directory, LOCK_FILENAME)
+        self.__log: logging.Logger = log
+
+    def acquire(self) -> bool:
+        """
+        Tries to take the lock, clearing it first if it has been held implausibly long.
+
+        Returns
+        -------
+        bool                    Did we get it?
+        """
+        os.makedirs(os.path.dirname(self.__lock_file), exist_ok=True)
+
+        try:
+            if time.time() - os.path.getmtime(self.__lock_file) > STALE_LOCK_SECONDS:
+                self.__log.warning("Removing stale lock %s", self.__lock_file)
+                os.remove(self.__lock_file)
+        except OSError:
+            pass
+
+        try:
+            handle: int = os.open(
+                self.__lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            )
+        except FileExistsError:
+            return False
+
+        with os.fdopen(handle, "w", encoding="utf-8") as file:
+            file.write(str(os.getpid()))
+
+        return True
+
+    def release(self) -> None:
+        """
+        Gives the lock back.
+        """
+        try:
+            os.remove(self.__lock_file)
+        except FileNotFoundError:
+            pass
+
+
+# pylint: disable=too-many-instance-attributes
+class SyncDaemon:
+    """
+    Periodically syncs one or more awardees.
+
+    Methods
+    -------
+    run_cycle() -> Union[RunMetrics, None]
+    run_forever() -> None
+    stop() -> None
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        aou_package: AouPackage,
+        awardees: list[str],
+        output_dir: str,
+        log: logging.Logger,
+        schedule: Union[CronSchedule, IntervalSchedule],
+        parallel: bool = False,
+        status_fn: Callable = None,
+    ) -> None:
+        """
+        Instantiate a SyncDaemon.
+
+        Parameters
+        ----------
+        aou_package: AouPackage
+        awardees: list[str]
+        output_dir: str             With several awardees, each gets a subdirectory.
+        log: logging.Logger
+        schedule: CronSchedule or IntervalSchedule
+        parallel: bool              Sync the awardees at the same time?
+        status_fn: Callable         Optional; defaults to printing to the console
+        """
+        self.__aou_package: AouPackage = aou_package
+        self.__output_dir: str = output_dir
+        self.__log: logging.Logger = log
+        self.__schedule: Union[CronSchedule, IntervalSchedule] = schedule
+        self.__parallel: bool = parallel
+        self.__status_fn: Callable = (
+            status_fn if status_fn is not None else ConsoleReporter()
+        )
+
+        self.__stop_event: threading.Event = threading.Event()
+        self.__cycle_lock: threading.Lock = threading.Lock()
+        self.__file_lock: RunLock = RunLock(output_dir, log)
+
+        # Warm state kept between cycles.
+        self.__session: requests.Session = requests.Session()
+        self.__tokens: Union[TokenProvider, None] = None
+
+        # The token the last cycle used, to tell when it's been refreshed.
+        self.__token: str = ""
+        self.__syncs: dict = {}
+
+        for awardee, package, directory in awardee_packages(
+            aou_package, awardees, output_dir
+        ):
+            self.__syncs[awardee] = AwardeeSync(
+                aou_package=package,
+                data_directory=directory,
+                log=log,
+                status_fn=self.__status_fn,
+                incremental=True,
+                stop_event=self.__stop_event,
+                session=self.__session,
+            )
+
+    def __get_tokens(self, metrics: RunMetrics) -> TokenProvider:
+        """
+        Authenticates on the first cycle. After that the provider gets a new token
+        itself when the token's old or the API rejects it, even mid-download.
+
+        Parameters
+        ----------
+        metrics: RunMetrics
+
+        Returns
+        -------
+        tokens: TokenProvider
+        """
+        with metrics.timer("auth"):
+            if self.__tokens is None:
+                self.__tokens = authenticate(
+                    self.__aou_package,
+                    self.__log,
+                    self.__status_fn,
+                    stop_event=self.__stop_event,
+                    metrics=metrics,
+                )
+            else:
+                # Any gcloud commands from here on belong to this cycle.
+                self.__tokens.set_metrics(metrics)
+
+            token: str = self.__tokens.get_token()
+
+        metrics.set("token_refreshed", token != self.__token)
+        self.__token = token
+        return self.__tokens
+
+    def __sync_all(self) -> RunMetrics:
+        """
+        Syncs every awardee once, while holding the locks.
+
+        Returns
+        -------
+        metrics: RunMetrics
+        """
+        metrics: RunMetrics = RunMetrics()
+        metrics.set("awardees", list(self.__syncs))
+
+        try:
+            tokens: TokenProvider = self.__get_tokens(metrics)
+        except RuntimeError as e:
+            self.__log.error("Authentication failed: %s", e)
+            metrics.increment("errors")
+            metrics.publish(self.__output_dir, self.__log)
+            return metrics
+
+        if self.__parallel and len(self.__syncs) > 1:
+            with ThreadPoolExecutor(max_workers=len(self.__syncs)) as executor:
+                for awardee in self.__syncs:
+                    executor.submit(self.__sync_one, awardee, tokens, metrics)
+        else:
+            for awardee in self.__syncs:
+                self.__sync_one(awardee, tokens, metrics)
+
+        metrics.publish(self.__output_dir, self.__log)
+        return metrics
+
+    def __sync_failed(
+        self, awardee: str, error: Exception, metrics: RunMetrics
+    ) -> None:
+        """
+        Logs & counts an awardee's failed sync. Called from an except block, so anything
+        other than the RuntimeErrors we raise ourselves gets its traceback logged.
+
+        Parameters
+        ----------
+        awardee: str
+        error: Exception
+        metrics: RunMetrics
+        """
+        self.__log.error(
+            "Sync of %s failed: %s",
+            awardee,
+            error,
+            exc_info=not isinstance(error, RuntimeError),
+        )
+        metrics.increment("errors")
+
+    def __sync_one(
+        self, awardee: str, tokens: TokenProvider, metrics: RunMetrics
+    ) -> None:
+        """
+        Syncs one awardee, recording its counts, or if it fails, the error.
+
+        Parameters
+        ----------
+        awardee: str
+        tokens: TokenProvider
+        metrics: RunMetrics
+        """
+        try:
+            with metrics.timer(f"{awardee}_sync"):
+                counts: dict = self.__syncs[awardee].run(tokens, metrics)
+        # One awardee's failure mustn't stop the others, or the daemon.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.__sync_failed(awardee, e, metrics)
+            return
+
+        for name, value in counts.items():
+            metrics.increment(f"participants_{name}", value)
+
+    def run_cycle(self) -> Union[RunMetrics, None]:
+        """
+        Syncs every awardee once, unless a previous cycle is still running.
+
+        Returns
+        -------
+        metrics: RunMetrics or None if skipped
+        """
+        # Doesn't wait, so can't be a with block.
+        # pylint: disable=consider-using-with
+        if not self.__cycle_lock.acquire(blocking=False):
+            self.__log.warning("Previous sync still running; skipping this one.")
+            return None
+
+        try:
+            if not self.__file_lock.acquire():
+                self.__log.warning(
+                    "Another process is syncing %s; skipping.", self.__output_dir
+                )
+                return None
+
+            try:
+                return self.__sync_all()
+            finally:
+                self.__file_lock.release()
+        finally:
+            self.__cycle_lock.release()
+
+    def run_forever(self) -> None:
+        """
+        Syncs now, then on schedule, until stop() is called.
+        """
+        while not self.__stop_event.is_set():
+            self.run_cycle()
+            next_run: float = self.__schedule.next_time(time.time())
+            self.__log.info(
+                "Next sync at %s.",
+                time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(next_run)),
+            )
+            self.__stop_event.wait(max(0.0, next_run - time.time()))
+
+        self.__session.close()
+
+    def stop(self) -> None:
+        """
+        Stops any request in progress & ends run_forever().
+        """
+        self.__log.info("Stop requested")
+        self.__stop_event.set()
+
+
+def main(argv: list[str] = None) -> int:
+    """
+    Command-line entry point for the service.
+
+    Parameters
+    ----------
+    argv: list[str]         Optional; defaults to sys.argv
+
+    Returns
+    -------
+    exit code: int
+    """
+    # Not the command line's options that make no sense here, like --incremental
+    # (every sync after the first is) or --summary.
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        description="Keep All of Us participant data in sync on a schedule.",
+        parents=[common_parser()],
+    )
+    when = parser.add_mutually_exclusive_group()
+    when.add_argument(
+        "--interval", type=float, help="Minutes between syncs", default=60.0
+    )
+    when.add_argument(
+        "--cron", type=str, help='Cron-style schedule, e.g. "0 6 * * 1-5"'
+    )
+    args = parser.parse_args(argv)
+
+    log: logging.Logger = setup_logging(
+        log_filename=os.path.join(os.getcwd(), "getmyapidata_sync.log")
+    )
+    log.setLevel(args.log_level)
+    aou_package: AouPackage = AouPackage(log, config_file=args.config)
+
+    if not aou_package.inputs_complete():
+        print("Config file is incomplete: fill in the account & project details.")
+        return EXIT_BAD_INPUTS
+
+    try:
+        schedule: Union[CronSchedule, IntervalSchedule] = (
+            CronSchedule(args.cron)
+            if args.cron
+            else IntervalSchedule(60 * args.interval)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    daemon: SyncDaemon = SyncDaemon(
+        aou_package=aou_package,
+        awardees=args.awardee or [aou_package.awardee],
+        output_dir=args.output_dir or aou_package.data_directory,
+        log=log,
+        schedule=schedule,
+        parallel=args.parallel,
+    )
+
+    try:
+        daemon.run_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
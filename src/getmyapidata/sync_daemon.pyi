@@ -0,0 +1,78 @@
+import logging
+import threading
+from collections.abc import Callable as Callable
+from typing import Union
+
+import requests
+
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.cli import AwardeeSync
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.token_provider import TokenProvider
+
+LOCK_FILENAME: str
+STALE_LOCK_SECONDS: int
+
+def parse_cron_field(field: str, lowest: int, highest: int) -> set[int]: ...
+
+class CronSchedule:
+    def __init__(self, expression: str) -> None:
+        self.__minutes: set[int] = None
+        self.__hours: set[int] = None
+        self.__days: set[int] = None
+        self.__months: set[int] = None
+        self.__weekdays: set[int] = None
+        self.__any_day: bool = None
+        self.__any_weekday: bool = None
+    def __day_matches(self, moment) -> bool: ...
+    def next_time(self, after: float) -> float: ...
+
+class IntervalSchedule:
+    def __init__(self, seconds: float) -> None:
+        self.__seconds: float = None
+    def next_time(self, after: float) -> float: ...
+
+class RunLock:
+    def __init__(self, data_directory: str, log: logging.Logger) -> None:
+        self.__lock_file: str = None
+        self.__log: logging.Logger = None
+    def acquire(self) -> bool: ...
+    def release(self) -> None: ...
+
+class SyncDaemon:
+    def __init__(
+        self,
+        aou_package: AouPackage,
+        awardees: list[str],
+        output_dir: str,
+        log: logging.Logger,
+        schedule: Union[CronSchedule, IntervalSchedule],
+        parallel: bool = ...,
+        status_fn: Callable = ...,
+    ) -> None:
+        self.__aou_package: AouPackage = None
+        self.__output_dir: str = None
+        self.__log: logging.Logger = None
+        self.__schedule: Union[CronSchedule, IntervalSchedule] = None
+        self.__parallel: bool = False
+        self.__status_fn: Callable = None
+        self.__stop_event: threading.Event = None
+        self.__cycle_lock: threading.Lock = None
+        self.__file_lock: RunLock = None
+        self.__session: requests.Session = None
+        self.__tokens: Union[TokenProvider, None] = None
+        self.__token: str = ""
+        self.__syncs: dict[str, AwardeeSync] = {}
+    def __get_tokens(self, metrics: RunMetrics) -> TokenProvider: ...
+    def __sync_all(self) -> RunMetrics: ...
+    def __sync_failed(
+        self, awardee: str, error: Exception, metrics: RunMetrics
+    ) -> None: ...
+    def __sync_one(
+        self, awardee: str, tokens: TokenProvider, metrics: RunMetrics
+    ) -> None: ...
+    def run_cycle(self) -> Union[RunMetrics, None]: ...
+    def run_forever(self) -> None: ...
+    def stop(self) -> None: ...
+
+def main(argv: list[str] = ...) -> int: ...
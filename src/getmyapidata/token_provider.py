@@ -0,0 +1,293 @@
+"""
+Token providers: where the InSite API requests get their access tokens.
+
+The request code only ever calls get_token() (for each request) & invalidate()
+(when the API rejects a token), so it works the same with gcloud, a cached token,
+a token file or a fixed token in tests & benchmarks.
+"""
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+from typing import Union
+
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.credential_cache import CredentialCache
+from src.getmyapidata.gcloud_tools import GCloudTools
+from src.getmyapidata.metrics import RunMetrics
+
+# Access tokens last an hour; get a new one a little before that.
+DEFAULT_MAX_AGE_SECONDS: int = 3000
+
+
+class TokenProvider(ABC):
+    """
+    Supplies access tokens.
+
+    Methods
+    -------
+    get_token() -> str
+    invalidate() -> bool
+    set_metrics(metrics: RunMetrics) -> None
+    """
+
+    @abstractmethod
+    def get_token(self) -> str:
+        """
+        A token to put in the Authorization header.
+
+        Returns
+        -------
+        token: str
+        """
+
+    def invalidate(self) -> bool:
+        """
+        Forgets the current token, e.g. after the API rejected it.
+
+        Returns
+        -------
+        bool                Might get_token() now return a different token?
+        """
+        return False
+
+    def set_metrics(self, metrics: RunMetrics) -> None:
+        """
+        Where to record the work of getting tokens from now on, e.g. a new run's metrics.
+        Most providers have nothing to record.
+
+        Parameters
+        ----------
+        metrics: RunMetrics
+        """
+
+
+class StaticTokenProvider(TokenProvider):
+    """
+    Always the same token: for tokens obtained elsewhere, tests & benchmarks.
+    """
+
+    def __init__(self, token: str) -> None:
+        """
+        Instantiate a StaticTokenProvider object.
+
+        Parameters
+        ----------
+        token: str
+        """
+        self.__token: str = token
+
+    def get_token(self) -> str:
+        """
+        Returns
+        -------
+        token: str
+        """
+        return self.__token
+
+
+class FileTokenProvider(TokenProvider):
+    """
+    Reads the token from a file, re-reading it only when the file changes.
+    Lets another process (or a test) keep the token fresh.
+    """
+
+    def __init__(self, token_file: str) -> None:
+        """
+        Instantiate a FileTokenProvider object.
+
+        Parameters
+        ----------
+        token_file: str         Holds the token on its first line
+        """
+        self.__token_file: str = token_file
+        self.__token: str = ""
+        self.__mtime: Union[float, None] = None
+
+    def get_token(self) -> str:
+        """
+        Returns
+        -------
+        token: str
+        """
+        try:
+            mtime: float = os.path.getmtime(self.__token_file)
+
+            if mtime != self.__mtime or not self.__token:
+                with open(self.__token_file, "r", encoding="utf-8") as file:
+                    self.__token = file.readline().strip()
+
+                self.__mtime = mtime
+        except OSError as e:
+            raise RuntimeError(
+                f"Unable to read token file '{self.__token_file}': {e}"
+            ) from e
+
+        if not self.__token:
+            raise RuntimeError(f"Token file '{self.__token_file}' is empty.")
+
+        return self.__token
+
+    def invalidate(self) -> bool:
+        """
+        Re-read the file next time.
+
+        Returns
+        -------
+        bool
+        """
+        self.__token = ""
+        return True
+
+
+class GCloudTokenProvider(TokenProvider):
+    """
+    Gets a token via the gcloud command-line tools (see GCloudTools).
+    Each call runs gcloud, so wrap this in a CachingTokenProvider.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(
+        self,
+        aou_package: AouPackage,
+        log: logging.Logger,
+        status_fn: Callable = None,
+        stop_event: threading.Event = None,
+        metrics: RunMetrics = None,
+        reuse_token: bool = True,
+    ) -> None:
+        """
+        Instantiate a GCloudTokenProvider object.
+
+        Parameters
+        ----------
+        aou_package: AouPackage
+        log: logging.Logger
+        status_fn: Callable         Optional; where GCloudTools reports progress
+        stop_event: threading.Event Optional; set to abandon authentication
+        metrics: RunMetrics         Optional; where to record gcloud command timings
+        reuse_token: bool           Use the token cached on disk the first time?
+                                    (Later times always may.)
+        """
+        self.__aou_package: AouPackage = aou_package
+        self.__log: logging.Logger = log
+        self.__status_fn: Callable = status_fn
+        self.__stop_event: threading.Event = stop_event
+        self.__metrics: RunMetrics = metrics
+        self.__reuse_token: bool = reuse_token
+
+    def get_token(self) -> str:
+        """
+        Returns
+        -------
+        token: str
+        """
+        gcloud_mgr: GCloudTools = GCloudTools(
+            aou_package=self.__aou_package,
+            log=self.__log,
+            status_fn=self.__status_fn,
+            stop_event=self.__stop_event,
+            metrics=self.__metrics,
+            reuse_token=self.__reuse_token,
+        )
+        gcloud_mgr.run()
+        token: str = gcloud_mgr.get_token()
+        self.__reuse_token = True
+        return token
+
+    def invalidate(self) -> bool:
+        """
+        Forgets the token cached on disk, so the next call authenticates again.
+
+        Returns
+        -------
+        bool
+        """
+        CredentialCache(
+            key_file=self.__aou_package.token_file,
+            account=self.__aou_package.aou_service_account,
+            log=self.__log,
+        ).clear()
+        return True
+
+    def set_metrics(self, metrics: RunMetrics) -> None:
+        """
+        Where later gcloud commands record their timings.
+
+        Parameters
+        ----------
+        metrics: RunMetrics
+        """
+        self.__metrics = metrics
+
+
+class CachingTokenProvider(TokenProvider):
+    """
+    Keeps another provider's token in memory until it's old, so asking for
+    a token is just an attribute lookup. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        provider: TokenProvider,
+        max_age: float = DEFAULT_MAX_AGE_SECONDS,
+        token: str = "",
+    ) -> None:
+        """
+        Instantiate a CachingTokenProvider object.
+
+        Parameters
+        ----------
+        provider: TokenProvider     Where tokens really come from
+        max_age: float              Seconds before we ask the provider again
+        token: str                  Optional; one just obtained from the provider's source
+        """
+        self.__provider: TokenProvider = provider
+        self.__max_age: float = max_age
+        self.__lock: threading.Lock = threading.Lock()
+        self.__token: str = token
+        self.__acquired: float = time.monotonic() if token else 0.0
+
+    def get_token(self) -> str:
+        """
+        Returns
+        -------
+        token: str
+        """
+        token: str = self.__token
+
+        if token and time.monotonic() - self.__acquired < self.__max_age:
+            return token
+
+        with self.__lock:
+            # Another thread may have refreshed it while we waited.
+            if not self.__token or time.monotonic() - self.__acquired >= self.__max_age:
+                self.__token = self.__provider.get_token()
+                self.__acquired = time.monotonic()
+
+            return self.__token
+
+    def invalidate(self) -> bool:
+        """
+        Forgets our copy & the provider's.
+
+        Returns
+        -------
+        bool
+        """
+        with self.__lock:
+            self.__token = ""
+
+        return self.__provider.invalidate()
+
+    def set_metrics(self, metrics: RunMetrics) -> None:
+        """
+        Passed on to the provider.
+
+        Parameters
+        ----------
+        metrics: RunMetrics
+        """
+        self.__provider.set_metrics(metrics)
@@ -0,0 +1,62 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Callable as Callable
+from typing import Union
+
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.metrics import RunMetrics
+
+DEFAULT_MAX_AGE_SECONDS: int
+
+class TokenProvider(ABC):
+    @abstractmethod
+    def get_token(self) -> str: ...
+    def invalidate(self) -> bool: ...
+    def set_metrics(self, metrics: RunMetrics) -> None: ...
+
+class StaticTokenProvider(TokenProvider):
+    def __init__(self, token: str) -> None:
+        self.__token: str = None
+    def get_token(self) -> str: ...
+
+class FileTokenProvider(TokenProvider):
+    def __init__(self, token_file: str) -> None:
+        self.__token_file: str = None
+        self.__token: str = None
+        self.__mtime: Union[float, None] = None
+    def get_token(self) -> str: ...
+    def invalidate(self) -> bool: ...
+
+class GCloudTokenProvider(TokenProvider):
+    def __init__(
+        self,
+        aou_package: AouPackage,
+        log: logging.Logger,
+        status_fn: Callable = ...,
+        stop_event: threading.Event = ...,
+        metrics: RunMetrics = ...,
+        reuse_token: bool = ...,
+    ) -> None:
+        self.__aou_package: AouPackage = None
+        self.__log: logging.Logger = None
+        self.__status_fn: Callable = None
+        self.__stop_event: threading.Event = None
+        self.__metrics: RunMetrics = None
+        self.__reuse_token: bool = None
+    def get_token(self) -> str: ...
+    def invalidate(self) -> bool: ...
+    def set_metrics(self, metrics: RunMetrics) -> None: ...
+
+class CachingTokenProvider(TokenProvider):
+    def __init__(
+        self, provider: TokenProvider, max_age: float = ..., token: str = ...
+    ) -> None:
+        self.__provider: TokenProvider = None
+        self.__max_age: float = None
+        self.__lock: threading.Lock = None
+        self.__token: str = None
+        self.__acquired: float = None
+    def get_token(self) -> str: ...
+    def invalidate(self) -> bool: ...
+    def set_metrics(self, metrics: RunMetrics) -> None: ...
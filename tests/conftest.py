@@ -1,3 +1,4 @@
+import csv
 import logging
 import logging.handlers
 import os
@@ -144,6 +145,25 @@ def fake_data_directory(tmp_path) -> str:
     return tmp_path / "test_data"
 
 
+@pytest.fixture(name="fake_gcloud")
+def fake_gcloud(tmp_path, monkeypatch) -> Path:
+    """
+    Puts a fake gcloud (see fake_gcloud.py) first on the PATH.
+    """
+    bin_directory: Path = tmp_path / "fake_gcloud_bin"
+    bin_directory.mkdir()
+    script: str = os.path.join(os.path.dirname(__file__), "fake_gcloud.py")
+
+    posix_wrapper: Path = bin_directory / "gcloud"
+    posix_wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+    posix_wrapper.chmod(0o755)
+    (bin_directory / "gcloud.cmd").write_text(f'@"{sys.executable}" "{script}" %*\r\n')
+
+    monkeypatch.setenv("FAKE_GCLOUD_DIR", str(bin_directory))
+    monkeypatch.setenv("PATH", str(bin_directory) + os.pathsep + os.environ["PATH"])
+    return bin_directory
+
+
 @pytest.fixture(name="fake_json")
 def fake_json() -> dict:
     d: dict = {
@@ -268,6 +288,28 @@ def fake_json_no_total() -> dict:
     return d
 
 
+@pytest.fixture(name="fake_participant_bundle")
+def fake_participant_bundle() -> dict:
+    """
+    A one-page API response holding the participants in TEST_participant_list.csv.
+    """
+    test_csv_file: str = os.path.join(
+        os.path.dirname(__file__), "TEST_participant_list.csv"
+    )
+
+    with open(test_csv_file, "r", newline="", encoding="utf-8") as f:
+        resources: list[dict] = [
+            {key: value for key, value in row.items() if key}
+            for row in csv.DictReader(f)
+        ]
+
+    return {
+        "resourceType": "Bundle",
+        "total": len(resources),
+        "entry": [{"resource": resource} for resource in resources],
+    }
+
+
 @pytest.fixture(name="fake_token")
 def fake_token() -> str:
     return "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
@@ -7,8 +7,9 @@ from configparser import ConfigParser
 from pathlib import Path
 from typing import Union
 
-from src.getmyapidata.aou_package import (AouPackage, get_config,
-                                          get_default_ini_path)
+from src.getmyapidata.aou_package import (DEFAULT_KEY_MAX_AGE_DAYS, AouPackage,
+                                          get_config, get_default_ini_path)
+from src.getmyapidata.output_options import OutputOptions
 
 
 def remove_config_file(config_file: Union[str, Path, None] = None) -> None:
@@ -177,3 +178,80 @@ def test_restore(logger: logging.Logger, fake_config_file: Path) -> None:
     assert aou_package.token_file == token_file
 
     aou_package.update_config()
+
+
+def test_key_lifecycle_settings(logger: logging.Logger, fake_config_file: Path) -> None:
+    # Older config files don't have the settings.
+    aou_package: AouPackage = AouPackage(logger, config_file=str(fake_config_file))
+    assert aou_package.key_max_age_days == DEFAULT_KEY_MAX_AGE_DAYS
+    assert not aou_package.delete_old_keys
+
+    config: ConfigParser = ConfigParser()
+    config.read(fake_config_file)
+    config["Logon"]["key_max_age_days"] = "30"
+    config["Logon"]["delete_old_keys"] = "yes"
+
+    with open(fake_config_file, "w", encoding="utf-8") as file:
+        config.write(file)
+
+    aou_package = AouPackage(logger, config_file=str(fake_config_file))
+    assert aou_package.key_max_age_days == 30
+    assert aou_package.delete_old_keys
+
+
+def test_healthpro_settings(logger: logging.Logger, fake_config_file: Path) -> None:
+    # Older config files don't have a [HealthPro] section.
+    aou_package: AouPackage = AouPackage(logger, config_file=str(fake_config_file))
+    assert aou_package.chunk_size == 0
+    assert aou_package.workers == 1
+    assert aou_package.engine == "auto"
+    assert not aou_package.combined
+
+    config: ConfigParser = ConfigParser()
+    config.read(fake_config_file)
+    config["HealthPro"] = {
+        "chunk_size": "50000",
+        "combined": "yes",
+        "engine": "pandas",
+        "workers": "0",
+    }
+
+    with open(fake_config_file, "w", encoding="utf-8") as file:
+        config.write(file)
+
+    aou_package = AouPackage(logger, config_file=str(fake_config_file))
+    assert aou_package.chunk_size == 50000
+    assert aou_package.workers == 0
+    assert aou_package.engine == "pandas"
+    assert aou_package.combined
+
+
+def test_output_settings(logger: logging.Logger, fake_config_file: Path) -> None:
+    # Older config files don't have an [Output] section.
+    aou_package: AouPackage = AouPackage(logger, config_file=str(fake_config_file))
+    assert aou_package.output_options() == OutputOptions()
+    assert aou_package.index
+
+    config: ConfigParser = ConfigParser()
+    config.read(fake_config_file)
+    config["Output"] = {
+        "formats": "Parquet, feather",
+        "parquet_compression": "snappy",
+        "row_group_size": "5000",
+        "compression": " GZip",
+        "index": "no",
+        "partition_by": "organization, withdrawalStatus",
+    }
+
+    with open(fake_config_file, "w", encoding="utf-8") as file:
+        config.write(file)
+
+    aou_package = AouPackage(logger, config_file=str(fake_config_file))
+    assert aou_package.output_options() == OutputOptions(
+        ("parquet", "feather"),
+        "snappy",
+        5000,
+        "gzip",
+        ("organization", "withdrawalStatus"),
+    )
+    assert not aou_package.index
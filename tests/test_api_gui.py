@@ -0,0 +1,146 @@
+"""
+Tests methods related to class ApiGui, against a stand-in for wx (no display needed).
+"""
+import importlib
+import sys
+import threading
+import types
+from unittest.mock import MagicMock
+
+import pytest
+
+
+class FakeWindow:
+    """
+    Any window: takes any arguments & has any method.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> MagicMock:
+        return MagicMock(name=name)
+
+
+def fake_module(name: str) -> types.ModuleType:
+    """
+    A module with any attribute, each a MagicMock that stays put once asked for.
+    """
+    module: types.ModuleType = types.ModuleType(name)
+
+    def attribute(attribute_name: str) -> MagicMock:
+        value: MagicMock = MagicMock(name=f"{name}.{attribute_name}")
+        setattr(module, attribute_name, value)
+        return value
+
+    module.__getattr__ = attribute
+    return module
+
+
+@pytest.fixture(name="fake_wx")
+def fake_wx(monkeypatch) -> types.ModuleType:
+    """
+    Puts a stand-in for wx (& wx.adv, wx.lib.dialogs) in place & imports api_gui with it.
+    """
+    wx: types.ModuleType = fake_module("wx")
+    wx.Dialog = FakeWindow
+    wx.adv = fake_module("wx.adv")
+    wx.lib = fake_module("wx.lib")
+    wx.lib.dialogs = fake_module("wx.lib.dialogs")
+
+    for name, module in {
+        "wx": wx,
+        "wx.adv": wx.adv,
+        "wx.lib": wx.lib,
+        "wx.lib.dialogs": wx.lib.dialogs,
+    }.items():
+        monkeypatch.setitem(sys.modules, name, module)
+
+    monkeypatch.delitem(sys.modules, "src.getmyapidata.api_gui", raising=False)
+    return wx
+
+
+def finished_checks(gcloud_installed, version) -> MagicMock:
+    """
+    StartupChecks that have already finished.
+    """
+    return MagicMock(gcloud_installed=gcloud_installed, version=version)
+
+
+def run_deferred(fake_wx: types.ModuleType) -> None:
+    """
+    Runs what's been handed to wx.CallAfter, as the GUI thread would.
+    """
+    for call in fake_wx.CallAfter.call_args_list:
+        call.args[0](*call.args[1:])
+
+
+@pytest.mark.parametrize("gcloud_installed", [True, False])
+def test_instantiation(
+    fake_config_file, fake_wx, gcloud_installed, logger, monkeypatch
+) -> None:
+    monkeypatch.chdir(fake_config_file.parent)
+    api_gui = importlib.import_module("src.getmyapidata.api_gui")
+
+    gui = api_gui.ApiGui(
+        logger, startup_checks=finished_checks(gcloud_installed, "1.2.3")
+    )
+    assert isinstance(gui, fake_wx.Dialog)
+    gui._ApiGui__checks_waiter.join(timeout=10)
+
+    # Nothing's known until the GUI thread gets round to it...
+    assert not fake_wx.adv.HyperlinkCtrl.called
+    run_deferred(fake_wx)
+
+    # ... & then, without gcloud, the user's pointed to where to get it.
+    assert fake_wx.adv.HyperlinkCtrl.called != gcloud_installed
+
+
+def test_failed_checks(fake_config_file, fake_wx, logger, monkeypatch) -> None:
+    monkeypatch.chdir(fake_config_file.parent)
+    api_gui = importlib.import_module("src.getmyapidata.api_gui")
+    startup = importlib.import_module("src.getmyapidata.startup")
+    threads: list = []
+
+    def gcloud_tools_installed() -> bool:
+        threads.append(threading.current_thread())
+        return False
+
+    monkeypatch.setattr(startup, "gcloud_tools_installed", gcloud_tools_installed)
+    monkeypatch.setattr(startup, "get_exe_version", lambda log: "1.2.3")
+
+    gui = api_gui.ApiGui(logger, startup_checks=finished_checks(None, None))
+    gui._ApiGui__checks_waiter.join(timeout=10)
+
+    # Tried again, but not on the GUI thread.
+    assert threads and threading.main_thread() not in threads
+    run_deferred(fake_wx)
+    assert fake_wx.adv.HyperlinkCtrl.called
+
+
+def test_data_completion(
+    fake_config_file, fake_wx, logger, monkeypatch, tmp_path
+) -> None:
+    monkeypatch.chdir(fake_config_file.parent)
+    api_gui = importlib.import_module("src.getmyapidata.api_gui")
+    summary = importlib.import_module("src.getmyapidata.participant_summary")
+    gui = api_gui.ApiGui(logger, startup_checks=finished_checks(True, "1.2.3"))
+    gui._ApiGui__checks_waiter.join(timeout=10)
+    fake_wx.CallAfter.reset_mock()
+
+    # As if InSiteAPI had just finished downloading.
+    monkeypatch.setattr(
+        gui, "_ApiGui__get_destination_directory", lambda: str(tmp_path)
+    )
+    gui._ApiGui__api_mgr = MagicMock(summary=summary.ParticipantSummary())
+    gui._ApiGui__data_report(True)
+
+    # Run on InSiteAPI's thread, so nothing's shown directly...
+    assert not fake_wx.lib.dialogs.ScrolledMessageDialog.called
+    deferred: list = [call.args[0] for call in fake_wx.CallAfter.call_args_list]
+    assert gui._ApiGui__show_summary in deferred
+
+    # ... but on the GUI thread, later.
+    run_deferred(fake_wx)
+
+    assert fake_wx.lib.dialogs.ScrolledMessageDialog.return_value.ShowModal.called
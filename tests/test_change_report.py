@@ -0,0 +1,155 @@
+"""
+Tests methods related to class ChangeReport
+"""
+import csv
+import os
+
+from src.getmyapidata.change_report import (CHANGES_DIRECTORY,
+                                            SNAPSHOT_FILENAME, TRACKED_FIELDS,
+                                            ChangeReport, hash_record)
+
+
+def write_participants(directory, rows: list[dict]) -> None:
+    header: list[str] = sorted({key for row in rows for key in row})
+
+    with open(
+        os.path.join(directory, "FakeUniversity_participant_list.csv"),
+        "w",
+        newline="",
+        encoding="utf-8",
+    ) as file:
+        writer: csv.DictWriter = csv.DictWriter(file, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_report(report_file: str) -> list[dict]:
+    with open(report_file, "r", newline="", encoding="utf-8") as file:
+        return list(csv.DictReader(file))
+
+
+def test_hash_record() -> None:
+    record: dict = {"participantId": "P1", "city": "San Diego"}
+    assert hash_record(record) == hash_record(
+        {"city": "San Diego", "participantId": "P1"}
+    )
+
+    # New, empty columns don't change the hash.
+    assert hash_record(record) == hash_record({**record, "streetAddress2": ""})
+    assert hash_record(record) != hash_record({**record, "city": "Escondido"})
+
+    # Nor does writing nested fields as JSON rather than a repr, or flattening them.
+    repr_status: str = "[{'organization': 'CAL_PMC_UCSD', 'status': 'YES'}]"
+    json_status: str = '[{"organization":"CAL_PMC_UCSD","status":"YES"}]'
+    assert hash_record({**record, "patientStatus": repr_status}) == hash_record(
+        {**record, "patientStatus": json_status, "patientStatusYes": "CAL_PMC_UCSD"}
+    )
+
+
+def test_change_report(logger, tmp_path) -> None:
+    write_participants(
+        tmp_path,
+        [
+            {"participantId": "P1", "organization": "FakeUniversity", "city": "A"},
+            {"participantId": "P2", "organization": "FakeUniversity", "city": "B"},
+            {
+                "participantId": "P3",
+                "organization": "FakeUniversity",
+                "withdrawalStatus": "not_withdrawn",
+            },
+        ],
+    )
+
+    # First run only records the snapshot.
+    counts: dict = ChangeReport(log=logger, data_directory=str(tmp_path)).run()
+    assert counts["new"] == 3
+    assert os.path.isfile(tmp_path / CHANGES_DIRECTORY / SNAPSHOT_FILENAME)
+
+    # P1 leaves, P2 moves, P3 withdraws and P4 arrives.
+    write_participants(
+        tmp_path,
+        [
+            {"participantId": "P2", "organization": "FakeUniversity", "city": "C"},
+            {
+                "participantId": "P3",
+                "organization": "FakeUniversity",
+                "withdrawalStatus": "withdrawn",
+            },
+            {"participantId": "P4", "organization": "FakeUniversity", "city": "D"},
+        ],
+    )
+
+    messages: list = []
+    report: ChangeReport = ChangeReport(
+        log=logger, data_directory=str(tmp_path), status_fn=messages.append
+    )
+    counts = report.run()
+    assert counts == {"new": 1, "removed": 1, "changed": 2, "unchanged": 0}
+    assert messages
+
+    rows: list[dict] = read_report(report.report_file)
+    changes: dict = {(row["participantId"], row["change"]): row for row in rows}
+    assert ("P1", "removed") in changes
+    assert ("P4", "new") in changes
+    assert changes[("P2", "changed")]["field"] == ""
+    assert changes[("P3", "changed")]["field"] == "withdrawalStatus"
+    assert changes[("P3", "changed")]["previous"] == "not_withdrawn"
+    assert changes[("P3", "changed")]["current"] == "withdrawn"
+
+    # Nothing changed since.
+    counts = ChangeReport(log=logger, data_directory=str(tmp_path)).run()
+    assert counts == {"new": 0, "removed": 0, "changed": 0, "unchanged": 3}
+
+
+def test_change_report_old_snapshot(logger, tmp_path) -> None:
+    # A snapshot written before nested fields were hashed as canonical JSON.
+    os.makedirs(tmp_path / CHANGES_DIRECTORY)
+
+    with open(
+        tmp_path / CHANGES_DIRECTORY / SNAPSHOT_FILENAME,
+        "w",
+        newline="",
+        encoding="utf-8",
+    ) as file:
+        writer: csv.writer = csv.writer(file)
+        writer.writerow(["participantId", "organization", "hash"] + TRACKED_FIELDS)
+        statuses: dict = {
+            "patientStatus": "[{'organization': 'CAL_PMC_UCSD', 'status': 'YES'}]"
+        }
+        writer.writerow(
+            ["P1", "FakeUniversity", "0" * 32]
+            + [statuses.get(field, "") for field in TRACKED_FIELDS]
+        )
+        writer.writerow(
+            ["P2", "FakeUniversity", "0" * 32] + ["" for _ in TRACKED_FIELDS]
+        )
+
+    write_participants(
+        tmp_path,
+        [
+            {
+                "participantId": "P1",
+                "organization": "FakeUniversity",
+                "patientStatus": '[{"organization":"CAL_PMC_UCSD","status":"YES"}]',
+                "patientStatusYes": "CAL_PMC_UCSD",
+            },
+            {
+                "participantId": "P2",
+                "organization": "FakeUniversity",
+                "withdrawalStatus": "withdrawn",
+            },
+        ],
+    )
+
+    # Only a real change in a tracked field counts, not the new representation.
+    report: ChangeReport = ChangeReport(log=logger, data_directory=str(tmp_path))
+    counts: dict = report.run()
+    assert counts == {"new": 0, "removed": 0, "changed": 1, "unchanged": 1}
+    rows: list[dict] = read_report(report.report_file)
+    assert [(row["participantId"], row["field"]) for row in rows] == [
+        ("P2", "withdrawalStatus")
+    ]
+
+    # From then on, the new hashes are compared.
+    counts = ChangeReport(log=logger, data_directory=str(tmp_path)).run()
+    assert counts == {"new": 0, "removed": 0, "changed": 0, "unchanged": 2}
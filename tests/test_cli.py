@@ -0,0 +1,199 @@
+"""
+Tests methods of the headless command-line runner
+"""
+import json
+import os
+import subprocess
+import sys
+
+import requests_mock
+
+from src.getmyapidata import cli
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.insite_api import ApiRequestPackage, InSiteAPI
+from src.getmyapidata.metrics import METRICS_FILENAME, RunMetrics
+from src.getmyapidata.token_provider import StaticTokenProvider, TokenProvider
+
+
+def test_no_gui_imports() -> None:
+    project_directory: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    check: str = (
+        "import sys\n"
+        "import src.getmyapidata.cli\n"
+        "loaded = {'wx', 'tkinter', 'win32api'} & set(sys.modules)\n"
+        "assert not loaded, loaded\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=project_directory,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_authenticate(
+    fake_aou_package, fake_gcloud, fake_participant_bundle, logger, tmp_path
+) -> None:
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    cache_file = tmp_path / "token_cache.json"
+    metrics: RunMetrics = RunMetrics()
+    tokens: TokenProvider = cli.authenticate(
+        fake_aou_package, logger, lambda progress: None, metrics=metrics
+    )
+    assert os.path.isfile(cache_file)
+    assert metrics.as_dict()["gcloud_auth_list_count"] > 0
+    assert "gcloud_auth_list_s" in metrics.as_dict()
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    cached_tokens: list = []
+
+    def respond(request, context) -> dict:
+        if cached_tokens:
+            context.status_code = 200
+            return fake_participant_bundle
+
+        # The rejected token's been forgotten, on disk too, before we ask again.
+        cached_tokens.append(os.path.isfile(cache_file))
+        context.status_code = 401
+        return {"message": "Request had invalid authentication credentials."}
+
+    api_obj: InSiteAPI = InSiteAPI(
+        api_package=ApiRequestPackage(fake_aou_package, tokens.get_token()),
+        log=logger,
+        token_provider=tokens,
+    )
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(method="GET", url=fake_url, json=respond)
+        api_obj.run()
+        assert m.call_count == 2
+
+    assert cached_tokens == [True]
+
+    # Authenticated again, so there's a fresh token cached.
+    assert os.path.isfile(cache_file)
+
+
+def test_build_parser() -> None:
+    args = cli.build_parser().parse_args(
+        ["--awardee", "A", "--awardee", "B", "--parallel", "--incremental"]
+    )
+    assert args.awardee == ["A", "B"]
+    assert args.parallel
+    assert args.incremental
+    assert args.log_level == "INFO"
+
+
+def test_main(
+    logger,
+    fake_config_file,
+    fake_participant_bundle,
+    fake_token,
+    monkeypatch,
+    tmp_path,
+    capsys,
+) -> None:
+    monkeypatch.chdir(tmp_path)
+    metrics_given: list = []
+
+    def fake_authenticate(*args, **kwargs) -> TokenProvider:
+        metrics_given.append(kwargs.get("metrics"))
+        return StaticTokenProvider(fake_token)
+
+    monkeypatch.setattr(cli, "authenticate", fake_authenticate)
+    output_dir = tmp_path / "output"
+
+    fake_aou_package: AouPackage = AouPackage(logger, config_file=str(fake_config_file))
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        exit_code: int = cli.main(
+            ["--config", str(fake_config_file), "--output-dir", str(output_dir)]
+        )
+
+    assert exit_code == cli.EXIT_OK
+    assert os.path.isfile(output_dir / "CAL_PMC_SDBB_participant_list.csv")
+    assert os.path.isfile(output_dir / "CAL_PMC_SDBB_participant_list_transformed.csv")
+    assert os.path.isfile(output_dir / "CAL_PMC_SDBB_participant_list.csv.idx")
+    out: str = capsys.readouterr().out
+    assert "Complete." in out
+    assert "Participants: 3" in out
+
+    # gcloud's timings go in the same metrics as the bytes written.
+    assert isinstance(metrics_given[0], RunMetrics)
+
+    with open(output_dir / METRICS_FILENAME, "r", encoding="utf-8") as file:
+        published: dict = json.loads(file.readline())
+
+    assert published["auth_s"] >= 0
+    assert any(name.endswith("_bytes_written") for name in published)
+
+    assert (
+        cli.main(
+            [
+                "--config",
+                str(fake_config_file),
+                "--output-dir",
+                str(output_dir),
+                "--summary",
+            ]
+        )
+        == cli.EXIT_OK
+    )
+    assert "By withdrawalStatus:" in capsys.readouterr().out
+
+    participant_id: str = fake_participant_bundle["entry"][0]["resource"][
+        "participantId"
+    ]
+    assert (
+        cli.main(
+            [
+                "--config",
+                str(fake_config_file),
+                "--output-dir",
+                str(output_dir),
+                "--lookup",
+                participant_id,
+            ]
+        )
+        == cli.EXIT_OK
+    )
+    out = capsys.readouterr().out
+    assert "CAL_PMC_SDBB_participant_list_transformed.csv:" in out
+    assert f"participantId: {participant_id}" in out
+    assert (
+        cli.main(
+            [
+                "--config",
+                str(fake_config_file),
+                "--output-dir",
+                str(output_dir),
+                "--lookup",
+                "P0",
+            ]
+        )
+        == cli.EXIT_FAILURE
+    )
+
+
+def test_main_failure(fake_config_file, monkeypatch, tmp_path) -> None:
+    monkeypatch.chdir(tmp_path)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("Unable to login.")
+
+    monkeypatch.setattr(cli, "authenticate", fail)
+    exit_code: int = cli.main(["--config", str(fake_config_file)])
+    assert exit_code == cli.EXIT_FAILURE
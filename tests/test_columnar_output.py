@@ -0,0 +1,118 @@
+"""
+Tests methods of columnar_output.py
+"""
+import datetime
+import pathlib
+from contextlib import ExitStack
+
+import pytest
+
+pyarrow = pytest.importorskip("pyarrow")
+
+# pylint: disable=wrong-import-position
+import pyarrow.feather
+import pyarrow.parquet
+
+from src.getmyapidata.columnar_output import (ColumnarWriter, column_type,
+                                              open_writers, to_arrow)
+from src.getmyapidata.output_options import OutputOptions
+
+COLUMNS: list[str] = [
+    "participantId",
+    "dateOfBirth",
+    "withdrawalTime",
+    "organization",
+    "consentForStudyEnrollment",
+    "zipCode",
+]
+
+
+def test_column_type() -> None:
+    assert column_type("dateOfBirth") == pyarrow.date32()
+    assert column_type("Date of Birth") == pyarrow.date32()
+    assert column_type("withdrawalTime") == pyarrow.timestamp("ms")
+    assert column_type("consentForStudyEnrollmentAuthored") == pyarrow.timestamp("ms")
+    assert column_type("Most Recent EHR Receipt") == pyarrow.timestamp("ms")
+    assert column_type("Withdrawal Date") == pyarrow.timestamp("ms")
+    assert pyarrow.types.is_dictionary(column_type("withdrawalStatus"))
+    assert pyarrow.types.is_dictionary(column_type("consentForStudyEnrollment"))
+    assert pyarrow.types.is_dictionary(column_type("Paired Organization"))
+    assert column_type("participantId") == pyarrow.string()
+
+
+def test_to_arrow() -> None:
+    assert to_arrow(
+        ["1/4/1962", "1999-12-31", "", None], pyarrow.date32()
+    ).to_pylist() == [
+        datetime.date(1962, 1, 4),
+        datetime.date(1999, 12, 31),
+        None,
+        None,
+    ]
+    assert to_arrow(
+        ["2020-01-02T03:04:05", "2020-01-02", "not a date"], pyarrow.timestamp("ms")
+    ).to_pylist() == [
+        datetime.datetime(2020, 1, 2, 3, 4, 5),
+        datetime.datetime(2020, 1, 2),
+        None,
+    ]
+    assert to_arrow(["a", 5, True, None], pyarrow.string()).to_pylist() == [
+        "a",
+        "5",
+        "True",
+        None,
+    ]
+
+
+@pytest.mark.parametrize("fmt", ["feather", "parquet"])
+def test_columnar_writer(fmt, logger, tmp_path) -> None:
+    rows: list[list] = [
+        ["P1", "1/4/1962", "2020-01-01T00:00:00", "ORG_A", "yes", "92029"],
+        ["P2", "", "", "ORG_B", "no", "02115"],
+        ["P3", "2001-02-03", "", "ORG_C", "yes", ""],
+    ]
+    options: OutputOptions = OutputOptions((fmt,), row_group_size=2)
+
+    with ExitStack() as stack:
+        writers: list = open_writers(
+            stack, str(tmp_path / "ORG_participant_list.csv"), COLUMNS, options, logger
+        )
+
+        for row in rows:
+            writers[0].write_row(row)
+
+        # Nothing's there till it's closed.
+        assert not (tmp_path / f"ORG_participant_list.{fmt}").exists()
+
+    filename: pathlib.Path = tmp_path / f"ORG_participant_list.{fmt}"
+    assert [path.name for path in tmp_path.iterdir()] == [filename.name]
+
+    if fmt == "parquet":
+        table = pyarrow.parquet.read_table(filename)
+        assert pyarrow.parquet.ParquetFile(filename).metadata.num_row_groups == 2
+    else:
+        table = pyarrow.feather.read_table(filename, memory_map=True)
+
+    assert table.schema.field("dateOfBirth").type == pyarrow.date32()
+    assert table.schema.field("withdrawalTime").type == pyarrow.timestamp("ms")
+    assert pyarrow.types.is_dictionary(table.schema.field("organization").type)
+    assert table.column("participantId").to_pylist() == ["P1", "P2", "P3"]
+    assert table.column("organization").to_pylist() == ["ORG_A", "ORG_B", "ORG_C"]
+    assert table.column("dateOfBirth").to_pylist()[1] is None
+    assert table.column("zipCode").to_pylist() == ["92029", "02115", None]
+
+
+def test_columnar_writer_failure(tmp_path) -> None:
+    filename: pathlib.Path = tmp_path / "broken.parquet"
+
+    with pytest.raises(RuntimeError):
+        with ColumnarWriter(
+            str(filename), "parquet", COLUMNS, OutputOptions(("parquet",))
+        ) as writer:
+            writer.write_row(["P1"])
+            raise RuntimeError("Stopped")
+
+    assert not list(tmp_path.iterdir())
+
+    with pytest.raises(ValueError):
+        ColumnarWriter(str(filename), "excel", COLUMNS, OutputOptions())
@@ -0,0 +1,36 @@
+"""
+Tests methods of combined_output.py
+"""
+import pathlib
+
+import pytest
+
+from src.getmyapidata.combined_output import CombinedOutput
+
+
+def test_combined_output(logger, tmp_path) -> None:
+    target: pathlib.Path = tmp_path / "combined.csv"
+    combined: CombinedOutput = CombinedOutput(str(target), ["Name", "ID"], "ID", logger)
+    combined.add([("P2", "Old,P2"), ("", "Nobody,"), ("P3", "Cy,P3")], rank=2.0)
+    combined.add([("P2", "Older,P2"), ("P1", "Al,P1")], rank=1.0)
+    combined.add([("P3", "New,P3")], rank=3.0)
+
+    previous: pathlib.Path = tmp_path / "previous.csv"
+    previous.write_text('Name,ID\n"Line\nbreak",P0\n\n', encoding="utf-8")
+    combined.add_converted_file(str(previous), rank=0.0)
+
+    assert combined.write() == 5
+    assert target.read_text(encoding="utf-8").splitlines() == [
+        "Name,ID",
+        "Nobody,",
+        '"Line',
+        'break",P0',
+        "Al,P1",
+        "Old,P2",
+        "New,P3",
+    ]
+
+    previous.write_text("Other,Columns\n", encoding="utf-8")
+
+    with pytest.raises(RuntimeError):
+        combined.add_converted_file(str(previous), rank=0.0)
@@ -0,0 +1,78 @@
+"""
+Tests methods related to class CommandRunner
+"""
+import sys
+import threading
+import time
+
+from src.getmyapidata.command_runner import CommandResult, CommandRunner, command_name
+from src.getmyapidata.metrics import RunMetrics
+
+SLEEP: list[str] = [sys.executable, "-c", "import time; time.sleep(10)"]
+
+
+def test_command_name() -> None:
+    assert command_name(["gcloud", "-q", "auth", "list", "--format=json"]) == (
+        "gcloud_auth_list"
+    )
+    assert command_name([r"C:\gcloud\bin\gcloud.cmd", "version"]) == "gcloud_version"
+
+
+def test_run(logger) -> None:
+    metrics: RunMetrics = RunMetrics()
+    runner: CommandRunner = CommandRunner(log=logger, metrics=metrics)
+    argv: list[str] = [sys.executable, "-c", "print('one'); print('two')"]
+
+    result: CommandResult = runner.run(argv)
+    assert result.returncode == 0
+    assert result.lines == ["one", "two"]
+    assert not result.timed_out and not result.cancelled
+
+    runner.run(argv)
+    assert metrics.as_dict()[f"{command_name(argv)}_count"] == 2
+    assert metrics.as_dict()[f"{command_name(argv)}_s"] > 0
+
+    result = runner.run([sys.executable, "-c", "import sys; sys.exit(3)"])
+    assert result.returncode == 3
+
+    # No shell, so nothing's found that isn't a real program.
+    result = runner.run(["no-such-program-here", "version"])
+    assert result.returncode is None
+    assert "not found" in result.lines[0]
+
+
+def test_run_timeout_and_cancel(logger) -> None:
+    runner: CommandRunner = CommandRunner(log=logger, default_timeout=0.3)
+    result: CommandResult = runner.run(SLEEP)
+    assert result.timed_out
+    assert result.returncode is None
+    assert result.duration < 5
+
+    # Including whatever the command started (gcloud's a wrapper script).
+    result = runner.run(
+        [
+            sys.executable,
+            "-c",
+            "import subprocess, sys; subprocess.run(sys.argv[1:])",
+            *SLEEP,
+        ]
+    )
+    assert result.timed_out
+    assert result.duration < 5
+
+    stop_event: threading.Event = threading.Event()
+    runner = CommandRunner(log=logger, stop_event=stop_event)
+    threading.Timer(0.3, stop_event.set).start()
+    result = runner.run(SLEEP)
+    assert result.cancelled
+    assert result.duration < 5
+
+
+def test_run_concurrently(logger) -> None:
+    runner: CommandRunner = CommandRunner(log=logger)
+    nap: list[str] = [sys.executable, "-c", "import time; time.sleep(1); print('up')"]
+
+    start: float = time.monotonic()
+    results: dict = runner.run_concurrently({"first": nap, "second": nap, "third": nap})
+    assert time.monotonic() - start < 2.5
+    assert [result.lines for result in results.values()] == [["up"]] * 3
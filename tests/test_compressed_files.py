@@ -0,0 +1,76 @@
+"""
+Tests methods of compressed_files.py
+"""
+import gzip
+import io
+import pathlib
+
+import pytest
+
+from src.getmyapidata.compressed_files import (BackgroundWriter,
+                                               compressed_filename,
+                                               compression_of, csv_files,
+                                               open_output, open_text,
+                                               uncompressed_filename)
+
+TEXT: str = (
+    'participantId,streetAddress\r\nP1,"12 Main St,\nApt 4"\r\nP2,Ünïcode\r\n' * 1000
+)
+
+
+@pytest.mark.parametrize("compression", ["none", "gzip", "zstd"])
+def test_round_trip(compression, tmp_path) -> None:
+    filename: str = compressed_filename(str(tmp_path / "A.csv"), compression)
+    sizes: dict = {}
+
+    with open_output(filename, sizes) as file:
+        file.write(TEXT)
+
+    with open_text(filename) as file:
+        assert file.read() == TEXT
+
+    assert compression_of(filename) == compression
+    assert uncompressed_filename(filename) == str(tmp_path / "A.csv")
+    assert sizes["csv_bytes"] == len(TEXT.encode("utf-8"))
+    assert sizes["bytes_written"] == pathlib.Path(filename).stat().st_size
+
+    if compression != "none":
+        assert sizes["bytes_written"] < sizes["csv_bytes"]
+
+
+def test_other_compressions_removed(tmp_path) -> None:
+    for name in ["A.csv", "A.csv.zst", "B.csv"]:
+        (tmp_path / name).write_text("old", encoding="utf-8")
+
+    with open_output(str(tmp_path / "A.csv.gz")) as file:
+        file.write(TEXT)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["A.csv.gz", "B.csv"]
+    assert gzip.decompress((tmp_path / "A.csv.gz").read_bytes()).decode() == TEXT
+    assert csv_files(str(tmp_path / "*")) == [
+        str(tmp_path / "A.csv.gz"),
+        str(tmp_path / "B.csv"),
+    ]
+
+
+def test_failed_write_leaves_nothing(tmp_path) -> None:
+    with pytest.raises(KeyError):
+        with open_output(str(tmp_path / "A.csv.gz")) as file:
+            file.write(TEXT)
+            raise KeyError("Stop.")
+
+    assert not list(tmp_path.iterdir())
+
+
+def test_background_writer_error() -> None:
+    class Broken(io.BytesIO):
+        def write(self, data) -> int:
+            raise OSError("Disk full.")
+
+    writer: BackgroundWriter = BackgroundWriter(Broken())
+    writer.write(b"x" * 10)
+
+    with pytest.raises(RuntimeError, match="Disk full"):
+        writer.close()
+
+    assert writer.bytes_written == 10
@@ -0,0 +1,82 @@
+"""
+Tests methods related to class ConversionManifest
+"""
+import json
+import os
+
+from src.getmyapidata.conversion_manifest import (MANIFEST_FILENAME,
+                                                  ConversionManifest,
+                                                  file_digest)
+
+
+def write(filename, text: str, mtime: float = None) -> None:
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write(text)
+
+    if mtime is not None:
+        os.utime(filename, (mtime, mtime))
+
+
+def test_conversion_manifest(logger, tmp_path) -> None:
+    source: str = str(tmp_path / "A_participant_list.csv")
+    target: str = str(tmp_path / "A_participant_list_transformed.csv")
+    write(source, "participantId\nP1\n", mtime=1_000_000)
+    write(target, "PMI ID\nP1\n")
+
+    manifest: ConversionManifest = ConversionManifest(str(tmp_path), "1", logger)
+    assert manifest.manifest_file == os.path.join(str(tmp_path), MANIFEST_FILENAME)
+    assert not manifest.is_current(source, target)
+
+    manifest.record(source, target)
+    manifest.save([source])
+    manifest = ConversionManifest(str(tmp_path), "1", logger)
+    assert manifest.is_current(source, target)
+
+    # Rewritten with the same content: the hash says it's unchanged.
+    write(source, "participantId\nP1\n", mtime=2_000_000)
+    assert manifest.is_current(source, target)
+
+    # Same size, different content.
+    write(source, "participantId\nP2\n", mtime=3_000_000)
+    assert not manifest.is_current(source, target)
+
+    # A different converter version redoes everything.
+    write(source, "participantId\nP1\n", mtime=1_000_000)
+    assert ConversionManifest(str(tmp_path), "1", logger).is_current(source, target)
+    assert not ConversionManifest(str(tmp_path), "2", logger).is_current(source, target)
+
+    # As does losing the output.
+    os.remove(target)
+    assert not manifest.is_current(source, target)
+
+
+def test_conversion_manifest_save(logger, tmp_path) -> None:
+    sources: list = []
+
+    for name in ["A", "B"]:
+        source: str = str(tmp_path / f"{name}_participant_list.csv")
+        target: str = str(tmp_path / f"{name}_participant_list_transformed.csv")
+        write(source, f"participantId\n{name}\n")
+        write(target, f"PMI ID\n{name}\n")
+        sources.append(source)
+
+    manifest: ConversionManifest = ConversionManifest(str(tmp_path), "1", logger)
+
+    for source in sources:
+        manifest.record(source, source.replace(".csv", "_transformed.csv"))
+
+    # B's gone: forget it.
+    manifest.save(sources[:1])
+
+    with open(manifest.manifest_file, "r", encoding="utf-8") as file:
+        saved: dict = json.load(file)
+
+    assert saved["converter_version"] == "1"
+    assert list(saved["files"]) == ["A_participant_list.csv"]
+    assert saved["files"]["A_participant_list.csv"]["hash"] == file_digest(sources[0])
+
+    # An unreadable manifest means converting everything.
+    write(manifest.manifest_file, "not json")
+    assert not ConversionManifest(str(tmp_path), "1", logger).is_current(
+        sources[0], sources[0].replace(".csv", "_transformed.csv")
+    )
@@ -0,0 +1,93 @@
+"""
+Tests methods related to class ConversionPlan
+"""
+import numpy as np
+import pandas
+import pytest
+
+from src.getmyapidata.conversion_plan import ConversionPlan, compile_plan
+from src.getmyapidata.healthpro_mapping import (ColumnMapping, Transform,
+                                                map_values, upper_case)
+
+
+def test_compile_plan(logger) -> None:
+    calls: list = []
+
+    def counted(values: pandas.Series, context: dict) -> pandas.Series:
+        calls.append(len(values))
+        return values + "!"
+
+    shout: Transform = Transform("shout", lambda value: value + "!", counted)
+    plan: ConversionPlan = compile_plan(
+        [
+            ColumnMapping("Name", "name", upper_case(), None),
+            ColumnMapping("Loud", "word", shout, None),
+            ColumnMapping("Louder", "word", shout, None),
+            ColumnMapping("Answer", "answer", map_values("yes/no", {"y": "1"}), "0"),
+            ColumnMapping("Fixed", None, None, "UNSET"),
+        ],
+        ["Name", "Empty", "Loud", "Louder", "Answer", "Fixed"],
+    )
+    assert plan.source_columns == ["answer", "name", "word"]
+
+    df: pandas.DataFrame = pandas.DataFrame(
+        {
+            "name": ["ann", "bob", "ann"],
+            "word": ["hi", "hi", np.nan],
+            "answer": ["y", "", "n"],
+            "unused": ["x", "y", "z"],
+        }
+    )
+    timings: dict = {}
+    converted: pandas.DataFrame = plan.run(df, logger, timings)
+
+    assert list(converted.columns) == plan.target_columns
+    assert list(converted["Name"]) == ["ANN", "BOB", "ANN"]
+    assert converted["Empty"].isna().all()
+    assert list(converted["Loud"].fillna("")) == ["hi!", "hi!", ""]
+    assert converted["Louder"].equals(converted["Loud"])
+    assert list(converted["Answer"]) == ["1", "0", "0"]
+    assert list(converted["Fixed"]) == ["UNSET"] * 3
+
+    # Once, for the one distinct value, for both targets.
+    assert calls == [1]
+    assert "word (shout)" in timings
+    assert "word (shout)" in ConversionPlan.report(timings)
+
+
+def test_compile_plan_unknown_target() -> None:
+    with pytest.raises(ValueError):
+        compile_plan([ColumnMapping("Nowhere", "name", None, None)], ["Name"])
+
+
+def test_missing_source_column(logger) -> None:
+    plan: ConversionPlan = compile_plan(
+        [ColumnMapping("State", "state", None, "UNSET")], ["State"]
+    )
+    converted: pandas.DataFrame = plan.run(pandas.DataFrame({"city": ["X"]}), logger)
+    assert list(converted["State"]) == ["UNSET"]
+
+
+def test_categorical_source(logger) -> None:
+    plan: ConversionPlan = compile_plan(
+        [
+            ColumnMapping(
+                "Status", "status", map_values("status", {"a": "1", "b": "1"}), None
+            ),
+            ColumnMapping("State", "state", None, "UNSET"),
+        ],
+        ["Status", "State"],
+    )
+    df: pandas.DataFrame = pandas.DataFrame(
+        {
+            "status": pandas.Categorical(["a", "b", "c", "a"]),
+            "state": pandas.Categorical(["CA", "", "NY", "CA"]),
+        }
+    )
+    converted: pandas.DataFrame = plan.run(df, logger)
+
+    assert isinstance(converted["Status"].dtype, pandas.CategoricalDtype)
+    assert list(converted["Status"].cat.categories) == ["1"]
+    assert list(converted["Status"].astype(object).fillna("")) == ["1", "1", "", "1"]
+    assert isinstance(converted["State"].dtype, pandas.CategoricalDtype)
+    assert list(converted["State"].astype(object)) == ["CA", "UNSET", "NY", "CA"]
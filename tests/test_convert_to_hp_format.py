@@ -1,47 +1,122 @@
 """
 Tests methods of convert_to_hp_format.py
 """
+import gzip
+import io
 import math
 import os
+import pathlib
+import shutil
 import sys
 from unittest.mock import MagicMock
 
 import pandas
+import pytest
 
-from src.getmyapidata.convert_to_hp_format import (HealthProConverter,
-                                                   convert_date,
-                                                   convert_patient_status)
+from src.getmyapidata.compressed_files import open_text
+from src.getmyapidata.convert_to_hp_format import (HEALTHPRO_COLUMNS,
+                                                   HEALTHPRO_PLAN,
+                                                   normalize_date_column,
+                                                   read_participant_list,
+                                                   to_healthpro,
+                                                   unique_column_names,
+                                                   write_with_arrow)
+from src.getmyapidata.healthpro_converter import (COMBINED_FILENAME,
+                                                  HealthProConverter,
+                                                  resolve_engine)
+from src.getmyapidata.healthpro_mapping import (DATE_FORMAT, HEALTHPRO_MAPPING,
+                                                normalize_date_value)
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.nested_fields import ResourceFlattener
+from src.getmyapidata.output_options import OutputOptions
 
 
-def test_convert_date(fake_series) -> None:
-    series: pandas.Series = convert_date(fake_series)
-    assert isinstance(series, pandas.Series)
-    assert series.size == fake_series.size
-    assert isinstance(series[0], str)
-    assert series[0] == "2025-12-25T00:00:00"
-    assert isinstance(series[1], float)
-    assert math.isnan(series[1])
+def file_lines(filename: str) -> list[str]:
+    with open(filename, "r", encoding="utf-8") as file:
+        return file.readlines()
+
+
+def flattened(df: pandas.DataFrame) -> pandas.DataFrame:
+    """
+    The participants as InSiteAPI writes them now, with patientStatus flattened.
+    """
+    flattener: ResourceFlattener = ResourceFlattener()
+    return pandas.DataFrame(
+        [flattener.flatten_row(row) for row in df.astype(object).to_dict("records")]
+    )
+
+
+@pytest.mark.parametrize(
+    "rows", [6, pytest.param(1_000_000, marks=pytest.mark.benchmark)]
+)
+def test_to_healthpro_patient_status(
+    fake_patient_status_dataframe, logger, rows
+) -> None:
+    statuses: list[str] = list(fake_patient_status_dataframe["patientStatus"]) + [
+        "[{'status': 'UNKNOWN', 'organization': 'CAL_PMC_UCSD'}]",
+        "[{'status': 'NO ACCESS', 'organization': 'CAL_PMC_SDBB'}]",
+        "[]",
+        "",
+    ]
+
+    # Each status flattened once, as InSiteAPI would have, then repeated.
+    distinct: pandas.DataFrame = flattened(
+        pandas.DataFrame({"participantId": "P1", "patientStatus": statuses})
+    )
+    df: pandas.DataFrame = distinct.iloc[
+        [i % len(statuses) for i in range(rows)]
+    ].reset_index(drop=True)
+    hp: pandas.DataFrame = to_healthpro(df, logger)
+
+    assert len(hp) == rows
+    expected: dict = {
+        "Patient Status: No": ["CAL_PMC_UCSD", None, None, None, None, None],
+        "Patient Status: Yes": [None, "CAL_PMC_SDBB", None, None, None, None],
+        "Patient Status: Unknown": [None, None, "CAL_PMC_UCSD", None, None, None],
+        "Patient Status: No Access": [None, None, None, "CAL_PMC_SDBB", None, None],
+    }
+
+    for column, values in expected.items():
+        assert (
+            list(hp[column][:6].astype(object).where(hp[column][:6].notna(), None))
+            == values
+        )
+
+    assert (
+        hp["Patient Status: No"].notna().sum()
+        == hp["Patient Status: Yes"].notna().sum()
+    )
+
 
+def test_unique_column_names() -> None:
+    assert unique_column_names(["a", "", "b", "a", "a", ""]) == [
+        "a",
+        "Unnamed: 1",
+        "b",
+        "a.1",
+        "a.2",
+        "Unnamed: 5",
+    ]
 
-def test_convert_patient_status(fake_patient_status_dataframe) -> None:
-    df: pandas.DataFrame = convert_patient_status(fake_patient_status_dataframe)
-    assert isinstance(df, pandas.DataFrame)
-    assert df.size == fake_patient_status_dataframe.size
-    assert "patientStatusOrganization" in df.columns
-    assert "patientStatusYes" in df.columns
-    assert "patientStatusNo" in df.columns
-    assert "patientStatusNoAccess" in df.columns
-    assert "patientStatusUnknown" in df.columns
-    assert df["patientStatusOrganization"][0] == "CAL_PMC_UCSD"
-    assert df["patientStatusOrganization"][1] == "CAL_PMC_SDBB"
-    assert not df["patientStatusYes"][0]
-    assert df["patientStatusYes"][1] == "CAL_PMC_SDBB"
-    assert df["patientStatusNo"][0] == "CAL_PMC_UCSD"
-    assert not df["patientStatusNo"][1]
-    assert not df["patientStatusNoAccess"][0]
-    assert not df["patientStatusNoAccess"][1]
-    assert not df["patientStatusUnknown"][0]
-    assert not df["patientStatusUnknown"][1]
+
+def test_write_with_arrow() -> None:
+    pytest.importorskip("pyarrow")
+    df: pandas.DataFrame = pandas.DataFrame(
+        {
+            "PMI ID": ["P1", "P2", "P3", "P4"],
+            "Street Address": ["1 Main St", 'The "Big" House', "A,B", "Line\nBreak"],
+            "Empty": [None, None, None, None],
+            "Some": ["x", None, float("nan"), ""],
+        }
+    )
+
+    for rows in [df, df.iloc[:1], df.iloc[:0]]:
+        for header in [True, False]:
+            expected: io.StringIO = io.StringIO()
+            rows.to_csv(expected, index=False, header=header)
+            written: io.StringIO = io.StringIO()
+            write_with_arrow(rows, written, header=header)
+            assert written.getvalue() == expected.getvalue()
 
 
 def test_hp_converter(fake_patient_dataframe, logger, hp_columns) -> None:
@@ -71,6 +146,525 @@ def test_hp_converter(fake_patient_dataframe, logger, hp_columns) -> None:
     assert transformed_dataframe.columns.isin(hp_columns).all()
 
 
+def test_normalize_date_column(fake_series) -> None:
+    cache: dict = {}
+    series: pandas.Series = normalize_date_column(fake_series, cache)
+    assert series[0] == "2025-12-25T00:00:00"
+    assert math.isnan(series[1])
+
+    raw_dates: pandas.Series = pandas.Series(
+        [
+            "2023-11-06T22:37:49",
+            "",
+            "2023-1-6T22:37:49",
+            "2023-13-06T22:37:49",
+            "2023-11-06T22:37:49",
+            None,
+        ],
+        index=[10, 11, 12, 13, 14, 15],
+    )
+    series = normalize_date_column(raw_dates, cache)
+    assert list(series.index) == list(raw_dates.index)
+    assert series[10] == "2023-11-06T22:37:49"
+    assert series[12] == "2023-01-06T22:37:49"
+    assert series[14] == "2023-11-06T22:37:49"
+
+    for i in [11, 13, 15]:
+        assert math.isnan(series[i])
+
+    # Fallback for strings not in the API's format.
+    raw_dates = pandas.Series(["2023-11-06T22:37:49Z", "2023-11-06T22:37:49Z"])
+    assert list(normalize_date_column(raw_dates, cache)) == [
+        normalize_date_value(date) for date in raw_dates
+    ]
+
+
+@pytest.mark.parametrize(
+    "rows", [50, pytest.param(200_000, marks=pytest.mark.benchmark)]
+)
+def test_to_healthpro_dates(logger, rows) -> None:
+    timestamps: pandas.Series = pandas.Series(
+        pandas.date_range("2018-01-01", periods=rows, freq="37min").strftime(
+            DATE_FORMAT
+        )
+    )
+    timestamps[::10] = ""
+    timestamps[1::10] = "2023-1-6T22:37:49"
+    date_mappings: list = [
+        mapping
+        for mapping in HEALTHPRO_MAPPING
+        if mapping.transform is not None and mapping.transform.name == "date"
+    ]
+    df: pandas.DataFrame = pandas.DataFrame(
+        {mapping.source: timestamps for mapping in date_mappings}
+    )
+    hp: pandas.DataFrame = to_healthpro(df, logger)
+
+    # Every date column, done at once, as each date would be done on its own.
+    expected: list = [normalize_date_value(date) for date in timestamps]
+
+    for mapping in date_mappings:
+        converted: pandas.Series = hp[mapping.target].astype(object)
+        assert list(converted.where(converted.notna(), None)) == expected
+
+
+def test_read_participant_list(tmp_path) -> None:
+    pytest.importorskip("pyarrow")
+    source: pathlib.Path = tmp_path / "A_participant_list.csv"
+    source.write_text(
+        'participantId,,city,city,streetAddress\nP1,,,Here,"1 Main St,\nApt 2"\nP2,x,There,,\n',
+        encoding="utf-8",
+    )
+    by_pandas: pandas.DataFrame = next(read_participant_list(str(source)))
+    by_arrow: pandas.DataFrame = next(
+        read_participant_list(str(source), engine="pyarrow")
+    )
+    assert list(by_arrow.columns) == list(by_pandas.columns)
+    assert by_arrow.astype(object).equals(by_pandas)
+
+    chunks: list = list(read_participant_list(str(source), 1, engine="pyarrow"))
+    assert pandas.concat(chunks).astype(object).equals(by_pandas)
+
+
+def test_read_participant_list_columns(tmp_path) -> None:
+    source: pathlib.Path = tmp_path / "A_participant_list.csv"
+    source.write_text("participantId,city,unused\nP1,Here,x\n", encoding="utf-8")
+    df: pandas.DataFrame = next(
+        read_participant_list(str(source), columns=["participantId", "city", "state"])
+    )
+    assert list(df.columns) == ["participantId", "city"]
+
+
+def test_read_participant_list_categories(tmp_path) -> None:
+    source: pathlib.Path = tmp_path / "A_participant_list.csv"
+    source.write_text(
+        "participantId,state,withdrawalStatus\nP1,CA,withdrawn\nP2,,not_withdrawn\n",
+        encoding="utf-8",
+    )
+    for engine in {"pandas", resolve_engine("auto", MagicMock())}:
+        df: pandas.DataFrame = next(read_participant_list(str(source), engine=engine))
+        assert isinstance(df["state"].dtype, pandas.CategoricalDtype)
+        assert list(df["state"].astype(object)) == ["CA", ""]
+        assert not isinstance(df["participantId"].dtype, pandas.CategoricalDtype)
+
+        hp: pandas.DataFrame = to_healthpro(df, MagicMock())
+        assert isinstance(hp["Withdrawal Status"].dtype, pandas.CategoricalDtype)
+        assert list(hp["Withdrawal Status"].astype(object)) == ["1", "0"]
+        assert list(hp["State"].astype(object)) == ["CA", "UNSET"]
+
+
+def test_to_healthpro(logger, hp_columns) -> None:
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+    participant_match: pandas.DataFrame = flattened(next(read_participant_list(source)))
+    timings: dict = {}
+    hp: pandas.DataFrame = to_healthpro(participant_match, logger, timings)
+
+    assert list(hp.columns) == HEALTHPRO_COLUMNS
+
+    assert set(HEALTHPRO_PLAN.source_columns) <= set(participant_match.columns)
+
+    # Going by the first entry only: the last participant is NO at UCSD first.
+    assert list(hp["Patient Status: No"].astype(object)) == ["CAL_PMC_UCSD"] * 3
+    assert list(hp["Patient Status: No Access"].astype(object)) == [None] * 3
+    assert hp["Login Phone"].equals(hp["Phone"])
+    assert (hp["Withdrawal Reason"] == "UNSET").all()
+    assert not (hp["State"] == "").any()
+    assert hp["Participant Status"].isna().all()
+    assert timings and "building the DataFrame" in timings
+
+
+def test_to_healthpro_patient_status_first_entry(logger) -> None:
+    participant_match: pandas.DataFrame = flattened(
+        pandas.DataFrame(
+            {
+                "participantId": ["P1"],
+                "patientStatus": [
+                    '[{"organization": "CAL_PMC_UCSD", "status": "YES"}, '
+                    '{"organization": "CAL_PMC_SDBB", "status": "YES"}]'
+                ],
+            }
+        )
+    )
+    hp: pandas.DataFrame = to_healthpro(participant_match, logger)
+
+    # Only the first entry, as HealthPro has always had it.
+    assert list(hp["Patient Status: Yes"].astype(object)) == ["CAL_PMC_UCSD"]
+
+
+def test_resolve_engine(logger) -> None:
+    assert resolve_engine("pandas", logger) == "pandas"
+    assert resolve_engine("auto", logger) in ["pandas", "pyarrow"]
+    assert resolve_engine("stream", logger) == "stream"
+    assert resolve_engine("auto", logger, 1000) == "stream"
+    assert resolve_engine("auto", logger, 10**9) in ["pandas", "pyarrow"]
+    assert resolve_engine("pandas", logger, 1000) == "pandas"
+
+    with pytest.raises(ValueError):
+        resolve_engine("fastest", logger)
+
+
+def test_hp_converter_chunked(logger, tmp_path) -> None:
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+    df: pandas.DataFrame = pandas.read_csv(source, dtype=str, keep_default_na=False)
+
+    # Enough participants to need several chunks, & a chunk that isn't full.
+    big_df: pandas.DataFrame = pandas.concat([df] * 1000, ignore_index=True)
+    big_df["participantId"] = [f"P{i:09d}" for i in range(len(big_df))]
+    whole_dir: pathlib.Path = tmp_path / "whole"
+    chunked_dir: pathlib.Path = tmp_path / "chunked"
+
+    for directory in [whole_dir, chunked_dir]:
+        directory.mkdir()
+        big_df.to_csv(directory / "big_participant_list.csv", index=False)
+        shutil.copy(source, directory)
+
+    HealthProConverter(log=logger, data_directory=str(whole_dir)).convert()
+    HealthProConverter(
+        log=logger, data_directory=str(chunked_dir), chunk_size=700
+    ).convert()
+
+    for filename in [
+        "big_participant_list_transformed.csv",
+        "TEST_participant_list_transformed.csv",
+    ]:
+        assert (chunked_dir / filename).read_bytes() == (
+            whole_dir / filename
+        ).read_bytes()
+
+    transformed: pandas.DataFrame = pandas.read_csv(
+        chunked_dir / "big_participant_list_transformed.csv"
+    )
+    assert len(transformed) == len(big_df)
+    assert transformed["PMI ID"].is_unique
+
+
+def test_hp_converter_chunked_empty(logger, tmp_path) -> None:
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+
+    with open(source, "r", encoding="utf-8") as file:
+        header: str = file.readline()
+
+    (tmp_path / "empty_participant_list.csv").write_text(header, encoding="utf-8")
+    HealthProConverter(
+        log=logger, data_directory=str(tmp_path), chunk_size=10
+    ).convert()
+    transformed: pandas.DataFrame = pandas.read_csv(
+        tmp_path / "empty_participant_list_transformed.csv"
+    )
+    assert transformed.empty
+    assert list(transformed.columns) == HEALTHPRO_COLUMNS
+
+
+def test_hp_converter_parallel(logger, tmp_path) -> None:
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+    df: pandas.DataFrame = pandas.read_csv(source, dtype=str, keep_default_na=False)
+    serial_dir: pathlib.Path = tmp_path / "serial"
+    parallel_dir: pathlib.Path = tmp_path / "parallel"
+
+    for directory in [serial_dir, parallel_dir]:
+        directory.mkdir()
+
+        for organization, copies in [("A", 1), ("B", 300), ("C", 30), ("D", 3)]:
+            pandas.concat([df] * copies, ignore_index=True).to_csv(
+                directory / f"{organization}_participant_list.csv", index=False
+            )
+
+    HealthProConverter(log=logger, data_directory=str(serial_dir)).convert()
+    mock_status_bar: MagicMock = MagicMock()
+    HealthProConverter(
+        log=logger,
+        data_directory=str(parallel_dir),
+        status_fn=mock_status_bar,
+        workers=2,
+    ).convert()
+
+    for organization in ["A", "B", "C", "D"]:
+        filename: str = f"{organization}_participant_list_transformed.csv"
+        assert (parallel_dir / filename).read_bytes() == (
+            serial_dir / filename
+        ).read_bytes()
+
+    messages: list = [call.args[0] for call in mock_status_bar.call_args_list]
+    assert messages[0] == "Converting 4 files on 2 processes."
+    assert len([m for m in messages if str(m).startswith("Converted '")]) == 4
+    assert messages[-1] == 100
+    assert any(
+        str(m).endswith("B_participant_list.csv' (900 participants).") for m in messages
+    )
+
+
+def test_hp_converter_skips_unchanged(logger, tmp_path) -> None:
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+
+    # A directory name with "transformed" in it mustn't stop anything being converted.
+    directory: pathlib.Path = tmp_path / "transformed_data"
+    directory.mkdir()
+
+    for organization in ["A", "B"]:
+        shutil.copy(source, directory / f"{organization}_participant_list.csv")
+
+    converter: HealthProConverter = HealthProConverter(
+        log=logger, data_directory=str(directory)
+    )
+    converter.convert()
+    assert sorted(os.listdir(directory)) == [
+        "A_participant_list.csv",
+        "A_participant_list_transformed.csv",
+        "B_participant_list.csv",
+        "B_participant_list_transformed.csv",
+        "conversion_manifest.json",
+    ]
+    output: pathlib.Path = directory / "A_participant_list_transformed.csv"
+    converted_at: float = output.stat().st_mtime_ns
+
+    # Nothing's changed.
+    mock_status_bar: MagicMock = MagicMock()
+    HealthProConverter(
+        log=logger, data_directory=str(directory), status_fn=mock_status_bar
+    ).convert()
+    mock_status_bar.assert_called_once_with(
+        "2 of 2 files unchanged since last converted."
+    )
+    assert output.stat().st_mtime_ns == converted_at
+
+    # Only B has changed.
+    with open(directory / "B_participant_list.csv", "a", encoding="utf-8") as file:
+        file.write(file_lines(source)[-1])
+
+    mock_status_bar = MagicMock()
+    HealthProConverter(
+        log=logger, data_directory=str(directory), status_fn=mock_status_bar
+    ).convert()
+    assert mock_status_bar.call_args_list[0].args[0] == (
+        "1 of 2 files unchanged since last converted."
+    )
+    assert output.stat().st_mtime_ns == converted_at
+    assert len(
+        pandas.read_csv(directory / "B_participant_list_transformed.csv")
+    ) == len(file_lines(source))
+
+    # Unless told to.
+    converter.convert(force=True)
+    assert output.stat().st_mtime_ns != converted_at
+
+
+def test_hp_converter_combined(logger, tmp_path) -> None:
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+    df: pandas.DataFrame = pandas.read_csv(source, dtype=str, keep_default_na=False)
+    organizations: dict = {
+        "A": range(50, 0, -1),
+        "B": range(50, 80),
+        "C": range(100, 120),
+    }
+    outputs: list = []
+
+    for engine, workers, chunk_size in [
+        ("stream", 1, 0),
+        ("pandas", 1, 0),
+        ("pyarrow", 2, 7),
+    ]:
+        directory: pathlib.Path = tmp_path / f"{engine}_{workers}"
+        directory.mkdir()
+
+        for organization, numbers in organizations.items():
+            organization_df: pandas.DataFrame = pandas.concat(
+                [df] * len(numbers), ignore_index=True
+            ).iloc[: len(numbers)]
+            organization_df["participantId"] = [f"P{number:03d}" for number in numbers]
+            organization_df["lastName"] = organization
+            organization_df.loc[0, "streetAddress"] = '12 "Quoted" St,\nApt 4'
+            organization_df.to_csv(
+                directory / f"{organization}_participant_list.csv", index=False
+            )
+
+        # P050's in A & B; B's the newer file, so its row wins.
+        os.utime(directory / "A_participant_list.csv", (1e9, 1e9))
+        HealthProConverter(
+            log=logger,
+            data_directory=str(directory),
+            workers=workers,
+            chunk_size=chunk_size,
+            engine=engine,
+            combined=True,
+        ).convert()
+        outputs.append((directory / COMBINED_FILENAME).read_bytes())
+
+    assert outputs[1] == outputs[0]
+    assert outputs[2] == outputs[0]
+
+    combined: pandas.DataFrame = pandas.read_csv(
+        directory / COMBINED_FILENAME, dtype=str, keep_default_na=False
+    )
+    assert list(combined.columns) == HEALTHPRO_COLUMNS
+    assert list(combined["PMI ID"]) == sorted(
+        {f"P{number:03d}" for numbers in organizations.values() for number in numbers}
+    )
+    assert combined.set_index("PMI ID").loc["P050", "Last Name"] == "B"
+    # A's first row is P050, so only B's & C's quoted addresses are left.
+    assert combined["Street Address"].str.contains("\n").sum() == 2
+
+    # Only C changes: A & B's rows come from their converted files.
+    combined_file: pathlib.Path = directory / COMBINED_FILENAME
+    c_file: pathlib.Path = directory / "C_participant_list.csv"
+    c_df: pandas.DataFrame = pandas.read_csv(c_file, dtype=str, keep_default_na=False)
+    c_df.loc[1, "lastName"] = "Changed"
+    c_df.to_csv(c_file, index=False)
+    converter: HealthProConverter = HealthProConverter(
+        log=logger, data_directory=str(directory), combined=True
+    )
+    converter.convert()
+    after_change: bytes = combined_file.read_bytes()
+    assert after_change != outputs[0]
+    assert after_change.count(b"Changed") == 1
+    converter.convert(force=True)
+    assert combined_file.read_bytes() == after_change
+
+    # Nothing's changed: the combined file's left alone.
+    written_at: float = combined_file.stat().st_mtime_ns
+    converter.convert()
+    assert combined_file.stat().st_mtime_ns == written_at
+
+    # An organization's gone.
+    c_file.unlink()
+    converter.convert()
+    assert b"P100" not in combined_file.read_bytes()
+
+
+def test_hp_converter_compressed(logger, tmp_path) -> None:
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+    plain_dir: pathlib.Path = tmp_path / "plain"
+    plain_dir.mkdir()
+    shutil.copy(source, plain_dir / "A_participant_list.csv")
+    HealthProConverter(
+        log=logger, data_directory=str(plain_dir), combined=True
+    ).convert()
+
+    for engine, workers in [("stream", 1), ("pandas", 1), ("pyarrow", 2)]:
+        directory: pathlib.Path = tmp_path / engine
+        directory.mkdir()
+
+        with open(source, "rb") as file:
+            (directory / "A_participant_list.csv.gz").write_bytes(
+                gzip.compress(file.read())
+            )
+
+        shutil.copy(source, directory / "B_participant_list.csv")
+        metrics: RunMetrics = RunMetrics()
+        HealthProConverter(
+            log=logger,
+            data_directory=str(directory),
+            workers=workers,
+            engine=engine,
+            combined=True,
+            output=OutputOptions(compression="zstd"),
+            metrics=metrics,
+        ).convert()
+
+        assert sorted(
+            p.name for p in directory.iterdir() if "transformed" in p.name
+        ) == [
+            "A_participant_list_transformed.csv.zst",
+            "B_participant_list_transformed.csv.zst",
+            COMBINED_FILENAME + ".zst",
+        ]
+
+        for organization in ["A", "B"]:
+            with open_text(
+                str(directory / f"{organization}_participant_list_transformed.csv.zst")
+            ) as file:
+                assert file.read() == (
+                    plain_dir / "A_participant_list_transformed.csv"
+                ).read_text(encoding="utf-8")
+
+        values: dict = metrics.as_dict()
+        assert values["converted_csv_bytes"] > values["converted_bytes_written"]
+        assert values["converted_compression_ratio"] > 1
+
+    # Compression's turned off: the files are converted again, uncompressed.
+    HealthProConverter(
+        log=logger, data_directory=str(directory), combined=True
+    ).convert()
+    assert sorted(p.name for p in directory.iterdir() if "transformed" in p.name) == [
+        "A_participant_list_transformed.csv",
+        "B_participant_list_transformed.csv",
+        COMBINED_FILENAME,
+    ]
+
+
+def test_hp_converter_engines(logger, tmp_path) -> None:
+    pytest.importorskip("pyarrow")
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+    df: pandas.DataFrame = pandas.read_csv(source, dtype=str, keep_default_na=False)
+    big_df: pandas.DataFrame = pandas.concat([df] * 500, ignore_index=True)
+
+    # Fields that must be quoted, & some that mustn't.
+    big_df.loc[5, "streetAddress"] = '12 "Quoted" St,\nApt 4'
+    big_df.loc[6, "streetAddress"] = "Ünïcode Street"
+    big_df.loc[7, "city"] = ""
+    big_df.loc[8, "city"] = "Here, There"
+    outputs: dict = {}
+
+    for engine, chunk_size in [("pandas", 0), ("pyarrow", 0), ("pyarrow", 300)]:
+        directory: pathlib.Path = tmp_path / f"{engine}_{chunk_size}"
+        directory.mkdir()
+        big_df.to_csv(directory / "big_participant_list.csv", index=False)
+        HealthProConverter(
+            log=logger,
+            data_directory=str(directory),
+            chunk_size=chunk_size,
+            engine=engine,
+        ).convert()
+        outputs[(engine, chunk_size)] = (
+            directory / "big_participant_list_transformed.csv"
+        ).read_bytes()
+
+    assert outputs[("pyarrow", 0)] == outputs[("pandas", 0)]
+    assert outputs[("pyarrow", 300)] == outputs[("pandas", 0)]
+
+
+def test_hp_converter_columnar(logger, tmp_path) -> None:
+    pyarrow = pytest.importorskip("pyarrow")
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    source: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+    output: OutputOptions = OutputOptions(("parquet", "feather"), row_group_size=2)
+    tables: dict = {}
+
+    for engine in ["pandas", "stream"]:
+        directory: pathlib.Path = tmp_path / engine
+        directory.mkdir()
+        shutil.copy(source, directory / "A_participant_list.csv")
+        HealthProConverter(
+            log=logger, data_directory=str(directory), engine=engine, output=output
+        ).convert()
+        tables[engine] = pyarrow.parquet.read_table(
+            directory / "A_participant_list_transformed.parquet"
+        )
+        assert tables[engine].equals(
+            pyarrow.feather.read_table(
+                directory / "A_participant_list_transformed.feather"
+            ).cast(tables[engine].schema)
+        )
+
+    table = tables["pandas"]
+    assert table.equals(tables["stream"])
+    assert table.column_names == HEALTHPRO_COLUMNS
+    assert table.num_rows == len(file_lines(source)) - 1
+    assert table.schema.field("Date of Birth").type == pyarrow.date32()
+    assert table.schema.field("Withdrawal Date").type == pyarrow.timestamp("ms")
+    assert pyarrow.types.is_dictionary(table.schema.field("Withdrawal Status").type)
+
+    # A columnar file's missing: the file's converted again, though it hasn't changed.
+    directory = tmp_path / "stream"
+    (directory / "A_participant_list_transformed.feather").unlink()
+    HealthProConverter(
+        log=logger, data_directory=str(directory), engine="stream", output=output
+    ).convert()
+    assert (directory / "A_participant_list_transformed.feather").exists()
+
+
 def test_hp_converter_no_status_fn(fake_patient_dataframe, logger, hp_columns) -> None:
     right_here: str = os.path.dirname(__file__)
 
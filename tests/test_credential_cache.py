@@ -0,0 +1,56 @@
+"""
+Tests methods related to class CredentialCache
+"""
+import json
+import os
+import stat
+import time
+
+from src.getmyapidata.credential_cache import CACHE_FILENAME, CredentialCache
+
+ACCOUNT: str = "awardee-not_real@all-of-us-ops-data-api-prod.iam.gserviceaccount.com"
+
+
+def write_key_file(key_file, client_email: str = ACCOUNT) -> None:
+    with open(key_file, "w", encoding="utf-8") as file:
+        json.dump({"type": "service_account", "client_email": client_email}, file)
+
+
+def test_credential_cache(logger, tmp_path) -> None:
+    key_file: str = str(tmp_path / "key.json")
+    write_key_file(key_file)
+    cache: CredentialCache = CredentialCache(key_file, ACCOUNT, logger)
+    assert cache.cache_file == os.path.join(str(tmp_path), CACHE_FILENAME)
+    assert cache.get() is None
+
+    cache.put("ya29.cached", time.time() + 3600)
+    assert CredentialCache(key_file, ACCOUNT, logger).get() == "ya29.cached"
+
+    if os.name == "posix":
+        # Nobody else can read the token.
+        assert stat.S_IMODE(os.stat(cache.cache_file).st_mode) == 0o600
+
+    # Another account's token is no good to us.
+    assert CredentialCache(key_file, "someone@else.com", logger).get() is None
+
+    # Nor is one from before the key file was replaced.
+    write_key_file(key_file, client_email="a-longer-address-" + ACCOUNT)
+    assert cache.get() is None
+
+    cache.clear()
+    assert not os.path.exists(cache.cache_file)
+
+
+def test_credential_cache_expiry(logger, tmp_path) -> None:
+    key_file: str = str(tmp_path / "key.json")
+    write_key_file(key_file)
+
+    # Tokens within the margin of expiring count as expired.
+    CredentialCache(key_file, ACCOUNT, logger).put("ya29.old", time.time() + 60)
+    assert CredentialCache(key_file, ACCOUNT, logger).get() is None
+
+    # A token whose expiry we don't know isn't cached at all.
+    cache: CredentialCache = CredentialCache(key_file, ACCOUNT, logger)
+    cache.put("ya29.new", time.time() + 3600)
+    cache.put("ya29.unknown", None)
+    assert not os.path.exists(cache.cache_file)
@@ -1,30 +1,54 @@
 """
 Tests methods in class GCloudTools
 """
+import json
 import os
 import subprocess
+import threading
+import time
 from typing import Union
 
 import pytest
 
 from src.getmyapidata.gcloud_tools import (GCloudTools, gcloud_tools_installed,
-                                           getoutput, system)
+                                           parse_access_token, wait_until)
+from src.getmyapidata.metrics import RunMetrics
 
 
-def test_getoutput() -> None:
-    # Exercise the 'command works' branch.
-    try:
-        result: list[str] = getoutput("dir")
-        assert isinstance(result, list)
-    except Exception as exc:
-        pytest.fail(f"'getoutput' raised an unexpected exception: {exc}")
+def read_fake_gcloud_state(fake_gcloud) -> dict:
+    with open(fake_gcloud / "fake_gcloud_state.json", "r", encoding="utf-8") as file:
+        return json.load(file)
 
-    # Exercise the branch for when command doesn't work.
-    try:
-        result: list[str] = getoutput("ls")
-        assert isinstance(result, list)
-    except Exception as exc:
-        pytest.fail(f"'getoutput' raised an unexpected exception: {exc}")
+
+def test_delete_old_keys(fake_aou_package, fake_gcloud, logger, tmp_path) -> None:
+    # One long-forgotten key & one a colleague made yesterday.
+    yesterday: str = time.strftime(
+        "%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - 86400)
+    )
+    with open(fake_gcloud / "fake_gcloud_state.json", "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "active": "",
+                "auth_list_calls": 0,
+                "calls": [],
+                "keys": [
+                    {"id": "forgotten", "created": "2020-01-01T00:00:00Z"},
+                    {"id": "abandoned", "created": "2021-01-01T00:00:00Z"},
+                    {"id": "colleague", "created": yesterday},
+                ],
+            },
+            file,
+        )
+
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    fake_aou_package.delete_old_keys = True
+    GCloudTools(aou_package=fake_aou_package, log=logger).run()
+
+    keys: list[str] = [key["id"] for key in read_fake_gcloud_state(fake_gcloud)["keys"]]
+    assert "forgotten" not in keys
+    assert "abandoned" not in keys
+    assert "colleague" in keys
+    assert len(keys) == 2
 
 
 @pytest.mark.skip(reason="No need to burn up token allotment.")
@@ -67,17 +91,194 @@ def test_installed() -> None:
     os.rename(full_new_file_path, file_path)
 
 
-def test_system() -> None:
-    # Exercise the 'command works' branch.
-    try:
-        system("dir")
-        assert True  # Add any other relevant assertions here
-    except Exception as exc:
-        pytest.fail(f"'system' raised an unexpected exception: {exc}")
-
-    # Exercise the branch for when command doesn't work.
-    try:
-        system("ls")
-        assert True  # Add any other relevant assertions here
-    except Exception as exc:
-        pytest.fail(f"'system' raised an unexpected exception: {exc}")
+def test_run_stop(fake_aou_package, fake_gcloud, logger, monkeypatch, tmp_path) -> None:
+    # The activated account never shows up, so we'd wait a minute.
+    monkeypatch.setenv("FAKE_GCLOUD_ACTIVATION_DELAY", "1000")
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    messages: list = []
+    metrics: RunMetrics = RunMetrics()
+    gcloud_tools: GCloudTools = GCloudTools(
+        aou_package=fake_aou_package,
+        log=logger,
+        status_fn=messages.append,
+        metrics=metrics,
+    )
+    threading.Timer(1.0, gcloud_tools.stop).start()
+
+    start: float = time.monotonic()
+    gcloud_tools.run()
+    assert time.monotonic() - start < 10
+    assert True not in messages
+
+    # Each gcloud command was timed.
+    assert metrics.as_dict()["gcloud_auth_list_count"] >= 1
+    assert metrics.as_dict()["gcloud_iam_service-accounts_s"] > 0
+
+
+def test_run_with_fake_gcloud(
+    fake_aou_package, fake_gcloud, logger, monkeypatch, tmp_path
+) -> None:
+    # Activation takes a couple of 'auth list' calls to show up.
+    monkeypatch.setenv("FAKE_GCLOUD_ACTIVATION_DELAY", "2")
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    messages: list = []
+    gcloud_tools: GCloudTools = GCloudTools(
+        aou_package=fake_aou_package, log=logger, status_fn=messages.append
+    )
+
+    start: float = time.monotonic()
+    gcloud_tools.run()
+
+    # Used to take a fixed 20 seconds.
+    assert time.monotonic() - start < 10
+    assert messages[-1] is True
+    assert gcloud_tools.get_token().startswith("ya29.")
+
+
+def test_run_reuses_cached_token(
+    fake_aou_package, fake_gcloud, logger, tmp_path
+) -> None:
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    first: GCloudTools = GCloudTools(aou_package=fake_aou_package, log=logger)
+    first.run()
+    token: str = first.get_token()
+
+    # The token the readiness probe got is the one handed out; gcloud isn't asked again.
+    calls: list[str] = read_fake_gcloud_state(fake_gcloud)["calls"]
+    assert len([call for call in calls if call.startswith("auth print-access")]) == 1
+
+    messages: list = []
+    second: GCloudTools = GCloudTools(
+        aou_package=fake_aou_package, log=logger, status_fn=messages.append
+    )
+    second.run()
+    assert second.get_token() == token
+    assert "Reusing cached credentials." in messages
+    assert messages[-1] is True
+
+    # Second time around, gcloud wasn't needed at all.
+    calls = read_fake_gcloud_state(fake_gcloud)["calls"]
+
+    assert (
+        len([call for call in calls if call.startswith("auth application-default")])
+        == 1
+    )
+
+    # Unless we insist.
+    GCloudTools(aou_package=fake_aou_package, log=logger, reuse_token=False).run()
+    calls = read_fake_gcloud_state(fake_gcloud)["calls"]
+    assert len([call for call in calls if call.startswith("auth activate")]) == 2
+
+
+def test_run_expiring_gcloud_token(
+    fake_aou_package, fake_gcloud, logger, monkeypatch, tmp_path
+) -> None:
+    # gcloud hands back its own cached token, which has only a couple of minutes left.
+    monkeypatch.setenv("FAKE_GCLOUD_TOKEN_SECONDS", "120")
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    first: GCloudTools = GCloudTools(aou_package=fake_aou_package, log=logger)
+    first.run()
+    first.get_token()
+
+    with open(tmp_path / "token_cache.json", "r", encoding="utf-8") as file:
+        assert json.load(file)["expires_at"] < time.time() + 180
+
+    # So it isn't reused.
+    messages: list = []
+    GCloudTools(
+        aou_package=fake_aou_package, log=logger, status_fn=messages.append
+    ).run()
+    assert "Reusing cached credentials." not in messages
+
+
+def test_installed_fake_gcloud(fake_gcloud) -> None:
+    assert gcloud_tools_installed()
+
+
+def test_key_file_reuse_and_rotation(
+    fake_aou_package, fake_gcloud, logger, tmp_path
+) -> None:
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    GCloudTools(aou_package=fake_aou_package, log=logger, reuse_token=False).run()
+
+    # The key file's new, so it's reused.
+    messages: list = []
+    GCloudTools(
+        aou_package=fake_aou_package,
+        log=logger,
+        status_fn=messages.append,
+        reuse_token=False,
+    ).run()
+    assert any(str(message).startswith("Reusing key file") for message in messages)
+    assert len(read_fake_gcloud_state(fake_gcloud)["keys"]) == 1
+
+    # Until it's too old.
+    old: float = time.time() - (fake_aou_package.key_max_age_days + 1) * 86400
+    os.utime(fake_aou_package.token_file, (old, old))
+    messages.clear()
+    GCloudTools(
+        aou_package=fake_aou_package,
+        log=logger,
+        status_fn=messages.append,
+        reuse_token=False,
+    ).run()
+    assert any("rotating" in str(message) for message in messages)
+    assert len(read_fake_gcloud_state(fake_gcloud)["keys"]) == 2
+    assert messages[-1] is True
+
+
+def test_parse_access_token() -> None:
+    assert parse_access_token(
+        ['{"token": "ya29.a", "token_expiry": "2030-01-01T00:00:00Z"}']
+    ) == ("ya29.a", 1893456000.0)
+    assert parse_access_token(
+        ['{"token": "ya29.a", "expiry": "2030-01-01T00:00:00"}']
+    ) == ("ya29.a", 1893456000.0)
+
+    token, expires_at = parse_access_token(
+        ['{"access_token": "ya29.b", "expires_in": 60}']
+    )
+    assert token == "ya29.b" and 0 < expires_at - time.time() <= 60
+
+    # Plain output from older versions: no expiry.
+    assert parse_access_token(["ya29.c"]) == ("ya29.c", None)
+    assert parse_access_token(["ERROR: no account"]) == ("ERROR: no account", None)
+    assert parse_access_token([]) == ("", None)
+
+
+def test_run_readiness_timeout(
+    fake_aou_package, fake_gcloud, logger, monkeypatch, tmp_path
+) -> None:
+    # The activated account never shows up.
+    monkeypatch.setenv("FAKE_GCLOUD_ACTIVATION_DELAY", "1000")
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    messages: list = []
+    gcloud_tools: GCloudTools = GCloudTools(
+        aou_package=fake_aou_package,
+        log=logger,
+        status_fn=messages.append,
+        readiness_timeout=0.5,
+    )
+
+    with pytest.raises(RuntimeError, match="activation"):
+        gcloud_tools.run()
+
+    assert True not in messages
+
+
+def test_wait_until() -> None:
+    calls: list = []
+
+    def ready_on_third_call() -> bool:
+        calls.append(time.monotonic())
+        return len(calls) >= 3
+
+    assert wait_until(ready_on_third_call, timeout=5, initial_interval=0.01)
+    assert len(calls) == 3
+
+    # Pauses grow between attempts.
+    assert calls[2] - calls[1] > calls[1] - calls[0]
+
+    start: float = time.monotonic()
+    assert not wait_until(lambda: False, timeout=0.2, initial_interval=0.01)
+    assert time.monotonic() - start < 1
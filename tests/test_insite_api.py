@@ -2,7 +2,9 @@
 Tests methods related to class InsiteAPI
 """
 import csv
+import gzip
 import os
+import pathlib
 from typing import Union
 from unittest import mock
 
@@ -12,7 +14,17 @@ import requests_mock
 from urllib3.exceptions import ConnectTimeoutError
 
 from src.getmyapidata.aou_package import AouPackage
-from src.getmyapidata.insite_api import InSiteAPI, join_headers, make_header
+from src.getmyapidata.insite_api import (
+    InSiteAPI,
+    join_headers,
+    make_header,
+    read_last_sync,
+    write_last_sync,
+)
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.output_options import OutputOptions
+from src.getmyapidata.participant_summary import read_summary
+from src.getmyapidata.token_provider import CachingTokenProvider, FileTokenProvider
 
 
 def test_join_headers() -> None:
@@ -160,7 +172,6 @@ def test_insite_api_malformed_json(
 def test_insite_api_no_report_fn(
     logger, fake_api_request_package, fake_json_no_total, fake_data_directory
 ) -> None:
-
     api_obj: InSiteAPI = InSiteAPI(
         api_package=fake_api_request_package,
         log=logger,
@@ -338,8 +349,398 @@ def test_insite_api_timeouts(
             response_list=[
                 {"status_code": 500},
                 {"exc": requests.exceptions.ConnectionError},
-            ]
+            ],
         )
 
         with pytest.raises(RuntimeError):
             api_obj.run()
+
+
+def test_insite_api_incremental(
+    logger, fake_api_request_package, fake_participant_bundle, tmp_path
+) -> None:
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+
+    # Full pull.
+    api_obj: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        api_obj.run()
+
+    api_obj.output_data(str(tmp_path))
+    write_last_sync(str(tmp_path), api_obj.last_sync)
+    since: str = read_last_sync(str(tmp_path))
+    assert since == api_obj.last_sync
+
+    # Only one participant changed since; the API is asked for just that one.
+    changed: dict = dict(fake_participant_bundle["entry"][0]["resource"])
+    changed["city"] = "Encinitas"
+    update: dict = {
+        "resourceType": "Bundle",
+        "total": 1,
+        "entry": [{"resource": changed}],
+    }
+
+    api_obj = InSiteAPI(api_package=fake_api_request_package, log=logger, since=since)
+    api_obj.load_data(str(tmp_path))
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET",
+            url=fake_url + "&_lastModified=gt" + since,
+            json=update,
+            status_code=200,
+        )
+        api_obj.run()
+        assert "_lastModified" in m.request_history[0].url
+
+    api_obj.output_data(str(tmp_path))
+
+    with open(
+        tmp_path / "CAL_PMC_SDBB_participant_list.csv", "r", encoding="utf-8"
+    ) as f:
+        rows: list[dict] = list(csv.DictReader(f))
+
+    assert len(rows) == len(fake_participant_bundle["entry"])
+    cities: dict = {row["participantId"]: row["city"] for row in rows}
+    assert cities[changed["participantId"]] == "Encinitas"
+
+
+def test_insite_api_organization_move(
+    logger, fake_api_request_package, fake_participant_bundle, tmp_path
+) -> None:
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+
+    # One participant starts out at an organization of their own.
+    mover: dict = dict(fake_participant_bundle["entry"][0]["resource"])
+    mover["organization"] = "OLD_ORG"
+    bundle: dict = {
+        **fake_participant_bundle,
+        "entry": [{"resource": mover}] + fake_participant_bundle["entry"][1:],
+    }
+    api_obj: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(method="GET", url=fake_url, json=bundle, status_code=200)
+        api_obj.run()
+
+    api_obj.output_data(str(tmp_path))
+    write_last_sync(str(tmp_path), api_obj.last_sync)
+    assert os.path.isfile(tmp_path / "OLD_ORG_participant_list.csv")
+
+    # Then moves, leaving it with nobody.
+    since: str = read_last_sync(str(tmp_path))
+    moved: dict = dict(fake_participant_bundle["entry"][0]["resource"])
+    update: dict = {
+        "resourceType": "Bundle",
+        "total": 1,
+        "entry": [{"resource": moved}],
+    }
+    api_obj = InSiteAPI(api_package=fake_api_request_package, log=logger, since=since)
+    api_obj.load_data(str(tmp_path))
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET",
+            url=fake_url + "&_lastModified=gt" + since,
+            json=update,
+            status_code=200,
+        )
+        api_obj.run()
+
+    api_obj.output_data(str(tmp_path))
+
+    # No header-only file is left behind for it.
+    assert not os.path.exists(tmp_path / "OLD_ORG_participant_list.csv")
+
+    with open(
+        tmp_path / "CAL_PMC_SDBB_participant_list.csv", "r", encoding="utf-8"
+    ) as f:
+        rows: list[dict] = list(csv.DictReader(f))
+
+    assert len(rows) == len(fake_participant_bundle["entry"])
+
+
+def test_insite_api_columnar_output(
+    logger, fake_api_request_package, fake_participant_bundle, tmp_path
+) -> None:
+    pyarrow = pytest.importorskip("pyarrow")
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.parquet
+
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    api_obj: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        api_obj.run()
+
+    api_obj.output_data(str(tmp_path), output=OutputOptions(("parquet", "feather")))
+
+    with open(
+        tmp_path / "CAL_PMC_SDBB_participant_list.csv", "r", encoding="utf-8"
+    ) as f:
+        rows: list[dict] = list(csv.DictReader(f))
+
+    table = pyarrow.parquet.read_table(
+        tmp_path / "CAL_PMC_SDBB_participant_list.parquet"
+    )
+    assert table.column_names == list(rows[0])
+    assert table.column("participantId").to_pylist() == [
+        row["participantId"] for row in rows
+    ]
+    assert pyarrow.types.is_timestamp(table.schema.field("withdrawalTime").type)
+    assert os.path.isfile(tmp_path / "CAL_PMC_SDBB_participant_list.feather")
+
+    with pytest.raises(ValueError):
+        api_obj.output_data(str(tmp_path), output=OutputOptions(("excel",)))
+
+
+def test_insite_api_compressed_output(
+    logger, fake_api_request_package, fake_participant_bundle, tmp_path
+) -> None:
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    api_obj: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        api_obj.run()
+
+    directory: pathlib.Path = tmp_path / "data"
+    directory.mkdir()
+    api_obj.output_data(str(directory))
+    plain: bytes = (directory / "CAL_PMC_SDBB_participant_list.csv").read_bytes()
+    metrics: RunMetrics = RunMetrics()
+    api_obj.output_data(
+        str(directory), output=OutputOptions(compression="gzip"), metrics=metrics
+    )
+
+    # The uncompressed file's replaced, not kept alongside.
+    assert os.listdir(directory) == ["CAL_PMC_SDBB_participant_list.csv.gz"]
+    assert (
+        gzip.decompress(
+            (directory / "CAL_PMC_SDBB_participant_list.csv.gz").read_bytes()
+        )
+        == plain
+    )
+    assert metrics.as_dict()["output_csv_bytes"] == len(plain)
+    assert metrics.as_dict()["output_compression_ratio"] > 1
+
+    # Loaded back the same as the uncompressed file, for the next incremental run.
+    plain_directory: pathlib.Path = tmp_path / "plain"
+    plain_directory.mkdir()
+    (plain_directory / "CAL_PMC_SDBB_participant_list.csv").write_bytes(plain)
+    reloaded: list[bytes] = []
+
+    for source in [directory, plain_directory]:
+        api_obj = InSiteAPI(api_package=fake_api_request_package, log=logger)
+        api_obj.load_data(str(source))
+        api_obj.output_data(str(source))
+        reloaded.append((source / "CAL_PMC_SDBB_participant_list.csv").read_bytes())
+
+    assert reloaded[0] == reloaded[1]
+
+
+def test_insite_api_partitioned_output(
+    logger, fake_api_request_package, fake_participant_bundle, tmp_path
+) -> None:
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    api_obj: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        api_obj.run()
+
+    api_obj.output_data(
+        str(tmp_path),
+        output=OutputOptions(partition_by=("organization", "withdrawalStatus")),
+    )
+
+    with open(
+        tmp_path / "CAL_PMC_SDBB_participant_list.csv", "r", encoding="utf-8"
+    ) as f:
+        rows: list[dict] = list(csv.DictReader(f))
+
+    partitioned: list[str] = []
+
+    for status in {row["withdrawalStatus"] for row in rows}:
+        with open(
+            tmp_path
+            / "partitioned"
+            / "organization=CAL_PMC_SDBB"
+            / f"withdrawalStatus={status}"
+            / "part-0000.csv",
+            "r",
+            encoding="utf-8",
+        ) as f:
+            reader: csv.DictReader = csv.DictReader(f)
+            assert "withdrawalStatus" not in reader.fieldnames
+            partitioned.extend(row["participantId"] for row in reader)
+
+    assert sorted(partitioned) == sorted(row["participantId"] for row in rows)
+
+
+def test_insite_api_summary(
+    logger, fake_api_request_package, fake_participant_bundle, tmp_path
+) -> None:
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    api_obj: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        api_obj.run()
+
+    api_obj.summary.write(str(tmp_path))
+    api_obj.output_data(str(tmp_path))
+    summary: dict = read_summary(str(tmp_path))
+    assert summary["participants"] == len(fake_participant_bundle["entry"])
+    assert summary == api_obj.summary.as_dict()
+
+    # The same participants again replace what's counted, rather than adding to it.
+    reloaded: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+    reloaded.load_data(str(tmp_path))
+    reloaded.load_data(str(tmp_path))
+    assert reloaded.summary.as_dict()["organizations"] == summary["organizations"]
+    assert (
+        reloaded.summary.as_dict()["counts"]["withdrawalStatus"]
+        == summary["counts"]["withdrawalStatus"]
+    )
+
+
+def test_insite_api_nested_fields(
+    logger, fake_api_request_package, fake_json, tmp_path
+) -> None:
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    fake_json["entry"][0]["resource"]["patientStatus"] = [
+        {"status": "NO_ACCESS", "organization": "ST_MARY'S"},
+        {"status": "YES", "organization": "FakeUniversity"},
+    ]
+    fake_json["entry"][1]["resource"]["patientStatus"] = []
+    api_obj: InSiteAPI = InSiteAPI(api_package=fake_api_request_package, log=logger)
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(method="GET", url=fake_url, json=fake_json, status_code=200)
+        api_obj.run()
+
+    api_obj.output_data(str(tmp_path))
+    csv_file = tmp_path / "FakeUniversity_participant_list.csv"
+
+    with open(csv_file, "r", newline="", encoding="utf-8") as f:
+        rows: list[dict] = list(csv.DictReader(f))
+
+    assert rows[0]["patientStatus"] == (
+        '[{"organization":"ST_MARY\'S","status":"NO_ACCESS"},'
+        '{"organization":"FakeUniversity","status":"YES"}]'
+    )
+    assert rows[0]["patientStatusNoAccess"] == "ST_MARY'S"
+    assert rows[0]["patientStatusYes"] == "FakeUniversity"
+    assert rows[0]["patientStatusNo"] == ""
+    assert rows[1]["patientStatus"] == "[]"
+    assert rows[1]["patientStatusYes"] == ""
+
+    # A file written before patientStatus was flattened gets its columns when loaded.
+    with open(csv_file, "w", newline="", encoding="utf-8") as f:
+        writer: csv.writer = csv.writer(f)
+        writer.writerow(["organization", "patientName", "patientStatus"])
+        writer.writerow(
+            [
+                "FakeUniversity",
+                "Ima Patient",
+                "[{'status': 'NO', 'organization': \"ST_MARY'S\"}]",
+            ]
+        )
+
+    api_obj = InSiteAPI(api_package=fake_api_request_package, log=logger)
+    api_obj.load_data(str(tmp_path))
+    api_obj.output_data(str(tmp_path))
+
+    with open(csv_file, "r", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    assert rows[0]["patientStatus"] == '[{"organization":"ST_MARY\'S","status":"NO"}]'
+    assert rows[0]["patientStatusNo"] == "ST_MARY'S"
+    assert rows[0]["patientStatusYes"] == ""
+
+
+def test_insite_api_token_refresh(
+    logger, fake_api_request_package, fake_participant_bundle, tmp_path
+) -> None:
+    fake_aou_package: AouPackage = fake_api_request_package.aou_package
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+
+    # Someone else keeps the token file fresh; ours has just expired.
+    token_file = tmp_path / "token.txt"
+    token_file.write_text("ya29.expired\n")
+    provider: CachingTokenProvider = CachingTokenProvider(
+        FileTokenProvider(str(token_file))
+    )
+    api_obj: InSiteAPI = InSiteAPI(
+        api_package=fake_api_request_package, log=logger, token_provider=provider
+    )
+
+    def respond(request, context) -> dict:
+        if request.headers["Authorization"] == "Bearer ya29.fresh":
+            context.status_code = 200
+            return fake_participant_bundle
+
+        token_file.write_text("ya29.fresh\n")
+        context.status_code = 401
+        return {"message": "Request had invalid authentication credentials."}
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(method="GET", url=fake_url, json=respond)
+        api_obj.run()
+        assert m.call_count == 2
+
+    api_obj.output_data(str(tmp_path))
+    assert os.path.isfile(tmp_path / "CAL_PMC_SDBB_participant_list.csv")
@@ -0,0 +1,87 @@
+"""
+Tests methods of nested_fields.py
+"""
+import json
+
+from src.getmyapidata.nested_fields import (PATIENT_STATUS_RULE,
+                                            ResourceFlattener, canonical_json,
+                                            group_rule, parse_nested)
+
+STATUS: list = [
+    {"status": "YES", "organization": "CAL_PMC_SDBB"},
+    {"status": "NO_ACCESS", "organization": "ST_MARY'S"},
+    {"status": "YES", "organization": "CAL_PMC_UCSD"},
+]
+
+
+def test_canonical_json() -> None:
+    assert canonical_json({"b": 1, "a": ["é"]}) == '{"a":["é"],"b":1}'
+    assert canonical_json({"a": ["é"], "b": 1}) == canonical_json({"b": 1, "a": ["é"]})
+
+
+def test_group_rule() -> None:
+    assert PATIENT_STATUS_RULE.flatten(STATUS) == {
+        "patientStatusYes": "CAL_PMC_SDBB;CAL_PMC_UCSD",
+        "patientStatusNo": None,
+        "patientStatusNoAccess": "ST_MARY'S",
+        "patientStatusUnknown": None,
+        "patientStatusFirstYes": "CAL_PMC_SDBB",
+        "patientStatusFirstNo": None,
+        "patientStatusFirstNoAccess": None,
+        "patientStatusFirstUnknown": None,
+    }
+    assert set(PATIENT_STATUS_RULE.flatten([]).values()) == {None}
+
+    rule = group_rule("sites", "kind", "name", {"MAIN": "mainSite"})
+    assert rule.columns == ["mainSite"]
+    assert rule.flatten({"kind": "main", "name": "A"}) == {"mainSite": "A"}
+    assert rule.flatten([{"kind": "other", "name": "B"}, "junk"]) == {"mainSite": None}
+
+    # Only the first entry counts for first_columns, whatever comes after it.
+    rule = group_rule("sites", "kind", "name", {}, {"MAIN": "firstMainSite"})
+    assert rule.columns == ["firstMainSite"]
+    assert rule.flatten([{"kind": "MAIN", "name": "A"}]) == {"firstMainSite": "A"}
+    assert rule.flatten([{"kind": "other"}, {"kind": "main", "name": "B"}]) == {
+        "firstMainSite": None
+    }
+
+
+def test_parse_nested() -> None:
+    assert parse_nested("") is None
+    assert parse_nested("not nested") is None
+    assert parse_nested(canonical_json(STATUS)) == STATUS
+    assert parse_nested(repr(STATUS)) == STATUS
+
+
+def test_resource_flattener() -> None:
+    flattener: ResourceFlattener = ResourceFlattener()
+    resource: dict = {
+        "participantId": "P1",
+        "patientStatus": list(STATUS),
+        "other": {"z": 1, "a": None},
+    }
+
+    assert flattener.flatten(resource) is resource
+    assert resource["participantId"] == "P1"
+    assert json.loads(resource["patientStatus"]) == STATUS
+    assert resource["other"] == '{"a":null,"z":1}'
+    assert resource["patientStatusYes"] == "CAL_PMC_SDBB;CAL_PMC_UCSD"
+    assert resource["patientStatusNoAccess"] == "ST_MARY'S"
+    assert resource["patientStatusNo"] is None
+    assert flattener.columns_for(["participantId", "patientStatus"]) == list(
+        PATIENT_STATUS_RULE.columns
+    )
+    assert flattener.columns_for(["participantId"]) == []
+
+    # Rows read back from an old file get the columns; rows from a new one are left alone.
+    legacy: dict = {"participantId": "P2", "patientStatus": repr(STATUS)}
+    flattener.flatten_row(legacy)
+    assert legacy["patientStatus"] == canonical_json(STATUS)
+    assert legacy["patientStatusYes"] == "CAL_PMC_SDBB;CAL_PMC_UCSD"
+
+    current: dict = dict(legacy, patientStatusYes="unchanged")
+    assert flattener.flatten_row(current)["patientStatusYes"] == "unchanged"
+
+    assert ResourceFlattener([]).flatten({"patientStatus": []}) == {
+        "patientStatus": "[]"
+    }
@@ -0,0 +1,58 @@
+"""
+Tests methods of output_options.py
+"""
+import importlib.util
+
+import pytest
+
+from src.getmyapidata.output_options import (OutputOptions, check_options,
+                                             columnar_filename, parse_columns,
+                                             parse_formats)
+
+
+def test_check_options(monkeypatch) -> None:
+    check_options(OutputOptions())
+
+    with pytest.raises(ValueError):
+        check_options(OutputOptions(("excel",)))
+
+    with pytest.raises(ValueError):
+        check_options(OutputOptions(parquet_compression="zip"))
+
+    with pytest.raises(ValueError):
+        check_options(OutputOptions(row_group_size=0))
+
+    with pytest.raises(ValueError):
+        check_options(OutputOptions(compression="bzip2"))
+
+    with pytest.raises(ValueError):
+        check_options(OutputOptions(partition_by=("organization", "organization")))
+
+    monkeypatch.setattr(importlib.util, "find_spec", lambda name: None)
+
+    with pytest.raises(RuntimeError):
+        check_options(OutputOptions(("parquet",)))
+
+
+def test_columnar_filename() -> None:
+    assert (
+        columnar_filename("/data/A_participant_list.csv", "parquet")
+        == "/data/A_participant_list.parquet"
+    )
+    assert columnar_filename("A_transformed.csv", "feather") == "A_transformed.feather"
+    assert (
+        columnar_filename("A_transformed.csv.zst", "parquet") == "A_transformed.parquet"
+    )
+
+
+def test_parse_columns() -> None:
+    assert parse_columns("") == ()
+    assert parse_columns(" organization; withdrawalStatus,organization") == (
+        "organization",
+        "withdrawalStatus",
+    )
+
+
+def test_parse_formats() -> None:
+    assert parse_formats("") == ()
+    assert parse_formats("Parquet, feather; parquet,csv") == ("parquet", "feather")
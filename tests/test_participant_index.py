@@ -0,0 +1,101 @@
+"""
+Tests methods of participant_index.py
+"""
+import csv
+import gzip
+import os
+import pathlib
+import shutil
+
+import pytest
+
+from src.getmyapidata.participant_index import (ParticipantIndex, build_index,
+                                                index_filename, is_current,
+                                                lookup, update_indexes)
+
+SOURCE: str = os.path.join(os.path.dirname(__file__), "TEST_participant_list.csv")
+
+
+def write_rows(filename: pathlib.Path, header: list[str], rows: list[list]) -> None:
+    with open(filename, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_build_index(tmp_path) -> None:
+    target: pathlib.Path = tmp_path / "A_participant_list_transformed.csv"
+    rows: list[list] = [
+        [
+            f"P{number:03d}",
+            f"{number} Main St,\nApt {number}" if number % 3 else "Ünïcode",
+        ]
+        for number in range(200, 0, -1)
+    ]
+    write_rows(
+        target, ["PMI ID", "Street Address"], rows + [["P007", "Again"], ["", "?"]]
+    )
+
+    assert build_index(str(target)) == 201
+    assert is_current(str(target))
+
+    with ParticipantIndex(index_filename(str(target))) as index:
+        assert len(index) == 201
+        assert len(index.find("P007")) == 2
+        assert index.find("P000") == []
+        assert index.find("P0070") == []
+
+        with open(target, "rb") as file:
+            offset, length = index.find("P151")[0]
+            file.seek(offset)
+            assert file.read(length).decode() == 'P151,"151 Main St,\nApt 151"\r\n'
+
+    assert [row for _, row in lookup(str(tmp_path), "P003")] == [
+        {"PMI ID": "P003", "Street Address": "Ünïcode"}
+    ]
+    assert [row["Street Address"] for _, row in lookup(str(tmp_path), "P007")] == [
+        "7 Main St,\nApt 7",
+        "Again",
+    ]
+    assert lookup(str(tmp_path), "P999") == []
+
+
+def test_update_indexes(logger, tmp_path) -> None:
+    shutil.copy(SOURCE, tmp_path / "A_participant_list.csv")
+    write_rows(tmp_path / "notes.csv", ["Note"], [["Not participants"]])
+
+    assert update_indexes(str(tmp_path), logger) == 1
+    assert update_indexes(str(tmp_path), logger) == 0
+    assert not os.path.exists(index_filename(str(tmp_path / "notes.csv")))
+
+    # Only the changed file's indexed again.
+    shutil.copy(SOURCE, tmp_path / "B_participant_list.csv")
+    assert update_indexes(str(tmp_path), logger) == 1
+    write_rows(tmp_path / "B_participant_list.csv", ["participantId"], [["P1"]])
+    assert not is_current(str(tmp_path / "B_participant_list.csv"))
+    assert update_indexes(str(tmp_path), logger) == 1
+    assert [filename for filename, _ in lookup(str(tmp_path), "P1")] == [
+        str(tmp_path / "B_participant_list.csv")
+    ]
+
+    # Compressed files aren't indexed, but are still searched.
+    (tmp_path / "C_participant_list.csv.gz").write_bytes(
+        gzip.compress(pathlib.Path(SOURCE).read_bytes())
+    )
+    (tmp_path / "B_participant_list.csv").unlink()
+    assert update_indexes(str(tmp_path), logger) == 0
+    assert sorted(
+        os.path.basename(filename)
+        for filename, _ in lookup(str(tmp_path), "P222222222")
+    ) == ["A_participant_list.csv", "C_participant_list.csv.gz"]
+    assert not os.path.exists(index_filename(str(tmp_path / "B_participant_list.csv")))
+
+
+def test_not_an_index(tmp_path) -> None:
+    (tmp_path / "A.csv.idx").write_bytes(b"Something else entirely")
+
+    with pytest.raises(RuntimeError):
+        ParticipantIndex(str(tmp_path / "A.csv.idx"))
+
+    with pytest.raises(RuntimeError):
+        build_index(str(tmp_path / "A.csv.idx"))
@@ -0,0 +1,91 @@
+"""
+Tests methods of participant_summary.py
+"""
+import csv
+import datetime
+
+from src.getmyapidata.participant_summary import (BLANK, NEVER,
+                                                  ParticipantSummary,
+                                                  format_summary, read_summary,
+                                                  recency_band)
+
+TODAY: datetime.date = datetime.date(2024, 6, 30)
+
+
+def participant(organization: str, withdrawal: str, ehr: str = "", **fields) -> dict:
+    return dict(
+        organization=organization,
+        withdrawalStatus=withdrawal,
+        latestEhrReceiptTime=ehr,
+        consentForStudyEnrollment="yes",
+        **fields,
+    )
+
+
+def test_recency_band() -> None:
+    assert recency_band(0) == "0-30 days"
+    assert recency_band(31) == "31-90 days"
+    assert recency_band(365) == "91-365 days"
+    assert recency_band(366) == "over 365 days"
+
+
+def test_participant_summary(tmp_path) -> None:
+    summary: ParticipantSummary = ParticipantSummary()
+    old: dict = participant("A", "NOT_WITHDRAWN", "2024-06-20T10:00:00")
+    summary.add(old)
+    summary.add(participant("A", "NOT_WITHDRAWN", patientStatusYes="A;B"))
+    summary.add(
+        participant("B", "EARLY_OUT", "2022-01-01T00:00:00", patientStatusNo="B")
+    )
+
+    # A newer version replaces the old one.
+    summary.remove(old)
+    summary.add(participant("B", "EARLY_OUT", "2024-04-01T00:00:00"))
+
+    values: dict = summary.as_dict(TODAY)
+    assert values["participants"] == 3
+    assert values["organizations"] == {"A": 1, "B": 2}
+    assert values["counts"]["withdrawalStatus"] == {"EARLY_OUT": 2, "NOT_WITHDRAWN": 1}
+    assert values["counts"]["deactivationStatus"] == {BLANK: 3}
+    assert values["counts"]["patientStatus"] == {BLANK: 1, "NO": 1, "YES": 1}
+    assert values["counts"]["ehrReceipt"] == {
+        "31-90 days": 1,
+        NEVER: 1,
+        "over 365 days": 1,
+    }
+    assert values["by_organization"]["A"]["withdrawalStatus"] == {"NOT_WITHDRAWN": 1}
+
+    # Recency's measured from when it's reported, not when the participant arrived.
+    assert summary.as_dict(TODAY + datetime.timedelta(days=365))["counts"][
+        "ehrReceipt"
+    ] == {NEVER: 1, "over 365 days": 2}
+
+    summary.write(str(tmp_path), TODAY)
+    assert read_summary(str(tmp_path)) == values
+
+    with open(
+        tmp_path / "summary" / "participant_summary.csv", "r", encoding="utf-8"
+    ) as file:
+        rows: list[dict] = list(csv.DictReader(file))
+
+    assert rows[0] == {
+        "organization": "ALL",
+        "field": "participants",
+        "value": "",
+        "participants": "3",
+    }
+    assert {
+        "organization": "B",
+        "field": "withdrawalStatus",
+        "value": "EARLY_OUT",
+        "participants": "2",
+    } in rows
+
+    text: str = format_summary(values)
+    assert text.startswith("Participants: 3 (as of 2024-06-30)")
+    assert "By withdrawalStatus:" in text
+    assert ["EARLY_OUT", "2"] in [line.split() for line in text.splitlines()]
+
+    summary.clear()
+    assert summary.as_dict(TODAY)["organizations"] == {}
+    assert read_summary(str(tmp_path / "nowhere")) is None
@@ -0,0 +1,133 @@
+"""
+Tests methods of partitioned_output.py
+"""
+import csv
+import json
+import pathlib
+
+import pytest
+
+from src.getmyapidata.output_options import OutputOptions
+from src.getmyapidata.partitioned_output import (DEFAULT_PARTITION,
+                                                 MANIFEST_FILENAME,
+                                                 PartitionedOutput,
+                                                 partition_path)
+
+HEADER: list[str] = ["organization", "participantId", "withdrawalStatus"]
+
+
+def read_part(filename: pathlib.Path) -> list[list[str]]:
+    with open(filename, "r", newline="", encoding="utf-8") as file:
+        return list(csv.reader(file))
+
+
+def test_partition_path() -> None:
+    assert (
+        partition_path(("organization", "withdrawalStatus"), ("A/B Site", None))
+        == f"organization=A%2FB%20Site/withdrawalStatus={DEFAULT_PARTITION}"
+    )
+
+
+def test_partitioned_output(logger, tmp_path) -> None:
+    options: OutputOptions = OutputOptions(
+        partition_by=("organization", "withdrawalStatus")
+    )
+    sizes: dict = {}
+
+    with PartitionedOutput(str(tmp_path), HEADER, options, logger, sizes) as output:
+        output.write_row(["A", "P1", "NOT_WITHDRAWN"])
+        output.write_row(["A", "P2", "EARLY_OUT"])
+        output.write_row(["A", "P3", "NOT_WITHDRAWN"])
+        output.close_partitions()
+        output.write_row(["B", "P4", ""])
+
+    root: pathlib.Path = tmp_path / "partitioned"
+    assert read_part(
+        root / "organization=A" / "withdrawalStatus=NOT_WITHDRAWN" / "part-0000.csv"
+    ) == [["participantId"], ["P1"], ["P3"]]
+    assert read_part(
+        root
+        / "organization=B"
+        / f"withdrawalStatus={DEFAULT_PARTITION}"
+        / "part-0000.csv"
+    ) == [["participantId"], ["P4"]]
+    assert sizes["csv_bytes"] > 0
+
+    manifest: dict = json.loads((root / MANIFEST_FILENAME).read_text(encoding="utf-8"))
+    assert manifest["partition_by"] == ["organization", "withdrawalStatus"]
+    assert manifest["columns"] == ["participantId"]
+    assert [(p["path"], p["rows"]) for p in manifest["partitions"]] == [
+        ("organization=A/withdrawalStatus=EARLY_OUT", 1),
+        ("organization=A/withdrawalStatus=NOT_WITHDRAWN", 2),
+        (f"organization=B/withdrawalStatus={DEFAULT_PARTITION}", 1),
+    ]
+    assert manifest["partitions"][2]["values"] == {
+        "organization": "B",
+        "withdrawalStatus": None,
+    }
+
+    # Next run: A's withdrawn participant's back & B's gone. Their old parts go too.
+    with PartitionedOutput(
+        str(tmp_path), HEADER, options._replace(compression="gzip"), logger
+    ) as output:
+        output.write_row(["A", "P1", "NOT_WITHDRAWN"])
+        output.write_row(["A", "P2", "NOT_WITHDRAWN"])
+
+    assert sorted(
+        str(path.relative_to(root)) for path in root.rglob("*") if path.is_file()
+    ) == [
+        MANIFEST_FILENAME,
+        "organization=A/withdrawalStatus=NOT_WITHDRAWN/part-0000.csv.gz",
+    ]
+
+
+def test_partitioned_output_failure(logger, tmp_path) -> None:
+    options: OutputOptions = OutputOptions(partition_by=("organization",))
+
+    with PartitionedOutput(str(tmp_path), HEADER, options, logger) as output:
+        output.write_row(["A", "P1", ""])
+
+    with pytest.raises(KeyError):
+        with PartitionedOutput(str(tmp_path), HEADER, options, logger) as output:
+            output.write_row(["A", "P9", ""])
+            raise KeyError("Stop.")
+
+    # The last complete run's left as it was.
+    assert read_part(tmp_path / "partitioned" / "organization=A" / "part-0000.csv") == [
+        ["participantId", "withdrawalStatus"],
+        ["P1", ""],
+    ]
+
+
+def test_partitioned_output_dataset(logger, tmp_path) -> None:
+    pytest.importorskip("pyarrow")
+    # pylint: disable=import-outside-toplevel
+    import pyarrow.dataset
+
+    options: OutputOptions = OutputOptions(
+        formats=("parquet",), partition_by=("organization", "withdrawalStatus")
+    )
+
+    with PartitionedOutput(str(tmp_path), HEADER, options, logger) as output:
+        for number in range(30):
+            output.write_row(
+                [
+                    "AB"[number % 2],
+                    f"P{number:02d}",
+                    "EARLY_OUT" if number % 3 == 0 else "NOT_WITHDRAWN",
+                ]
+            )
+
+    dataset = pyarrow.dataset.dataset(
+        tmp_path / "partitioned",
+        format="parquet",
+        partitioning="hive",
+        exclude_invalid_files=True,
+    )
+    table = dataset.to_table(
+        filter=(pyarrow.dataset.field("organization") == "A")
+        & (pyarrow.dataset.field("withdrawalStatus") == "NOT_WITHDRAWN")
+    )
+    assert sorted(table.column("participantId").to_pylist()) == [
+        f"P{number:02d}" for number in range(30) if number % 2 == 0 and number % 3
+    ]
@@ -0,0 +1,111 @@
+"""
+Start-up time guards: heavy modules stay out of the entry points' imports,
+and importing each entry point stays within an `-X importtime` budget,
+relative to importing a few stdlib modules, so it holds on slow machines too.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.getmyapidata import startup
+from src.getmyapidata.startup import StartupChecks
+
+PROJECT_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What every entry point imports anyway; its import time is the yardstick.
+BASELINE_MODULES: list[str] = ["argparse", "json", "logging"]
+
+# Cumulative import time allowed for each entry point, in multiples of the baseline's.
+IMPORT_BUDGETS: dict = {
+    "src.getmyapidata.cli": 30,
+    "src.getmyapidata.api_gui": 100,
+    "src.getmyapidata.healthpro_converter": 15,
+}
+
+# Modules each entry point must leave for the stage that needs them.
+DEFERRED_MODULES: dict = {
+    "src.getmyapidata.cli": ["pandas", "numpy", "wx", "tkinter", "win32api"],
+    "src.getmyapidata.api_gui": [
+        "pandas",
+        "numpy",
+        "requests",
+        "tkinter",
+        "win32api",
+        "pywintypes",
+    ],
+    "src.getmyapidata.healthpro_converter": ["pandas", "numpy", "pyarrow"],
+}
+
+
+def import_times(*modules: str) -> dict:
+    """
+    Runs a fresh interpreter with -X importtime & collects each module's cumulative time.
+
+    Parameters
+    ----------
+    modules: str
+
+    Returns
+    -------
+    times: dict         module name -> cumulative microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {', '.join(modules)}"],
+        cwd=PROJECT_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict = {}
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        _, cumulative, name = line.split("|")
+
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+
+    return times
+
+
+@pytest.mark.parametrize("module", list(IMPORT_BUDGETS))
+def test_import_budget(module: str) -> None:
+    if module.endswith("api_gui"):
+        pytest.importorskip("wx")
+
+    times: dict = import_times(module)
+    loaded: set = {name.split(".")[0] for name in times}
+
+    for deferred in DEFERRED_MODULES[module]:
+        assert deferred not in loaded, f"{module} imports {deferred} at start-up"
+
+    baseline_times: dict = import_times(*BASELINE_MODULES)
+    baseline: int = sum(baseline_times[name] for name in BASELINE_MODULES)
+    assert times[module] < IMPORT_BUDGETS[module] * baseline
+
+
+def test_startup_checks(logger) -> None:
+    checks: StartupChecks = StartupChecks(logger)
+    checks.start()
+    checks.join(timeout=60)
+    assert isinstance(checks.gcloud_installed, bool)
+    assert isinstance(checks.version, str)
+
+
+def test_startup_checks_errors(logger, monkeypatch) -> None:
+    def broken() -> bool:
+        raise OSError("gcloud vanished")
+
+    monkeypatch.setattr(startup, "gcloud_tools_installed", broken)
+    monkeypatch.setattr(startup, "get_exe_version", lambda log: "1.2.3")
+    checks: StartupChecks = StartupChecks(logger)
+    checks.start()
+    checks.join(timeout=60)
+
+    # Left for ApiGui to try again, rather than reported as "not installed".
+    assert checks.gcloud_installed is None
+    assert checks.version == "1.2.3"
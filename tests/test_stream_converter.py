@@ -0,0 +1,157 @@
+"""
+Tests methods of stream_converter.py, mostly that it gives the same output as pandas
+"""
+import csv
+import os
+import pathlib
+import subprocess
+import sys
+
+import pandas
+import pytest
+
+from src.getmyapidata import convert_to_hp_format
+from src.getmyapidata.healthpro_mapping import ColumnMapping, upper_case
+from src.getmyapidata.nested_fields import ResourceFlattener
+from src.getmyapidata.stream_converter import RowConverter
+
+PROJECT_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_FILE: str = os.path.join(PROJECT_DIRECTORY, "tests", "TEST_participant_list.csv")
+
+
+def awkward_participants() -> pandas.DataFrame:
+    """
+    The test participants, many times over, with fields that are hard to get right.
+    """
+    df: pandas.DataFrame = pandas.read_csv(TEST_FILE, dtype=str, keep_default_na=False)
+    df = pandas.concat([df] * 20, ignore_index=True)
+    df.loc[0, "streetAddress"] = '12 "Quoted" St,\nApt 4'
+    df.loc[1, "city"] = "Here, There"
+    df.loc[2, "state"] = ""
+    df.loc[3, "withdrawalStatus"] = "something_new"
+    df.loc[4, "clinicPhysicalMeasurementsStatus"] = "completed"
+    df.loc[5, "patientStatus"] = "[{'status': 'NO', 'organization': \"ST_MARY'S\"}]"
+    df.loc[6, "patientStatus"] = "[]"
+    df.loc[7, "withdrawalTime"] = "2020-1-5T1:2:3"
+    df.loc[8, "withdrawalTime"] = "2020-01-05"
+    df.loc[9, "withdrawalTime"] = "2020-01-05T01:02:03.250"
+    df.loc[10, "withdrawalTime"] = "2020-02-30T00:00:00"
+    df.loc[11, "withdrawalTime"] = "not a date"
+    df.loc[12, "deceasedAuthored"] = "3000-01-01T00:00:00"
+    df.loc[13, "firstName"] = "Ünïcode"
+    return df
+
+
+def convert_both(source: str, tmp_path: pathlib.Path, logger) -> tuple:
+    """
+    Converts source with the pandas & stream engines.
+
+    Returns
+    -------
+    (pandas output, stream output): tuple of bytes
+    """
+    outputs: list = []
+
+    for engine in ["pandas", "stream"]:
+        target: pathlib.Path = tmp_path / f"{engine}_transformed.csv"
+        participants: int = convert_to_hp_format.convert_file(
+            source, str(target), logger, engine=engine
+        )
+        assert participants > 0
+        outputs.append(target.read_bytes())
+
+    return tuple(outputs)
+
+
+def test_parity(logger, tmp_path) -> None:
+    by_pandas, by_stream = convert_both(TEST_FILE, tmp_path, logger)
+    assert by_stream == by_pandas
+
+
+def test_parity_awkward(logger, tmp_path) -> None:
+    source: pathlib.Path = tmp_path / "awkward_participant_list.csv"
+    awkward_participants().to_csv(source, index=False)
+    by_pandas, by_stream = convert_both(str(source), tmp_path, logger)
+    assert by_stream == by_pandas
+
+
+def test_parity_file_quirks(logger, tmp_path) -> None:
+    # A byte-order mark, blank lines & no state column.
+    source: pathlib.Path = tmp_path / "quirky_participant_list.csv"
+    df: pandas.DataFrame = awkward_participants().drop(columns=["state"])
+    lines: list[str] = df.to_csv(index=False).split("\n")
+    lines.insert(3, "")
+    source.write_text("﻿" + "\n".join(lines) + "\n", encoding="utf-8")
+    by_pandas, by_stream = convert_both(str(source), tmp_path, logger)
+    assert by_stream == by_pandas
+
+
+def test_parity_flattened(logger, tmp_path) -> None:
+    # The same participants, with patientStatus flattened as InSiteAPI now writes it.
+    legacy: pathlib.Path = tmp_path / "legacy_participant_list.csv"
+    awkward_participants().to_csv(legacy, index=False)
+    flattener: ResourceFlattener = ResourceFlattener()
+
+    with open(legacy, "r", newline="", encoding="utf-8") as file:
+        rows: list[dict] = [flattener.flatten_row(row) for row in csv.DictReader(file)]
+
+    flattened: pathlib.Path = tmp_path / "flattened_participant_list.csv"
+    pandas.DataFrame(rows).to_csv(flattened, index=False)
+    assert "patientStatusNoAccess" in flattened.read_text(encoding="utf-8")
+
+    by_pandas, by_stream = convert_both(str(flattened), tmp_path, logger)
+    assert by_stream == by_pandas
+    assert "ST_MARY'S" in by_pandas.decode("utf-8")
+
+    # Lists written before then have no patient status to go on until InSiteAPI
+    # rewrites them, but the engines still agree.
+    by_pandas, by_stream = convert_both(str(legacy), tmp_path, logger)
+    assert by_stream == by_pandas
+    assert "ST_MARY'S" not in by_pandas.decode("utf-8")
+
+
+def test_row_converter(logger) -> None:
+    convert_row: RowConverter = RowConverter(
+        [
+            ColumnMapping("Name", "name", upper_case(), None),
+            ColumnMapping("Loud Name", "name", upper_case(), None),
+            ColumnMapping("State", "state", None, "UNSET"),
+            ColumnMapping("Reason", None, None, "UNSET"),
+        ],
+        ["Name", "Empty", "Loud Name", "State", "Reason"],
+        ["state", "name"],
+        logger,
+    )
+    assert convert_row(["CA", "ann"]) == ["ANN", None, "ANN", "CA", "UNSET"]
+    assert convert_row(["", "bob"]) == ["BOB", None, "BOB", "UNSET", "UNSET"]
+
+    # Short rows, as pandas reads them.
+    assert convert_row([]) == ["", None, "", "UNSET", "UNSET"]
+
+    with pytest.raises(ValueError):
+        RowConverter(
+            [ColumnMapping("Nowhere", "name", None, None)], ["Name"], [], logger
+        )
+
+
+def test_without_pandas(logger, tmp_path) -> None:
+    (tmp_path / "A_participant_list.csv").write_bytes(
+        pathlib.Path(TEST_FILE).read_bytes()
+    )
+    script: str = (
+        "import logging, sys\n"
+        "sys.modules['pandas'] = sys.modules['numpy'] = None\n"
+        "from src.getmyapidata.healthpro_converter import HealthProConverter\n"
+        f"HealthProConverter(logging.getLogger(), {str(tmp_path)!r}, engine='pandas').convert()\n"
+    )
+    subprocess.run(
+        [sys.executable, "-c", script], cwd=PROJECT_DIRECTORY, check=True, timeout=60
+    )
+
+    by_pandas: pathlib.Path = tmp_path / "pandas.csv"
+    convert_to_hp_format.convert_file(
+        TEST_FILE, str(by_pandas), logger, engine="pandas"
+    )
+    assert (
+        tmp_path / "A_participant_list_transformed.csv"
+    ).read_bytes() == by_pandas.read_bytes()
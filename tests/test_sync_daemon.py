@@ -0,0 +1,204 @@
+"""
+Tests methods related to the scheduled sync service
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+import requests_mock
+
+from src.getmyapidata import sync_daemon
+from src.getmyapidata.aou_package import AouPackage
+from src.getmyapidata.insite_api import read_last_sync
+from src.getmyapidata.metrics import METRICS_FILENAME, RunMetrics
+from src.getmyapidata.sync_daemon import (LOCK_FILENAME, CronSchedule,
+                                          IntervalSchedule, RunLock,
+                                          SyncDaemon, parse_cron_field)
+from src.getmyapidata.token_provider import StaticTokenProvider, TokenProvider
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [["--incremental"], ["--summary"], ["--lookup", "P1"], ["--refresh-credentials"]],
+)
+def test_main_rejects_cli_options(argv, capsys) -> None:
+    with pytest.raises(SystemExit):
+        sync_daemon.main(argv)
+
+    assert argv[0] in capsys.readouterr().err
+
+
+def test_parse_cron_field() -> None:
+    assert parse_cron_field("*", 0, 5) == {0, 1, 2, 3, 4, 5}
+    assert parse_cron_field("*/15", 0, 59) == {0, 15, 30, 45}
+    assert parse_cron_field("1-3,7", 0, 10) == {1, 2, 3, 7}
+
+    with pytest.raises(ValueError):
+        parse_cron_field("61", 0, 59)
+
+
+def test_cron_schedule() -> None:
+    # Monday 2025-01-06 05:30.
+    start: float = datetime(2025, 1, 6, 5, 30).timestamp()
+
+    schedule: CronSchedule = CronSchedule("0 6 * * 1-5")
+    assert datetime.fromtimestamp(schedule.next_time(start)) == datetime(
+        2025, 1, 6, 6, 0
+    )
+
+    # Sundays only.
+    schedule = CronSchedule("15 2 * * 0")
+    assert datetime.fromtimestamp(schedule.next_time(start)) == datetime(
+        2025, 1, 12, 2, 15
+    )
+
+    with pytest.raises(ValueError):
+        CronSchedule("* * *")
+
+
+def test_interval_schedule() -> None:
+    assert IntervalSchedule(60).next_time(100.0) == 160.0
+
+    with pytest.raises(ValueError):
+        IntervalSchedule(0)
+
+
+def test_run_lock(logger, tmp_path) -> None:
+    lock: RunLock = RunLock(str(tmp_path), logger)
+    assert lock.acquire()
+    assert not RunLock(str(tmp_path), logger).acquire()
+    lock.release()
+    assert lock.acquire()
+    lock.release()
+
+
+def test_sync_daemon(
+    logger,
+    fake_config_file,
+    fake_participant_bundle,
+    fake_token,
+    monkeypatch,
+    tmp_path,
+) -> None:
+    num_auths: list = []
+
+    def fake_authenticate(*args, **kwargs) -> TokenProvider:
+        num_auths.append(kwargs.get("metrics"))
+        return StaticTokenProvider(fake_token)
+
+    monkeypatch.setattr(sync_daemon, "authenticate", fake_authenticate)
+    fake_aou_package: AouPackage = AouPackage(logger, config_file=str(fake_config_file))
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    daemon: SyncDaemon = SyncDaemon(
+        aou_package=fake_aou_package,
+        awardees=[fake_aou_package.awardee],
+        output_dir=str(tmp_path),
+        log=logger,
+        schedule=IntervalSchedule(60),
+        status_fn=lambda progress: None,
+    )
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        metrics: RunMetrics = daemon.run_cycle()
+        assert metrics.as_dict()["participants_new"] == 3
+        assert num_auths == [metrics]
+
+        # Second cycle: same token, incremental request.
+        metrics = daemon.run_cycle()
+        assert "_lastModified" in m.request_history[-1].url
+        assert metrics.as_dict()["token_refreshed"] is False
+        assert metrics.as_dict()["participants_unchanged"] == 3
+
+    assert len(num_auths) == 1
+    assert os.path.isfile(tmp_path / "CAL_PMC_SDBB_participant_list_transformed.csv")
+
+    with open(tmp_path / METRICS_FILENAME, "r", encoding="utf-8") as f:
+        published: list[dict] = [json.loads(line) for line in f]
+
+    assert len(published) == 2
+
+    # Someone else is syncing this directory.
+    (tmp_path / LOCK_FILENAME).write_text("12345")
+    assert daemon.run_cycle() is None
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_sync_daemon_errors(
+    logger, fake_config_file, fake_token, monkeypatch, parallel, tmp_path
+) -> None:
+    def failing_run(*args, **kwargs) -> dict:
+        raise ValueError("Unexpected response")
+
+    monkeypatch.setattr(
+        sync_daemon, "authenticate", lambda *a, **k: StaticTokenProvider(fake_token)
+    )
+    monkeypatch.setattr(sync_daemon.AwardeeSync, "run", failing_run)
+    fake_aou_package: AouPackage = AouPackage(logger, config_file=str(fake_config_file))
+    daemon: SyncDaemon = SyncDaemon(
+        aou_package=fake_aou_package,
+        awardees=["FIRST", "SECOND"],
+        output_dir=str(tmp_path),
+        log=logger,
+        schedule=IntervalSchedule(60),
+        parallel=parallel,
+        status_fn=lambda progress: None,
+    )
+
+    # Each failure is counted, in parallel as in turn, & the daemon carries on.
+    metrics: RunMetrics = daemon.run_cycle()
+    assert metrics.as_dict()["errors"] == 2
+
+
+def test_sync_daemon_failed_cycle(
+    logger,
+    fake_config_file,
+    fake_participant_bundle,
+    fake_token,
+    monkeypatch,
+    tmp_path,
+) -> None:
+    monkeypatch.setattr(
+        sync_daemon, "authenticate", lambda *a, **k: StaticTokenProvider(fake_token)
+    )
+    fake_aou_package: AouPackage = AouPackage(logger, config_file=str(fake_config_file))
+    fake_url: str = (
+        fake_aou_package.endpoint
+        + "?_sort=lastModified&_includeTotal=TRUE&_count=1000&awardee="
+        + fake_aou_package.awardee
+    )
+    daemon: SyncDaemon = SyncDaemon(
+        aou_package=fake_aou_package,
+        awardees=[fake_aou_package.awardee],
+        output_dir=str(tmp_path),
+        log=logger,
+        schedule=IntervalSchedule(60),
+        status_fn=lambda progress: None,
+    )
+
+    with requests_mock.Mocker() as m:
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        daemon.run_cycle()
+        since: str = read_last_sync(str(tmp_path))
+
+        # A second later, a cycle fails part-way...
+        time.sleep(1.1)
+        m.register_uri(method="GET", url=fake_url, json={}, status_code=200)
+        assert daemon.run_cycle().as_dict()["errors"] == 1
+
+        # ... so the next asks again for everything since the last one that worked.
+        m.register_uri(
+            method="GET", url=fake_url, json=fake_participant_bundle, status_code=200
+        )
+        daemon.run_cycle()
+        assert f"_lastModified=gt{since}" in m.request_history[-1].url
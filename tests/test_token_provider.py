@@ -0,0 +1,85 @@
+"""
+Tests the token providers
+"""
+import os
+
+import pytest
+
+from src.getmyapidata.metrics import RunMetrics
+from src.getmyapidata.token_provider import (CachingTokenProvider,
+                                             FileTokenProvider,
+                                             GCloudTokenProvider,
+                                             StaticTokenProvider,
+                                             TokenProvider)
+
+
+class CountingTokenProvider(TokenProvider):
+    def __init__(self) -> None:
+        self.calls: int = 0
+
+    def get_token(self) -> str:
+        self.calls += 1
+        return f"ya29.token{self.calls}"
+
+    def invalidate(self) -> bool:
+        return True
+
+
+def test_static_token_provider() -> None:
+    provider: StaticTokenProvider = StaticTokenProvider("ya29.static")
+    assert provider.get_token() == "ya29.static"
+
+    # Nothing else to offer.
+    assert not provider.invalidate()
+
+
+def test_file_token_provider(tmp_path) -> None:
+    token_file = tmp_path / "token.txt"
+    provider: FileTokenProvider = FileTokenProvider(str(token_file))
+
+    with pytest.raises(RuntimeError):
+        provider.get_token()
+
+    token_file.write_text("ya29.first\n")
+    assert provider.get_token() == "ya29.first"
+
+    token_file.write_text("ya29.second\n")
+    os.utime(token_file, (0, 0))
+    assert provider.get_token() == "ya29.second"
+
+
+def test_caching_token_provider() -> None:
+    inner: CountingTokenProvider = CountingTokenProvider()
+    provider: CachingTokenProvider = CachingTokenProvider(inner)
+
+    assert provider.get_token() == "ya29.token1"
+    assert provider.get_token() == "ya29.token1"
+    assert inner.calls == 1
+
+    assert provider.invalidate()
+    assert provider.get_token() == "ya29.token2"
+
+    # Too old to keep.
+    provider = CachingTokenProvider(inner, max_age=0)
+    assert provider.get_token() != provider.get_token()
+
+    # Wrapping a fixed token doesn't pretend to refresh it.
+    assert not CachingTokenProvider(StaticTokenProvider("ya29.static")).invalidate()
+
+
+def test_gcloud_token_provider(fake_aou_package, fake_gcloud, logger, tmp_path) -> None:
+    fake_aou_package.token_file = str(tmp_path / "key.json")
+    provider: CachingTokenProvider = CachingTokenProvider(
+        GCloudTokenProvider(aou_package=fake_aou_package, log=logger)
+    )
+    assert provider.get_token().startswith("ya29.")
+
+    # Invalidating also forgets the token cached on disk.
+    assert provider.invalidate()
+    assert not os.path.exists(tmp_path / "token_cache.json")
+
+    # Authenticating again is timed in whichever metrics it's been given since.
+    metrics: RunMetrics = RunMetrics()
+    provider.set_metrics(metrics)
+    assert provider.get_token().startswith("ya29.")
+    assert metrics.as_dict()["gcloud_auth_list_count"] > 0